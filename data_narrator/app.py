@@ -1,9 +1,8 @@
 import os
 import io
-import csv as _csv_mod
 import json
 import unicodedata
-import hashlib
+import threading
 from pathlib import Path
 from datetime import datetime
 
@@ -14,6 +13,9 @@ from loguru import logger
 from mistralai import Mistral
 from fpdf import FPDF
 
+import dataset_cache
+import profiler
+
 # ── logging ──────────────────────────────────────────────────────────────────
 
 os.makedirs("logs", exist_ok=True)
@@ -47,6 +49,9 @@ MAX_ROWS_WARN = 500_000
 TIMEOUT_MS = 180_000
 MAX_DESCRIBE_COLS = 12
 MAX_SAMPLE_CHARS = 2_000
+STREAM_PROFILE_MB = 50          # CSVs acima disso: prévia por amostra + perfil em blocos
+REFINE_POLL_S = 1.0             # intervalo de atualização do progresso do refinamento
+MAX_REFINE_JOBS = 4
 
 _SYSTEM_PROMPT = (
     "Você é um analista de dados sênior especialista em BI e storytelling com dados. "
@@ -81,41 +86,26 @@ def _get_secret(key: str, env_var: str = "") -> str:
     return os.getenv(env_var or key, "")
 
 
-def _sniff_sep(file_bytes: bytes) -> str:
-    """Detecta separador de CSV via Sniffer (vírgula como fallback)."""
-    try:
-        sample = file_bytes[:8192].decode("utf-8", errors="replace")
-        dialect = _csv_mod.Sniffer().sniff(sample, delimiters=",;\t|")
-        return dialect.delimiter
-    except Exception:
-        return ","
-
-
-def _file_hash(file_bytes: bytes) -> str:
-    return hashlib.md5(file_bytes).hexdigest()[:12]
+def _file_hash(uploaded) -> str:
+    """Hash do conteúdo do upload, calculado uma vez por arquivo enviado (não a cada rerun)."""
+    memo = st.session_state.setdefault("_upload_hashes", {})
+    ident = getattr(uploaded, "file_id", None) or f"{uploaded.name}:{uploaded.size}"
+    if ident not in memo:
+        memo.clear()
+        memo[ident] = dataset_cache.content_hash(uploaded.getbuffer())
+    return memo[ident]
 
 # ── data helpers ─────────────────────────────────────────────────────────────
 
-@st.cache_data(show_spinner=False)
 def load_data(file_bytes: bytes, filename: str) -> pd.DataFrame:
     logger.info(f"Carregando: {filename} ({len(file_bytes):,} bytes)")
     name = filename.lower()
     if name.endswith(".csv"):
-        sep = _sniff_sep(file_bytes)
-        for enc in ("utf-8", "latin-1", "cp1252"):
-            try:
-                df = pd.read_csv(io.BytesIO(file_bytes), encoding=enc, sep=sep)
-                # se sniffer errou e gerou só 1 coluna, tenta vírgula
-                if len(df.columns) == 1 and sep != ",":
-                    df2 = pd.read_csv(io.BytesIO(file_bytes), encoding=enc, sep=",")
-                    if len(df2.columns) > 1:
-                        df = df2
-                        sep = ","
-                logger.info(f"CSV ok encoding={enc} sep={sep!r} shape={df.shape}")
-                return df
-            except UnicodeDecodeError:
-                continue
-        raise ValueError("Não foi possível decodificar o CSV. Salve como UTF-8.")
+        # encoding e separador detectados no início do arquivo: uma única leitura
+        enc, sep = profiler.sniff_csv(file_bytes[:profiler.SNIFF_BYTES])
+        df = pd.read_csv(io.BytesIO(file_bytes), encoding=enc, encoding_errors="replace", sep=sep)
+        logger.info(f"CSV ok encoding={enc} sep={sep!r} shape={df.shape}")
+        return df
     elif name.endswith((".xlsx", ".xls")):
         df = pd.read_excel(io.BytesIO(file_bytes))
         logger.info(f"Excel ok shape={df.shape}")
@@ -123,78 +113,97 @@ def load_data(file_bytes: bytes, filename: str) -> pd.DataFrame:
     raise ValueError(f"Formato não suportado: '{filename}'. Use CSV ou Excel.")
 
 
-def _detect_string_dates(df: pd.DataFrame, cat_cols: list[str]) -> list[str]:
-    """Detecta colunas objeto que provavelmente contêm datas por heurística."""
-    date_like = []
-    sample_size = min(50, len(df))
-    for col in cat_cols:
-        sample = df[col].dropna().head(sample_size).astype(str)
-        try:
-            parsed = pd.to_datetime(sample, errors="coerce")
-            if parsed.notna().mean() > 0.7:
-                date_like.append(col)
-        except Exception:
-            pass
-    return date_like
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_dataset(cache_key: str, _uploaded=None) -> pd.DataFrame:
+    """Frame parseado: memória do processo → parquet do cache em disco → parser CSV/Excel.
+
+    Cada sessão recebe sua própria cópia. Sem `_uploaded`, só consulta o cache
+    (amostras de arquivos grandes) e levanta `LookupError` se a entrada não existe,
+    para que a ausência não fique memorizada.
+    """
+    df = dataset_cache.load_frame(cache_key)
+    if df is None:
+        if _uploaded is None:
+            raise LookupError(cache_key)
+        df = load_data(_uploaded.getvalue(), _uploaded.name)
+        dataset_cache.save_frame(cache_key, df)
+    return df
 
 
-@st.cache_data(show_spinner=False)
-def basic_profile(df: pd.DataFrame) -> dict:
-    logger.info(f"Gerando perfil shape={df.shape}")
-    num_cols = df.select_dtypes(include="number").columns.tolist()
-    cat_cols = df.select_dtypes(include=["object", "category"]).columns.tolist()
-    date_cols = df.select_dtypes(include=["datetime"]).columns.tolist()
-    string_dates = _detect_string_dates(df, cat_cols)
-
-    missing = df.isnull().sum()
-    missing_pct = (missing / len(df) * 100).round(2)
-    duplicates = int(df.duplicated().sum())
-
-    desc = df[num_cols].describe().round(4).to_dict() if num_cols else {}
-    skewness = {}
-    if num_cols:
-        skew = df[num_cols].skew().round(3)
-        skewness = {col: float(v) for col, v in skew.items() if pd.notna(v)}
+def cached_dataset(cache_key: str) -> pd.DataFrame | None:
+    """Frame já salvo no cache em disco, ou None."""
+    try:
+        return load_dataset(cache_key)
+    except LookupError:
+        return None
 
-    outlier_counts: dict[str, int] = {}
-    for col in num_cols:
-        s = df[col].dropna()
-        if len(s) < 4:
-            continue
-        q1, q3 = s.quantile(0.25), s.quantile(0.75)
-        iqr = q3 - q1
-        if iqr == 0:
-            continue
-        n = int(((s < q1 - 1.5 * iqr) | (s > q3 + 1.5 * iqr)).sum())
-        if n:
-            outlier_counts[col] = n
-
-    total_cells = len(df) * len(df.columns) or 1
-    missing_rate = missing.sum() / total_cells * 100
-    dup_rate = duplicates / len(df) * 100
-    outlier_rate = sum(outlier_counts.values()) / max(len(df) * len(num_cols), 1) * 100
-    quality_score = round(max(0, 100 - missing_rate * 0.6 - dup_rate * 0.3 - outlier_rate * 0.1), 1)
-    memory_mb = round(df.memory_usage(deep=True).sum() / 1_048_576, 2)
-
-    logger.info(f"Perfil: {len(num_cols)} num | {len(cat_cols)} cat | {duplicates} dup | Q={quality_score}")
-    return {
-        "rows": len(df),
-        "cols": len(df.columns),
-        "num_cols": num_cols,
-        "cat_cols": cat_cols,
-        "date_cols": date_cols,
-        "string_dates": string_dates,
-        "missing": {col: int(v) for col, v in missing[missing > 0].items()},
-        "missing_pct": {col: float(v) for col, v in missing_pct[missing_pct > 0].items()},
-        "duplicates": duplicates,
-        "outlier_counts": outlier_counts,
-        "skewness": skewness,
-        "describe": desc,
-        "dtypes": {col: str(dt) for col, dt in df.dtypes.items()},
-        "sample": df.head(5).to_dict(orient="records"),
-        "quality_score": quality_score,
-        "memory_mb": memory_mb,
-    }
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_sample(file_hash: str, _source) -> tuple[pd.DataFrame, int]:
+    """Amostra rápida de um CSV grande (blocos em posições aleatórias) e linhas estimadas."""
+    sample, est_rows, _ = profiler.sample_csv(_source)
+    logger.info(f"Amostra ok hash={file_hash} shape={sample.shape} linhas≈{est_rows:,}")
+    return sample, est_rows
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def sample_profile(file_hash: str, _sample: pd.DataFrame, est_rows: int) -> dict:
+    return profiler.profile_sample(_sample, est_rows)
+
+
+@st.cache_resource(show_spinner=False)
+def _refine_jobs() -> dict:
+    """Passadas completas em segundo plano, por hash do arquivo (compartilhadas entre sessões)."""
+    return {}
+
+
+def _refine(job: dict, data: bytes, cache_key: str) -> None:
+    """Perfil exato + amostra uniforme (reservatório) em uma passada pelo arquivo.
+
+    O resultado vai para o cache em disco: reabrir o arquivo não repete a passada.
+    """
+    t0 = datetime.now()
+    try:
+        profile, sample = profiler.refine_csv(data, on_progress=lambda rows: job.update(rows_done=rows))
+        dataset_cache.save_frame(cache_key, sample)
+        dataset_cache.save_json(cache_key, profile)
+        job["profile"], job["sample"] = profile, sample
+        logger.info(f"Refinamento ok em {(datetime.now()-t0).total_seconds():.1f}s ({profile['rows']:,} linhas)")
+    except Exception as e:
+        logger.error(f"Refinamento falhou: {e}")
+        job["error"] = str(e)
+    finally:
+        job["done"] = True
+
+
+def start_refine(cache_key: str, source, est_rows: int) -> dict:
+    """Dispara (uma vez por arquivo) o refinamento em segundo plano e retorna o job."""
+    jobs = _refine_jobs()
+    job = jobs.setdefault(cache_key, {"done": False, "rows_done": 0, "est_rows": est_rows})
+    if "thread" not in job:
+        job["thread"] = threading.Thread(target=_refine, args=(job, source.getvalue(), cache_key), daemon=True)
+        job["thread"].start()
+        for old in [h for h, j in jobs.items() if j["done"] and h != cache_key][:-MAX_REFINE_JOBS]:
+            jobs.pop(old, None)
+    return job
+
+
+@st.fragment(run_every=REFINE_POLL_S)
+def refine_status(job: dict) -> None:
+    if job["done"]:
+        st.rerun()
+    frac = min(job["rows_done"] / max(job["est_rows"], 1), 0.99)
+    st.progress(frac, text=f"🔄 Refinando com o arquivo completo... {job['rows_done']:,} linhas lidas")
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def basic_profile(cache_key: str, _df: pd.DataFrame) -> dict:
+    profile = dataset_cache.load_json(cache_key)
+    if profile is None:
+        logger.info(f"Gerando perfil shape={_df.shape}")
+        profile = profiler.profile_frame(_df)
+        dataset_cache.save_json(cache_key, profile)
+    return profile
 
 
 def _filter_profile_for_cols(profile: dict, cols: list[str]) -> dict:
@@ -210,6 +219,11 @@ def _filter_profile_for_cols(profile: dict, cols: list[str]) -> dict:
     p["outlier_counts"] = {c: v for c, v in profile["outlier_counts"].items() if c in col_set}
     p["skewness"] = {c: v for c, v in profile.get("skewness", {}).items() if c in col_set}
     p["describe"] = {c: v for c, v in profile.get("describe", {}).items() if c in col_set}
+    p["top_categories"] = {c: v for c, v in profile.get("top_categories", {}).items() if c in col_set}
+    p["correlations"] = {
+        c: {c2: r for c2, r in row.items() if c2 in col_set}
+        for c, row in profile.get("correlations", {}).items() if c in col_set
+    }
     p["cols"] = len(cols)
     p["sample"] = [{k: row.get(k) for k in cols if k in row} for row in profile["sample"]]
     return p
@@ -263,11 +277,10 @@ Use os nomes reais das colunas e valores do dataset.""".strip()
 @st.cache_data(show_spinner=False)
 def build_excel(df: pd.DataFrame, profile: dict) -> bytes:
     buf = io.BytesIO()
-    num_cols = profile["num_cols"]
     with pd.ExcelWriter(buf, engine="openpyxl") as writer:
         df.to_excel(writer, sheet_name="Dados", index=False)
-        if num_cols:
-            df[num_cols].describe().round(4).to_excel(writer, sheet_name="Estatisticas")
+        if profile["describe"]:
+            pd.DataFrame(profile["describe"]).to_excel(writer, sheet_name="Estatisticas")
         if profile["missing"]:
             pd.DataFrame({
                 "Coluna": list(profile["missing"].keys()),
@@ -288,17 +301,16 @@ def build_excel(df: pd.DataFrame, profile: dict) -> bytes:
 
 
 @st.cache_data(show_spinner=False)
-def top_correlations(df: pd.DataFrame, threshold: float = 0.7) -> list[tuple]:
+def top_correlations(corr: dict, threshold: float = 0.7) -> list[tuple]:
     """Retorna pares de colunas com |r| >= threshold, ordenados por |r| desc."""
-    num_cols = df.select_dtypes(include="number").columns.tolist()
+    num_cols = list(corr)
     if len(num_cols) < 2:
         return []
-    corr = df[num_cols].corr()
     pairs = []
     for i, c1 in enumerate(num_cols):
         for c2 in num_cols[i + 1:]:
-            r = corr.loc[c1, c2]
-            if pd.notna(r) and abs(r) >= threshold:
+            r = corr[c1].get(c2)
+            if r is not None and abs(r) >= threshold:
                 pairs.append((c1, c2, round(float(r), 3)))
     pairs.sort(key=lambda x: abs(x[2]), reverse=True)
     return pairs[:20]
@@ -507,10 +519,28 @@ if not uploaded:
 
 # ── load ─────────────────────────────────────────────────────────────────────
 
+# CSVs grandes: perfil da amostra na hora, refinado em segundo plano; demais: carga completa
+large_file = uploaded.name.lower().endswith(".csv") and uploaded.size > STREAM_PROFILE_MB * 1_048_576
+current_hash = _file_hash(uploaded)
+# entrada do cache em disco: hash do conteúdo + modo de leitura
+data_key = dataset_cache.dataset_key(
+    current_hash,
+    ext=Path(uploaded.name).suffix.lower(),
+    mode=f"stream-{profiler.SAMPLE_ROWS}" if large_file else "full",
+)
+cached_profile = dataset_cache.load_json(data_key) if large_file else None
+refine_job = None
+
 with st.spinner("Carregando dados..."):
     try:
-        file_bytes = uploaded.read()
-        df = load_data(file_bytes, uploaded.name)
+        # já analisado: perfil exato e amostra vêm do cache, sem nova passada pelo arquivo
+        df = cached_dataset(data_key) if cached_profile is not None else None
+        if df is None and large_file:
+            cached_profile = None
+            df, est_rows = load_sample(current_hash, uploaded)
+            refine_job = start_refine(data_key, uploaded, est_rows)
+        elif not large_file:
+            df = load_dataset(data_key, uploaded)
     except ValueError as e:
         logger.warning(f"Arquivo rejeitado: {e}")
         st.error(f"Arquivo inválido: {e}")
@@ -522,7 +552,14 @@ with st.spinner("Carregando dados..."):
 
 with st.spinner("Analisando estrutura..."):
     try:
-        profile = basic_profile(df)
+        if cached_profile is not None:
+            profile = cached_profile
+        elif refine_job and "profile" in refine_job:
+            profile, df = refine_job["profile"], refine_job["sample"]
+        elif refine_job:
+            profile = sample_profile(current_hash, df, est_rows)
+        else:
+            profile = basic_profile(data_key, df)
     except Exception as e:
         logger.error(f"Erro no perfil: {e}")
         st.error(f"Erro ao analisar o dataset: {e}")
@@ -530,14 +567,33 @@ with st.spinner("Analisando estrutura..."):
 
 # ── hash check: limpa estado ao trocar de arquivo ────────────────────────────
 
-current_hash = _file_hash(file_bytes)
 if st.session_state.get("_file_hash") != current_hash:
     for key in ("narrative", "pdf_bytes", "used_provider", "used_model", "chat_history"):
         st.session_state.pop(key, None)
     st.session_state["_file_hash"] = current_hash
     logger.info(f"Novo arquivo detectado (hash={current_hash}), estado limpo.")
 
-if profile["rows"] > MAX_ROWS_WARN:
+sampled = bool(profile.get("sample_rows"))
+conf = profile.get("confidence", {})
+approx = "≈" if sampled else ""
+
+if sampled:
+    st.info(
+        f"⚡ Prévia por amostra de {profile['sample_rows']:,} linhas (≈{profile['rows']:,} no arquivo). "
+        "Valores com ≈ são estimativas com intervalo de confiança de 95%; duplicatas e valores "
+        "exatos chegam ao fim do refinamento."
+    )
+    if refine_job.get("error"):
+        st.warning(f"Refinamento falhou: {refine_job['error']}. Mantida a prévia por amostra.")
+    else:
+        refine_status(refine_job)
+elif large_file:
+    st.info(
+        f"Arquivo grande: perfil calculado em blocos sobre {profile['rows']:,} linhas"
+        f"{' (quantis e outliers aproximados)' if profile.get('approximate') else ''}. "
+        f"Prévia, gráficos e exportação de dados usam uma amostra uniforme de {len(df):,} linhas."
+    )
+elif profile["rows"] > MAX_ROWS_WARN:
     st.warning(
         f"Dataset grande: {profile['rows']:,} linhas. "
         "EDA e perfil podem ser lentos. Considere filtrar antes do upload."
@@ -546,7 +602,7 @@ if profile["rows"] > MAX_ROWS_WARN:
 with st.sidebar:
     st.markdown(
         f'<div class="file-info">📄 <b>{uploaded.name}</b><br>'
-        f'{profile["rows"]:,} linhas · {profile["cols"]} colunas · {profile["memory_mb"]} MB</div>',
+        f'{approx}{profile["rows"]:,} linhas · {profile["cols"]} colunas · {approx}{profile["memory_mb"]} MB</div>',
         unsafe_allow_html=True,
     )
 
@@ -562,11 +618,11 @@ outlier_count = sum(profile["outlier_counts"].values())
 
 cols_m = st.columns(5)
 labels_vals = [
-    (f"{profile['rows']:,}", "Linhas"),
+    (f"{approx}{profile['rows']:,}", "Linhas"),
     (str(profile["cols"]), "Colunas"),
-    (f"{missing_count:,}", "Ausentes"),
-    (f"{outlier_count:,}", "Outliers"),
-    (str(qs), "Score Qualidade"),
+    (f"{approx}{missing_count:,}", "Ausentes"),
+    (f"{approx}{outlier_count:,}", "Outliers"),
+    (f"{approx}{qs}", "Score Qualidade"),
 ]
 for col_obj, (value, label) in zip(cols_m, labels_vals):
     val_cls = f"metric-value {q_class}" if label == "Score Qualidade" else "metric-value"
@@ -594,19 +650,22 @@ with tab_data:
     with col_a:
         st.subheader("Tipos de dados")
         dtype_rows = []
-        for col in df.columns:
+        for col, dtype in profile["dtypes"].items():
             sd = "📅 data detectada" if col in profile.get("string_dates", []) else ""
-            dtype_rows.append({"Coluna": col, "Tipo": str(df[col].dtype), "Obs": sd})
+            dtype_rows.append({"Coluna": col, "Tipo": dtype, "Obs": sd})
         st.dataframe(pd.DataFrame(dtype_rows), use_container_width=True)
 
     with col_b:
         if profile["missing"]:
             st.subheader("Valores ausentes")
-            st.dataframe(pd.DataFrame({
+            miss_df = pd.DataFrame({
                 "Coluna": list(profile["missing"].keys()),
                 "Ausentes": list(profile["missing"].values()),
                 "% do Total": [profile["missing_pct"][c] for c in profile["missing"]],
-            }), use_container_width=True)
+            })
+            if sampled:
+                miss_df["IC 95% (± p.p.)"] = [conf["missing_pct"].get(c) for c in profile["missing"]]
+            st.dataframe(miss_df, use_container_width=True)
         else:
             st.success("Nenhum valor ausente encontrado.")
 
@@ -640,12 +699,14 @@ with tab_data:
             "Outliers": list(profile["outlier_counts"].values()),
         }), use_container_width=True)
 
-    if num_cols:
+    if profile["describe"]:
         st.subheader("Estatísticas descritivas")
-        desc_df = df[num_cols].describe().round(4)
+        desc_df = pd.DataFrame(profile["describe"])
         if profile.get("skewness"):
             skew_series = pd.Series(profile["skewness"], name="skewness").round(3)
             desc_df = pd.concat([desc_df, skew_series.to_frame().T])
+        if sampled:
+            desc_df = pd.concat([desc_df, pd.Series(conf["mean"], name="± IC95 média").to_frame().T])
         st.dataframe(desc_df, use_container_width=True)
 
 # ── TAB: EDA ─────────────────────────────────────────────────────────────────
@@ -714,7 +775,7 @@ with tab_eda:
             for j, col in enumerate(display_cat[i : i + 2]):
                 with row_cols[j]:
                     try:
-                        vc = df[col].value_counts().head(max_cat_unique)
+                        vc = pd.Series(profile["top_categories"].get(col, {})).head(max_cat_unique)
                         fig = px.bar(
                             x=vc.values, y=vc.index, orientation="h", title=col,
                             labels={"x": "Contagem", "y": col},
@@ -733,20 +794,25 @@ with tab_eda:
 
     if len(num_cols) >= 2:
         # Top correlações em tabela
-        corr_pairs = top_correlations(df)
+        corr_pairs = top_correlations(profile["correlations"])
         if corr_pairs:
             st.subheader("Correlações Fortes (|r| ≥ 0.7)")
             corr_df = pd.DataFrame(corr_pairs, columns=["Coluna A", "Coluna B", "r"])
             corr_df["Força"] = corr_df["r"].abs().apply(
                 lambda v: "Alta (≥0.9)" if v >= 0.9 else ("Média (0.7–0.9)" if v >= 0.7 else "Baixa")
             )
+            if sampled:
+                corr_df["IC 95%"] = [
+                    conf["correlations"].get(a, {}).get(b) for a, b in zip(corr_df["Coluna A"], corr_df["Coluna B"])
+                ]
             st.dataframe(corr_df, use_container_width=True, hide_index=True)
 
         st.subheader("Matriz de Correlação")
         try:
-            corr_cols = num_cols[:MAX_EDA_COLS]
+            corr_cols = [c for c in num_cols[:MAX_EDA_COLS] if c in profile["correlations"]]
+            corr_matrix = pd.DataFrame(profile["correlations"]).loc[corr_cols, corr_cols].astype(float)
             fig = px.imshow(
-                df[corr_cols].corr(), text_auto=".2f",
+                corr_matrix, text_auto=".2f",
                 color_continuous_scale="RdBu_r", zmin=-1, zmax=1,
                 template="plotly_dark", aspect="auto",
             )
@@ -789,6 +855,8 @@ with tab_eda:
 with tab_ai:
     if not generate_ai:
         st.info("Ative 'Gerar narrativa com IA' na barra lateral.")
+    elif sampled:
+        st.info("A narrativa usa o perfil exato: aguarde o fim do refinamento (barra acima).")
     else:
         _ms_valid = validate_key("mistral", mistral_key)[0]
 
@@ -810,6 +878,13 @@ with tab_ai:
                 st.warning("Selecione pelo menos uma coluna para análise.")
                 st.stop()
 
+            narrative_file = dataset_cache.narrative_name(mistral_model, selected_cols)
+            if "narrative" not in st.session_state:
+                cached_narrative = dataset_cache.load_text(data_key, narrative_file)
+                if cached_narrative:
+                    st.session_state["narrative"] = cached_narrative
+                    st.session_state["used_model"] = mistral_model
+
             if "narrative" not in st.session_state or st.button("🔄 Regenerar análise"):
                 st.session_state.pop("pdf_bytes", None)
                 st.session_state.pop("narrative", None)
@@ -832,6 +907,7 @@ with tab_ai:
                 try:
                     full_text = st.write_stream(_run_stream())
                     st.session_state["narrative"] = full_text
+                    dataset_cache.save_text(data_key, narrative_file, full_text)
                     mdl = st.session_state.get("used_model", mistral_model)
                     st.markdown(f'<span class="provider-badge">💳 Mistral AI · {mdl}</span>',
                                 unsafe_allow_html=True)
@@ -918,10 +994,10 @@ with tab_export:
             mime="text/csv",
             use_container_width=True,
         )
-        if num_cols:
+        if profile["describe"]:
             st.download_button(
                 "⬇️ Estatísticas (CSV)",
-                data=df[num_cols].describe().round(4).to_csv().encode("utf-8"),
+                data=pd.DataFrame(profile["describe"]).to_csv().encode("utf-8"),
                 file_name="estatisticas_descritivas.csv",
                 mime="text/csv",
                 use_container_width=True,
@@ -0,0 +1,159 @@
+"""Cache em disco endereçado por conteúdo: datasets, perfis e narrativas.
+
+Cada entrada fica em `CACHE_DIR/<chave>/`, onde a chave é o hash do arquivo mais o
+conjunto de opções que afetam o resultado:
+
+    data.parquet          frame já parseado (ou a amostra, em arquivos grandes)
+    profile.json          perfil + correlações
+    narrativa_<id>.md     narrativas geradas (por modelo e colunas selecionadas)
+
+O parquet é relido com memory-map, então reabrir um dataset já analisado não passa
+pelo parser de CSV/Excel. Entradas menos usadas recentemente são removidas quando o
+total passa de `CACHE_MAX_MB`. O cache é compartilhado entre sessões e reinícios.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import pandas as pd
+from loguru import logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # sem pyarrow: só perfis e narrativas vão para o cache
+    pa = pq = None
+
+# ── constants ─────────────────────────────────────────────────────────────────
+
+CACHE_DIR = Path(os.getenv("DATNARRATOR_CACHE_DIR", Path(__file__).parent / ".cache" / "datasets"))
+CACHE_MAX_MB = int(os.getenv("DATNARRATOR_CACHE_MAX_MB", "2048"))
+CACHE_VERSION = 1  # incrementar quando o formato do perfil/parsing mudar
+
+# ── keys ─────────────────────────────────────────────────────────────────────
+
+def content_hash(data: bytes | memoryview) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def dataset_key(file_hash: str, **options) -> str:
+    """Chave da entrada: hash do conteúdo + opções (modo de leitura, versão do cache...)."""
+    opts = json.dumps({"v": CACHE_VERSION, **options}, sort_keys=True, default=str)
+    return f"{file_hash}-{hashlib.blake2b(opts.encode(), digest_size=4).hexdigest()}"
+
+
+def narrative_name(model: str, cols: list[str]) -> str:
+    ident = hashlib.blake2b(json.dumps([model, sorted(cols)]).encode(), digest_size=6).hexdigest()
+    return f"narrativa_{ident}.md"
+
+# ── entries ──────────────────────────────────────────────────────────────────
+
+def _entry(key: str) -> Path:
+    return CACHE_DIR / key
+
+
+def _touch(key: str) -> None:
+    """Marca a entrada como usada agora (ordem do LRU)."""
+    try:
+        os.utime(_entry(key))
+    except FileNotFoundError:
+        pass
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def load_frame(key: str) -> pd.DataFrame | None:
+    path = _entry(key) / "data.parquet"
+    if pq is None or not path.exists():
+        return None
+    try:
+        t0 = time.perf_counter()
+        df = pq.read_table(pa.memory_map(str(path)), memory_map=True).to_pandas()
+        _touch(key)
+        logger.info(f"Cache: frame {key} carregado em {(time.perf_counter()-t0)*1000:.0f} ms shape={df.shape}")
+        return df
+    except Exception as e:
+        logger.warning(f"Cache: parquet ilegível em {key}, ignorando: {e}")
+        return None
+
+
+def save_frame(key: str, df: pd.DataFrame) -> bool:
+    """Grava o frame como parquet; tipos que o Arrow não representa ficam só em memória."""
+    if pq is None:
+        return False
+    path = _entry(key) / "data.parquet"
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp)
+        os.replace(tmp, path)
+    except Exception as e:
+        logger.warning(f"Cache: frame {key} não gravado ({e})")
+        return False
+    evict()
+    return True
+
+
+def load_json(key: str, name: str = "profile.json") -> dict | None:
+    try:
+        data = json.loads((_entry(key) / name).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Cache: {name} ilegível em {key}: {e}")
+        return None
+    _touch(key)
+    return data
+
+
+def save_json(key: str, obj: dict, name: str = "profile.json") -> None:
+    _write_atomic(_entry(key) / name, json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8"))
+    evict()
+
+
+def load_text(key: str, name: str) -> str | None:
+    try:
+        text = (_entry(key) / name).read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+    _touch(key)
+    return text
+
+
+def save_text(key: str, name: str, text: str) -> None:
+    _write_atomic(_entry(key) / name, text.encode("utf-8"))
+    _touch(key)
+
+# ── eviction ─────────────────────────────────────────────────────────────────
+
+def _entry_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.iterdir() if f.is_file())
+
+
+def evict(max_mb: int | None = None) -> int:
+    """Remove as entradas usadas há mais tempo até o total caber em `max_mb`. Retorna quantas."""
+    limit = (CACHE_MAX_MB if max_mb is None else max_mb) * 1_048_576
+    if not CACHE_DIR.exists():
+        return 0
+    entries = sorted((p for p in CACHE_DIR.iterdir() if p.is_dir()), key=lambda p: p.stat().st_mtime)
+    sizes = {p: _entry_size(p) for p in entries}
+    total = sum(sizes.values())
+    removed = 0
+    for path in entries[:-1]:  # a entrada mais recente nunca é removida
+        if total <= limit:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= sizes[path]
+        removed += 1
+    if removed:
+        logger.info(f"Cache: {removed} entradas removidas (LRU), total {total / 1_048_576:.1f} MB")
+    return removed
@@ -0,0 +1,683 @@
+"""Perfil de datasets em uma passada, por blocos, com sketches mergeáveis.
+
+Cada bloco (chunk) de linhas atualiza acumuladores de tamanho limitado — momentos,
+quantis aproximados, top-k de categorias e hashes de linha para duplicatas — e o
+resultado final tem o mesmo formato de `basic_profile`. O pico de memória depende do
+tamanho do bloco, não do arquivo. Enquanto nenhum sketch precisa compactar (datasets
+pequenos), os números são exatos e batem com os do pandas.
+"""
+
+import codecs
+import csv as _csv_mod
+import io
+import os
+import tempfile
+from pathlib import Path
+from typing import IO, Callable, Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+# ── constants ─────────────────────────────────────────────────────────────────
+
+CHUNK_ROWS = 100_000          # linhas por bloco lido
+QUANTILE_K = 4_096            # itens por nível do sketch de quantis
+TOPK_CAPACITY = 10_000        # contadores por coluna categórica (Misra-Gries)
+TOPK_REPORT = 30              # categorias mais frequentes guardadas no perfil
+DUP_SPILL_HASHES = 2_000_000  # hashes de linha em memória antes de ir para disco
+DUP_BUCKETS = 64
+SNIFF_BYTES = 65_536
+CORR_MAX_COLS = 50            # colunas numéricas na matriz de correlação
+SAMPLE_ROWS = 50_000          # linhas da amostra (prévia rápida e reservatório)
+SAMPLE_BLOCK_BYTES = 16_384   # bytes lidos por posição aleatória na amostragem
+Z95 = 1.96
+
+NUM_DTYPES = "number"
+CAT_DTYPES = ["object", "category", "string"]
+
+# ── sketches ─────────────────────────────────────────────────────────────────
+
+class Moments:
+    """Contagem, média, M2, M3, mínimo e máximo (merge de Chan/Pébay)."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values: np.ndarray) -> None:
+        if not len(values):
+            return
+        other = Moments()
+        other.n = len(values)
+        other.mean = float(values.mean())
+        dev = values - other.mean
+        other.m2 = float((dev ** 2).sum())
+        other.m3 = float((dev ** 3).sum())
+        other.min = float(values.min())
+        other.max = float(values.max())
+        self.merge(other)
+
+    def merge(self, other: "Moments") -> None:
+        if not other.n:
+            return
+        if not self.n:
+            self.__dict__.update(other.__dict__)
+            return
+        na, nb = self.n, other.n
+        n = na + nb
+        delta = other.mean - self.mean
+        m3 = (self.m3 + other.m3 + delta ** 3 * na * nb * (na - nb) / n ** 2
+              + 3 * delta * (na * other.m2 - nb * self.m2) / n)
+        self.m2 = self.m2 + other.m2 + delta ** 2 * na * nb / n
+        self.m3 = m3
+        self.mean += delta * nb / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else float("nan")
+
+    @property
+    def skew(self) -> float:
+        """Assimetria ajustada de Fisher-Pearson (mesma definição de `Series.skew`)."""
+        if self.n < 3:
+            return float("nan")
+        m2, m3 = self.m2 / self.n, self.m3 / self.n
+        if m2 <= 1e-14 * max(1.0, self.mean ** 2):
+            return 0.0
+        return float(np.sqrt(self.n * (self.n - 1)) / (self.n - 2) * m3 / m2 ** 1.5)
+
+
+class QuantileSketch:
+    """Sketch de quantis no estilo KLL: níveis de até `k` itens, peso 2**nível.
+
+    Ao estourar, um nível é ordenado e metade dos itens (alternados) sobe de nível.
+    Enquanto nada subiu, guarda todos os valores e responde quantis exatos.
+    """
+
+    def __init__(self, k: int = QUANTILE_K, seed: int = 0):
+        self.k = k
+        self.levels: list[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def exact(self) -> bool:
+        return len(self.levels) == 1
+
+    def update(self, values: np.ndarray) -> None:
+        self.levels[0] = np.concatenate([self.levels[0], values.astype(float, copy=False)])
+        self._compress()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.k:
+                items = np.sort(items)
+                rest = items[len(items) - len(items) % 2:]
+                promoted = items[int(self._rng.integers(2)):len(items) - len(rest):2]
+                self.levels[level] = rest
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def _weighted(self) -> tuple[np.ndarray, np.ndarray]:
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lv), 2.0 ** i) for i, lv in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], weights[order]
+
+    def quantile(self, q: float) -> float:
+        if self.exact:
+            return float(np.quantile(self.levels[0], q)) if len(self.levels[0]) else float("nan")
+        items, weights = self._weighted()
+        cum = np.cumsum(weights)
+        idx = int(np.searchsorted(cum, q * cum[-1], side="left"))
+        return float(items[min(idx, len(items) - 1)])
+
+    def count_outside(self, low: float, high: float) -> int:
+        items, weights = self._weighted() if not self.exact else (self.levels[0], None)
+        mask = (items < low) | (items > high)
+        return int(mask.sum()) if weights is None else int(round(weights[mask].sum()))
+
+
+class TopK:
+    """Categorias mais frequentes (Misra-Gries): contagens exatas enquanto cabem em `capacity`."""
+
+    def __init__(self, capacity: int = TOPK_CAPACITY):
+        self.capacity = capacity
+        self.counts: dict = {}
+
+    def update(self, series: pd.Series) -> None:
+        self._merge_counts(series.value_counts(dropna=True).items())
+
+    def merge(self, other: "TopK") -> None:
+        self._merge_counts(other.counts.items())
+
+    def _merge_counts(self, items: Iterable) -> None:
+        counts = self.counts
+        for value, n in items:
+            counts[value] = counts.get(value, 0) + int(n)
+        if len(counts) > self.capacity:
+            cut = sorted(counts.values(), reverse=True)[self.capacity]
+            self.counts = {v: n - cut for v, n in counts.items() if n > cut}
+
+    def top(self, n: int = TOPK_REPORT) -> dict:
+        return {str(v): c for v, c in sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)[:n]}
+
+
+class DuplicateCounter:
+    """Conta linhas duplicadas por hash (64 bits) da linha inteira.
+
+    Os hashes ficam em memória até `DUP_SPILL_HASHES`; acima disso vão para arquivos
+    temporários particionados pelo prefixo do hash, deduplicados um por vez no final.
+    """
+
+    def __init__(self, spill_at: int = DUP_SPILL_HASHES):
+        self.spill_at = spill_at
+        self.rows = 0
+        self._pending: list[np.ndarray] = []
+        self._pending_size = 0
+        self._tmpdir: tempfile.TemporaryDirectory | None = None
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy(dtype=np.uint64)
+        self._add(hashes)
+
+    def _add(self, hashes: np.ndarray) -> None:
+        self.rows += len(hashes)
+        self._pending.append(hashes)
+        self._pending_size += len(hashes)
+        if self._pending_size > self.spill_at:
+            self._spill()
+
+    def _bucket_path(self, bucket: int) -> Path:
+        return Path(self._tmpdir.name) / f"{bucket:02d}.u64"
+
+    def _spill(self) -> None:
+        if self._tmpdir is None:
+            self._tmpdir = tempfile.TemporaryDirectory(prefix="datnarrator_dup_")
+        hashes = np.sort(np.concatenate(self._pending))
+        bounds = np.searchsorted(hashes >> np.uint64(58), np.arange(DUP_BUCKETS + 1, dtype=np.uint64))
+        for bucket in range(DUP_BUCKETS):
+            part = hashes[bounds[bucket]:bounds[bucket + 1]]
+            if len(part):
+                with open(self._bucket_path(bucket), "ab") as fh:
+                    part.tofile(fh)
+        self._pending, self._pending_size = [], 0
+
+    def merge(self, other: "DuplicateCounter") -> None:
+        rows = self.rows
+        for hashes in other._pending:
+            self._add(hashes)
+        if other._tmpdir is not None:
+            for bucket in range(DUP_BUCKETS):
+                path = other._bucket_path(bucket)
+                if path.exists():
+                    self._add(np.fromfile(path, dtype=np.uint64))
+        self.rows = rows + other.rows
+
+    def duplicates(self) -> int:
+        if self._tmpdir is None:
+            unique = len(np.unique(np.concatenate(self._pending))) if self._pending else 0
+            return self.rows - unique
+        self._spill()
+        unique = 0
+        for bucket in range(DUP_BUCKETS):
+            path = self._bucket_path(bucket)
+            if path.exists():
+                unique += len(np.unique(np.fromfile(path, dtype=np.uint64)))
+        self._tmpdir.cleanup()
+        self._tmpdir = None
+        return self.rows - unique
+
+class CorrelationSketch:
+    """Somas cruzadas para Pearson com pares completos (como `DataFrame.corr`).
+
+    Os valores são deslocados pela média do 1º bloco para reduzir erro numérico.
+    """
+
+    def __init__(self, cols: list[str]):
+        self.cols = cols
+        p = len(cols)
+        self.shift: np.ndarray | None = None
+        self.n = np.zeros((p, p))
+        self.sx = np.zeros((p, p))
+        self.sxx = np.zeros((p, p))
+        self.sxy = np.zeros((p, p))
+
+    def update(self, values: np.ndarray) -> None:
+        if not len(values) or not self.cols:
+            return
+        if self.shift is None:
+            self.shift = np.nan_to_num(np.nanmean(values, axis=0)) if np.isfinite(values).any() else np.zeros(len(self.cols))
+        present = ~np.isnan(values)
+        x = np.where(present, values - self.shift, 0.0)
+        m = present.astype(float)
+        self.n += m.T @ m
+        self.sx += x.T @ m
+        self.sxx += (x * x).T @ m
+        self.sxy += x.T @ x
+
+    def merge(self, other: "CorrelationSketch") -> None:
+        if other.shift is None:
+            return
+        if self.shift is None:
+            self.__dict__.update(other.__dict__)
+            return
+        # Traz as somas do outro para o deslocamento deste: x' = x + d
+        d = other.shift - self.shift
+        sx = other.sx + d[:, None] * other.n
+        self.sxx += other.sxx + 2 * d[:, None] * other.sx + (d ** 2)[:, None] * other.n
+        self.sxy += other.sxy + d[:, None] * other.sx.T + d[None, :] * other.sx + np.outer(d, d) * other.n
+        self.sx += sx
+        self.n += other.n
+
+    def matrix(self) -> dict[str, dict[str, float]]:
+        n, sx, sxx = self.n, self.sx, self.sxx
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = n * self.sxy - sx * sx.T
+            var = (n * sxx - sx ** 2) * (n * sxx.T - sx.T ** 2)
+            r = np.where((n >= 2) & (var > 0), cov / np.sqrt(var), np.nan)
+        np.fill_diagonal(r, np.where(np.diag(n) >= 2, 1.0, np.nan))
+        r = np.clip(r, -1.0, 1.0)
+        return {c1: {c2: (None if np.isnan(r[i, j]) else round(float(r[i, j]), 4))
+                     for j, c2 in enumerate(self.cols)} for i, c1 in enumerate(self.cols)}
+
+
+class ReservoirSample:
+    """Amostra uniforme de até `k` linhas (bottom-k por chave aleatória; mergeável)."""
+
+    def __init__(self, k: int = SAMPLE_ROWS, seed: int = 42):
+        self.k = k
+        self.frame: pd.DataFrame | None = None
+        self.keys = np.empty(0)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        keys = self._rng.random(len(chunk))
+        if self.frame is not None and len(self.keys) >= self.k:
+            keep = keys < self.keys.max()
+            chunk, keys = chunk[keep], keys[keep]
+        self._add(chunk, keys)
+
+    def merge(self, other: "ReservoirSample") -> None:
+        if other.frame is not None:
+            self._add(other.frame, other.keys)
+
+    def _add(self, chunk: pd.DataFrame, keys: np.ndarray) -> None:
+        if not len(chunk):
+            return
+        frame = chunk if self.frame is None else pd.concat([self.frame, chunk], ignore_index=True)
+        keys = np.concatenate([self.keys, keys])
+        if len(keys) > self.k:
+            idx = np.argpartition(keys, self.k - 1)[:self.k]
+            frame, keys = frame.iloc[idx], keys[idx]
+        self.frame, self.keys = frame.reset_index(drop=True), keys
+
+    def result(self) -> pd.DataFrame:
+        if self.frame is None:
+            return pd.DataFrame()
+        return self.frame.iloc[np.argsort(self.keys)].reset_index(drop=True)
+
+# ── profile accumulator ──────────────────────────────────────────────────────
+
+class ProfileAccumulator:
+    """Acumula o perfil bloco a bloco; `merge` combina perfis de partes do arquivo.
+
+    Com `reservoir_rows`, mantém também uma amostra uniforme das linhas (`reservoir`).
+    """
+
+    def __init__(self, reservoir_rows: int = 0):
+        self.rows = 0
+        self.columns: list[str] = []
+        self.num_cols: list[str] = []
+        self.cat_cols: list[str] = []
+        self.date_cols: list[str] = []
+        self.string_dates: list[str] = []
+        self.dtypes: dict[str, str] = {}
+        self.sample: list[dict] = []
+        self.missing: dict[str, int] = {}
+        self.memory_bytes = 0
+        self.moments: dict[str, Moments] = {}
+        self.quantiles: dict[str, QuantileSketch] = {}
+        self.topk: dict[str, TopK] = {}
+        self.dups = DuplicateCounter()
+        self.corr = CorrelationSketch([])
+        self.reservoir = ReservoirSample(reservoir_rows) if reservoir_rows else None
+        self._coerced: set[str] = set()
+
+    def _init_schema(self, chunk: pd.DataFrame) -> None:
+        self.columns = chunk.columns.tolist()
+        self.num_cols = chunk.select_dtypes(include=NUM_DTYPES).columns.tolist()
+        self.cat_cols = chunk.select_dtypes(include=CAT_DTYPES).columns.tolist()
+        self.date_cols = chunk.select_dtypes(include=["datetime"]).columns.tolist()
+        self.string_dates = detect_string_dates(chunk, self.cat_cols)
+        self.dtypes = {col: str(dt) for col, dt in chunk.dtypes.items()}
+        self.sample = chunk.head(5).to_dict(orient="records")
+        self.missing = {col: 0 for col in self.columns}
+        self.moments = {col: Moments() for col in self.num_cols}
+        self.quantiles = {col: QuantileSketch() for col in self.num_cols}
+        self.topk = {col: TopK() for col in self.cat_cols}
+        self.corr = CorrelationSketch(self.num_cols[:CORR_MAX_COLS])
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        if not self.columns:
+            self._init_schema(chunk)
+        self.rows += len(chunk)
+        self.memory_bytes += int(chunk.memory_usage(deep=True).sum())
+        for col, n in chunk.isna().sum().items():
+            self.missing[col] = self.missing.get(col, 0) + int(n)
+        hashed = chunk.copy(deep=False)
+        for col in self.num_cols:
+            series = chunk[col]
+            if not pd.api.types.is_numeric_dtype(series):
+                # Tipo inferido no 1º bloco; valores não numéricos viram ausentes
+                if col not in self._coerced:
+                    logger.warning(f"Coluna '{col}' com valores não numéricos após o 1º bloco; tratados como ausentes")
+                    self._coerced.add(col)
+                series = pd.to_numeric(series, errors="coerce")
+            if str(series.dtype) != self.dtypes[col]:
+                self.dtypes[col] = "float64"
+            # Mesmo dtype em todos os blocos: o hash da linha não depende da inferência do bloco
+            hashed[col] = series.astype(float)
+            values = series.dropna().to_numpy(dtype=float)
+            self.moments[col].update(values)
+            self.quantiles[col].update(values)
+        for col in self.cat_cols:
+            self.topk[col].update(chunk[col])
+        self.corr.update(hashed[self.corr.cols].to_numpy(dtype=float))
+        self.dups.update(hashed)
+        if self.reservoir is not None:
+            self.reservoir.update(chunk)
+
+    def merge(self, other: "ProfileAccumulator") -> None:
+        if not other.columns:
+            return
+        if not self.columns:
+            self.__dict__.update({k: v for k, v in other.__dict__.items()})
+            return
+        self.rows += other.rows
+        self.memory_bytes += other.memory_bytes
+        for col, n in other.missing.items():
+            self.missing[col] = self.missing.get(col, 0) + n
+        for col in self.num_cols:
+            self.moments[col].merge(other.moments[col])
+            self.quantiles[col].merge(other.quantiles[col])
+        for col in self.cat_cols:
+            self.topk[col].merge(other.topk[col])
+        self.corr.merge(other.corr)
+        self.dups.merge(other.dups)
+        if self.reservoir is not None and other.reservoir is not None:
+            self.reservoir.merge(other.reservoir)
+
+    @property
+    def exact(self) -> bool:
+        """True se nenhum sketch de quantis compactou (quantis e outliers exatos)."""
+        return all(q.exact for q in self.quantiles.values())
+
+    def result(self) -> dict:
+        rows = self.rows
+        missing = {col: n for col, n in self.missing.items() if n > 0}
+        duplicates = self.dups.duplicates()
+
+        desc: dict[str, dict] = {}
+        skewness: dict[str, float] = {}
+        outlier_counts: dict[str, int] = {}
+        for col in self.num_cols:
+            m, qs = self.moments[col], self.quantiles[col]
+            if not m.n:
+                continue
+            q1, q2, q3 = (qs.quantile(q) for q in (0.25, 0.5, 0.75))
+            desc[col] = {
+                stat: round(float(v), 4)
+                for stat, v in (("count", m.n), ("mean", m.mean), ("std", m.std), ("min", m.min),
+                                ("25%", q1), ("50%", q2), ("75%", q3), ("max", m.max))
+            }
+            if not np.isnan(m.skew):
+                skewness[col] = round(m.skew, 3)
+            iqr = q3 - q1
+            if m.n >= 4 and iqr != 0:
+                n_out = qs.count_outside(q1 - 1.5 * iqr, q3 + 1.5 * iqr)
+                if n_out:
+                    outlier_counts[col] = n_out
+
+        num_cols = self.num_cols
+        total_cells = rows * len(self.columns) or 1
+        missing_rate = sum(missing.values()) / total_cells * 100
+        dup_rate = duplicates / rows * 100 if rows else 0.0
+        outlier_rate = sum(outlier_counts.values()) / max(rows * len(num_cols), 1) * 100
+        quality_score = round(max(0, 100 - missing_rate * 0.6 - dup_rate * 0.3 - outlier_rate * 0.1), 1)
+
+        logger.info(
+            f"Perfil: {rows:,} linhas | {len(num_cols)} num | {len(self.cat_cols)} cat | "
+            f"{duplicates} dup | Q={quality_score} | exato={self.exact}"
+        )
+        return {
+            "rows": rows,
+            "cols": len(self.columns),
+            "num_cols": num_cols,
+            "cat_cols": self.cat_cols,
+            "date_cols": self.date_cols,
+            "string_dates": self.string_dates,
+            "missing": missing,
+            "missing_pct": {col: round(n / rows * 100, 2) for col, n in missing.items()},
+            "duplicates": duplicates,
+            "outlier_counts": outlier_counts,
+            "skewness": skewness,
+            "describe": desc,
+            "dtypes": self.dtypes,
+            "sample": self.sample,
+            "quality_score": quality_score,
+            "memory_mb": round(self.memory_bytes / 1_048_576, 2),
+            "top_categories": {col: self.topk[col].top() for col in self.cat_cols},
+            "correlations": self.corr.matrix(),
+            "approximate": not self.exact,
+        }
+
+# ── readers ──────────────────────────────────────────────────────────────────
+
+def detect_string_dates(df: pd.DataFrame, cat_cols: list[str]) -> list[str]:
+    """Detecta colunas objeto que provavelmente contêm datas por heurística."""
+    date_like = []
+    sample_size = min(50, len(df))
+    for col in cat_cols:
+        sample = df[col].dropna().head(sample_size).astype(str)
+        try:
+            parsed = pd.to_datetime(sample, errors="coerce")
+            if parsed.notna().mean() > 0.7:
+                date_like.append(col)
+        except Exception:
+            pass
+    return date_like
+
+
+def sniff_csv(head: bytes) -> tuple[str, str]:
+    """Detecta (encoding, separador) a partir do início do arquivo, sem reler o arquivo todo."""
+    encoding = "utf-8"
+    try:
+        text = codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        encoding = "latin-1"
+        text = head.decode("latin-1")
+    try:
+        sep = _csv_mod.Sniffer().sniff(text[:8192], delimiters=",;\t|").delimiter
+    except Exception:
+        sep = ","
+    # se o sniffer errou e gera só 1 coluna, tenta vírgula
+    lines = text.splitlines()[:20]
+    if sep != "," and lines and all(sep not in line for line in lines) and "," in lines[0]:
+        sep = ","
+    return encoding, sep
+
+
+def _open_binary(source: str | os.PathLike | IO[bytes] | bytes) -> IO[bytes]:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, "rb")
+    source.seek(0)
+    return source
+
+
+def iter_csv_chunks(source: str | os.PathLike | IO[bytes] | bytes,
+                    chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Lê o CSV em blocos de `chunk_rows` linhas (encoding e separador detectados no início)."""
+    fh = _open_binary(source)
+    try:
+        head = fh.read(SNIFF_BYTES)
+        fh.seek(0)
+        encoding, sep = sniff_csv(head)
+        logger.info(f"CSV em blocos encoding={encoding} sep={sep!r} chunk={chunk_rows:,}")
+        yield from pd.read_csv(fh, encoding=encoding, encoding_errors="replace", sep=sep, chunksize=chunk_rows)
+    finally:
+        if isinstance(source, (str, os.PathLike)):
+            fh.close()
+
+
+def iter_frame_chunks(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def profile_chunks(chunks: Iterable[pd.DataFrame]) -> dict:
+    acc = ProfileAccumulator()
+    for chunk in chunks:
+        acc.update(chunk)
+    return acc.result()
+
+
+def profile_frame(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS) -> dict:
+    """Perfil de um DataFrame já carregado (mesmo motor, processado em blocos)."""
+    return profile_chunks(iter_frame_chunks(df, chunk_rows))
+
+
+def profile_csv(source: str | os.PathLike | IO[bytes] | bytes, chunk_rows: int = CHUNK_ROWS) -> dict:
+    """Perfil de um CSV sem carregá-lo inteiro: memória limitada pelo tamanho do bloco."""
+    return profile_chunks(iter_csv_chunks(source, chunk_rows))
+
+def refine_csv(source: str | os.PathLike | IO[bytes] | bytes, sample_rows: int = SAMPLE_ROWS,
+               chunk_rows: int = CHUNK_ROWS,
+               on_progress: Callable[[int], None] | None = None) -> tuple[dict, pd.DataFrame]:
+    """Passada completa que substitui a prévia por amostra: perfil exato + amostra uniforme.
+
+    `on_progress` recebe o total de linhas lidas após cada bloco.
+    """
+    acc = ProfileAccumulator(reservoir_rows=sample_rows)
+    for chunk in iter_csv_chunks(source, chunk_rows):
+        acc.update(chunk)
+        if on_progress is not None:
+            on_progress(acc.rows)
+    return acc.result(), acc.reservoir.result()
+
+# ── fast sample ──────────────────────────────────────────────────────────────
+
+def sample_csv(source: str | os.PathLike | IO[bytes] | bytes, n_rows: int = SAMPLE_ROWS,
+               seed: int = 42) -> tuple[pd.DataFrame, int, bool]:
+    """Amostra rápida de um CSV lendo blocos em posições aleatórias do arquivo.
+
+    Retorna (amostra, linhas estimadas, exata). Não percorre o arquivo: o custo depende
+    de `n_rows`, não do tamanho. Linhas longas têm um pouco mais de chance de entrar;
+    a amostra uniforme vem do reservatório calculado na passada completa.
+    """
+    fh = _open_binary(source)
+    try:
+        fh.seek(0, os.SEEK_END)
+        size = fh.tell()
+        fh.seek(0)
+        head = fh.read(SNIFF_BYTES)
+        encoding, sep = sniff_csv(head)
+        header_end = head.find(b"\n") + 1
+        header = head[:header_end]
+
+        body_lines: list[bytes] = []
+        if size <= max(SNIFF_BYTES, n_rows * 200):
+            fh.seek(header_end)
+            body_lines = fh.read().splitlines()
+            exact = True
+        else:
+            exact = False
+            avg_line = max(1, (len(head) - header_end) // max(1, head[header_end:].count(b"\n")))
+            n_blocks = max(1, int(np.ceil(n_rows * avg_line / SAMPLE_BLOCK_BYTES)))
+            rng = np.random.default_rng(seed)
+            # Blocos sorteados sem reposição entre posições disjuntas: nenhuma linha entra duas vezes
+            n_slots = max(1, (size - header_end) // SAMPLE_BLOCK_BYTES)
+            slots = np.sort(rng.choice(n_slots, min(n_blocks, n_slots), replace=False))
+            for offset in header_end + slots * SAMPLE_BLOCK_BYTES:
+                fh.seek(int(offset))
+                # Descarta a primeira e a última linha do bloco (podem estar cortadas)
+                body_lines.extend(fh.read(SAMPLE_BLOCK_BYTES).split(b"\n")[1:-1])
+            body_lines = [line for line in body_lines if line.strip()]
+            if len(body_lines) > n_rows:
+                keep = np.sort(rng.choice(len(body_lines), n_rows, replace=False))
+                body_lines = [body_lines[i] for i in keep]
+    finally:
+        if isinstance(source, (str, os.PathLike)):
+            fh.close()
+
+    raw = header + b"\n".join(body_lines)
+    sample = pd.read_csv(io.BytesIO(raw), encoding=encoding, encoding_errors="replace", sep=sep,
+                         on_bad_lines="skip")
+    if exact:
+        est_rows = len(sample)
+    else:
+        mean_bytes = np.mean([len(line) + 1 for line in body_lines]) if body_lines else 1
+        est_rows = int(round((size - header_end) / mean_bytes))
+    logger.info(f"Amostra rápida: {len(sample):,} linhas | ≈{est_rows:,} no arquivo | exata={exact}")
+    return sample, est_rows, exact
+
+
+def profile_sample(sample: pd.DataFrame, est_rows: int) -> dict:
+    """Perfil de uma amostra extrapolado para `est_rows` linhas, com intervalos de 95%.
+
+    Contagens (ausentes, outliers) são escaladas; duplicatas ficam para a passada
+    completa, pois não se estimam bem a partir de uma amostra pequena.
+    """
+    profile = profile_frame(sample)
+    n = max(profile["rows"], 1)
+    scale = est_rows / n
+
+    mean_ci = {}
+    for col, d in profile["describe"].items():
+        if d["count"] > 1 and not np.isnan(d["std"]):
+            mean_ci[col] = round(Z95 * d["std"] / np.sqrt(d["count"]), 4)
+    missing_pct_ci = {}
+    for col, pct in profile["missing_pct"].items():
+        p = pct / 100
+        missing_pct_ci[col] = round(Z95 * np.sqrt(p * (1 - p) / n) * 100, 2)
+    corr_ci = {}
+    for c1, row in profile["correlations"].items():
+        for c2, r in row.items():
+            if r is None or c1 == c2 or n <= 3:
+                continue
+            z, hw = np.arctanh(np.clip(r, -0.9999, 0.9999)), Z95 / np.sqrt(n - 3)
+            corr_ci.setdefault(c1, {})[c2] = [round(float(np.tanh(z - hw)), 3), round(float(np.tanh(z + hw)), 3)]
+
+    for d in profile["describe"].values():
+        d["count"] = round(d["count"] * scale, 4)
+    profile.update({
+        "rows": est_rows,
+        "missing": {col: int(round(v * scale)) for col, v in profile["missing"].items()},
+        "outlier_counts": {col: int(round(v * scale)) for col, v in profile["outlier_counts"].items()},
+        "duplicates": 0,
+        "memory_mb": round(profile["memory_mb"] * scale, 2),
+        "approximate": True,
+        "sample_rows": profile["rows"],
+        "confidence": {"mean": mean_ci, "missing_pct": missing_pct_ci, "correlations": corr_ci},
+    })
+    return profile
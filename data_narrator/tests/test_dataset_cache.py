@@ -0,0 +1,104 @@
+"""
+Testes do cache em disco de datasets, perfis e narrativas
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+import dataset_cache
+from dataset_cache import content_hash, dataset_key
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Cache isolado em diretório temporário"""
+    monkeypatch.setattr(dataset_cache, "CACHE_DIR", tmp_path / "datasets")
+    return tmp_path / "datasets"
+
+
+def _fill(key: str, mb: float, mtime: float) -> None:
+    """Entrada com `mb` megabytes e última utilização em `mtime`"""
+    dataset_cache.save_text(key, "blob.bin", "x" * int(mb * 1_048_576))
+    os.utime(dataset_cache.CACHE_DIR / key, (mtime, mtime))
+
+
+class TestKeys:
+    """Testes para as chaves do cache"""
+
+    def test_changed_file_misses(self):
+        original = dataset_key(content_hash(b"a,b\n1,2\n"), ext=".csv", mode="full")
+        dataset_cache.save_json(original, {"rows": 1})
+
+        changed = dataset_key(content_hash(b"a,b\n1,3\n"), ext=".csv", mode="full")
+        assert changed != original
+        assert dataset_cache.load_json(changed) is None
+        assert dataset_cache.load_json(original) == {"rows": 1}
+
+    def test_changed_options_miss(self):
+        file_hash = content_hash(b"a,b\n1,2\n")
+        full = dataset_key(file_hash, ext=".csv", mode="full")
+        dataset_cache.save_json(full, {"rows": 1})
+
+        assert dataset_key(file_hash, ext=".csv", mode="full") == full
+        for other in (dataset_key(file_hash, ext=".csv", mode="stream-50000"),
+                      dataset_key(file_hash, ext=".xlsx", mode="full")):
+            assert other != full
+            assert dataset_cache.load_json(other) is None
+
+    def test_cache_version_is_part_of_key(self, monkeypatch):
+        key = dataset_key("abc", mode="full")
+        monkeypatch.setattr(dataset_cache, "CACHE_VERSION", dataset_cache.CACHE_VERSION + 1)
+        assert dataset_key("abc", mode="full") != key
+
+    def test_narrative_name_ignores_column_order(self):
+        assert dataset_cache.narrative_name("m", ["a", "b"]) == dataset_cache.narrative_name("m", ["b", "a"])
+        assert dataset_cache.narrative_name("m", ["a"]) != dataset_cache.narrative_name("outro", ["a"])
+
+
+class TestEntries:
+    """Testes para leitura e gravação das entradas"""
+
+    def test_frame_roundtrip(self):
+        pytest.importorskip("pyarrow")
+        df = pd.DataFrame({"x": [1, 2, 3], "y": ["a", "b", None]})
+
+        assert dataset_cache.save_frame("k", df)
+        pd.testing.assert_frame_equal(dataset_cache.load_frame("k"), df)
+        assert dataset_cache.load_frame("outra") is None
+
+
+class TestEviction:
+    """Testes para a remoção por tamanho (LRU)"""
+
+    def test_removes_oldest_until_under_limit(self, cache_dir):
+        for age, key in enumerate(["nova", "media", "velha", "mais_velha"]):
+            _fill(key, 0.4, mtime=1_000_000 - age * 60)
+
+        assert dataset_cache.evict(max_mb=1) == 2
+        assert sorted(p.name for p in cache_dir.iterdir()) == ["media", "nova"]
+
+    def test_reading_an_entry_protects_it(self, cache_dir):
+        for age, key in enumerate(["nova", "media", "velha"]):
+            _fill(key, 0.4, mtime=1_000_000 - age * 60)
+
+        assert dataset_cache.load_text("velha", "blob.bin")  # passa a ser a mais recente
+        assert dataset_cache.evict(max_mb=1) == 1
+        assert sorted(p.name for p in cache_dir.iterdir()) == ["nova", "velha"]
+
+    def test_keeps_newest_entry_even_if_over_limit(self, cache_dir):
+        _fill("velha", 0.5, mtime=1_000_000)
+        _fill("grande", 2, mtime=1_000_060)
+
+        assert dataset_cache.evict(max_mb=1) == 1
+        assert [p.name for p in cache_dir.iterdir()] == ["grande"]
+
+    def test_save_evicts_with_configured_limit(self, cache_dir, monkeypatch):
+        monkeypatch.setattr(dataset_cache, "CACHE_MAX_MB", 1)
+        _fill("velha", 0.6, mtime=1_000_000)
+        _fill("media", 0.3, mtime=1_000_060)
+
+        dataset_cache.save_json("nova", {"blob": "x" * 400_000})
+
+        assert sorted(p.name for p in cache_dir.iterdir()) == ["media", "nova"]
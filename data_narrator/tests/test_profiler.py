@@ -0,0 +1,266 @@
+"""
+Testes do perfil em blocos: sketches mesclados bloco a bloco comparados com o pandas
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from profiler import (
+    ProfileAccumulator, QuantileSketch, ReservoirSample, TopK,
+    iter_frame_chunks, profile_csv, profile_frame, profile_sample, refine_csv, sample_csv,
+)
+
+QUANTILES = (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+
+
+def _chunks(values, size):
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+def _iqr_outliers(series: pd.Series) -> int:
+    q1, q3 = series.quantile(0.25), series.quantile(0.75)
+    iqr = q3 - q1
+    return int(((series < q1 - 1.5 * iqr) | (series > q3 + 1.5 * iqr)).sum())
+
+
+@pytest.fixture
+def frame():
+    """Dataset misto com ausentes, duplicatas, cauda longa e categorias"""
+    rng = np.random.default_rng(0)
+    n = 3_500  # abaixo de QUANTILE_K: o perfil é exato
+    df = pd.DataFrame({
+        "valor": rng.lognormal(3, 1, n),
+        "idade": rng.integers(18, 90, n).astype(float),
+        "uf": rng.choice(["SP", "RJ", "MG", "BA", "RS", "PR"], n, p=[0.4, 0.2, 0.15, 0.1, 0.1, 0.05]),
+    })
+    df.loc[rng.choice(n, 200, replace=False), "idade"] = np.nan
+    return pd.concat([df, df.iloc[:300]], ignore_index=True)
+
+
+class TestQuantileSketch:
+    """Testes para QuantileSketch (estilo KLL)"""
+
+    def test_exact_while_not_compacted(self):
+        values = np.random.default_rng(1).normal(size=3_000)
+        sketch = QuantileSketch()
+        for part in _chunks(values, 700):
+            sketch.update(part)
+
+        assert sketch.exact
+        for q in QUANTILES:
+            assert sketch.quantile(q) == pytest.approx(pd.Series(values).quantile(q))
+
+    def test_merged_chunks_stay_within_rank_error(self):
+        values = np.random.default_rng(2).lognormal(0, 1, 200_000)
+        sketches = []
+        for part in _chunks(values, 25_000):
+            sketch = QuantileSketch(k=512, seed=len(sketches))
+            sketch.update(part)
+            sketches.append(sketch)
+        merged = sketches[0]
+        for other in sketches[1:]:
+            merged.merge(other)
+
+        assert not merged.exact
+        assert sum(len(level) for level in merged.levels) < 10_000
+        ordered = np.sort(values)
+        for q in QUANTILES:
+            rank = np.searchsorted(ordered, merged.quantile(q), side="right") / len(values)
+            assert rank == pytest.approx(q, abs=0.02)
+
+    def test_count_outside_matches_pandas_outliers(self):
+        series = pd.Series(np.random.default_rng(3).standard_t(3, 200_000))
+        sketch = QuantileSketch(k=1_024)
+        for part in _chunks(series.to_numpy(), 20_000):
+            sketch.update(part)
+
+        q1, q3 = series.quantile(0.25), series.quantile(0.75)
+        iqr = q3 - q1
+        expected = _iqr_outliers(series)
+        assert sketch.count_outside(q1 - 1.5 * iqr, q3 + 1.5 * iqr) == pytest.approx(expected, rel=0.05)
+
+
+class TestTopK:
+    """Testes para TopK (Misra-Gries)"""
+
+    def test_exact_counts_within_capacity(self, frame):
+        topk = TopK()
+        for chunk in iter_frame_chunks(frame, 600):
+            topk.update(chunk["uf"])
+
+        assert topk.top() == {k: int(v) for k, v in frame["uf"].value_counts().items()}
+
+    def test_merged_heavy_hitters_with_bounded_error(self):
+        rng = np.random.default_rng(4)
+        series = pd.Series(rng.zipf(1.5, 100_000) % 5_000).astype(str)
+        parts = []
+        for chunk in _chunks(series, 10_000):
+            part = TopK(capacity=200)
+            part.update(chunk)
+            parts.append(part)
+        merged = parts[0]
+        for other in parts[1:]:
+            merged.merge(other)
+
+        truth = series.value_counts()
+        top = merged.top(10)
+        assert list(top) == truth.index[:10].tolist()
+        # Misra-Gries subestima no máximo n / (capacity + 1) por mescla
+        bound = len(series) / 201 * len(parts)
+        for value, count in top.items():
+            assert truth[value] - bound <= count <= truth[value]
+
+
+class TestReservoirSample:
+    """Testes para ReservoirSample"""
+
+    def test_merged_sample_is_uniform(self):
+        frame = pd.DataFrame({"i": np.arange(100_000)})
+        parts = []
+        for seed, chunk in enumerate(iter_frame_chunks(frame, 10_000)):
+            part = ReservoirSample(k=5_000, seed=seed)
+            part.update(chunk)
+            parts.append(part)
+        merged = parts[0]
+        for other in parts[1:]:
+            merged.merge(other)
+
+        sample = merged.result()["i"]
+        assert len(sample) == 5_000
+        assert sample.is_unique
+        # cada bloco de 10% do arquivo contribui ~10% da amostra
+        shares = np.bincount(sample // 10_000, minlength=10) / len(sample)
+        assert shares == pytest.approx(np.full(10, 0.1), abs=0.02)
+        assert sample.mean() == pytest.approx(frame["i"].mean(), rel=0.03)
+
+
+class TestProfileAccumulator:
+    """Testes para ProfileAccumulator"""
+
+    def test_chunked_profile_matches_pandas(self, frame):
+        profile = profile_frame(frame, chunk_rows=500)
+
+        assert not profile["approximate"]
+        assert profile["rows"] == len(frame)
+        assert profile["duplicates"] == int(frame.duplicated().sum())
+        assert profile["missing"] == {"idade": int(frame["idade"].isna().sum())}
+        for col in ("valor", "idade"):
+            stats, series = profile["describe"][col], frame[col]
+            assert stats["count"] == series.count()
+            assert stats["mean"] == pytest.approx(series.mean(), abs=1e-3)
+            assert stats["std"] == pytest.approx(series.std(), abs=1e-3)
+            assert stats["50%"] == pytest.approx(series.quantile(0.5), abs=1e-3)
+            assert profile["skewness"][col] == pytest.approx(series.skew(), abs=1e-3)
+            assert profile["outlier_counts"].get(col, 0) == _iqr_outliers(series.dropna())
+        assert profile["top_categories"]["uf"] == {k: int(v) for k, v in frame["uf"].value_counts().items()}
+        assert profile["correlations"]["valor"]["idade"] == pytest.approx(
+            frame["valor"].corr(frame["idade"]), abs=1e-4
+        )
+
+    def test_merge_of_parts_equals_single_pass(self, frame):
+        parts = []
+        for half in (frame.iloc[:1_700], frame.iloc[1_700:]):
+            acc = ProfileAccumulator()
+            for chunk in iter_frame_chunks(half, 400):
+                acc.update(chunk)
+            parts.append(acc)
+        parts[0].merge(parts[1])
+
+        merged, single = parts[0].result(), profile_frame(frame)
+        for key in ("rows", "duplicates", "missing", "outlier_counts", "describe", "top_categories"):
+            assert merged[key] == single[key], key
+
+    def test_large_input_is_approximate_but_close(self):
+        rng = np.random.default_rng(5)
+        frame = pd.DataFrame({"x": rng.exponential(10, 300_000)})
+        profile = profile_frame(frame, chunk_rows=30_000)
+
+        assert profile["approximate"]
+        stats = profile["describe"]["x"]
+        ordered = np.sort(frame["x"].to_numpy())
+        for label, q in (("25%", 0.25), ("50%", 0.5), ("75%", 0.75)):
+            rank = np.searchsorted(ordered, stats[label], side="right") / len(ordered)
+            assert rank == pytest.approx(q, abs=0.01)
+        assert profile["outlier_counts"]["x"] == pytest.approx(_iqr_outliers(frame["x"]), rel=0.05)
+
+
+@pytest.fixture(scope="module")
+def large_csv(tmp_path_factory):
+    """CSV de ~100 mil linhas (bem acima do limite da leitura completa na amostragem)"""
+    rng = np.random.default_rng(6)
+    n = 100_000
+    df = pd.DataFrame({
+        "id": np.arange(n),
+        "preco": rng.normal(100, 15, n).round(2),
+        "qtd": rng.poisson(4, n).astype(float),
+        "cidade": rng.choice(["Recife", "Salvador", "Curitiba", "Belém"], n),
+    })
+    df["preco"] = df["preco"] + df["qtd"] * 2
+    df.loc[rng.random(n) < 0.05, "qtd"] = np.nan
+    path = tmp_path_factory.mktemp("csv") / "vendas.csv"
+    df.to_csv(path, index=False)
+    return path, df
+
+
+class TestSampleCsv:
+    """Testes para sample_csv e profile_sample (prévia por amostra)"""
+
+    def test_small_file_is_read_whole(self, frame):
+        sample, est_rows, exact = sample_csv(frame.to_csv(index=False).encode())
+
+        assert exact
+        assert est_rows == len(sample) == len(frame)
+
+    def test_sampled_blocks_do_not_overlap(self, large_csv):
+        path, df = large_csv
+        sample, _, exact = sample_csv(path, n_rows=10_000)
+
+        assert not exact
+        # blocos sobrepostos repetiriam linhas e inflariam o tamanho efetivo da amostra
+        assert sample["id"].is_unique
+        assert len(sample) > 5_000
+
+    def test_estimates_match_full_profile(self, large_csv):
+        path, df = large_csv
+        sample, est_rows, exact = sample_csv(path, n_rows=5_000)
+        estimate, full = profile_sample(sample, est_rows), profile_csv(path)
+
+        assert not exact
+        assert len(sample) <= 5_000
+        assert est_rows == pytest.approx(len(df), rel=0.03)
+        assert estimate["sample_rows"] == len(sample)
+        assert estimate["approximate"]
+        conf = estimate["confidence"]
+        for col in ("preco", "qtd"):
+            # média da amostra dentro de 3 semi-amplitudes do IC de 95% (margem para a amostragem por blocos)
+            error = abs(estimate["describe"][col]["mean"] - full["describe"][col]["mean"])
+            assert error <= 3 * conf["mean"][col]
+            assert estimate["describe"][col]["count"] == pytest.approx(full["describe"][col]["count"], rel=0.05)
+        assert estimate["missing_pct"]["qtd"] == pytest.approx(full["missing_pct"]["qtd"], abs=3 * conf["missing_pct"]["qtd"])
+        assert estimate["missing"]["qtd"] == pytest.approx(full["missing"]["qtd"], rel=0.15)
+        low, high = conf["correlations"]["preco"]["qtd"]
+        assert low - 0.05 <= full["correlations"]["preco"]["qtd"] <= high + 0.05
+
+
+class TestRefineCsv:
+    """Testes para refine_csv (passada completa que substitui a prévia)"""
+
+    def test_refined_profile_replaces_sampled_estimates(self, large_csv):
+        path, df = large_csv
+        sample, est_rows, _ = sample_csv(path, n_rows=5_000)
+        preview = profile_sample(sample, est_rows)
+        progress = []
+
+        refined, reservoir = refine_csv(path, sample_rows=5_000, chunk_rows=20_000, on_progress=progress.append)
+
+        assert progress == [20_000, 40_000, 60_000, 80_000, 100_000]
+        # sem marcas de prévia: a página troca o aviso de amostra pelo perfil completo
+        assert "sample_rows" not in refined and "confidence" not in refined
+        assert refined["rows"] == len(df) != preview["rows"]
+        assert refined["describe"]["qtd"]["count"] == df["qtd"].count()
+        assert refined["missing"] == {"qtd": int(df["qtd"].isna().sum())}
+        assert refined["describe"] == profile_csv(path, chunk_rows=20_000)["describe"]
+        assert len(reservoir) == 5_000
+        assert reservoir["id"].is_unique
+        assert reservoir["id"].mean() == pytest.approx(df["id"].mean(), rel=0.05)
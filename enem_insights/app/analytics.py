@@ -1,10 +1,16 @@
-"""Statistical analyses on ENEM data."""
+"""Statistical analyses on ENEM data.
+
+Every function answers from the aggregate cube (``app.cube``); passing row-level
+microdata still works, it is aggregated first.
+"""
 from __future__ import annotations
 
 import numpy as np
 import pandas as pd
 
+from .cube import HIST_BINS, HIST_WIDTH, ScoreCube, build_cube
 from .data_loader import INCOME_MAP, SUBJECT_COLS
+from .score_index import ScoreIndex
 
 SUBJECTS = {
     "NU_NOTA_CN": "Ciências da Natureza",
@@ -14,108 +20,130 @@ SUBJECTS = {
     "NU_NOTA_REDACAO": "Redação",
 }
 
+SUMMARY_COLS = SUBJECT_COLS + ["media_geral"]
 
-def regional_summary(df: pd.DataFrame) -> pd.DataFrame:
-    cols = SUBJECT_COLS + ["media_geral"]
-    agg = {c: "mean" for c in cols}
-    agg["SG_UF_RESIDENCIA"] = "count"
-    result = (
-        df.groupby("regiao")
-        .agg(agg)
-        .rename(columns={"SG_UF_RESIDENCIA": "participantes"})
-        .reset_index()
-    )
-    for col in cols:
-        result[col] = result[col].round(1)
-    return result.sort_values("media_geral", ascending=False)
 
+def _as_cube(data: ScoreCube | pd.DataFrame) -> ScoreCube:
+    return data if isinstance(data, ScoreCube) else build_cube(data)
 
-def state_summary(df: pd.DataFrame) -> pd.DataFrame:
-    cols = SUBJECT_COLS + ["media_geral"]
-    result = (
-        df.groupby(["SG_UF_RESIDENCIA", "iso_code", "regiao"])
-        .agg({c: "mean" for c in cols} | {"NU_ANO": "count"})
-        .rename(columns={"NU_ANO": "participantes"})
-        .reset_index()
-    )
-    for col in cols:
-        result[col] = result[col].round(1)
-    return result.sort_values("media_geral", ascending=False)
 
+def _grouped(cube: ScoreCube, by: str | list[str]) -> pd.DataFrame:
+    sums = [c for c in cube.stats.columns if c == "n" or c.split("_", 1)[0] in ("cnt", "sum", "sq")]
+    keys = [by] if isinstance(by, str) else by
+    g = cube.stats.groupby(keys, observed=True)[sums].sum().reset_index()
+    for k in keys:  # plain labels, sorted as a groupby on the microdata would
+        if isinstance(g[k].dtype, pd.CategoricalDtype):
+            g[k] = g[k].astype(str)
+    return g.sort_values(keys).set_index(by)
 
-def school_type_summary(df: pd.DataFrame) -> pd.DataFrame:
-    cols = SUBJECT_COLS + ["media_geral"]
-    result = (
-        df[df["escola_label"].isin(["Pública", "Privada"])]
-        .groupby("escola_label")[cols]
-        .agg(["mean", "std", "count"])
-    )
-    result.columns = ["_".join(c) for c in result.columns]
+
+def _means(g: pd.DataFrame, cols: list[str] = SUMMARY_COLS) -> pd.DataFrame:
+    return pd.DataFrame({c: g[f"sum_{c}"] / g[f"cnt_{c}"] for c in cols}, index=g.index)
+
+
+def _std(g: pd.DataFrame, col: str) -> pd.Series:
+    cnt = g[f"cnt_{col}"]
+    var = (g[f"sq_{col}"] - g[f"sum_{col}"] ** 2 / cnt) / (cnt - 1)
+    return np.sqrt(var.clip(lower=0))
+
+
+def regional_summary(df: ScoreCube | pd.DataFrame) -> pd.DataFrame:
+    g = _grouped(_as_cube(df), "regiao")
+    result = _means(g).round(1)
+    result["participantes"] = g["n"]
+    return result.reset_index().sort_values("media_geral", ascending=False)
+
+
+def state_summary(df: ScoreCube | pd.DataFrame) -> pd.DataFrame:
+    g = _grouped(_as_cube(df), ["SG_UF_RESIDENCIA", "iso_code", "regiao"])
+    result = _means(g).round(1)
+    result["participantes"] = g["n"]
+    return result.reset_index().sort_values("media_geral", ascending=False)
+
+
+def school_type_summary(df: ScoreCube | pd.DataFrame) -> pd.DataFrame:
+    cube = _as_cube(df).filter(escola_label=["Pública", "Privada"])
+    g = _grouped(cube, "escola_label")
+    means = _means(g)
+    result = pd.DataFrame(index=g.index)
+    for c in SUMMARY_COLS:
+        result[f"{c}_mean"] = means[c]
+        result[f"{c}_std"] = _std(g, c)
+        result[f"{c}_count"] = g[f"cnt_{c}"]
     return result.reset_index()
 
 
-def gender_summary(df: pd.DataFrame) -> pd.DataFrame:
-    cols = SUBJECT_COLS + ["media_geral"]
-    return (
-        df[df["genero_label"].isin(["Masculino", "Feminino"])]
-        .groupby("genero_label")[cols]
-        .mean()
-        .round(1)
-        .reset_index()
-    )
+def gender_summary(df: ScoreCube | pd.DataFrame) -> pd.DataFrame:
+    cube = _as_cube(df).filter(genero_label=["Masculino", "Feminino"])
+    return _means(_grouped(cube, "genero_label")).round(1).reset_index()
 
 
-def income_summary(df: pd.DataFrame) -> pd.DataFrame:
+def income_summary(df: ScoreCube | pd.DataFrame) -> pd.DataFrame:
     order = {v: i for i, v in enumerate(INCOME_MAP.values())}
-    result = (
-        df.groupby("renda_label")["media_geral"]
-        .agg(["mean", "count"])
-        .reset_index()
-        .rename(columns={"mean": "media_geral", "count": "participantes"})
-    )
+    g = _grouped(_as_cube(df), "renda_label")
+    result = pd.DataFrame({
+        "media_geral": g["sum_media_geral"] / g["cnt_media_geral"],
+        "participantes": g["cnt_media_geral"],
+    }).reset_index()
+    result["renda_label"] = result["renda_label"].astype(str)
     result["order"] = result["renda_label"].map(order).fillna(99)
     return result.sort_values("order").drop(columns="order").reset_index(drop=True)
 
 
-def race_summary(df: pd.DataFrame) -> pd.DataFrame:
-    cols = SUBJECT_COLS + ["media_geral"]
+def race_summary(df: ScoreCube | pd.DataFrame) -> pd.DataFrame:
+    cube = _as_cube(df)
+    cube = cube.filter(raca_label=[r for r in cube.levels("raca_label") if r != "Não declarado"])
     return (
-        df[df["raca_label"] != "Não declarado"]
-        .groupby("raca_label")[cols]
-        .mean()
+        _means(_grouped(cube, "raca_label"))
         .round(1)
         .reset_index()
         .sort_values("media_geral", ascending=False)
     )
 
 
-def yearly_trend(df: pd.DataFrame) -> pd.DataFrame:
-    cols = SUBJECT_COLS + ["media_geral"]
-    return (
-        df.groupby("NU_ANO")[cols]
-        .mean()
-        .round(1)
-        .reset_index()
-        .sort_values("NU_ANO")
-    )
+def yearly_trend(df: ScoreCube | pd.DataFrame) -> pd.DataFrame:
+    return _means(_grouped(_as_cube(df), "NU_ANO")).round(1).reset_index().sort_values("NU_ANO")
 
 
-def score_distribution(df: pd.DataFrame, subject: str, bins: int = 40) -> tuple[list, list]:
-    values = df[subject].dropna()
-    counts, edges = np.histogram(values, bins=bins, range=(0, 1000))
+def _histogram(cube: ScoreCube, subject: str) -> np.ndarray:
+    """Counts per ``HIST_WIDTH``-point bin over 0–1000."""
+    if cube.hist is None:
+        raise ValueError("Histogram not available for this filter (only year, UF/region and school type).")
+    h = cube.hist[cube.hist["disciplina"] == subject]
+    return np.bincount(h["bin"].to_numpy(), weights=h["n"].to_numpy(), minlength=HIST_BINS)
+
+
+def score_distribution(df: ScoreCube | pd.DataFrame, subject: str, bins: int = 40) -> tuple[list, list]:
+    fine = _histogram(_as_cube(df), subject)
+    if HIST_BINS % bins == 0:
+        counts = fine.reshape(bins, -1).sum(axis=1)
+    else:  # bins that do not align with the stored ones: re-bin by bin centre
+        centres = (np.arange(HIST_BINS) + 0.5) * HIST_WIDTH
+        counts, _ = np.histogram(centres, bins=bins, range=(0, 1000), weights=fine)
+    edges = np.linspace(0, 1000, bins + 1)
     centers = ((edges[:-1] + edges[1:]) / 2).round(0)
-    return centers.tolist(), counts.tolist()
+    return centers.tolist(), counts.astype(int).tolist()
 
 
-def subject_correlations(df: pd.DataFrame) -> pd.DataFrame:
-    return df[SUBJECT_COLS].corr().round(3)
+def subject_correlations(df: ScoreCube | pd.DataFrame) -> pd.DataFrame:
+    stats = _as_cube(df).stats
+    n = stats["cn"].sum()
+    s = {c: stats[f"cs_{c}"].sum() for c in SUBJECT_COLS}
+    cov = {}
+    for a, b in [(a, b) for a in SUBJECT_COLS for b in SUBJECT_COLS]:
+        key = f"cp_{a}_{b}" if f"cp_{a}_{b}" in stats else f"cp_{b}_{a}"
+        cov[a, b] = stats[key].sum() - s[a] * s[b] / n
+    corr = [[cov[a, b] / np.sqrt(cov[a, a] * cov[b, b]) for b in SUBJECT_COLS] for a in SUBJECT_COLS]
+    return pd.DataFrame(corr, index=SUBJECT_COLS, columns=SUBJECT_COLS).round(3)
 
 
-def top_states(df: pd.DataFrame, n: int = 10) -> pd.DataFrame:
+def top_states(df: ScoreCube | pd.DataFrame, n: int = 10) -> pd.DataFrame:
+    g = _grouped(_as_cube(df), "SG_UF_RESIDENCIA")
     result = (
-        df.groupby("SG_UF_RESIDENCIA")["media_geral"]
-        .agg(["mean", "count"])
-        .rename(columns={"mean": "Média", "count": "Participantes"})
+        pd.DataFrame({
+            "Média": g["sum_media_geral"] / g["cnt_media_geral"],
+            "Participantes": g["cnt_media_geral"],
+        })
         .reset_index()
         .rename(columns={"SG_UF_RESIDENCIA": "Estado"})
         .sort_values("Média", ascending=False)
@@ -125,11 +153,13 @@ def top_states(df: pd.DataFrame, n: int = 10) -> pd.DataFrame:
     return result.reset_index(drop=True)
 
 
-def inequality_index(df: pd.DataFrame) -> dict:
+def inequality_index(df: ScoreCube | pd.DataFrame) -> dict:
     """Compute a composite inequality index (0–100) from school and income gaps."""
-    pub = df[df["escola_label"] == "Pública"]["media_geral"]
-    prv = df[df["escola_label"] == "Privada"]["media_geral"]
-    school_gap = prv.mean() - pub.mean()
+    df = _as_cube(df)
+    school_gap = (
+        df.filter(escola_label=["Privada"]).mean("media_geral")
+        - df.filter(escola_label=["Pública"]).mean("media_geral")
+    )
 
     income_df = income_summary(df)
     income_gap = income_df["media_geral"].max() - income_df["media_geral"].min()
@@ -147,11 +177,26 @@ def inequality_index(df: pd.DataFrame) -> dict:
     }
 
 
-def percentile_distribution(df: pd.DataFrame, bins: int = 20) -> pd.DataFrame:
-    """Score cutoff per percentile bucket (useful for percentile band chart)."""
+def percentile_distribution(
+    df: ScoreIndex | ScoreCube | pd.DataFrame, bins: int = 20, **filters
+) -> pd.DataFrame:
+    """Score cutoff per percentile bucket (useful for percentile band chart).
+
+    Exact from a ``ScoreIndex`` (*filters* select its segments, e.g. ``NU_ANO=[2023]``);
+    from a cube, interpolated inside its ``HIST_WIDTH``-point histogram bins.
+    """
     quantiles = np.linspace(0, 1, bins + 1)
-    cuts = df["media_geral"].quantile(quantiles).round(1)
+    if isinstance(df, ScoreIndex):
+        cuts = df.quantiles(quantiles, **filters)
+    else:
+        counts = _histogram(_as_cube(df), "media_geral")
+        cum = np.concatenate([[0.0], np.cumsum(counts)])
+        edges = np.arange(HIST_BINS + 1) * HIST_WIDTH
+        nonzero = np.flatnonzero(counts)
+        cuts = np.interp(quantiles * cum[-1], cum, edges)
+        if len(nonzero):  # extremes: edges of the first/last non-empty bins
+            cuts[0], cuts[-1] = edges[nonzero[0]], edges[nonzero[-1] + 1]
     return pd.DataFrame({
         "percentil": (quantiles * 100).round(0).astype(int),
-        "nota": cuts.values,
+        "nota": cuts.round(1),
     })
@@ -253,6 +253,34 @@ def percentile_band_chart(score: float, percentile: float) -> go.Figure:
                   height=160)
 
 
+def income_whatif_chart(whatif_df: pd.DataFrame, current_income: str) -> go.Figure:
+    """Predicted score for the same profile across income brackets, with the 95% band."""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=whatif_df["income_label"], y=whatif_df["upper_95"],
+        mode="lines", line=dict(width=0), showlegend=False, hoverinfo="skip",
+    ))
+    fig.add_trace(go.Scatter(
+        x=whatif_df["income_label"], y=whatif_df["lower_95"],
+        mode="lines", line=dict(width=0), fill="tonexty",
+        fillcolor="rgba(52,152,219,0.15)", name="Intervalo 95%",
+    ))
+    fig.add_trace(go.Scatter(
+        x=whatif_df["income_label"], y=whatif_df["predicted"],
+        mode="lines+markers", name="Nota prevista",
+        line=dict(width=2.5, color="#3498db"),
+    ))
+    current = whatif_df[whatif_df["income_label"] == current_income]
+    fig.add_trace(go.Scatter(
+        x=current["income_label"], y=current["predicted"],
+        mode="markers", name="Seu perfil",
+        marker=dict(size=14, color="#e74c3c"),
+    ))
+    fig.update_layout(xaxis_tickangle=-45)
+    return _apply(fig, title="E se a renda fosse outra? Nota prevista por faixa de renda",
+                  xaxis_title="Faixa de Renda", yaxis_title="Nota prevista")
+
+
 def feature_importance_chart(fi_series: "pd.Series") -> go.Figure:  # noqa: F821
     labels = {
         "school_private": "Escola Privada",
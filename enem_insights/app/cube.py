@@ -0,0 +1,129 @@
+"""Pre-aggregated ENEM score cube.
+
+Two tables, both additive, so cubes built from CSV chunks merge by summing:
+
+* ``stats`` — one row per year × UF × school type × gender × race × income with
+  ``n`` (participants) and, per score column, ``cnt_``/``sum_``/``sq_`` (count,
+  sum, sum of squares). Complete-case sums and cross-products of the five subjects
+  (``cn``, ``cs_``, ``cp_``) make the correlation matrix exact as well.
+* ``hist`` — per year × UF × school type, score histograms in ``HIST_WIDTH``-point
+  bins, for distributions and percentile cut-offs.
+
+Label columns (``regiao``, ``escola_label``...) are attached after aggregation, so
+the pages filter the cube by the same names they used on the microdata.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .data_loader import PROFILE_COLS, SUBJECT_COLS, add_labels
+
+MEASURE_COLS = SUBJECT_COLS + ["media_objetivas", "media_geral"]
+HIST_DIMS = ["NU_ANO", "SG_UF_RESIDENCIA", "TP_ESCOLA"]
+HIST_WIDTH = 5
+HIST_BINS = 1000 // HIST_WIDTH
+
+PAIRS = [(a, b) for i, a in enumerate(SUBJECT_COLS) for b in SUBJECT_COLS[i:]]
+# label columns available in each table (derived from the code dimensions)
+STATS_LABELS = ["regiao", "iso_code", "escola_label", "genero_label", "raca_label", "renda_label"]
+HIST_LABELS = ["regiao", "iso_code", "escola_label"]
+
+
+@dataclass(frozen=True)
+class ScoreCube:
+    stats: pd.DataFrame
+    hist: pd.DataFrame | None
+
+    @property
+    def n(self) -> int:
+        return int(self.stats["n"].sum())
+
+    @property
+    def empty(self) -> bool:
+        return self.n == 0
+
+    def levels(self, dim: str) -> list:
+        return sorted(self.stats.loc[self.stats["n"] > 0, dim].dropna().unique())
+
+    def mean(self, col: str) -> float:
+        cnt = self.stats[f"cnt_{col}"].sum()
+        return float(self.stats[f"sum_{col}"].sum() / cnt) if cnt else float("nan")
+
+    def filter(self, **dims) -> "ScoreCube":
+        """Keep the cells whose dimensions are in the given values, e.g. ``NU_ANO=[2022]``.
+
+        The histogram is only kept when every filtered dimension exists in it.
+        """
+        stats, hist = self.stats, self.hist
+        for dim, values in dims.items():
+            stats = stats[stats[dim].isin(values)]
+            if hist is not None:
+                hist = hist[hist[dim].isin(values)] if dim in hist else None
+        return ScoreCube(stats, hist)
+
+
+def _stats(df: pd.DataFrame) -> pd.DataFrame:
+    cols: dict[str, pd.Series] = {"n": pd.Series(1, index=df.index, dtype="int64")}
+    for c in MEASURE_COLS:
+        v = df[c].astype("float64")
+        cols[f"cnt_{c}"] = v.notna().astype("int64")
+        cols[f"sum_{c}"] = v
+        cols[f"sq_{c}"] = v * v
+    subjects = df[SUBJECT_COLS].astype("float64")
+    complete = subjects.notna().all(axis=1)
+    cols["cn"] = complete.astype("int64")
+    for c in SUBJECT_COLS:
+        cols[f"cs_{c}"] = subjects[c].where(complete)
+    for a, b in PAIRS:
+        cols[f"cp_{a}_{b}"] = (subjects[a] * subjects[b]).where(complete)
+    keys = [df[d] for d in PROFILE_COLS]
+    return pd.DataFrame(cols).groupby(keys, dropna=False, observed=True, sort=False).sum().reset_index()
+
+
+def _hist(df: pd.DataFrame) -> pd.DataFrame:
+    parts = []
+    for c in MEASURE_COLS:
+        v = df[c].astype("float64")
+        valid = v.between(0, 1000)
+        part = df.loc[valid, HIST_DIMS].copy()
+        part["disciplina"] = c
+        part["bin"] = np.minimum(v[valid].to_numpy() // HIST_WIDTH, HIST_BINS - 1).astype("int16")
+        parts.append(part)
+    rows = pd.concat(parts, ignore_index=True)
+    return (
+        rows.groupby(HIST_DIMS + ["disciplina", "bin"], dropna=False, observed=True, sort=False)
+        .size()
+        .rename("n")
+        .reset_index()
+    )
+
+
+def _finish(stats: pd.DataFrame, hist: pd.DataFrame) -> ScoreCube:
+    stats = add_labels(stats.drop(columns=STATS_LABELS, errors="ignore"))
+    hist = add_labels(hist.drop(columns=HIST_LABELS, errors="ignore"))
+    hist["disciplina"] = hist["disciplina"].astype("category")
+    return ScoreCube(stats, hist)
+
+
+def build_cube(df: pd.DataFrame) -> ScoreCube:
+    """Aggregate row-level microdata (with ``media_*`` columns) into a cube."""
+    return _finish(_stats(df), _hist(df))
+
+
+def merge_cubes(cubes: list[ScoreCube]) -> ScoreCube:
+    """Sum cubes built from disjoint parts of the data (e.g. CSV chunks)."""
+    if len(cubes) == 1:
+        return cubes[0]
+    stats = pd.concat([c.stats.drop(columns=STATS_LABELS) for c in cubes], ignore_index=True)
+    hist = pd.concat([c.hist.drop(columns=HIST_LABELS) for c in cubes], ignore_index=True)
+    hist["disciplina"] = hist["disciplina"].astype(str)
+    stats = stats.groupby(PROFILE_COLS, dropna=False, observed=True, sort=False).sum().reset_index()
+    hist = (
+        hist.groupby(HIST_DIMS + ["disciplina", "bin"], dropna=False, observed=True, sort=False)["n"]
+        .sum()
+        .reset_index()
+    )
+    return _finish(stats, hist)
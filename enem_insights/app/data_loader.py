@@ -1,6 +1,8 @@
 """Load ENEM microdata or generate synthetic sample data."""
 from __future__ import annotations
 
+import hashlib
+import json
 import os
 
 import numpy as np
@@ -45,6 +47,8 @@ INCOME_MAP = {
 }
 
 SUBJECT_COLS = ["NU_NOTA_CN", "NU_NOTA_CH", "NU_NOTA_LC", "NU_NOTA_MT", "NU_NOTA_REDACAO"]
+OBJECTIVE_COLS = ["NU_NOTA_CN", "NU_NOTA_CH", "NU_NOTA_LC", "NU_NOTA_MT"]
+PROFILE_COLS = ["NU_ANO", "SG_UF_RESIDENCIA", "TP_ESCOLA", "TP_SEXO", "TP_COR_RACA", "Q006"]
 SUBJECT_NAMES = {
     "NU_NOTA_CN": "Ciências da Natureza",
     "NU_NOTA_CH": "Ciências Humanas",
@@ -123,42 +127,117 @@ def _generate_synthetic_data(n: int = 60_000, seed: int = 42) -> pd.DataFrame:
         "NU_NOTA_MT": subj(shift=-10, noise=100),
         "NU_NOTA_REDACAO": redacao,
     })
+    return _enrich(df)
+
+
+# ── Derived columns ──────────────────────────────────────────────────────────
+
+def _label(codes: pd.Series, mapping: dict, default: str | None) -> pd.Series:
+    """Categorical label column; maps the distinct codes only, not every row."""
+    cat = codes.astype("category").cat
+    labels = [mapping.get(c, default) for c in cat.categories] + [default]
+    uniques = list(dict.fromkeys(lab for lab in labels if lab is not None))
+    lookup = np.array([uniques.index(lab) if lab is not None else -1 for lab in labels], dtype=np.int16)
+    return pd.Series(
+        pd.Categorical.from_codes(lookup[cat.codes], categories=uniques),
+        index=codes.index,
+    )
+
+
+def add_labels(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the display label columns for whichever code columns *df* has."""
+    if "SG_UF_RESIDENCIA" in df:
+        df["regiao"] = _label(df["SG_UF_RESIDENCIA"], REGIONS, "Desconhecida")
+        df["iso_code"] = _label(df["SG_UF_RESIDENCIA"], STATE_ISO, None)
+    if "TP_ESCOLA" in df:
+        df["escola_label"] = _label(df["TP_ESCOLA"], SCHOOL_TYPE_MAP, "Outro")
+    if "TP_SEXO" in df:
+        df["genero_label"] = _label(df["TP_SEXO"], GENDER_MAP, "Outro")
+    if "TP_COR_RACA" in df:
+        df["raca_label"] = _label(df["TP_COR_RACA"], RACE_MAP, "Não declarado")
+    if "Q006" in df:
+        df["renda_label"] = _label(df["Q006"], INCOME_MAP, "Não informado")
     return df
 
 
+def add_means(df: pd.DataFrame) -> pd.DataFrame:
+    df["media_objetivas"] = df[OBJECTIVE_COLS].mean(axis=1).round(1)
+    df["media_geral"] = df[SUBJECT_COLS].mean(axis=1).round(1)
+    return df
+
+
+def _enrich(df: pd.DataFrame) -> pd.DataFrame:
+    return add_labels(add_means(df))
+
+
 # ── Public loader ────────────────────────────────────────────────────────────
 
-@st.cache_data(show_spinner="Carregando dados do ENEM...")
-def load_data() -> pd.DataFrame:
+def _data_source() -> tuple[str, int]:
     path = os.getenv("ENEM_DATA_PATH", "")
     sample_size = int(os.getenv("ENEM_SAMPLE_SIZE", "0"))
+    return (path if path and os.path.exists(path) else ""), sample_size
+
 
-    if path and os.path.exists(path):
-        logger.info(f"Loading microdata from {path}")
-        df = pd.read_csv(
-            path, sep=";", encoding="latin-1",
-            usecols=["NU_ANO", "SG_UF_RESIDENCIA", "TP_ESCOLA", "TP_SEXO",
-                     "TP_COR_RACA", "Q006"] + SUBJECT_COLS,
-            nrows=sample_size or None,
-        )
-        df = df.dropna(subset=["NU_NOTA_MT", "NU_NOTA_REDACAO"])
+@st.cache_resource(show_spinner="Carregando dados do ENEM...")
+def load_data() -> pd.DataFrame:
+    """Row-level microdata. Only pages that need individual scores should call this."""
+    from . import store  # store imports this module
+
+    path, sample_size = _data_source()
+    if path:
+        store.ensure_store(path, sample_size)
+        logger.info(f"Loading microdata from Parquet store {store.STORE_DIR}")
+        return store.read_microdata()
+    logger.info("No data path — using synthetic sample.")
+    return _generate_synthetic_data()
+
+
+def data_version() -> str:
+    """Short hash identifying the current dataset (versions the trained models)."""
+    from . import store
+
+    path, sample_size = _data_source()
+    if path:
+        store.ensure_store(path, sample_size)
+        manifest = store.read_manifest()
+        payload = json.dumps({k: manifest[k] for k in ("version", "source", "size", "mtime_ns", "sample_size")})
     else:
-        logger.info("No data path — using synthetic sample.")
-        df = _generate_synthetic_data()
+        payload = str(pd.util.hash_pandas_object(load_data()[PROFILE_COLS + SUBJECT_COLS], index=False).sum())
+    return hashlib.blake2b(payload.encode(), digest_size=6).hexdigest()
 
-    df["regiao"] = df["SG_UF_RESIDENCIA"].map(REGIONS).fillna("Desconhecida")
-    df["iso_code"] = df["SG_UF_RESIDENCIA"].map(STATE_ISO)
-    df["escola_label"] = df["TP_ESCOLA"].map(SCHOOL_TYPE_MAP).fillna("Outro")
-    df["genero_label"] = df["TP_SEXO"].map(GENDER_MAP).fillna("Outro")
-    df["raca_label"] = df["TP_COR_RACA"].map(RACE_MAP).fillna("Não declarado")
-    df["renda_label"] = df["Q006"].map(INCOME_MAP).fillna("Não informado")
 
-    df["media_objetivas"] = df[["NU_NOTA_CN", "NU_NOTA_CH", "NU_NOTA_LC", "NU_NOTA_MT"]].mean(axis=1).round(1)
-    df["media_geral"] = df[SUBJECT_COLS].mean(axis=1).round(1)
+@st.cache_resource(show_spinner="Carregando agregados do ENEM...")
+def load_cube():
+    """Aggregate cube behind the analytics pages (never loads the microdata for real data)."""
+    from . import store
+    from .cube import build_cube
+
+    path, sample_size = _data_source()
+    if path:
+        store.ensure_store(path, sample_size)
+        return store.read_cube()
+    return build_cube(load_data())
+
+
+@st.cache_resource(show_spinner="Indexando notas...")
+def load_score_index():
+    """Sorted-score index for percentile lookups (binary search, see ``app.score_index``)."""
+    from . import store
+    from .score_index import ScoreIndex
+
+    path, sample_size = _data_source()
+    if path:
+        store.ensure_store(path, sample_size)
+        return store.read_score_index()
+    return ScoreIndex.from_frame(load_data())
 
-    return df
 
+def calc_percentile(df, score: float, **filters) -> float:
+    """Return percentile rank of *score* within the dataset (0–100).
 
-def calc_percentile(df: pd.DataFrame, score: float) -> float:
-    """Return percentile rank of *score* within the dataset (0–100)."""
-    return float((df["media_geral"] < score).mean() * 100)
+    *df* is a ``ScoreIndex`` (binary search, optional segment filters) or the
+    microdata frame (full-column scan).
+    """
+    if isinstance(df, pd.DataFrame):
+        return float((df["media_geral"] < score).mean() * 100)
+    return df.percentile(score, **filters)
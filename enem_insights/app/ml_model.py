@@ -1,56 +1,104 @@
-"""Score prediction model — Gradient Boosting with uncertainty estimate."""
+"""Score prediction model — Gradient Boosting with uncertainty estimate.
+
+Models are trained offline and saved as versioned artifacts:
+
+    python -m app.ml_model train [--algo hgb|gbr] [--max-rows N]
+
+``data/models/<algo>-<data version>.joblib`` holds the fitted pipeline, metrics
+and feature importances. The app loads the artifact matching the current data
+(``data_loader.data_version``) and only trains in-process when none exists.
+"""
 from __future__ import annotations
 
+import argparse
+import os
+import time
+from pathlib import Path
+
+import joblib
 import numpy as np
 import pandas as pd
+import sklearn
 import streamlit as st
-from sklearn.ensemble import GradientBoostingRegressor
+from loguru import logger
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor
+from sklearn.inspection import permutation_importance
 from sklearn.metrics import mean_absolute_error, r2_score
-from sklearn.model_selection import cross_val_score, train_test_split
+from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.preprocessing import StandardScaler
 
-from .data_loader import INCOME_MAP, REGIONS
+from .data_loader import INCOME_MAP, REGIONS, data_version, load_data
+
+MODELS_DIR = Path(os.getenv("ENEM_MODELS_DIR", Path(__file__).resolve().parent.parent / "data" / "models"))
+DEFAULT_ALGO = os.getenv("ENEM_MODEL_ALGO", "hgb")
+ALGOS = ("hgb", "gbr")
 
 INCOME_ORDER = {v: i for i, v in enumerate(INCOME_MAP.values())}
 _RACE_CLASSES = ["Não declarado", "Branco", "Preto", "Pardo", "Amarelo", "Indígena", "Outro"]
+# same codes LabelEncoder would assign (sorted classes)
+_RACE_CODES = {c: i for i, c in enumerate(sorted(_RACE_CLASSES))}
 _REGION_ORDER = {r: i for i, r in enumerate(sorted(set(REGIONS.values())))}
+FEATURES = ["school_private", "income_rank", "regiao_encoded", "gender_male", "race_encoded"]
 
 
 def _build_features(df: pd.DataFrame) -> pd.DataFrame:
-    race_enc = LabelEncoder().fit(_RACE_CLASSES)
+    race = df["raca_label"].astype(object).fillna("Não declarado")
     feat = pd.DataFrame({
         "school_private": (df["escola_label"] == "Privada").astype(int),
-        "income_rank": df["renda_label"].map(INCOME_ORDER).fillna(0),
-        "regiao_encoded": df["regiao"].map(_REGION_ORDER).fillna(0),
+        "income_rank": df["renda_label"].map(INCOME_ORDER).astype(float).fillna(0),
+        "regiao_encoded": df["regiao"].map(_REGION_ORDER).astype(float).fillna(0),
         "gender_male": (df["genero_label"] == "Masculino").astype(int),
-        "race_encoded": race_enc.transform(
-            df["raca_label"].fillna("Não declarado").where(
-                df["raca_label"].isin(_RACE_CLASSES), "Outro"
-            )
-        ),
+        "race_encoded": race.map(_RACE_CODES).fillna(_RACE_CODES["Outro"]).astype(int),
     })
     return feat
 
 
-@st.cache_resource(show_spinner="Treinando modelo preditivo...")
-def train_model(df: pd.DataFrame):
-    feat = _build_features(df)
+def _estimator(algo: str) -> Pipeline:
+    if algo == "hgb":
+        return Pipeline([
+            ("hgb", HistGradientBoostingRegressor(
+                max_iter=300, max_depth=4, learning_rate=0.08,
+                min_samples_leaf=20, random_state=42,
+            )),
+        ])
+    if algo == "gbr":
+        return Pipeline([
+            ("scaler", StandardScaler()),
+            ("gbr", GradientBoostingRegressor(
+                n_estimators=300, max_depth=4,
+                learning_rate=0.08, subsample=0.8,
+                min_samples_leaf=20, random_state=42,
+            )),
+        ])
+    raise ValueError(f"Unknown algorithm {algo!r}; use one of {ALGOS}")
+
+
+def _importances(model: Pipeline, X: pd.DataFrame, y: pd.Series) -> pd.Series:
+    est = model.steps[-1][1]
+    if hasattr(est, "feature_importances_"):
+        values = est.feature_importances_
+    else:  # HistGradientBoosting: permutation importance on (a sample of) the test split
+        sample = X.sample(min(len(X), 20_000), random_state=42)
+        result = permutation_importance(model, sample, y.loc[sample.index], n_repeats=3, random_state=42)
+        values = np.clip(result.importances_mean, 0, None)
+        values = values / values.sum() if values.sum() else values
+    return pd.Series(values, index=X.columns).sort_values(ascending=False)
+
+
+def train_model(df: pd.DataFrame, algo: str = DEFAULT_ALGO, max_rows: int = 0) -> dict:
+    """Fit the model and return the artifact (model, metrics, importances, metadata)."""
+    t0 = time.perf_counter()
     target = df["media_geral"].dropna()
-    feat = feat.loc[target.index]
+    if max_rows and len(target) > max_rows:
+        target = target.sample(max_rows, random_state=42)
+    feat = _build_features(df.loc[target.index])
 
     X_train, X_test, y_train, y_test = train_test_split(
         feat, target, test_size=0.2, random_state=42
     )
 
-    model = Pipeline([
-        ("scaler", StandardScaler()),
-        ("gbr", GradientBoostingRegressor(
-            n_estimators=300, max_depth=4,
-            learning_rate=0.08, subsample=0.8,
-            min_samples_leaf=20, random_state=42,
-        )),
-    ])
+    model = _estimator(algo)
     model.fit(X_train, y_train)
 
     y_pred = model.predict(X_test)
@@ -61,11 +109,83 @@ def train_model(df: pd.DataFrame):
         "rmse": round(float(np.sqrt(np.mean(residuals ** 2))), 1),
         "std_residual": round(float(residuals.std()), 1),
     }
+    return {
+        "model": model,
+        "metrics": metrics,
+        "feat_importance": _importances(model, X_test, y_test),
+        "algo": algo,
+        "rows": len(target),
+        "train_s": round(time.perf_counter() - t0, 1),
+        "sklearn": sklearn.__version__,
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+# ── artifacts ────────────────────────────────────────────────────────────────
+
+def artifact_path(algo: str, version: str) -> Path:
+    return MODELS_DIR / f"{algo}-{version}.joblib"
+
+
+def save_artifact(artifact: dict, version: str) -> Path:
+    MODELS_DIR.mkdir(parents=True, exist_ok=True)
+    path = artifact_path(artifact["algo"], version)
+    tmp = path.with_suffix(".tmp")
+    joblib.dump({**artifact, "data_version": version}, tmp)
+    os.replace(tmp, path)
+    logger.info(f"Model saved: {path.name} ({artifact['rows']:,} rows, {artifact['train_s']}s)")
+    return path
+
 
-    importances = model.named_steps["gbr"].feature_importances_
-    feat_importance = pd.Series(importances, index=feat.columns).sort_values(ascending=False)
+def load_artifact(algo: str, version: str) -> dict | None:
+    path = artifact_path(algo, version)
+    if not path.exists():
+        return None
+    artifact = joblib.load(path)
+    if artifact.get("sklearn") != sklearn.__version__:
+        logger.warning(f"{path.name} was trained with scikit-learn {artifact.get('sklearn')}; retrain if it fails")
+    return artifact
 
-    return model, metrics, feat_importance
+
+@st.cache_resource(show_spinner="Carregando modelo preditivo...")
+def load_model(algo: str = DEFAULT_ALGO) -> tuple:
+    """``(model, metrics, feat_importance)`` for the current data; trains only without an artifact."""
+    version = data_version()
+    artifact = load_artifact(algo, version)
+    if artifact is None:
+        logger.info(f"No {algo} model for data {version} — training now (run `python -m app.ml_model train`)")
+        artifact = train_model(load_data(), algo)
+        save_artifact(artifact, version)
+    return artifact["model"], artifact["metrics"], artifact["feat_importance"]
+
+
+# ── inference ────────────────────────────────────────────────────────────────
+
+def profile_features(profiles: pd.DataFrame) -> pd.DataFrame:
+    """Feature matrix for profiles with the ``predict_score`` fields as columns."""
+    race = profiles["race_label"].where(profiles["race_label"].isin(_RACE_CLASSES), "Outro")
+    return pd.DataFrame({
+        "school_private": profiles["school_private"].astype(int),
+        "income_rank": profiles["income_label"].map(INCOME_ORDER).fillna(0),
+        "regiao_encoded": profiles["region"].map(_REGION_ORDER).fillna(0),
+        "gender_male": profiles["gender_male"].astype(int),
+        "race_encoded": race.map(_RACE_CODES),
+    }, index=profiles.index)
+
+
+def predict_batch(model, std_residual: float, profiles: pd.DataFrame) -> pd.DataFrame:
+    """Score many profiles in one call; returns ``predicted``, ``lower_95``, ``upper_95``.
+
+    *profiles* columns: ``school_private``, ``income_label``, ``region``,
+    ``gender_male``, ``race_label``.
+    """
+    pred = np.clip(model.predict(profile_features(profiles)), 0, 1000)
+    margin = 1.96 * std_residual
+    return pd.DataFrame({
+        "predicted": pred,
+        "lower_95": np.clip(pred - margin, 0, 1000),
+        "upper_95": np.clip(pred + margin, 0, 1000),
+    }, index=profiles.index)
 
 
 def predict_score(
@@ -78,18 +198,34 @@ def predict_score(
     race_label: str,
 ) -> tuple[float, float, float]:
     """Return (predicted, lower_95, upper_95)."""
-    race_enc = LabelEncoder().fit(_RACE_CLASSES)
-    safe_race = race_label if race_label in _RACE_CLASSES else "Outro"
-
     row = pd.DataFrame([{
-        "school_private": int(school_private),
-        "income_rank": INCOME_ORDER.get(income_label, 0),
-        "regiao_encoded": _REGION_ORDER.get(region, 0),
-        "gender_male": int(gender_male),
-        "race_encoded": race_enc.transform([safe_race])[0],
+        "school_private": school_private,
+        "income_label": income_label,
+        "region": region,
+        "gender_male": gender_male,
+        "race_label": race_label,
     }])
-    pred = float(np.clip(model.predict(row)[0], 0, 1000))
-    margin = 1.96 * std_residual
-    lo = float(np.clip(pred - margin, 0, 1000))
-    hi = float(np.clip(pred + margin, 0, 1000))
-    return pred, lo, hi
+    pred, lo, hi = predict_batch(model, std_residual, row).iloc[0]
+    return float(pred), float(lo), float(hi)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Train and save the ENEM score model.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    train = sub.add_parser("train", help="train on the current data and save a versioned artifact")
+    train.add_argument("--algo", choices=ALGOS, default=DEFAULT_ALGO)
+    train.add_argument("--max-rows", type=int, default=0, help="train on a random sample (0 = all rows)")
+    train.add_argument("--force", action="store_true", help="retrain even if the artifact exists")
+    args = parser.parse_args(argv)
+
+    version = data_version()
+    if not args.force and artifact_path(args.algo, version).exists():
+        print(f"{artifact_path(args.algo, version)} is up to date")
+        return
+    artifact = train_model(load_data(), args.algo, args.max_rows)
+    path = save_artifact(artifact, version)
+    print(f"{path}  {artifact['metrics']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Sorted-score index for percentile and distribution lookups.
+
+``media_geral`` is kept twice: sorted globally, and sorted inside each segment
+(year × UF × school type), the segments laid end to end. Percentiles are a binary
+search (``np.searchsorted``) instead of a scan of the column. Filtered queries
+(``NU_ANO=[2022]``, ``regiao=["Sul"]``, ``escola_label=["Pública"]``...) add up one
+search per selected segment, vectorized. Quantiles over a filter use a binary
+search on the score domain, so nothing is re-sorted per interaction either.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .data_loader import add_labels
+
+SEGMENT_DIMS = ["NU_ANO", "SG_UF_RESIDENCIA", "TP_ESCOLA"]
+SCORE_COL = "media_geral"
+# segment i occupies [i * KEY_SPAN, i * KEY_SPAN + 1000] in the keyed array
+KEY_SPAN = 2_000.0
+
+
+class ScoreIndex:
+    def __init__(self, scores: np.ndarray, segment_ids: np.ndarray, segments: pd.DataFrame):
+        """*scores*/*segment_ids* are row-aligned; *segments* has one row per id (0..k-1)."""
+        valid = ~np.isnan(scores)
+        scores, segment_ids = scores[valid].astype(np.float32), segment_ids[valid].astype(np.int32)
+        order = np.lexsort((scores, segment_ids))
+        self.sorted = np.sort(scores)
+        self.keyed = segment_ids[order] * KEY_SPAN + scores[order].astype(np.float64)
+        self.segments = add_labels(segments.reset_index(drop=True))
+        counts = np.bincount(segment_ids, minlength=len(self.segments))
+        self.starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        self.segments["n"] = counts
+        # selected segments, quantiles and histograms are cached per filter
+        self._select = lru_cache(maxsize=256)(self._select)
+        self._quantiles = lru_cache(maxsize=256)(self._quantiles)
+        self._histogram = lru_cache(maxsize=256)(self._histogram)
+
+    def __len__(self) -> int:
+        return len(self.sorted)
+
+    # ── construction / persistence ───────────────────────────────────────────
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "ScoreIndex":
+        groups = df.groupby(SEGMENT_DIMS, dropna=False, observed=True, sort=True)
+        segments = groups.size().reset_index()[SEGMENT_DIMS]
+        return cls(df[SCORE_COL].to_numpy(np.float32), groups.ngroup().to_numpy(), segments)
+
+    def save(self, path: Path) -> None:
+        seg_ids = np.floor(self.keyed / KEY_SPAN).astype(np.int32)
+        scores = (self.keyed - seg_ids * KEY_SPAN).astype(np.float32)
+        self.segments[SEGMENT_DIMS].to_parquet(path.with_suffix(".segments.parquet"), index=False)
+        np.savez(path, scores=scores, segment_ids=seg_ids)
+
+    @classmethod
+    def load(cls, path: Path) -> "ScoreIndex":
+        with np.load(path) as data:
+            scores, seg_ids = data["scores"], data["segment_ids"]
+        return cls(scores, seg_ids, pd.read_parquet(path.with_suffix(".segments.parquet")))
+
+    # ── queries ──────────────────────────────────────────────────────────────
+
+    def _select(self, filters: tuple) -> np.ndarray | None:
+        """Segment ids matching the filters; ``None`` means no filter (use the global array)."""
+        if not filters:
+            return None
+        mask = np.ones(len(self.segments), dtype=bool)
+        for dim, values in filters:
+            mask &= self.segments[dim].isin(values).to_numpy()
+        return np.flatnonzero(mask & (self.segments["n"].to_numpy() > 0))
+
+    @staticmethod
+    def _key(filters: dict) -> tuple:
+        return tuple(sorted((dim, tuple(sorted(values))) for dim, values in filters.items()))
+
+    def _count_le(self, seg: np.ndarray, values: np.ndarray, side: str) -> np.ndarray:
+        """Scores below (``left``) or up to (``right``) each value, summed over *seg*."""
+        keys = seg[:, None] * KEY_SPAN + values[None, :]
+        found = np.searchsorted(self.keyed, keys.ravel(), side=side).reshape(keys.shape)
+        return (found - self.starts[seg][:, None]).sum(axis=0)
+
+    def count(self, **filters) -> int:
+        seg = self._select(self._key(filters))
+        return len(self) if seg is None else int(self.segments["n"].to_numpy()[seg].sum())
+
+    def percentile(self, score: float, **filters) -> float:
+        """Share of candidates (0–100) scoring strictly below *score*."""
+        score = np.float32(score)  # compared at the precision the scores are stored in
+        seg = self._select(self._key(filters))
+        if seg is None:
+            below, total = np.searchsorted(self.sorted, score, side="left"), len(self)
+        else:
+            below = int(self._count_le(seg, np.array([score], dtype=np.float64), "left")[0])
+            total = int(self.segments["n"].to_numpy()[seg].sum())
+        return float(below / total * 100) if total else float("nan")
+
+    def _kth(self, seg: np.ndarray | None, ks: np.ndarray) -> np.ndarray:
+        """k-th smallest scores (0-based) of the filtered set, by bisection over ``sorted``."""
+        if seg is None:
+            return self.sorted[ks]
+        lo, hi = np.zeros(len(ks), dtype=np.int64), np.full(len(ks), len(self) - 1, dtype=np.int64)
+        while np.any(lo < hi):
+            mid = (lo + hi) // 2
+            enough = self._count_le(seg, self.sorted[mid].astype(np.float64), "right") >= ks + 1
+            hi, lo = np.where(enough, mid, hi), np.where(enough, lo, mid + 1)
+        return self.sorted[lo]
+
+    def _quantiles(self, qs: tuple, filters: tuple) -> np.ndarray:
+        seg = self._select(filters)
+        n = len(self) if seg is None else int(self.segments["n"].to_numpy()[seg].sum())
+        if not n:
+            return np.full(len(qs), np.nan)
+        pos = np.asarray(qs) * (n - 1)  # linear interpolation, as pandas' quantile
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, n - 1)
+        v = self._kth(seg, np.concatenate([lo, hi])).astype(np.float64)
+        v_lo, v_hi = v[: len(qs)], v[len(qs):]
+        return v_lo + (pos - lo) * (v_hi - v_lo)
+
+    def quantiles(self, qs, **filters) -> np.ndarray:
+        return self._quantiles(tuple(float(q) for q in qs), self._key(filters))
+
+    def _histogram(self, bins: int, filters: tuple) -> np.ndarray:
+        seg = self._select(filters)
+        edges = np.linspace(0, 1000, bins + 1)
+        if seg is None:
+            cum = np.searchsorted(self.sorted, edges, side="left")
+            cum[-1] = np.searchsorted(self.sorted, edges[-1], side="right")  # last bin includes 1000
+        else:
+            cum = self._count_le(seg, edges, "left")
+            cum[-1] = self._count_le(seg, edges[-1:], "right")[0]
+        return np.diff(cum)
+
+    def histogram(self, bins: int = 40, **filters) -> tuple[list, list]:
+        """``(centers, counts)`` of ``media_geral`` over 0–1000, like ``score_distribution``."""
+        counts = self._histogram(bins, self._key(filters))
+        edges = np.linspace(0, 1000, bins + 1)
+        return ((edges[:-1] + edges[1:]) / 2).round(0).tolist(), counts.tolist()
+
+
+class ScoreIndexBuilder:
+    """Builds a ``ScoreIndex`` chunk by chunk, keeping 8 bytes per row.
+
+    Each chunk is reduced to float32 scores and int32 segment ids numbered within
+    the chunk; ``build`` renumbers them against the union of the chunk segments, in
+    the same sorted order as ``ScoreIndex.from_frame``.
+    """
+
+    def __init__(self):
+        self._scores: list[np.ndarray] = []
+        self._ids: list[np.ndarray] = []
+        self._segments: list[pd.DataFrame] = []
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        groups = chunk.groupby(SEGMENT_DIMS, dropna=False, observed=True, sort=True)
+        self._scores.append(chunk[SCORE_COL].to_numpy(np.float32))
+        self._ids.append(groups.ngroup().to_numpy(np.int32))
+        self._segments.append(groups.size().reset_index()[SEGMENT_DIMS])
+
+    def build(self) -> ScoreIndex:
+        local = pd.concat(self._segments, ignore_index=True)
+        groups = local.groupby(SEGMENT_DIMS, dropna=False, observed=True, sort=True)
+        remap = groups.ngroup().to_numpy(np.int32)
+        offsets = np.cumsum([0] + [len(s) for s in self._segments[:-1]])
+        seg_ids = np.concatenate([remap[off + ids] for off, ids in zip(offsets, self._ids)])
+        segments = groups.size().reset_index()[SEGMENT_DIMS]
+        return ScoreIndex(np.concatenate(self._scores), seg_ids, segments)
@@ -0,0 +1,233 @@
+"""Parquet store for INEP microdata, converted once from the CSV.
+
+Layout of ``STORE_DIR``:
+
+    microdata.parquet   typed columns (int16/Int8/float32, dictionary strings)
+    cube_stats.parquet  aggregate cube — see ``app.cube``
+    cube_hist.parquet
+    score_index.npz     sorted media_geral per segment — see ``app.score_index``
+    manifest.json       source CSV (path, size, mtime), row count, timings
+
+The conversion streams the CSV in chunks, so peak memory is one chunk plus the
+cube and the score index (float32 score + int32 segment id, 8 bytes per row). ``ensure_store`` rebuilds only when the source CSV or the sample size
+changes. Run ``python -m app.store MICRODADOS.csv --compare`` to convert and
+report load time and memory against reading the CSV directly.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from loguru import logger
+
+from .cube import ScoreCube, build_cube, merge_cubes
+from .data_loader import (
+    GENDER_MAP,
+    INCOME_MAP,
+    PROFILE_COLS,
+    RACE_MAP,
+    REGIONS,
+    SCHOOL_TYPE_MAP,
+    STATE_ISO,
+    SUBJECT_COLS,
+    add_labels,
+    add_means,
+)
+from .score_index import ScoreIndex, ScoreIndexBuilder
+
+STORE_DIR = Path(os.getenv("ENEM_STORE_DIR", Path(__file__).resolve().parent.parent / "data" / "store"))
+STORE_VERSION = 2
+CHUNK_ROWS = 250_000
+MERGE_EVERY = 8  # chunk cubes kept before merging them
+
+CSV_DTYPES = {
+    "NU_ANO": "int16",
+    "SG_UF_RESIDENCIA": "str",
+    "TP_ESCOLA": "Int8",
+    "TP_SEXO": "str",
+    "TP_COR_RACA": "Int8",
+    "Q006": "str",
+    **{c: "float32" for c in SUBJECT_COLS},
+}
+STRING_COLS = ["SG_UF_RESIDENCIA", "TP_SEXO", "Q006"]
+SCHEMA = pa.schema(
+    [
+        ("NU_ANO", pa.int16()),
+        ("SG_UF_RESIDENCIA", pa.string()),
+        ("TP_ESCOLA", pa.int8()),
+        ("TP_SEXO", pa.string()),
+        ("TP_COR_RACA", pa.int8()),
+        ("Q006", pa.string()),
+    ]
+    + [(c, pa.float32()) for c in SUBJECT_COLS + ["media_objetivas", "media_geral"]]
+)
+
+
+def _path(name: str, store_dir: Path | None = None) -> Path:
+    return (store_dir or STORE_DIR) / name
+
+
+def _source_info(csv_path: str, sample_size: int) -> dict:
+    st_ = os.stat(csv_path)
+    return {
+        "version": STORE_VERSION,
+        "source": str(Path(csv_path).resolve()),
+        "size": st_.st_size,
+        "mtime_ns": st_.st_mtime_ns,
+        "sample_size": sample_size,
+    }
+
+
+def read_manifest(store_dir: Path | None = None) -> dict:
+    try:
+        return json.loads(_path("manifest.json", store_dir).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+
+
+def is_fresh(csv_path: str, sample_size: int = 0, store_dir: Path | None = None) -> bool:
+    manifest = read_manifest(store_dir)
+    info = _source_info(csv_path, sample_size)
+    return all(manifest.get(k) == v for k, v in info.items())
+
+
+def _read_csv_chunks(csv_path: str, sample_size: int = 0):
+    reader = pd.read_csv(
+        csv_path, sep=";", encoding="latin-1",
+        usecols=PROFILE_COLS + SUBJECT_COLS, dtype=CSV_DTYPES,
+        chunksize=CHUNK_ROWS, nrows=sample_size or None,
+    )
+    for chunk in reader:
+        chunk = chunk.dropna(subset=["NU_NOTA_MT", "NU_NOTA_REDACAO"])
+        if not chunk.empty:
+            yield add_means(chunk)
+
+
+def convert_csv(csv_path: str, sample_size: int = 0, store_dir: Path | None = None) -> dict:
+    """Convert the INEP CSV into the Parquet store and aggregate cube. Returns the manifest."""
+    store_dir = store_dir or STORE_DIR
+    store_dir.mkdir(parents=True, exist_ok=True)
+    t0 = time.perf_counter()
+    rows, cubes, index = 0, [], ScoreIndexBuilder()
+    tmp = _path("microdata.parquet.tmp", store_dir)
+    with pq.ParquetWriter(tmp, SCHEMA, compression="zstd") as writer:
+        for chunk in _read_csv_chunks(csv_path, sample_size):
+            writer.write_table(pa.Table.from_pandas(chunk[SCHEMA.names], schema=SCHEMA, preserve_index=False))
+            cubes.append(build_cube(chunk))
+            index.add(chunk)
+            if len(cubes) >= MERGE_EVERY:
+                cubes = [merge_cubes(cubes)]
+            rows += len(chunk)
+            logger.info(f"Store: {rows:,} rows converted")
+    if not cubes:
+        tmp.unlink(missing_ok=True)
+        raise ValueError(f"No rows with Matemática and Redação scores in {csv_path}")
+    os.replace(tmp, _path("microdata.parquet", store_dir))
+    cube = merge_cubes(cubes)
+    cube.stats.to_parquet(_path("cube_stats.parquet", store_dir), index=False)
+    cube.hist.to_parquet(_path("cube_hist.parquet", store_dir), index=False)
+    index.build().save(_path("score_index.npz", store_dir))
+
+    manifest = {
+        **_source_info(csv_path, sample_size),
+        "rows": rows,
+        "cube_cells": len(cube.stats),
+        "convert_s": round(time.perf_counter() - t0, 2),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    _path("manifest.json", store_dir).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    logger.info(f"Store ready: {rows:,} rows, {len(cube.stats):,} cube cells in {manifest['convert_s']}s")
+    return manifest
+
+
+def ensure_store(csv_path: str, sample_size: int = 0, store_dir: Path | None = None) -> None:
+    if not is_fresh(csv_path, sample_size, store_dir):
+        logger.info(f"Converting {csv_path} to the Parquet store (one-time)")
+        convert_csv(csv_path, sample_size, store_dir)
+
+
+def read_microdata(columns: list[str] | None = None, store_dir: Path | None = None) -> pd.DataFrame:
+    """Microdata from the store, string columns as categoricals, plus label columns."""
+    table = pq.read_table(
+        _path("microdata.parquet", store_dir), columns=columns,
+        read_dictionary=[c for c in STRING_COLS if columns is None or c in columns],
+    )
+    df = table.to_pandas()
+    for c in ("TP_ESCOLA", "TP_COR_RACA"):
+        if c in df:
+            df[c] = df[c].astype("Int8")
+    return add_labels(df)
+
+
+def read_score_index(store_dir: Path | None = None) -> ScoreIndex:
+    return ScoreIndex.load(_path("score_index.npz", store_dir))
+
+
+def read_cube(store_dir: Path | None = None) -> ScoreCube:
+    stats = pd.read_parquet(_path("cube_stats.parquet", store_dir))
+    hist = pd.read_parquet(_path("cube_hist.parquet", store_dir))
+    return ScoreCube(stats, hist)
+
+
+# ── CSV vs store comparison ──────────────────────────────────────────────────
+
+def _measure(fn) -> tuple[object, float]:
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+def _frame_mb(df: pd.DataFrame) -> float:
+    return round(df.memory_usage(deep=True).sum() / 1_048_576, 1)
+
+
+def _load_csv_legacy(csv_path: str, sample_size: int = 0) -> pd.DataFrame:
+    """The previous loader: whole CSV with inferred dtypes and object label columns."""
+    df = pd.read_csv(
+        csv_path, sep=";", encoding="latin-1",
+        usecols=PROFILE_COLS + SUBJECT_COLS, nrows=sample_size or None,
+    )
+    df = df.dropna(subset=["NU_NOTA_MT", "NU_NOTA_REDACAO"])
+    df["regiao"] = df["SG_UF_RESIDENCIA"].map(REGIONS).fillna("Desconhecida")
+    df["iso_code"] = df["SG_UF_RESIDENCIA"].map(STATE_ISO)
+    df["escola_label"] = df["TP_ESCOLA"].map(SCHOOL_TYPE_MAP).fillna("Outro")
+    df["genero_label"] = df["TP_SEXO"].map(GENDER_MAP).fillna("Outro")
+    df["raca_label"] = df["TP_COR_RACA"].map(RACE_MAP).fillna("Não declarado")
+    df["renda_label"] = df["Q006"].map(INCOME_MAP).fillna("Não informado")
+    return add_means(df)
+
+
+def compare(csv_path: str, sample_size: int = 0, store_dir: Path | None = None) -> pd.DataFrame:
+    """Load time and in-memory size: CSV (previous path) vs Parquet microdata vs cube."""
+    ensure_store(csv_path, sample_size, store_dir)
+    legacy, t_csv = _measure(lambda: _load_csv_legacy(csv_path, sample_size))
+    micro, t_parquet = _measure(lambda: read_microdata(store_dir=store_dir))
+    cube, t_cube = _measure(lambda: read_cube(store_dir))
+    cube_mb = _frame_mb(cube.stats) + _frame_mb(cube.hist)
+    return pd.DataFrame([
+        {"fonte": "CSV (microdados)", "linhas": len(legacy), "segundos": t_csv, "memoria_mb": _frame_mb(legacy)},
+        {"fonte": "Parquet (microdados)", "linhas": len(micro), "segundos": t_parquet, "memoria_mb": _frame_mb(micro)},
+        {"fonte": "Cubo agregado", "linhas": len(cube.stats) + len(cube.hist), "segundos": t_cube, "memoria_mb": cube_mb},
+    ]).round({"segundos": 2})
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Convert ENEM microdata CSV into the Parquet store.")
+    parser.add_argument("csv", help="MICRODADOS_ENEM_<ano>.csv (latin-1, ';')")
+    parser.add_argument("--sample", type=int, default=0, help="max CSV rows (0 = all)")
+    parser.add_argument("--compare", action="store_true", help="report load time/memory vs the CSV path")
+    args = parser.parse_args(argv)
+
+    convert_csv(args.csv, args.sample)
+    if args.compare:
+        print(compare(args.csv, args.sample).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,15 +3,15 @@ import streamlit as st
 
 from app.analytics import state_summary, yearly_trend, regional_summary
 from app.charts import choropleth_brazil, bar_regional, line_yearly_trend
-from app.data_loader import SUBJECT_NAMES, load_data
+from app.data_loader import SUBJECT_NAMES, load_cube
 
 st.set_page_config(page_title="Mapa — ENEM Insights", page_icon="🗺️", layout="wide")
 
-df_full = load_data()
+cube_full = load_cube()
 
 with st.sidebar:
     st.header("🔧 Filtros")
-    years = sorted(df_full["NU_ANO"].unique())
+    years = cube_full.levels("NU_ANO")
     sel_years = st.multiselect("Ano(s)", years, default=years)
     metric = st.selectbox(
         "Métrica do Mapa",
@@ -19,13 +19,13 @@ with st.sidebar:
         format_func=lambda x: SUBJECT_NAMES.get(x, "Média Geral"),
     )
 
-df = df_full[df_full["NU_ANO"].isin(sel_years)]
+cube = cube_full.filter(NU_ANO=sel_years)
 
 st.title("🗺️ Mapa Interativo do Brasil")
 st.caption("Desempenho médio por estado. Passe o mouse para ver detalhes.")
 
 # ── Compute state summary ─────────────────────────────────────────────────────
-state_df = state_summary(df)
+state_df = state_summary(cube)
 metric_label = SUBJECT_NAMES.get(metric, "Média Geral")
 
 st.plotly_chart(
@@ -38,7 +38,7 @@ st.markdown("---")
 # ── Region bar + detail table ─────────────────────────────────────────────────
 col1, col2 = st.columns([1, 1])
 with col1:
-    reg_df = regional_summary(df)
+    reg_df = regional_summary(cube)
     st.plotly_chart(bar_regional(reg_df), use_container_width=True)
 
 with col2:
@@ -53,4 +53,4 @@ with col2:
 
 # ── Trend by region ───────────────────────────────────────────────────────────
 st.subheader("Evolução Temporal das Médias")
-st.plotly_chart(line_yearly_trend(yearly_trend(df)), use_container_width=True)
+st.plotly_chart(line_yearly_trend(yearly_trend(cube)), use_container_width=True)
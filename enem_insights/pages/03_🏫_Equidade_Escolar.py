@@ -11,28 +11,28 @@ from app.analytics import (
 )
 from app.charts import bar_school_gap, radar_subjects, bar_race, heatmap_correlation
 from app.analytics import subject_correlations
-from app.data_loader import SUBJECT_NAMES, load_data
+from app.data_loader import SUBJECT_NAMES, load_cube
 
 st.set_page_config(page_title="Equidade — ENEM Insights", page_icon="🏫", layout="wide")
 
-df_full = load_data()
+cube_full = load_cube()
 
 with st.sidebar:
     st.header("🔧 Filtros")
-    years = sorted(df_full["NU_ANO"].unique())
+    years = cube_full.levels("NU_ANO")
     sel_years = st.multiselect("Ano(s)", years, default=years)
-    regions = sorted(df_full["regiao"].unique())
+    regions = cube_full.levels("regiao")
     sel_regions = st.multiselect("Região(ões)", regions, default=regions)
 
-df = df_full[df_full["NU_ANO"].isin(sel_years) & df_full["regiao"].isin(sel_regions)]
-if df.empty:
+cube = cube_full.filter(NU_ANO=sel_years, regiao=sel_regions)
+if cube.empty:
     st.warning("Nenhum dado para os filtros selecionados.")
     st.stop()
 
 st.title("🏫 Equidade Escolar & Desigualdade")
 
 # ── Inequality index banner ───────────────────────────────────────────────────
-ineq = inequality_index(df)
+ineq = inequality_index(cube)
 c1, c2, c3, c4 = st.columns(4)
 c1.metric("Índice de Desigualdade", f"{ineq['index']:.1f} / 100",
           help="Composto por gap escola, renda e raça")
@@ -45,11 +45,11 @@ st.markdown("---")
 tab1, tab2, tab3 = st.tabs(["🏫 Escola Pública vs Privada", "⚧ Gênero", "🎨 Raça / Etnia"])
 
 with tab1:
-    school_df = school_type_summary(df)
+    school_df = school_type_summary(cube)
     st.plotly_chart(bar_school_gap(school_df), use_container_width=True)
 
-    pub = df[df["escola_label"] == "Pública"]["media_geral"].mean()
-    pri = df[df["escola_label"] == "Privada"]["media_geral"].mean()
+    pub = cube.filter(escola_label=["Pública"]).mean("media_geral")
+    pri = cube.filter(escola_label=["Privada"]).mean("media_geral")
     st.info(
         f"Escola privada supera a pública em **{pri - pub:.1f} pontos** em média geral. "
         "Essa diferença é mais pronunciada em Matemática e Redação."
@@ -57,16 +57,15 @@ with tab1:
 
     # radar by school type
     radar_df = (
-        df[df["escola_label"].isin(["Pública", "Privada"])]
-        .groupby("escola_label")[list(SUBJECT_NAMES.keys())]
-        .mean()
+        school_df.set_index("escola_label")[[f"{c}_mean" for c in SUBJECT_NAMES]]
+        .rename(columns=lambda c: c.removesuffix("_mean"))
         .round(1)
         .reset_index()
     )
     st.plotly_chart(radar_subjects(radar_df, "escola_label"), use_container_width=True)
 
 with tab2:
-    gender_df = gender_summary(df)
+    gender_df = gender_summary(cube)
     st.plotly_chart(radar_subjects(gender_df, "genero_label"), use_container_width=True)
     st.dataframe(gender_df.rename(columns={"genero_label": "Gênero"}),
                  use_container_width=True, hide_index=True)
@@ -80,11 +79,11 @@ with tab2:
         )
 
 with tab3:
-    race_df = race_summary(df)
+    race_df = race_summary(cube)
     st.plotly_chart(bar_race(race_df), use_container_width=True)
     st.dataframe(race_df.rename(columns={"raca_label": "Raça / Etnia", "media_geral": "Média Geral"}),
                  use_container_width=True, hide_index=True)
 
 st.markdown("---")
 st.subheader("Correlação entre Disciplinas")
-st.plotly_chart(heatmap_correlation(subject_correlations(df)), use_container_width=True)
+st.plotly_chart(heatmap_correlation(subject_correlations(cube)), use_container_width=True)
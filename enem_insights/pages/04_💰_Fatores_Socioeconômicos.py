@@ -4,21 +4,21 @@ import plotly.express as px
 
 from app.analytics import income_summary, race_summary, gender_summary, percentile_distribution
 from app.charts import scatter_income_score, radar_subjects, bar_race
-from app.data_loader import load_data
+from app.data_loader import load_cube, load_score_index
 
 st.set_page_config(
     page_title="Socioeconômico — ENEM Insights", page_icon="💰", layout="wide"
 )
 
-df_full = load_data()
+cube_full = load_cube()
 
 with st.sidebar:
     st.header("🔧 Filtros")
-    years = sorted(df_full["NU_ANO"].unique())
+    years = cube_full.levels("NU_ANO")
     sel_years = st.multiselect("Ano(s)", years, default=years)
 
-df = df_full[df_full["NU_ANO"].isin(sel_years)]
-if df.empty:
+cube = cube_full.filter(NU_ANO=sel_years)
+if cube.empty:
     st.warning("Nenhum dado para os filtros selecionados.")
     st.stop()
 
@@ -27,7 +27,7 @@ st.title("💰 Fatores Socioeconômicos")
 tab1, tab2, tab3, tab4 = st.tabs(["Renda Familiar", "Raça / Etnia", "Gênero", "Distribuição Percentil"])
 
 with tab1:
-    income_df = income_summary(df)
+    income_df = income_summary(cube)
     st.plotly_chart(scatter_income_score(income_df), use_container_width=True)
 
     # Detailed bar chart
@@ -46,7 +46,7 @@ with tab1:
                  use_container_width=True, hide_index=True)
 
 with tab2:
-    race_df = race_summary(df)
+    race_df = race_summary(cube)
     st.plotly_chart(bar_race(race_df), use_container_width=True)
 
     radar_race = race_df.rename(columns={"raca_label": "raca_label"})
@@ -54,7 +54,7 @@ with tab2:
     st.dataframe(race_df, use_container_width=True, hide_index=True)
 
 with tab3:
-    gender_df = gender_summary(df)
+    gender_df = gender_summary(cube)
     col1, col2 = st.columns(2)
     with col1:
         st.plotly_chart(radar_subjects(gender_df, "genero_label"), use_container_width=True)
@@ -69,7 +69,7 @@ with tab3:
         st.plotly_chart(fig_g, use_container_width=True)
 
 with tab4:
-    perc_df = percentile_distribution(df)
+    perc_df = percentile_distribution(load_score_index(), NU_ANO=sel_years)
     fig_p = px.area(
         perc_df, x="nota", y="percentil",
         title="Distribuição de Percentis — Nota Média Geral",
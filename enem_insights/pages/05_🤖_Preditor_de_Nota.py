@@ -1,16 +1,17 @@
 """Page 5 — ML score predictor with AI narrative."""
+import pandas as pd
 import streamlit as st
 
 from app.ai_insights import profile_insight
-from app.data_loader import INCOME_MAP, REGIONS, calc_percentile, load_data
-from app.charts import gauge_predicted_score, percentile_band_chart, feature_importance_chart
-from app.ml_model import predict_score, train_model
+from app.data_loader import INCOME_MAP, REGIONS, calc_percentile, load_score_index
+from app.charts import gauge_predicted_score, income_whatif_chart, percentile_band_chart, feature_importance_chart
+from app.ml_model import load_model, predict_batch, predict_score
 
 st.set_page_config(
     page_title="Preditor — ENEM Insights", page_icon="🤖", layout="wide"
 )
 
-df_full = load_data()
+score_index = load_score_index()
 
 st.title("🤖 Preditor de Nota com IA")
 st.markdown(
@@ -18,8 +19,8 @@ st.markdown(
     "com **intervalo de confiança de 95%**. A IA gera um insight personalizado sobre seu perfil."
 )
 
-# ── Train model ───────────────────────────────────────────────────────────────
-model, metrics, feat_importance = train_model(df_full)
+# ── Load model (trained offline: python -m app.ml_model train) ─────────────────
+model, metrics, feat_importance = load_model()
 
 col_m1, col_m2, col_m3 = st.columns(3)
 col_m1.metric("MAE (erro médio)", f"± {metrics['mae']:.1f} pts")
@@ -57,7 +58,8 @@ if submitted:
         gender_male=(gender == "Masculino"),
         race_label=race,
     )
-    percentile = calc_percentile(df_full, score)
+    percentile = calc_percentile(score_index, score)
+    peer_percentile = calc_percentile(score_index, score, regiao=[region], escola_label=[school])
 
     # ── Results ───────────────────────────────────────────────────────────────
     st.markdown("---")
@@ -72,7 +74,8 @@ if submitted:
         st.markdown(
             f"**Nota prevista:** {score:.0f} pontos  \n"
             f"**Intervalo 95%:** {lo:.0f} – {hi:.0f} pts  \n"
-            f"**Percentil nacional:** {percentile:.0f}%"
+            f"**Percentil nacional:** {percentile:.0f}%  \n"
+            f"**Percentil entre escola {school.lower()} — {region}:** {peer_percentile:.0f}%"
         )
         st.markdown("---")
 
@@ -100,5 +103,16 @@ if submitted:
                 "universidades federais do Nordeste e Norte. Veja o **Simulador SISU**!"
             )
 
+    # ── What-if: same profile across every income bracket (one batch prediction) ──
+    whatif = pd.DataFrame({
+        "school_private": school == "Privada",
+        "income_label": list(INCOME_MAP.values()),
+        "region": region,
+        "gender_male": gender == "Masculino",
+        "race_label": race,
+    })
+    whatif = pd.concat([whatif, predict_batch(model, metrics["std_residual"], whatif)], axis=1)
+    st.plotly_chart(income_whatif_chart(whatif, income), use_container_width=True)
+
     st.markdown("---")
     st.plotly_chart(feature_importance_chart(feat_importance), use_container_width=True)
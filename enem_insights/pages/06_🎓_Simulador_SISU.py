@@ -4,6 +4,7 @@ import plotly.express as px
 
 from app.sisu_data import find_eligible, get_dataframe, unique_courses
 from app.charts import sisu_waterfall
+from app.data_loader import calc_percentile, load_score_index
 
 st.set_page_config(
     page_title="Simulador SISU — ENEM Insights", page_icon="🎓", layout="wide"
@@ -55,9 +56,11 @@ with col_b:
     eligible_all = find_eligible(score, margin)
     approved = (eligible_all["situacao"] == "✅ Aprovado").sum()
     marginal = (eligible_all["situacao"] == "⚠️ Margem").sum()
-    c1, c2 = st.columns(2)
+    c1, c2, c3 = st.columns(3)
     c1.metric("✅ Dentro da nota", approved)
     c2.metric("⚠️ Na margem", marginal)
+    c3.metric("Percentil nacional", f"{calc_percentile(load_score_index(), score):.0f}%",
+              help="Candidatos com média geral abaixo da sua nota")
 
 st.markdown("---")
 
@@ -0,0 +1,63 @@
+"""Tests for the persisted prediction model and batch inference."""
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import ml_model
+from app.data_loader import INCOME_MAP, _generate_synthetic_data
+
+
+@pytest.fixture(scope="module")
+def artifact():
+    return ml_model.train_model(_generate_synthetic_data(n=4_000, seed=0), algo="hgb")
+
+
+@pytest.fixture()
+def profiles():
+    return pd.DataFrame({
+        "school_private": [True, False, False],
+        "income_label": [list(INCOME_MAP.values())[-1], list(INCOME_MAP.values())[0], "Não informado"],
+        "region": ["Sudeste", "Nordeste", "Sul"],
+        "gender_male": [False, True, True],
+        "race_label": ["Branco", "Pardo", "Cor inexistente"],
+    })
+
+
+def test_train_reports_metrics(artifact):
+    assert set(artifact["metrics"]) == {"mae", "r2", "rmse", "std_residual"}
+    assert artifact["metrics"]["r2"] > 0
+    assert artifact["feat_importance"].sum() == pytest.approx(1.0)
+    assert list(artifact["feat_importance"].index.sort_values()) == sorted(ml_model.FEATURES)
+
+
+def test_batch_matches_single(artifact, profiles):
+    std = artifact["metrics"]["std_residual"]
+    batch = ml_model.predict_batch(artifact["model"], std, profiles)
+    for i, row in profiles.iterrows():
+        single = ml_model.predict_score(artifact["model"], std, **row.to_dict())
+        np.testing.assert_allclose(batch.loc[i].to_numpy(), single)
+    assert (batch["lower_95"] <= batch["predicted"]).all()
+    assert (batch["predicted"] <= batch["upper_95"]).all()
+
+
+def test_artifact_roundtrip(tmp_path, monkeypatch, artifact, profiles):
+    monkeypatch.setattr(ml_model, "MODELS_DIR", tmp_path)
+    path = ml_model.save_artifact(artifact, "abc123")
+    assert path == tmp_path / "hgb-abc123.joblib"
+    loaded = ml_model.load_artifact("hgb", "abc123")
+    assert loaded["data_version"] == "abc123"
+    assert ml_model.load_artifact("hgb", "other") is None
+    pd.testing.assert_frame_equal(
+        ml_model.predict_batch(loaded["model"], 50.0, profiles),
+        ml_model.predict_batch(artifact["model"], 50.0, profiles),
+    )
+
+
+def test_unknown_algo():
+    with pytest.raises(ValueError):
+        ml_model._estimator("svm")
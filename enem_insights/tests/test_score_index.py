@@ -0,0 +1,70 @@
+"""Tests for the sorted-score percentile index."""
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+import pytest
+
+from app.analytics import percentile_distribution
+from app.data_loader import _generate_synthetic_data, calc_percentile
+from app.score_index import ScoreIndex, ScoreIndexBuilder
+
+
+@pytest.fixture(scope="module")
+def sample_df():
+    df = _generate_synthetic_data(n=5_000, seed=0)
+    df["media_geral"] = df["media_geral"].astype(np.float32)  # stored precision
+    return df
+
+
+@pytest.fixture(scope="module")
+def index(sample_df):
+    return ScoreIndex.from_frame(sample_df)
+
+
+@pytest.mark.parametrize("score", [0, 380.5, 512.3, 600, 1000])
+def test_percentile_matches_scan(sample_df, index, score):
+    assert calc_percentile(index, score) == pytest.approx(calc_percentile(sample_df, score))
+
+
+def test_segment_percentile_matches_scan(sample_df, index):
+    mask = sample_df["NU_ANO"].isin([2021, 2023]) & (sample_df["regiao"] == "Sul")
+    expected = calc_percentile(sample_df[mask], 512.3)
+    assert calc_percentile(index, 512.3, NU_ANO=[2021, 2023], regiao=["Sul"]) == pytest.approx(expected)
+    assert index.count(NU_ANO=[2021, 2023], regiao=["Sul"]) == mask.sum()
+
+
+def test_quantiles_match_pandas(sample_df, index):
+    qs = np.linspace(0, 1, 21)
+    mask = (sample_df["escola_label"] == "Pública") & (sample_df["NU_ANO"] == 2022)
+    expected = sample_df.loc[mask, "media_geral"].astype("float64").quantile(qs).to_numpy()
+    np.testing.assert_allclose(index.quantiles(qs, escola_label=["Pública"], NU_ANO=[2022]), expected)
+    exact = percentile_distribution(index)["nota"].to_numpy()
+    np.testing.assert_allclose(exact, sample_df["media_geral"].astype("float64").quantile(qs).round(1), atol=0.051)
+
+
+def test_histogram_matches_numpy(sample_df, index):
+    mask = sample_df["regiao"] == "Nordeste"
+    expected, _ = np.histogram(sample_df.loc[mask, "media_geral"], bins=40, range=(0, 1000))
+    _, counts = index.histogram(40, regiao=["Nordeste"])
+    assert counts == expected.tolist()
+
+
+def test_save_and_load(tmp_path, index):
+    path = tmp_path / "score_index.npz"
+    index.save(path)
+    loaded = ScoreIndex.load(path)
+    assert len(loaded) == len(index)
+    assert loaded.percentile(512.3, regiao=["Sul"]) == index.percentile(512.3, regiao=["Sul"])
+
+
+def test_builder_matches_from_frame(sample_df, index):
+    builder = ScoreIndexBuilder()
+    for start in range(0, len(sample_df), 700):
+        builder.add(sample_df.iloc[start:start + 700])
+    built = builder.build()
+    np.testing.assert_array_equal(built.keyed, index.keyed)
+    assert built.segments["n"].tolist() == index.segments["n"].tolist()
+    assert built.percentile(512.3, regiao=["Sul"]) == index.percentile(512.3, regiao=["Sul"])
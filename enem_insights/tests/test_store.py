@@ -0,0 +1,90 @@
+"""Tests for the Parquet store and the aggregate cube."""
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import store
+from app.analytics import (
+    percentile_distribution,
+    regional_summary,
+    school_type_summary,
+    score_distribution,
+    subject_correlations,
+)
+from app.cube import build_cube, merge_cubes
+from app.data_loader import PROFILE_COLS, SUBJECT_COLS, _generate_synthetic_data
+
+
+@pytest.fixture(scope="module")
+def sample_df():
+    return _generate_synthetic_data(n=5_000, seed=0)
+
+
+@pytest.fixture(scope="module")
+def store_dir(tmp_path_factory, sample_df):
+    tmp = tmp_path_factory.mktemp("enem")
+    raw = sample_df[PROFILE_COLS + SUBJECT_COLS].copy()
+    raw.loc[raw.index[:50], "NU_NOTA_MT"] = np.nan  # dropped, as in the INEP loader
+    csv_path = tmp / "MICRODADOS.csv"
+    raw.to_csv(csv_path, sep=";", index=False, encoding="latin-1")
+    store.convert_csv(str(csv_path), store_dir=tmp / "store")
+    return csv_path, tmp / "store"
+
+
+def test_cube_matches_microdata(sample_df):
+    cube = build_cube(sample_df)
+    assert cube.n == len(sample_df)
+    assert cube.mean("media_geral") == pytest.approx(sample_df["media_geral"].mean())
+    school = school_type_summary(cube).set_index("escola_label")
+    expected = sample_df.groupby("escola_label", observed=True)["NU_NOTA_MT"].agg(["mean", "std"])
+    assert school["NU_NOTA_MT_mean"].to_dict() == pytest.approx(expected["mean"].to_dict())
+    assert school["NU_NOTA_MT_std"].to_dict() == pytest.approx(expected["std"].to_dict())
+
+
+def test_correlations_match_pandas(sample_df):
+    expected = sample_df[SUBJECT_COLS].corr().round(3)
+    pd.testing.assert_frame_equal(subject_correlations(build_cube(sample_df)), expected)
+
+
+def test_merged_chunks_equal_whole(sample_df):
+    whole = build_cube(sample_df)
+    merged = merge_cubes([build_cube(sample_df.iloc[i:i + 1_250]) for i in range(0, len(sample_df), 1_250)])
+    assert merged.n == whole.n
+    pd.testing.assert_frame_equal(regional_summary(merged), regional_summary(whole))
+    assert score_distribution(merged, "NU_NOTA_CN") == score_distribution(whole, "NU_NOTA_CN")
+
+
+def test_filter_keeps_histogram_only_for_its_dims(sample_df):
+    cube = build_cube(sample_df)
+    assert cube.filter(NU_ANO=[2022], regiao=["Sul"]).hist is not None
+    assert cube.filter(genero_label=["Feminino"]).hist is None
+    with pytest.raises(ValueError):
+        score_distribution(cube.filter(genero_label=["Feminino"]), "NU_NOTA_MT")
+
+
+def test_percentile_distribution_close_to_quantiles(sample_df):
+    result = percentile_distribution(build_cube(sample_df)).set_index("percentil")["nota"]
+    expected = sample_df["media_geral"].quantile([0.25, 0.5, 0.75]).to_numpy()
+    assert result.loc[[25, 50, 75]].to_numpy() == pytest.approx(expected, abs=2.5)
+
+
+def test_store_roundtrip(store_dir, sample_df):
+    csv_path, path = store_dir
+    micro = store.read_microdata(store_dir=path)
+    assert len(micro) == len(sample_df) - 50
+    assert isinstance(micro["SG_UF_RESIDENCIA"].dtype, pd.CategoricalDtype)
+    assert micro["NU_NOTA_CN"].dtype == np.float32
+    cube = store.read_cube(path)
+    assert cube.n == len(micro)
+    pd.testing.assert_frame_equal(regional_summary(cube), regional_summary(build_cube(micro)))
+
+
+def test_store_freshness(store_dir):
+    csv_path, path = store_dir
+    assert store.is_fresh(str(csv_path), store_dir=path)
+    assert not store.is_fresh(str(csv_path), sample_size=100, store_dir=path)
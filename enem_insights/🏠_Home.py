@@ -82,17 +82,17 @@ st.markdown('</div>', unsafe_allow_html=True)
 st.markdown("---")
 
 # ── Quick stats ───────────────────────────────────────────────────────────────
-from app.data_loader import load_data  # noqa: E402
+from app.data_loader import load_cube  # noqa: E402
 
-df = load_data()
+cube = load_cube()
 
 st.subheader("Dados em Tempo Real")
 c1, c2, c3, c4, c5 = st.columns(5)
-c1.metric("Participantes", f"{len(df):,}")
-c2.metric("Média Geral", f"{df['media_geral'].mean():.1f}")
-c3.metric("Média Matemática", f"{df['NU_NOTA_MT'].mean():.1f}")
-c4.metric("Média Redação", f"{df['NU_NOTA_REDACAO'].mean():.1f}")
-c5.metric("Anos Cobertos", f"{df['NU_ANO'].nunique()}")
+c1.metric("Participantes", f"{cube.n:,}")
+c2.metric("Média Geral", f"{cube.mean('media_geral'):.1f}")
+c3.metric("Média Matemática", f"{cube.mean('NU_NOTA_MT'):.1f}")
+c4.metric("Média Redação", f"{cube.mean('NU_NOTA_REDACAO'):.1f}")
+c5.metric("Anos Cobertos", f"{len(cube.levels('NU_ANO'))}")
 
 st.markdown("""
 ---
@@ -0,0 +1,202 @@
+"""Latency benchmark for one agent turn: time-to-first-token and total turn time.
+
+Runs a local server that mimics the Mistral chat completions API (plain JSON
+and server-sent events) and plays the same turn twice:
+
+* **antes** — the previous loop: full ``chat`` response, tools one after the
+  other, typewriter effect of 8 ms per character;
+* **depois** — :class:`core.agent.Agent`: streamed tokens, concurrent tools.
+
+The model first asks for ``--tools`` tool calls (each takes ``--tool-ms``),
+then answers with ``--chars`` characters generated at ``--chunk-ms`` per
+4-character chunk.
+
+Usage:
+    python benchmark.py [--tools 3] [--tool-ms 400] [--chars 1000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from loguru import logger
+
+from core.agent import Agent
+from core.events import EventType
+from core.llm import MistralClient
+from core.memory import Memory
+
+_CHUNK_CHARS = 4
+
+
+# ---------------------------------------------------------------------------
+# Fake Mistral server
+# ---------------------------------------------------------------------------
+
+
+def _make_handler(args: argparse.Namespace) -> type[BaseHTTPRequestHandler]:
+    answer = ("Resposta do Nexus. " * (args.chars // 19 + 1))[: args.chars]
+    chunks = [answer[i : i + _CHUNK_CHARS] for i in range(0, len(answer), _CHUNK_CHARS)]
+    tool_calls = [
+        {
+            "id": f"call_{i}",
+            "type": "function",
+            "function": {"name": "sleep", "arguments": json.dumps({"n": i})},
+        }
+        for i in range(args.tools)
+    ]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *_: object) -> None:
+            pass
+
+        def do_POST(self) -> None:  # noqa: N802
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            wants_tools = payload["messages"][-1]["role"] == "user"
+            time.sleep(args.first_byte_ms / 1000)
+
+            if not payload.get("stream"):
+                if not wants_tools:
+                    time.sleep(len(chunks) * args.chunk_ms / 1000)
+                message = (
+                    {"role": "assistant", "content": "", "tool_calls": tool_calls}
+                    if wants_tools
+                    else {"role": "assistant", "content": answer}
+                )
+                body = json.dumps({
+                    "choices": [{
+                        "message": message,
+                        "finish_reason": "tool_calls" if wants_tools else "stop",
+                    }]
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def send(data: str) -> None:
+                line = f"data: {data}\n\n".encode()
+                self.wfile.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+                self.wfile.flush()
+
+            if wants_tools:
+                delta = {"role": "assistant", "content": "", "tool_calls": tool_calls}
+                send(json.dumps({"choices": [{"delta": delta, "finish_reason": "tool_calls"}]}))
+            else:
+                for chunk in chunks:
+                    time.sleep(args.chunk_ms / 1000)
+                    send(json.dumps({"choices": [{"delta": {"content": chunk}, "finish_reason": None}]}))
+                send(json.dumps({"choices": [{"delta": {}, "finish_reason": "stop"}]}))
+            send("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+
+    return Handler
+
+
+# ---------------------------------------------------------------------------
+# Turns
+# ---------------------------------------------------------------------------
+
+
+async def _legacy_turn(llm: MistralClient, memory: Memory, executor, session_id: int) -> tuple[float, float]:
+    """The loop before streaming: blocking chat, sequential tools, typewriter."""
+    start = time.perf_counter()
+    first_token = 0.0
+    loop = asyncio.get_running_loop()
+    memory.add_user_message(session_id, "benchmark")
+    while True:
+        response = await loop.run_in_executor(
+            None, llm.chat, memory.get_messages(session_id), [{"type": "function"}]
+        )
+        choice = response["choices"][0]
+        message = choice["message"]
+        if choice["finish_reason"] == "tool_calls":
+            memory.add_assistant_message(session_id, "", tool_calls=message["tool_calls"])
+            for call in message["tool_calls"]:
+                result = await executor(call["function"]["name"], {})
+                memory.add_tool_result(session_id, call["id"], call["function"]["name"], result)
+            continue
+        for _ in message["content"]:
+            first_token = first_token or time.perf_counter() - start
+            await asyncio.sleep(0.008)
+        memory.add_assistant_message(session_id, message["content"])
+        return first_token, time.perf_counter() - start
+
+
+async def _agent_turn(agent: Agent, session_id: int) -> tuple[float, float]:
+    start = time.perf_counter()
+    first_token = 0.0
+    async for event in agent.run("benchmark", session_id):
+        if event.type == EventType.TOKEN and not first_token:
+            first_token = time.perf_counter() - start
+        elif event.type == EventType.ERROR:
+            raise RuntimeError(event.error)
+    return first_token, time.perf_counter() - start
+
+
+async def _main(args: argparse.Namespace) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(args))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["MISTRAL_API_URL"] = f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+    os.environ.setdefault("MISTRAL_API_KEY", "benchmark")
+
+    async def executor(name: str, tool_args: dict) -> str:
+        await asyncio.sleep(args.tool_ms / 1000)
+        return f"{name} ok"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        memory = Memory(Path(tmp) / "memory.db")
+        llm = MistralClient()
+        agent = Agent(llm, memory, [{"type": "function"}], executor)
+
+        results = {
+            "antes": await _legacy_turn(llm, memory, executor, memory.create_session()),
+            "depois": await _agent_turn(agent, memory.create_session()),
+        }
+        await llm.aclose()
+        memory.close()
+    server.shutdown()
+
+    print(
+        f"{args.tools} ferramentas x {args.tool_ms} ms, resposta de {args.chars} chars "
+        f"({args.chunk_ms} ms/chunk, primeiro byte {args.first_byte_ms} ms)"
+    )
+    print(f"{'':8} {'1º token':>10} {'turno':>10}")
+    for name, (ttft, turn) in results.items():
+        print(f"{name:8} {ttft * 1000:8.0f}ms {turn * 1000:8.0f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tools", type=int, default=3, help="tool calls in the first step")
+    parser.add_argument("--tool-ms", type=int, default=400, help="duration of each tool call")
+    parser.add_argument("--chars", type=int, default=1000, help="length of the final answer")
+    parser.add_argument("--chunk-ms", type=float, default=5, help="generation time per chunk")
+    parser.add_argument("--first-byte-ms", type=int, default=150, help="server latency per request")
+    args = parser.parse_args()
+
+    logger.remove()
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
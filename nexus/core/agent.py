@@ -2,9 +2,12 @@
 from __future__ import annotations
 
 import asyncio
+import inspect
+import json
+import os
 import time
 from collections.abc import AsyncGenerator
-from typing import Any, Callable
+from typing import Any, Awaitable, Callable
 
 from loguru import logger
 
@@ -22,21 +25,33 @@ class Agent:
         tools_schema:  List of Mistral-format tool definition dicts.
         tool_executor: Callable ``(tool_name: str, tool_args: dict) -> str``
                        that executes a named tool and returns its string result.
+                       May be a coroutine function; sync callables run in a
+                       thread executor.
+        tool_timeout:  Seconds each tool call may take before it is reported
+                       as a :attr:`EventType.TOOL_ERROR`.
+        context_tokens: Token budget of the history sent to the LLM on each
+                       iteration (``NEXUS_CONTEXT_TOKENS``, default 24000).
     """
 
     _MAX_ITERATIONS = 8
+    _TOOL_TIMEOUT_S = 30.0
+    _CONTEXT_TOKENS = int(os.environ.get("NEXUS_CONTEXT_TOKENS", "24000"))
 
     def __init__(
         self,
         llm: MistralClient,
         memory: Memory,
         tools_schema: list[dict],
-        tool_executor: Callable[[str, dict], str],
+        tool_executor: Callable[[str, dict], str] | Callable[[str, dict], Awaitable[str]],
+        tool_timeout: float = _TOOL_TIMEOUT_S,
+        context_tokens: int = _CONTEXT_TOKENS,
     ) -> None:
         self.llm = llm
         self.memory = memory
         self.tools_schema = tools_schema
         self.tool_executor = tool_executor
+        self.tool_timeout = tool_timeout
+        self.context_tokens = context_tokens
 
     # ------------------------------------------------------------------
     # Main entry point
@@ -64,20 +79,25 @@ class Agent:
         self.memory.add_user_message(session_id, user_message)
         logger.info("Nova mensagem do usuário na sessão {}", session_id)
 
-        loop = asyncio.get_event_loop()
-
         # 2. ReAct loop — at most _MAX_ITERATIONS rounds.
         for iteration in range(self._MAX_ITERATIONS):
             logger.debug("Iteração ReAct {}/{}", iteration + 1, self._MAX_ITERATIONS)
 
-            messages = self.memory.get_messages(session_id)
+            # Cached in memory and trimmed to the token budget: the cost of
+            # this call doesn't grow with the length of the session.
+            messages = self.memory.get_context(session_id, self.context_tokens)
 
-            # 2b. Call the LLM in a thread executor so we don't block the
-            #     asyncio event loop while waiting for the HTTP response.
+            # 2b. Stream the completion, forwarding text fragments as they
+            #     arrive; the last chunk carries the assembled message.
+            finish_reason = "stop"
+            message: dict = {}
             try:
-                response: dict = await loop.run_in_executor(
-                    None, self.llm.chat, messages, self.tools_schema
-                )
+                async for chunk in self.llm.stream_chat(messages, self.tools_schema):
+                    if chunk.content:
+                        yield AgentEvent(type=EventType.TOKEN, data=chunk.content)
+                    if chunk.finish_reason:
+                        finish_reason = chunk.finish_reason
+                        message = chunk.message
             except Exception as exc:  # noqa: BLE001
                 logger.exception("Erro ao chamar a API Mistral")
                 yield AgentEvent(
@@ -86,16 +106,11 @@ class Agent:
                 )
                 return
 
-            choice: dict = response.get("choices", [{}])[0]
-            finish_reason: str = choice.get("finish_reason", "stop")
-            message: dict = choice.get("message", {})
-
             # ----------------------------------------------------------
             # 2c. Tool call branch
             # ----------------------------------------------------------
-            if finish_reason == "tool_calls":
-                tool_calls: list[dict] = message.get("tool_calls", [])
-
+            tool_calls: list[dict] = message.get("tool_calls") or []
+            if finish_reason == "tool_calls" and tool_calls:
                 # Persist the assistant's intent (with tool_calls) so the
                 # conversation history stays coherent for follow-up turns.
                 self.memory.add_assistant_message(
@@ -104,64 +119,43 @@ class Agent:
                     tool_calls=tool_calls,
                 )
 
-                for tool_call in tool_calls:
-                    tool_id: str = tool_call.get("id", "")
-                    function_info: dict = tool_call.get("function", {})
-                    tool_name: str = function_info.get("name", "")
-                    raw_args: Any = function_info.get("arguments", {})
-
-                    # Arguments may arrive as a JSON string or as a dict.
-                    if isinstance(raw_args, str):
-                        import json as _json
-
-                        try:
-                            tool_args: dict = _json.loads(raw_args)
-                        except Exception:  # noqa: BLE001
-                            tool_args = {}
-                    else:
-                        tool_args = raw_args or {}
-
+                calls = [_parse_tool_call(tool_call) for tool_call in tool_calls]
+                for tool_id, tool_name, tool_args in calls:
                     logger.info("Executando ferramenta '{}' args={}", tool_name, tool_args)
                     yield AgentEvent(
                         type=EventType.TOOL_START,
                         tool_name=tool_name,
+                        tool_id=tool_id,
                         tool_args=tool_args,
                     )
 
-                    t_start = time.perf_counter()
-                    try:
-                        # Execute in thread executor so blocking tools don't
-                        # stall the event loop.
-                        tool_result: str = await loop.run_in_executor(
-                            None, self.tool_executor, tool_name, tool_args
-                        )
-                        duration_ms = (time.perf_counter() - t_start) * 1_000
-
-                        logger.debug(
-                            "Ferramenta '{}' concluída em {:.1f} ms", tool_name, duration_ms
-                        )
+                # Independent calls of one step run concurrently; events are
+                # emitted as each finishes, results are persisted in call order.
+                results: list[str] = [""] * len(calls)
+                tasks = [
+                    asyncio.create_task(self._execute_tool(index, name, args))
+                    for index, (_, name, args) in enumerate(calls)
+                ]
+                try:
+                    for next_done in asyncio.as_completed(tasks):
+                        index, tool_result, error, duration_ms = await next_done
+                        tool_id, tool_name, tool_args = calls[index]
+                        results[index] = error or tool_result
                         yield AgentEvent(
-                            type=EventType.TOOL_END,
+                            type=EventType.TOOL_ERROR if error else EventType.TOOL_END,
                             tool_name=tool_name,
+                            tool_id=tool_id,
                             tool_args=tool_args,
-                            data=tool_result,
+                            data="" if error else tool_result,
+                            error=error,
                             duration_ms=duration_ms,
                         )
+                finally:
+                    for task in tasks:
+                        task.cancel()
 
-                    except Exception as exc:  # noqa: BLE001
-                        duration_ms = (time.perf_counter() - t_start) * 1_000
-                        error_msg = f"Erro na ferramenta '{tool_name}': {exc}"
-                        logger.exception("Ferramenta '{}' falhou", tool_name)
-                        tool_result = error_msg
-                        yield AgentEvent(
-                            type=EventType.TOOL_ERROR,
-                            tool_name=tool_name,
-                            tool_args=tool_args,
-                            error=error_msg,
-                            duration_ms=duration_ms,
-                        )
-
-                    # Persist the tool result so the LLM can observe it.
+                # Persist the tool results so the LLM can observe them.
+                for (tool_id, tool_name, _), tool_result in zip(calls, results):
                     self.memory.add_tool_result(
                         session_id,
                         tool_call_id=tool_id,
@@ -177,11 +171,6 @@ class Agent:
             # ----------------------------------------------------------
             content: str = message.get("content") or ""
 
-            # Typewriter effect — emit one character at a time.
-            for char in content:
-                yield AgentEvent(type=EventType.TOKEN, data=char)
-                await asyncio.sleep(0.008)
-
             # Persist the full assistant response.
             self.memory.add_assistant_message(session_id, content=content)
 
@@ -204,3 +193,57 @@ class Agent:
                 "sem produzir uma resposta final. Tente reformular sua pergunta."
             ),
         )
+
+    # ------------------------------------------------------------------
+    # Tool execution
+    # ------------------------------------------------------------------
+
+    async def _execute_tool(
+        self, index: int, tool_name: str, tool_args: dict
+    ) -> tuple[int, str, str, float]:
+        """Run one tool with a timeout; returns ``(index, result, error, duration_ms)``.
+
+        Async executors are awaited on the event loop; sync ones run in the
+        default thread executor so blocking tools don't stall it.
+        """
+        t_start = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(self.tool_executor):
+                pending = self.tool_executor(tool_name, tool_args)
+            else:
+                pending = asyncio.get_running_loop().run_in_executor(
+                    None, self.tool_executor, tool_name, tool_args
+                )
+            tool_result: str = await asyncio.wait_for(pending, self.tool_timeout)
+            duration_ms = (time.perf_counter() - t_start) * 1_000
+            logger.debug("Ferramenta '{}' concluída em {:.1f} ms", tool_name, duration_ms)
+            return index, tool_result, "", duration_ms
+        except asyncio.TimeoutError:
+            error_msg = (
+                f"Erro na ferramenta '{tool_name}': tempo limite de "
+                f"{self.tool_timeout:g}s excedido"
+            )
+            logger.warning(error_msg)
+        except Exception as exc:  # noqa: BLE001
+            error_msg = f"Erro na ferramenta '{tool_name}': {exc}"
+            logger.exception("Ferramenta '{}' falhou", tool_name)
+        return index, "", error_msg, (time.perf_counter() - t_start) * 1_000
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _parse_tool_call(tool_call: dict) -> tuple[str, str, dict]:
+    """Return ``(id, name, args)``; arguments may arrive as a JSON string or a dict."""
+    function_info: dict = tool_call.get("function", {})
+    raw_args: Any = function_info.get("arguments", {})
+    if isinstance(raw_args, str):
+        try:
+            tool_args: dict = json.loads(raw_args) if raw_args else {}
+        except Exception:  # noqa: BLE001
+            tool_args = {}
+    else:
+        tool_args = raw_args or {}
+    return tool_call.get("id", ""), function_info.get("name", ""), tool_args
@@ -0,0 +1,117 @@
+"""In-memory view of a session used to build the LLM context window."""
+from __future__ import annotations
+
+import json
+from collections.abc import Iterable
+
+# Rough token estimate: no tokenizer dependency, errs on the high side for
+# Portuguese/English text.
+_CHARS_PER_TOKEN = 3.5
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+# Tool outputs from previous turns keep only their head in the context.
+_TOOL_OUTPUT_KEEP_CHARS = 600
+
+_OMITTED_NOTE = {
+    "role": "system",
+    "content": (
+        "Mensagens anteriores desta conversa foram omitidas para caber no "
+        "contexto do modelo."
+    ),
+}
+
+
+def estimate_tokens(message: dict) -> int:
+    """Approximate token count of a message in Mistral API format."""
+    chars = len(message.get("content") or "")
+    if message.get("tool_calls"):
+        chars += len(json.dumps(message["tool_calls"], ensure_ascii=False))
+    return int(chars / _CHARS_PER_TOKEN) + _MESSAGE_OVERHEAD_TOKENS
+
+
+def compact(message: dict) -> dict:
+    """Return *message* with a long tool output cut to its head.
+
+    Other messages are returned unchanged: truncating ``tool_calls``
+    arguments would leave invalid JSON in the history.
+    """
+    content = message.get("content") or ""
+    if message.get("role") != "tool" or len(content) <= _TOOL_OUTPUT_KEEP_CHARS:
+        return message
+    omitted = len(content) - _TOOL_OUTPUT_KEEP_CHARS
+    return {
+        **message,
+        "content": (
+            f"{content[:_TOOL_OUTPUT_KEEP_CHARS]}\n"
+            f"[... {omitted} caracteres omitidos da saída da ferramenta]"
+        ),
+    }
+
+
+class SessionContext:
+    """Messages of one session plus what the context builder needs.
+
+    Token estimates and turn boundaries (indices of user messages) are
+    computed once, on :meth:`append`. :meth:`build` walks back from the end
+    one turn at a time and stops at the budget, so its cost depends on the
+    window size, not on the length of the session.
+    """
+
+    def __init__(self, messages: Iterable[dict] = ()) -> None:
+        self.messages: list[dict] = []
+        self.tokens: list[int] = []
+        self.turn_starts: list[int] = []
+        # compacted form of closed turns: turn start -> (messages, tokens)
+        self._compacted: dict[int, tuple[list[dict], int]] = {}
+        for message in messages:
+            self.append(message)
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def append(self, message: dict) -> None:
+        if message.get("role") == "user":
+            self.turn_starts.append(len(self.messages))
+        self.messages.append(message)
+        self.tokens.append(estimate_tokens(message))
+
+    def build(self, budget_tokens: int) -> list[dict]:
+        """Most recent messages that fit in *budget_tokens*, oldest first.
+
+        The current turn (from the last user message on) is always kept in
+        full; if it alone exceeds the budget, its tool outputs are compacted.
+        Earlier turns are added whole, newest first, with their tool outputs
+        compacted, until the next one would not fit. Whole turns keep each
+        assistant ``tool_calls`` message next to its tool results, as the API
+        requires. A system note marks the cut when older turns are left out.
+        """
+        if not self.messages:
+            return []
+
+        current_start = self.turn_starts[-1] if self.turn_starts else 0
+        window = self.messages[current_start:]
+        used = sum(self.tokens[current_start:])
+        if used > budget_tokens:
+            window = [compact(message) for message in window]
+            used = sum(estimate_tokens(message) for message in window)
+
+        parts = [window]
+        first_included = current_start
+        for turn in range(len(self.turn_starts) - 2, -1, -1):
+            start = self.turn_starts[turn]
+            messages, tokens = self._compact_turn(start, self.turn_starts[turn + 1])
+            if used + tokens > budget_tokens:
+                break
+            parts.append(messages)
+            used += tokens
+            first_included = start
+
+        if first_included > 0:
+            parts.append([_OMITTED_NOTE])
+        return [message for part in reversed(parts) for message in part]
+
+    def _compact_turn(self, start: int, end: int) -> tuple[list[dict], int]:
+        if start not in self._compacted:
+            messages = [compact(message) for message in self.messages[start:end]]
+            self._compacted[start] = (messages, sum(estimate_tokens(m) for m in messages))
+        return self._compacted[start]
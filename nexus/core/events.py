@@ -19,6 +19,7 @@ class AgentEvent:
     type: EventType
     data: str = ""
     tool_name: str = ""
+    tool_id: str = ""  # matches TOOL_START to its TOOL_END/TOOL_ERROR when tools run concurrently
     tool_args: dict = field(default_factory=dict)
     duration_ms: float = 0.0
     error: str = ""
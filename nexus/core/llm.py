@@ -1,12 +1,31 @@
 """Mistral AI client for Nexus agent."""
 from __future__ import annotations
 
+import json
 import os
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
 
+import httpx
 import requests
 from loguru import logger
 
 
+@dataclass
+class ChatChunk:
+    """One step of a streamed completion.
+
+    ``content`` is the text fragment received in this chunk. The last chunk
+    has ``finish_reason`` set and ``message`` holding the assembled assistant
+    message (content plus any ``tool_calls``), in the same shape as
+    ``choices[0].message`` of a non-streamed response.
+    """
+
+    content: str = ""
+    finish_reason: str | None = None
+    message: dict = field(default_factory=dict)
+
+
 class MistralClient:
     """Thin client for the Mistral AI chat completions API."""
 
@@ -15,6 +34,8 @@ class MistralClient:
     def __init__(self) -> None:
         self._api_key: str | None = os.environ.get("MISTRAL_API_KEY")
         self._model: str = os.environ.get("MISTRAL_MODEL", "mistral-small-latest")
+        self._api_url: str = os.environ.get("MISTRAL_API_URL", self._API_URL)
+        self._http: httpx.AsyncClient | None = None
 
         if not self._api_key:
             logger.warning(
@@ -50,6 +71,104 @@ class MistralClient:
             ValueError: If the API key is not configured.
             requests.HTTPError: If the API returns a non-2xx status.
         """
+        payload = self._payload(messages, tools)
+
+        response = requests.post(
+            self._api_url,
+            json=payload,
+            headers=self._headers(),
+            timeout=60,
+        )
+
+        response.raise_for_status()
+        result: dict = response.json()
+
+        finish_reason = (
+            result.get("choices", [{}])[0].get("finish_reason", "unknown")
+        )
+        logger.debug(
+            "Resposta recebida | finish_reason={} | tokens={}",
+            finish_reason,
+            result.get("usage", {}).get("total_tokens", "?"),
+        )
+
+        return result
+
+    async def stream_chat(
+        self,
+        messages: list[dict],
+        tools: list[dict] | None = None,
+    ) -> AsyncIterator[ChatChunk]:
+        """Stream a chat completion, yielding text fragments as they arrive.
+
+        Uses server-sent events (``"stream": true``). Tool calls are
+        accumulated across chunks and returned in the final chunk's
+        ``message``, so callers see the same message shape as :meth:`chat`.
+
+        Raises:
+            ValueError: If the API key is not configured.
+            httpx.HTTPStatusError: If the API returns a non-2xx status.
+        """
+        payload = self._payload(messages, tools)
+        payload["stream"] = True
+
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=10.0))
+
+        content_parts: list[str] = []
+        tool_calls: dict[int, dict] = {}
+        finish_reason: str | None = None
+
+        async with self._http.stream(
+            "POST", self._api_url, json=payload, headers=self._headers()
+        ) as response:
+            if response.is_error:
+                await response.aread()
+                response.raise_for_status()
+
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+
+                chunk: dict = json.loads(data)
+                choice: dict = (chunk.get("choices") or [{}])[0]
+                delta: dict = choice.get("delta") or {}
+
+                for position, call in enumerate(delta.get("tool_calls") or []):
+                    _merge_tool_call(tool_calls, call.get("index", position), call)
+
+                finish_reason = choice.get("finish_reason") or finish_reason
+                text = delta.get("content") or ""
+                if text:
+                    content_parts.append(text)
+                    yield ChatChunk(content=text)
+
+        message: dict = {"role": "assistant", "content": "".join(content_parts)}
+        if tool_calls:
+            message["tool_calls"] = [tool_calls[i] for i in sorted(tool_calls)]
+        finish_reason = finish_reason or ("tool_calls" if tool_calls else "stop")
+        logger.debug(
+            "Stream concluído | finish_reason={} | chars={} | tool_calls={}",
+            finish_reason,
+            len(message["content"]),
+            len(tool_calls),
+        )
+        yield ChatChunk(finish_reason=finish_reason, message=message)
+
+    async def aclose(self) -> None:
+        """Close the streaming HTTP client, if one was opened."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _payload(self, messages: list[dict], tools: list[dict] | None) -> dict:
         if not self._api_key:
             raise ValueError(
                 "MISTRAL_API_KEY não está configurada. "
@@ -66,34 +185,36 @@ class MistralClient:
             payload["tools"] = tools
             payload["tool_choice"] = "auto"
 
-        headers = {
-            "Authorization": f"Bearer {self._api_key}",
-            "Content-Type": "application/json",
-        }
-
         logger.debug(
             "Enviando requisição para Mistral | model={} | mensagens={}",
             self._model,
             len(messages),
         )
+        return payload
 
-        response = requests.post(
-            self._API_URL,
-            json=payload,
-            headers=headers,
-            timeout=60,
-        )
+    def _headers(self) -> dict:
+        return {
+            "Authorization": f"Bearer {self._api_key}",
+            "Content-Type": "application/json",
+        }
 
-        response.raise_for_status()
-        result: dict = response.json()
 
-        finish_reason = (
-            result.get("choices", [{}])[0].get("finish_reason", "unknown")
-        )
-        logger.debug(
-            "Resposta recebida | finish_reason={} | tokens={}",
-            finish_reason,
-            result.get("usage", {}).get("total_tokens", "?"),
-        )
-
-        return result
+def _merge_tool_call(calls: dict[int, dict], index: int, delta: dict) -> None:
+    """Merge a streamed tool-call fragment into the call at *index*.
+
+    Mistral usually sends each call whole, but OpenAI-style streams split
+    ``function.arguments`` across chunks; both are handled.
+    """
+    call = calls.setdefault(
+        index, {"id": "", "type": "function", "function": {"name": "", "arguments": ""}}
+    )
+    if delta.get("id"):
+        call["id"] = delta["id"]
+    function: dict = delta.get("function") or {}
+    if function.get("name"):
+        call["function"]["name"] = function["name"]
+    arguments = function.get("arguments")
+    if isinstance(arguments, dict):
+        call["function"]["arguments"] = json.dumps(arguments, ensure_ascii=False)
+    elif arguments:
+        call["function"]["arguments"] += arguments
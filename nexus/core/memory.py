@@ -3,20 +3,28 @@ from __future__ import annotations
 
 import json
 import sqlite3
+from collections import OrderedDict
 from datetime import datetime, timezone
 from pathlib import Path
 
 from loguru import logger
 
+from .context import SessionContext
+
 
 class Memory:
     """Persistent conversation memory backed by SQLite.
 
     Database lives at ``~/.nexus/memory.db``. The directory is created
     automatically on first use.
+
+    The messages of recently used sessions are also kept in memory: a session
+    is read from SQLite once, and every later write is appended to both. This
+    assumes a single process writes to the database, as in the TUI.
     """
 
     _DB_PATH = Path.home() / ".nexus" / "memory.db"
+    _CACHED_SESSIONS = 16
 
     def __init__(self, db_path: Path | None = None) -> None:
         self._db_path = db_path or self._DB_PATH
@@ -24,6 +32,7 @@ class Memory:
         self._conn = sqlite3.connect(str(self._db_path), check_same_thread=False)
         self._conn.row_factory = sqlite3.Row
         self._conn.execute("PRAGMA journal_mode=WAL")
+        self._sessions: OrderedDict[int, SessionContext] = OrderedDict()
         self._setup_schema()
         logger.info("Memory inicializada em {}", self._db_path)
 
@@ -51,6 +60,9 @@ class Memory:
                     name         TEXT,
                     created_at   TEXT    NOT NULL
                 );
+
+                CREATE INDEX IF NOT EXISTS idx_messages_session
+                    ON messages (session_id, id);
                 """
             )
 
@@ -101,14 +113,11 @@ class Memory:
         tool_calls: list | None = None,
     ) -> None:
         """Persist an assistant message, optionally with tool call data."""
-        tool_calls_json: str | None = None
-        if tool_calls:
-            tool_calls_json = json.dumps(tool_calls, ensure_ascii=False)
         self._insert_message(
             session_id=session_id,
             role="assistant",
             content=content,
-            tool_calls=tool_calls_json,
+            tool_calls=tool_calls or None,
         )
 
     def add_tool_result(
@@ -129,36 +138,14 @@ class Memory:
 
     def get_messages(self, session_id: int) -> list[dict]:
         """Return all messages for a session in Mistral API format."""
-        rows = self._conn.execute(
-            """
-            SELECT role, content, tool_calls, tool_call_id, name
-            FROM messages
-            WHERE session_id = ?
-            ORDER BY id ASC
-            """,
-            (session_id,),
-        ).fetchall()
-
-        result: list[dict] = []
-        for row in rows:
-            msg: dict = {"role": row["role"]}
-
-            # Content may be None for pure tool-call assistant messages.
-            if row["content"] is not None:
-                msg["content"] = row["content"]
-
-            if row["tool_calls"]:
-                msg["tool_calls"] = json.loads(row["tool_calls"])
+        return list(self._session(session_id).messages)
 
-            if row["tool_call_id"]:
-                msg["tool_call_id"] = row["tool_call_id"]
+    def get_context(self, session_id: int, budget_tokens: int) -> list[dict]:
+        """Return the most recent messages that fit in *budget_tokens*.
 
-            if row["name"]:
-                msg["name"] = row["name"]
-
-            result.append(msg)
-
-        return result
+        See :meth:`SessionContext.build` for what is kept, compacted or left out.
+        """
+        return self._session(session_id).build(budget_tokens)
 
     def clear_session(self, session_id: int) -> None:
         """Delete all messages belonging to a session."""
@@ -166,32 +153,73 @@ class Memory:
             "DELETE FROM messages WHERE session_id = ?", (session_id,)
         )
         self._conn.commit()
+        self._sessions.pop(session_id, None)
         logger.debug("Mensagens da sessão {} removidas", session_id)
 
     # ------------------------------------------------------------------
     # Internal helpers
     # ------------------------------------------------------------------
 
+    def _session(self, session_id: int) -> SessionContext:
+        """Cached messages of a session, loaded from SQLite on first use."""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+            return session
+
+        rows = self._conn.execute(
+            """
+            SELECT role, content, tool_calls, tool_call_id, name
+            FROM messages
+            WHERE session_id = ?
+            ORDER BY id ASC
+            """,
+            (session_id,),
+        ).fetchall()
+        session = SessionContext(
+            _to_message(
+                row["role"],
+                row["content"],
+                json.loads(row["tool_calls"]) if row["tool_calls"] else None,
+                row["tool_call_id"],
+                row["name"],
+            )
+            for row in rows
+        )
+        self._sessions[session_id] = session
+        if len(self._sessions) > self._CACHED_SESSIONS:
+            self._sessions.popitem(last=False)
+        logger.debug("Sessão {} carregada do banco ({} mensagens)", session_id, len(session))
+        return session
+
     def _insert_message(
         self,
         *,
         session_id: int,
         role: str,
         content: str | None = None,
-        tool_calls: str | None = None,
+        tool_calls: list | None = None,
         tool_call_id: str | None = None,
         name: str | None = None,
     ) -> None:
+        tool_calls_json: str | None = None
+        if tool_calls:
+            tool_calls_json = json.dumps(tool_calls, ensure_ascii=False)
         self._conn.execute(
             """
             INSERT INTO messages
                 (session_id, role, content, tool_calls, tool_call_id, name, created_at)
             VALUES (?, ?, ?, ?, ?, ?, ?)
             """,
-            (session_id, role, content, tool_calls, tool_call_id, name, _utcnow()),
+            (session_id, role, content, tool_calls_json, tool_call_id, name, _utcnow()),
         )
         self._conn.commit()
 
+        # Sessions not in the cache are read in full on their next use.
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.append(_to_message(role, content, tool_calls, tool_call_id, name))
+
     def close(self) -> None:
         """Close the underlying database connection."""
         self._conn.close()
@@ -205,3 +233,29 @@ class Memory:
 def _utcnow() -> str:
     """Return the current UTC time as an ISO-8601 string."""
     return datetime.now(tz=timezone.utc).isoformat()
+
+
+def _to_message(
+    role: str,
+    content: str | None,
+    tool_calls: list | None,
+    tool_call_id: str | None,
+    name: str | None,
+) -> dict:
+    """Build a message dict in Mistral API format, omitting empty fields."""
+    msg: dict = {"role": role}
+
+    # Content may be None for pure tool-call assistant messages.
+    if content is not None:
+        msg["content"] = content
+
+    if tool_calls:
+        msg["tool_calls"] = tool_calls
+
+    if tool_call_id:
+        msg["tool_call_id"] = tool_call_id
+
+    if name:
+        msg["name"] = name
+
+    return msg
@@ -1,8 +1,6 @@
 """Nexus TUI — AI Agent Terminal."""
 from __future__ import annotations
 
-import asyncio
-
 from textual.app import App, ComposeResult
 from textual.binding import Binding
 from textual.containers import Horizontal, ScrollableContainer, Vertical
@@ -23,19 +21,6 @@ from ..core.tools import TOOLS_SCHEMA, execute_tool
 # Helpers
 # ---------------------------------------------------------------------------
 
-def _sync_tool_executor(name: str, args: dict) -> str:
-    """Synchronous wrapper around the async execute_tool.
-
-    Agent.run() calls this inside a thread-pool executor, so there is no
-    running event loop in the calling thread — we can safely create one.
-    """
-    loop = asyncio.new_event_loop()
-    try:
-        return loop.run_until_complete(execute_tool(name, args))
-    finally:
-        loop.close()
-
-
 def _format_args(args: dict) -> str:
     """Format tool arguments as 'key: "value"' pairs, truncating long values."""
     if not args:
@@ -110,7 +95,7 @@ class NexusApp(App):
             llm=self.llm,
             memory=self.memory,
             tools_schema=TOOLS_SCHEMA,
-            tool_executor=_sync_tool_executor,
+            tool_executor=execute_tool,
         )
 
         # Show API key warning if not configured.
@@ -127,6 +112,10 @@ class NexusApp(App):
         self._add_welcome_message()
         self.query_one("#message-input", Input).focus()
 
+    async def on_unmount(self) -> None:
+        """Close the LLM client's streaming connection pool."""
+        await self.llm.aclose()
+
     # ------------------------------------------------------------------
     # Welcome message
     # ------------------------------------------------------------------
@@ -203,7 +192,8 @@ class NexusApp(App):
         self._append_raw(status)
 
         accumulated: str = ""
-        tool_widget: Static | None = None
+        # Tools of one step run concurrently; widgets are matched by call id.
+        tool_widgets: dict[str, Static] = {}
         status_removed = False
 
         try:
@@ -228,9 +218,11 @@ class NexusApp(App):
                         f"│ ⏳ executando...",
                         classes="msg-tool",
                     )
+                    tool_widgets[event.tool_id] = tool_widget
                     self._append_raw(tool_widget)
 
                 elif event.type == EventType.TOOL_END:
+                    tool_widget = tool_widgets.pop(event.tool_id, None)
                     if tool_widget is not None:
                         tool_widget.update(
                             f"╭─ 🔧 **{event.tool_name}** ({event.duration_ms:.0f}ms) ─╮\n"
@@ -243,9 +235,9 @@ class NexusApp(App):
                         preview = event.data if len(event.data) <= 300 else event.data[:300] + "..."
                         result_widget = Static(preview, classes="msg-tool tool-result")
                         self._append_raw(result_widget)
-                    tool_widget = None
 
                 elif event.type == EventType.TOOL_ERROR:
+                    tool_widget = tool_widgets.pop(event.tool_id, None)
                     if tool_widget is not None:
                         tool_widget.update(
                             f"╭─ 🔧 **{event.tool_name}** ({event.duration_ms:.0f}ms) ─╮\n"
@@ -253,7 +245,6 @@ class NexusApp(App):
                             f"│ ❌ {event.error}\n"
                             f"╰──"
                         )
-                    tool_widget = None
 
                 elif event.type == EventType.DONE:
                     if not status_removed:
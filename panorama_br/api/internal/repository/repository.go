@@ -118,15 +118,13 @@ func (r *Repository) GetLastPipelineRun() (string, error) {
 	return runAt, nil
 }
 
-// GetRecordsCount retorna a soma de registros nas tabelas principais
+// GetRecordsCount retorna a soma de registros nas tabelas principais.
+// Os totais vêm de table_counts, mantida por triggers do pipeline, sem COUNT(*).
 func (r *Repository) GetRecordsCount() (int, error) {
 	var count int
 	err := r.db.QueryRow(`
-		SELECT
-			(SELECT COUNT(*) FROM macro_indicators) +
-			(SELECT COUNT(*) FROM indicator_history) +
-			(SELECT COUNT(*) FROM market_snapshot) +
-			(SELECT COUNT(*) FROM regional_indicators)
+		SELECT COALESCE(SUM(n), 0) FROM table_counts
+		WHERE name IN ('macro_indicators', 'indicator_history', 'market_snapshot', 'regional_indicators')
 	`).Scan(&count)
 	if err != nil {
 		return 0, err
@@ -0,0 +1,160 @@
+"""Benchmark da etapa de armazenamento — carga inicial de 10 anos de histórico.
+
+Compara o caminho antigo (um INSERT e um commit por linha, pragmas padrão) com
+``process_and_store`` (executemany numa única transação, pragmas ajustados)
+gravando os mesmos dados em bancos temporários:
+
+    python -m pipeline.benchmark [--years 10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from loguru import logger
+
+from . import db
+from .processor import process_and_store
+
+_STOCKS = ["^BVSP", "PETR4.SA", "VALE3.SA", "ITUB4.SA", "BBDC4.SA", "WEGE3.SA", "ABEV3.SA", "MGLU3.SA"]
+_UFS = [
+    "AC", "AL", "AP", "AM", "BA", "CE", "DF", "ES", "GO", "MA", "MT", "MS", "MG", "PA",
+    "PB", "PR", "PE", "PI", "RJ", "RN", "RS", "RO", "RR", "SC", "SP", "SE", "TO",
+]
+
+
+# ---------------------------------------------------------------------------
+# Dados sintéticos no formato dos coletores
+# ---------------------------------------------------------------------------
+
+def _backfill(years: int, seed: int = 42) -> tuple[dict, dict, list[dict]]:
+    """Séries diárias (SELIC, câmbio) e mensais (IPCA, desemprego) de *years* anos."""
+    rng = random.Random(seed)
+    end = date.today()
+    start = end - timedelta(days=365 * years)
+    days = [start + timedelta(days=i) for i in range((end - start).days)]
+    business_days = [d for d in days if d.weekday() < 5]
+    months = [d for d in days if d.day == 1]
+
+    def series(indicator: str, dates: list[date], base: float) -> list[dict]:
+        value, points = base, []
+        for d in dates:
+            value = max(0.0, value * (1 + rng.uniform(-0.01, 0.01)))
+            points.append({"indicator": indicator, "value": round(value, 4), "date": d.isoformat()})
+        return points
+
+    bcb = {
+        "selic_atual": 10.5, "ipca_mensal": 0.4, "ipca_12m": 4.5, "cambio_usd": 5.0, "desemprego": 7.5,
+        "selic_history": series("selic", business_days, 10.5),
+        "cambio_history": series("cambio_usd", business_days, 5.0),
+        "ipca_mensal_history": series("ipca_mensal", months, 0.4),
+        "ipca_12m_history": series("ipca_12m", months, 4.5),
+        "desemprego_history": series("desemprego", months, 7.5),
+    }
+    market = {"stocks": [
+        {"symbol": s, "name": s, "price": 30.0, "change_pct": 0.5, "volume": 1e6, "market_cap": 1e9}
+        for s in _STOCKS
+    ]}
+    regional = [
+        {"uf": uf, "year": end.year - y, "state_name": uf, "region": "", "pib": 1e5,
+         "pib_per_capita": 4e4, "population": 1_000_000, "desemprego": 8.0}
+        for uf in _UFS for y in range(years)
+    ]
+    return bcb, market, regional
+
+
+# ---------------------------------------------------------------------------
+# Caminho antigo: uma linha e um commit por vez
+# ---------------------------------------------------------------------------
+
+def _legacy_store(path: Path, bcb: dict, market: dict, regional: list[dict]) -> None:
+    conn = sqlite3.connect(str(path))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(db._DDL)
+    for indicator, value_key, unit in [
+        ("selic", "selic_atual", "% a.a."), ("ipca_mensal", "ipca_mensal", "%"),
+        ("ipca_12m", "ipca_12m", "% a.a."), ("cambio_usd", "cambio_usd", "R$/USD"),
+        ("desemprego", "desemprego", "%"),
+    ]:
+        conn.execute(
+            "INSERT OR REPLACE INTO macro_indicators (indicator, value, unit, ref_date, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (indicator, bcb[value_key], unit, "", ""),
+        )
+        conn.commit()
+    for key, series in bcb.items():
+        if not key.endswith("_history"):
+            continue
+        for item in series:
+            conn.execute(
+                "INSERT OR IGNORE INTO indicator_history (indicator, value, date) VALUES (?, ?, ?)",
+                (item["indicator"], float(item["value"]), item["date"]),
+            )
+            conn.commit()
+    for s in market["stocks"]:
+        conn.execute(
+            "INSERT OR REPLACE INTO market_snapshot "
+            "(symbol, name, price, change_pct, volume, market_cap, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (s["symbol"], s["name"], s["price"], s["change_pct"], s["volume"], s["market_cap"], ""),
+        )
+        conn.commit()
+    for r in regional:
+        conn.execute(
+            "INSERT OR REPLACE INTO regional_indicators "
+            "(uf, year, state_name, region, pib, pib_per_capita, population, desemprego) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (r["uf"], r["year"], r["state_name"], r["region"], r["pib"],
+             r["pib_per_capita"], r["population"], r["desemprego"]),
+        )
+        conn.commit()
+    for table in db.COUNTED_TABLES:
+        conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()  # noqa: S608
+    conn.close()
+
+
+def _batched_store(path: Path, bcb: dict, market: dict, regional: list[dict]) -> None:
+    db.DB_PATH = path
+    conn = db.get_conn()
+    try:
+        process_and_store(bcb, market, regional, conn)
+        db.table_counts(conn)
+    finally:
+        conn.close()
+
+
+def run(years: int = 10) -> dict[str, float]:
+    bcb, market, regional = _backfill(years)
+    points = sum(len(v) for k, v in bcb.items() if k.endswith("_history"))
+    rows = points + len(market["stocks"]) + len(regional) + 5
+    logger.info(f"Backfill de {years} anos: {points} pontos de histórico, {rows} linhas no total.")
+
+    timings: dict[str, float] = {}
+    original_path = db.DB_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, store in [("linha a linha", _legacy_store), ("executemany", _batched_store)]:
+            start = time.perf_counter()
+            store(Path(tmp) / f"{name.replace(' ', '_')}.db", bcb, market, regional)
+            timings[name] = time.perf_counter() - start
+    db.DB_PATH = original_path
+
+    for name, seconds in timings.items():
+        print(f"{name:<15} {seconds:8.3f}s  {rows / seconds:10,.0f} linhas/s")
+    print(f"ganho: {timings['linha a linha'] / timings['executemany']:.0f}x")
+    return timings
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark da gravação de uma carga histórica.")
+    parser.add_argument("--years", type=int, default=10, help="anos de histórico (padrão: 10)")
+    args = parser.parse_args(argv)
+    run(args.years)
+
+
+if __name__ == "__main__":
+    main()
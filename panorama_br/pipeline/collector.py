@@ -1,8 +1,10 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 
 import requests
+from requests.adapters import HTTPAdapter
 from loguru import logger
 
 try:
@@ -31,6 +33,28 @@ _TICKER_NAMES: dict[str, str] = {
 
 _TICKERS = list(_TICKER_NAMES.keys())
 
+# indicador, série SGS, janela da primeira carga (pontos), chave do valor atual,
+# chave do histórico, valor sintético quando não há dado algum
+_BCB_SERIES: list[tuple[str, int, int, str, str, float]] = [
+    ("selic",       11,    90,  "selic_atual", "selic_history",       10.50),
+    ("ipca_mensal", 433,   36,  "ipca_mensal", "ipca_mensal_history", 0.44),
+    ("ipca_12m",    13522, 36,  "ipca_12m",    "ipca_12m_history",    4.83),
+    ("cambio_usd",  1,     365, "cambio_usd",  "cambio_history",      4.97),
+    ("desemprego",  24369, 24,  "desemprego",  "desemprego_history",  7.8),
+]
+
+_session: requests.Session | None = None
+
+
+def _get_session() -> requests.Session:
+    """Sessão HTTP compartilhada (keep-alive) entre as requisições paralelas ao BCB."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(_BCB_SERIES), pool_maxsize=len(_BCB_SERIES))
+        _session.mount("https://", adapter)
+    return _session
+
 
 def _bcb_date_to_iso(date_str: str) -> str:
     """Converte 'DD/MM/YYYY' para 'YYYY-MM-DD'."""
@@ -40,10 +64,24 @@ def _bcb_date_to_iso(date_str: str) -> str:
         return date_str
 
 
-def _fetch_bcb_series(series_id: int, n: int = 90) -> list[dict]:
-    """Busca os últimos n registros de uma série BCB."""
-    url = f"{_BCB_BASE}.{series_id}/dados/ultimos/{n}?formato=json"
-    resp = requests.get(url, timeout=10)
+def _fetch_bcb_series(series_id: int, n: int = 90, since: str | None = None) -> list[dict]:
+    """Busca os últimos n registros de uma série BCB ou, com ``since`` (YYYY-MM-DD),
+    só as observações posteriores a essa data."""
+    if since:
+        start = datetime.strptime(since, "%Y-%m-%d") + timedelta(days=1)
+        end = datetime.now(timezone.utc)
+        if start.date() > end.date():
+            return []
+        url = (
+            f"{_BCB_BASE}.{series_id}/dados?formato=json"
+            f"&dataInicial={start:%d/%m/%Y}&dataFinal={end:%d/%m/%Y}"
+        )
+    else:
+        url = f"{_BCB_BASE}.{series_id}/dados/ultimos/{n}?formato=json"
+    resp = _get_session().get(url, timeout=10)
+    if since and resp.status_code == 404:
+        # o SGS responde 404 quando não há observações no período
+        return []
     resp.raise_for_status()
     return resp.json()
 
@@ -65,66 +103,47 @@ def _series_to_history(raw: list[dict], indicator: str) -> list[dict]:
     return result
 
 
-# ---------------------------------------------------------------------------
-# BCB fallback data (valores realistas 2024)
-# ---------------------------------------------------------------------------
-
-def _bcb_fallback() -> dict:
-    logger.warning("Usando dados sintéticos BCB.")
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    return {
-        "selic_atual": 10.50,
-        "selic_history": [{"indicator": "selic", "value": 10.50, "date": today}],
-        "ipca_mensal": 0.44,
-        "ipca_mensal_history": [{"indicator": "ipca_mensal", "value": 0.44, "date": today}],
-        "ipca_12m": 4.83,
-        "ipca_12m_history": [{"indicator": "ipca_12m", "value": 4.83, "date": today}],
-        "cambio_usd": 4.97,
-        "cambio_history": [{"indicator": "cambio_usd", "value": 4.97, "date": today}],
-        "desemprego": 7.8,
-        "desemprego_history": [{"indicator": "desemprego", "value": 7.8, "date": today}],
-    }
-
-
 # ---------------------------------------------------------------------------
 # collect_bcb
 # ---------------------------------------------------------------------------
 
-def collect_bcb() -> dict:
+def collect_bcb(latest: dict[str, tuple[str, float]] | None = None) -> dict:
     """Retorna dict com chaves: selic_atual, selic_history, ipca_mensal, ipca_mensal_history,
-    ipca_12m, ipca_12m_history, cambio_usd, cambio_history, desemprego, desemprego_history."""
-    try:
-        raw_selic = _fetch_bcb_series(11, 90)
-        raw_ipca_m = _fetch_bcb_series(433, 36)
-        raw_ipca_12 = _fetch_bcb_series(13522, 36)
-        raw_usd = _fetch_bcb_series(1, 365)
-        raw_desemp = _fetch_bcb_series(24369, 24)
-
-        def _last_value(raw: list[dict]) -> float:
-            return float(raw[-1]["valor"].replace(",", ".")) if raw else 0.0
-
-        selic_h = _series_to_history(raw_selic, "selic")
-        ipca_m_h = _series_to_history(raw_ipca_m, "ipca_mensal")
-        ipca_12_h = _series_to_history(raw_ipca_12, "ipca_12m")
-        cambio_h = _series_to_history(raw_usd, "cambio_usd")
-        desemp_h = _series_to_history(raw_desemp, "desemprego")
-
-        return {
-            "selic_atual": _last_value(raw_selic),
-            "selic_history": selic_h,
-            "ipca_mensal": _last_value(raw_ipca_m),
-            "ipca_mensal_history": ipca_m_h,
-            "ipca_12m": _last_value(raw_ipca_12),
-            "ipca_12m_history": ipca_12_h,
-            "cambio_usd": _last_value(raw_usd),
-            "cambio_history": cambio_h,
-            "desemprego": _last_value(raw_desemp),
-            "desemprego_history": desemp_h,
+    ipca_12m, ipca_12m_history, cambio_usd, cambio_history, desemprego, desemprego_history.
+
+    As cinco séries são buscadas em paralelo. ``latest`` mapeia indicador -> (data, valor)
+    da última observação já gravada (``db.latest_history``): nesse caso só as observações
+    mais novas são pedidas e, sem novidade, o valor atual é o último gravado. Uma série que
+    falha usa o último valor gravado ou, sem histórico, um valor sintético, que nunca entra
+    no histórico (assim o próximo ciclo ainda busca a janela completa).
+    """
+    latest = latest or {}
+    with ThreadPoolExecutor(max_workers=len(_BCB_SERIES)) as pool:
+        futures = {
+            indicator: pool.submit(_fetch_bcb_series, series_id, n, latest.get(indicator, (None, 0.0))[0])
+            for indicator, series_id, n, *_ in _BCB_SERIES
         }
 
-    except Exception as exc:
-        logger.warning(f"Erro ao coletar dados BCB: {exc}. Usando fallback sintético.")
-        return _bcb_fallback()
+    result: dict = {}
+    for indicator, _, _, value_key, history_key, fallback in _BCB_SERIES:
+        try:
+            history = _series_to_history(futures[indicator].result(), indicator)
+        except Exception as exc:
+            logger.warning(f"Erro ao coletar série BCB {indicator}: {exc}")
+            history = []
+
+        if history:
+            result[value_key] = history[-1]["value"]
+        elif indicator in latest:
+            result[value_key] = latest[indicator][1]
+        else:
+            # o valor sintético vai só para macro_indicators: gravá-lo no histórico
+            # faria os próximos ciclos pedirem apenas dados posteriores a hoje, e a
+            # janela inicial (ultimos/n) nunca seria buscada
+            logger.warning(f"Usando dado sintético BCB para {indicator}.")
+            result[value_key] = fallback
+        result[history_key] = history
+    return result
 
 
 # ---------------------------------------------------------------------------
@@ -157,59 +176,63 @@ def _market_fallback() -> dict:
 # collect_market
 # ---------------------------------------------------------------------------
 
-def collect_market() -> dict:
-    """Retorna dict com: ibovespa (valor, change_pct), stocks (lista)."""
+def _fetch_ticker(ticker_sym: str, updated_at: str) -> dict | None:
+    try:
+        info = yf.Ticker(ticker_sym).fast_info
+        last_price = float(info.last_price or 0)
+        prev_close = float(info.previous_close or 0)
+        change_pct = (
+            (last_price - prev_close) / prev_close * 100
+            if prev_close and prev_close != 0
+            else 0.0
+        )
+        return {
+            "symbol": ticker_sym,
+            "name": _TICKER_NAMES.get(ticker_sym, ticker_sym),
+            "price": last_price,
+            "change_pct": round(change_pct, 4),
+            "volume": float(getattr(info, "three_month_average_volume", None) or 0),
+            "market_cap": float(getattr(info, "market_cap", None) or 0),
+            "updated_at": updated_at,
+        }
+    except Exception as ticker_exc:
+        logger.warning(f"Erro ao buscar ticker {ticker_sym}: {ticker_exc}")
+        return None
+
+
+def collect_market(fallback: bool = True) -> dict:
+    """Retorna dict com: ibovespa (valor, change_pct), stocks (lista).
+
+    Os tickers são consultados em paralelo; a ordem de ``_TICKERS`` é preservada.
+    Com ``fallback=False``, uma coleta sem nenhuma cotação levanta ``RuntimeError``
+    em vez de devolver dados sintéticos (o scheduler mantém o último snapshot real)."""
     if not _YF_AVAILABLE:
+        if not fallback:
+            raise RuntimeError("yfinance não disponível")
         return _market_fallback()
 
     try:
         today = datetime.now(timezone.utc).isoformat()
-        stocks = []
-        ibov_value = 0.0
-        ibov_change = 0.0
-
-        for ticker_sym in _TICKERS:
-            try:
-                ticker = yf.Ticker(ticker_sym)
-                info = ticker.fast_info
-                last_price = float(info.last_price or 0)
-                prev_close = float(info.previous_close or 0)
-                change_pct = (
-                    (last_price - prev_close) / prev_close * 100
-                    if prev_close and prev_close != 0
-                    else 0.0
-                )
-                volume = float(getattr(info, "three_month_average_volume", None) or 0)
-                market_cap = float(getattr(info, "market_cap", None) or 0)
-                name = _TICKER_NAMES.get(ticker_sym, ticker_sym)
-
-                entry = {
-                    "symbol": ticker_sym,
-                    "name": name,
-                    "price": last_price,
-                    "change_pct": round(change_pct, 4),
-                    "volume": volume,
-                    "market_cap": market_cap,
-                    "updated_at": today,
-                }
-                stocks.append(entry)
-
-                if ticker_sym == "^BVSP":
-                    ibov_value = last_price
-                    ibov_change = round(change_pct, 4)
-
-            except Exception as ticker_exc:
-                logger.warning(f"Erro ao buscar ticker {ticker_sym}: {ticker_exc}")
+        with ThreadPoolExecutor(max_workers=len(_TICKERS)) as pool:
+            stocks = [s for s in pool.map(lambda t: _fetch_ticker(t, today), _TICKERS) if s]
 
         if not stocks:
+            if not fallback:
+                raise RuntimeError("nenhuma cotação retornada pelo yfinance")
             return _market_fallback()
 
+        ibov = next((s for s in stocks if s["symbol"] == "^BVSP"), None)
         return {
-            "ibovespa": {"value": ibov_value, "change_pct": ibov_change},
+            "ibovespa": {
+                "value": ibov["price"] if ibov else 0.0,
+                "change_pct": ibov["change_pct"] if ibov else 0.0,
+            },
             "stocks": stocks,
         }
 
     except Exception as exc:
+        if not fallback:
+            raise
         logger.warning(f"Erro ao coletar dados de mercado: {exc}. Usando fallback sintético.")
         return _market_fallback()
 
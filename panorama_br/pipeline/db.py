@@ -51,96 +51,183 @@ CREATE TABLE IF NOT EXISTS pipeline_log (
   run_at TEXT NOT NULL,
   status TEXT NOT NULL,
   message TEXT DEFAULT '',
-  duration_s REAL DEFAULT 0
+  duration_s REAL DEFAULT 0,
+  source TEXT DEFAULT 'cycle'
+);
+
+CREATE TABLE IF NOT EXISTS source_state (
+  source TEXT PRIMARY KEY,
+  content_hash TEXT NOT NULL,
+  updated_at TEXT DEFAULT ''
+);
+
+CREATE TABLE IF NOT EXISTS table_counts (
+  name TEXT PRIMARY KEY,
+  n INTEGER NOT NULL DEFAULT 0
 );
 """
 
+# Tabelas cujo total de linhas é mantido em ``table_counts`` por triggers.
+COUNTED_TABLES = (
+    "macro_indicators",
+    "indicator_history",
+    "market_snapshot",
+    "regional_indicators",
+    "pipeline_log",
+)
+
+_COUNT_TRIGGERS = "".join(
+    f"""
+CREATE TRIGGER IF NOT EXISTS {table}_count_ins AFTER INSERT ON {table}
+BEGIN UPDATE table_counts SET n = n + 1 WHERE name = '{table}'; END;
+CREATE TRIGGER IF NOT EXISTS {table}_count_del AFTER DELETE ON {table}
+BEGIN UPDATE table_counts SET n = n - 1 WHERE name = '{table}'; END;
+"""
+    for table in COUNTED_TABLES
+)
+
+# synchronous=NORMAL é seguro em WAL (só o último commit pode se perder numa
+# queda de energia, o banco não corrompe) e evita um fsync por transação.
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",  # 16 MB
+    "PRAGMA busy_timeout=5000",  # a API Go lê o mesmo arquivo
+)
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Adiciona colunas criadas depois da primeira versão do schema."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(pipeline_log)")}
+    if "source" not in columns:
+        conn.execute("ALTER TABLE pipeline_log ADD COLUMN source TEXT DEFAULT 'cycle'")
+    # contadores: uma contagem completa só na primeira abertura, depois as triggers mantêm
+    if conn.execute("SELECT COUNT(*) FROM table_counts").fetchone()[0] < len(COUNTED_TABLES):
+        for table in COUNTED_TABLES:
+            conn.execute(
+                f"INSERT OR REPLACE INTO table_counts (name, n) SELECT '{table}', COUNT(*) FROM {table}"  # noqa: S608
+            )
+
 
 def get_conn() -> sqlite3.Connection:
     """Abre conexão com o banco SQLite em modo WAL e cria as tabelas se necessário."""
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(DB_PATH), check_same_thread=False)
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.executescript(_DDL)
+    conn = sqlite3.connect(str(DB_PATH), check_same_thread=False, cached_statements=256)
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
+    conn.executescript(_DDL + _COUNT_TRIGGERS)
+    _migrate(conn)
     conn.commit()
     return conn
 
 
-def upsert_macro(
+def latest_history(conn: sqlite3.Connection) -> dict[str, tuple[str, float]]:
+    """Última observação gravada por indicador: {indicator: (date, value)}."""
+    # no SQLite, colunas simples junto de MAX() vêm da linha que tem o máximo
+    rows = conn.execute(
+        "SELECT indicator, MAX(date), value FROM indicator_history GROUP BY indicator"
+    ).fetchall()
+    return {indicator: (date, value) for indicator, date, value in rows}
+
+
+# ---------------------------------------------------------------------------
+# Gravação em lote
+# ---------------------------------------------------------------------------
+# As funções abaixo não fazem commit: quem chama abre uma transação (``with
+# conn:``) e grava o ciclo inteiro de uma vez. Cada SQL é uma constante, então
+# o cache de statements da conexão prepara cada um só uma vez por processo, e
+# ``executemany`` reaproveita o statement preparado em todas as linhas. Os
+# upserts usam ON CONFLICT DO UPDATE (e não INSERT OR REPLACE) para que as
+# triggers de ``table_counts`` só contem linhas realmente novas.
+
+_UPSERT_MACRO = """
+INSERT INTO macro_indicators (indicator, value, unit, ref_date, updated_at)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(indicator) DO UPDATE SET
+  value = excluded.value, unit = excluded.unit,
+  ref_date = excluded.ref_date, updated_at = excluded.updated_at
+"""
+
+_INSERT_HISTORY = """
+INSERT OR IGNORE INTO indicator_history (indicator, value, date)
+VALUES (?, ?, ?)
+"""
+
+_UPSERT_MARKET = """
+INSERT INTO market_snapshot (symbol, name, price, change_pct, volume, market_cap, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(symbol) DO UPDATE SET
+  name = excluded.name, price = excluded.price, change_pct = excluded.change_pct,
+  volume = excluded.volume, market_cap = excluded.market_cap, updated_at = excluded.updated_at
+"""
+
+_UPSERT_REGIONAL = """
+INSERT INTO regional_indicators
+  (uf, year, state_name, region, pib, pib_per_capita, population, desemprego)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(uf, year) DO UPDATE SET
+  state_name = excluded.state_name, region = excluded.region, pib = excluded.pib,
+  pib_per_capita = excluded.pib_per_capita, population = excluded.population,
+  desemprego = excluded.desemprego
+"""
+
+
+def upsert_macro_many(
     conn: sqlite3.Connection,
-    indicator: str,
-    value: float,
-    unit: str,
-    ref_date: str,
-) -> None:
+    rows: list[tuple[str, float, str, str]],
+) -> int:
+    """Grava (indicator, value, unit, ref_date); retorna o número de linhas gravadas."""
     updated_at = datetime.now(timezone.utc).isoformat()
-    conn.execute(
-        """
-        INSERT OR REPLACE INTO macro_indicators (indicator, value, unit, ref_date, updated_at)
-        VALUES (?, ?, ?, ?, ?)
-        """,
-        (indicator, value, unit, ref_date, updated_at),
-    )
-    conn.commit()
+    return conn.executemany(_UPSERT_MACRO, [(*row, updated_at) for row in rows]).rowcount
 
 
-def insert_history(
+def insert_history_many(
     conn: sqlite3.Connection,
-    indicator: str,
-    value: float,
-    date: str,
-) -> None:
-    conn.execute(
-        """
-        INSERT OR IGNORE INTO indicator_history (indicator, value, date)
-        VALUES (?, ?, ?)
-        """,
-        (indicator, value, date),
-    )
-    conn.commit()
+    rows: list[tuple[str, float, str]],
+) -> int:
+    """Insere (indicator, value, date) ignorando datas já gravadas; retorna quantos pontos eram novos."""
+    return conn.executemany(_INSERT_HISTORY, rows).rowcount
 
 
-def upsert_market(
+def upsert_market_many(
     conn: sqlite3.Connection,
-    symbol: str,
-    name: str,
-    price: float,
-    change_pct: float,
-    volume: float,
-    market_cap: float,
-) -> None:
+    rows: list[tuple[str, str, float, float, float, float]],
+) -> int:
+    """Grava (symbol, name, price, change_pct, volume, market_cap)."""
     updated_at = datetime.now(timezone.utc).isoformat()
-    conn.execute(
-        """
-        INSERT OR REPLACE INTO market_snapshot
-          (symbol, name, price, change_pct, volume, market_cap, updated_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        """,
-        (symbol, name, price, change_pct, volume, market_cap, updated_at),
-    )
-    conn.commit()
+    return conn.executemany(_UPSERT_MARKET, [(*row, updated_at) for row in rows]).rowcount
 
 
-def upsert_regional(
+def upsert_regional_many(
     conn: sqlite3.Connection,
-    uf: str,
-    year: int,
-    state_name: str,
-    region: str,
-    pib: float,
-    pib_per_capita: float,
-    population: int,
-    desemprego: float,
-) -> None:
+    rows: list[tuple[str, int, str, str, float, float, int, float]],
+) -> int:
+    """Grava (uf, year, state_name, region, pib, pib_per_capita, population, desemprego)."""
+    return conn.executemany(_UPSERT_REGIONAL, rows).rowcount
+
+
+def table_counts(conn: sqlite3.Connection) -> dict[str, int]:
+    """Número de linhas por tabela, mantido pelas triggers (sem COUNT(*))."""
+    return dict(conn.execute("SELECT name, n FROM table_counts").fetchall())
+
+
+def source_hash(conn: sqlite3.Connection, source: str) -> str | None:
+    """Hash do conteúdo gravado pela última vez para a fonte, se houver."""
+    row = conn.execute("SELECT content_hash FROM source_state WHERE source = ?", (source,)).fetchone()
+    return row[0] if row else None
+
+
+def set_source_hash(conn: sqlite3.Connection, source: str, content_hash: str) -> None:
+    """Registra o hash do conteúdo gravado (sem commit, como as funções em lote)."""
     conn.execute(
         """
-        INSERT OR REPLACE INTO regional_indicators
-          (uf, year, state_name, region, pib, pib_per_capita, population, desemprego)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        INSERT INTO source_state (source, content_hash, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(source) DO UPDATE SET
+          content_hash = excluded.content_hash, updated_at = excluded.updated_at
         """,
-        (uf, year, state_name, region, pib, pib_per_capita, population, desemprego),
+        (source, content_hash, datetime.now(timezone.utc).isoformat()),
     )
-    conn.commit()
 
 
 def log_run(
@@ -148,13 +235,14 @@ def log_run(
     status: str,
     message: str,
     duration_s: float,
+    source: str = "cycle",
 ) -> None:
     run_at = datetime.now(timezone.utc).isoformat()
     conn.execute(
         """
-        INSERT INTO pipeline_log (run_at, status, message, duration_s)
-        VALUES (?, ?, ?, ?)
+        INSERT INTO pipeline_log (run_at, status, message, duration_s, source)
+        VALUES (?, ?, ?, ?, ?)
         """,
-        (run_at, status, message, duration_s),
+        (run_at, status, message, duration_s, source),
     )
     conn.commit()
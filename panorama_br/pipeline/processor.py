@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import sqlite3
+import time
 from datetime import datetime, timezone
 
 from loguru import logger
@@ -12,27 +13,62 @@ def process_and_store(
     bcb_data: dict,
     market_data: dict,
     regional_data: list[dict],
-) -> None:
-    """Processa os dados coletados e armazena no SQLite."""
-    conn = db.get_conn()
+    conn: sqlite3.Connection | None = None,
+) -> dict[str, int]:
+    """Processa os dados coletados e armazena no SQLite numa única transação.
+
+    Retorna as linhas gravadas por tabela. Se *conn* não for informada, abre e
+    fecha uma conexão própria.
+    """
+    own_conn = conn is None
+    conn = conn or db.get_conn()
+    start = time.perf_counter()
     try:
-        _store_macro(conn, bcb_data)
-        _store_history(conn, bcb_data)
-        _store_market(conn, market_data)
-        _store_regional(conn, regional_data)
-        logger.info("Dados processados e armazenados com sucesso.")
+        with conn:  # commit único no fim do ciclo; rollback em caso de erro
+            written = {
+                **_store(conn, "bcb", bcb_data),
+                **_store(conn, "market", market_data),
+                **_store(conn, "regional", regional_data),
+            }
+        logger.info(
+            f"Dados processados e armazenados com sucesso em {time.perf_counter() - start:.3f}s: {written}"
+        )
+        return written
     except Exception as exc:
         logger.error(f"Erro ao processar/armazenar dados: {exc}")
         raise
     finally:
-        conn.close()
+        if own_conn:
+            conn.close()
+
+
+def store_source(
+    conn: sqlite3.Connection,
+    source: str,
+    data: dict | list[dict],
+    content_hash: str | None = None,
+) -> dict[str, int]:
+    """Grava os dados de uma fonte (``bcb``, ``market`` ou ``regional``) numa transação própria.
+
+    Só as tabelas da fonte são tocadas, e a API nunca vê uma fonte gravada pela
+    metade. *content_hash*, se informado, é gravado na mesma transação.
+    """
+    with conn:
+        written = _store(conn, source, data)
+        if content_hash is not None:
+            db.set_source_hash(conn, source, content_hash)
+    return written
+
+
+def _store(conn: sqlite3.Connection, source: str, data: dict | list[dict]) -> dict[str, int]:
+    return {table: store(conn, data) for table, store in _SOURCE_TABLES[source]}
 
 
 # ---------------------------------------------------------------------------
 # Macro indicators
 # ---------------------------------------------------------------------------
 
-def _store_macro(conn: sqlite3.Connection, bcb: dict) -> None:
+def _store_macro(conn: sqlite3.Connection, bcb: dict) -> int:
     today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
 
     _macro_entries = [
@@ -43,16 +79,16 @@ def _store_macro(conn: sqlite3.Connection, bcb: dict) -> None:
         ("desemprego", bcb.get("desemprego", 0.0),     "%",        today),
     ]
 
-    for indicator, value, unit, ref_date in _macro_entries:
-        db.upsert_macro(conn, indicator, value, unit, ref_date)
-        logger.debug(f"Macro salvo: {indicator}={value}{unit}")
+    written = db.upsert_macro_many(conn, _macro_entries)
+    logger.debug(f"Macro salvo: {', '.join(f'{i}={v}{u}' for i, v, u, _ in _macro_entries)}")
+    return written
 
 
 # ---------------------------------------------------------------------------
 # Historical series
 # ---------------------------------------------------------------------------
 
-def _store_history(conn: sqlite3.Connection, bcb: dict) -> None:
+def _store_history(conn: sqlite3.Connection, bcb: dict) -> int:
     history_keys = [
         "selic_history",
         "ipca_mensal_history",
@@ -60,66 +96,74 @@ def _store_history(conn: sqlite3.Connection, bcb: dict) -> None:
         "cambio_history",
         "desemprego_history",
     ]
-    total = 0
+    rows: list[tuple[str, float, str]] = []
     for key in history_keys:
         series: list[dict] = bcb.get(key, [])
         for item in series:
             try:
-                db.insert_history(
-                    conn,
-                    indicator=item["indicator"],
-                    value=float(item["value"]),
-                    date=item["date"],
-                )
-                total += 1
+                rows.append((item["indicator"], float(item["value"]), item["date"]))
             except (KeyError, ValueError) as exc:
                 logger.warning(f"Ponto de histórico inválido em {key}: {exc}")
-    logger.info(f"Histórico: {total} pontos inseridos/ignorados.")
+    inserted = db.insert_history_many(conn, rows)
+    logger.info(f"Histórico: {inserted} ponto(s) novo(s) de {len(rows)} recebido(s).")
+    return inserted
 
 
 # ---------------------------------------------------------------------------
 # Market snapshot
 # ---------------------------------------------------------------------------
 
-def _store_market(conn: sqlite3.Connection, market: dict) -> None:
+def _store_market(conn: sqlite3.Connection, market: dict) -> int:
     stocks: list[dict] = market.get("stocks", [])
+    rows: list[tuple] = []
     for s in stocks:
         try:
-            db.upsert_market(
-                conn,
-                symbol=s["symbol"],
-                name=s.get("name", ""),
-                price=float(s.get("price", 0)),
-                change_pct=float(s.get("change_pct", 0)),
-                volume=float(s.get("volume", 0)),
-                market_cap=float(s.get("market_cap", 0)),
-            )
+            rows.append((
+                s["symbol"],
+                s.get("name", ""),
+                float(s.get("price", 0)),
+                float(s.get("change_pct", 0)),
+                float(s.get("volume", 0)),
+                float(s.get("market_cap", 0)),
+            ))
         except (KeyError, ValueError) as exc:
             logger.warning(f"Dado de mercado inválido para {s.get('symbol', '?')}: {exc}")
-    logger.info(f"Mercado: {len(stocks)} ativo(s) salvo(s).")
+    written = db.upsert_market_many(conn, rows)
+    logger.info(f"Mercado: {written} ativo(s) salvo(s).")
+    return written
 
 
 # ---------------------------------------------------------------------------
 # Regional indicators
 # ---------------------------------------------------------------------------
 
-def _store_regional(conn: sqlite3.Connection, regional: list[dict]) -> None:
+def _store_regional(conn: sqlite3.Connection, regional: list[dict]) -> int:
+    rows: list[tuple] = []
     for r in regional:
         try:
-            db.upsert_regional(
-                conn,
-                uf=r["uf"],
-                year=int(r["year"]),
-                state_name=r.get("state_name", ""),
-                region=r.get("region", ""),
-                pib=float(r.get("pib", 0)),
-                pib_per_capita=float(r.get("pib_per_capita", 0)),
-                population=int(r.get("population", 0)),
-                desemprego=float(r.get("desemprego", 0)),
-            )
+            rows.append((
+                r["uf"],
+                int(r["year"]),
+                r.get("state_name", ""),
+                r.get("region", ""),
+                float(r.get("pib", 0)),
+                float(r.get("pib_per_capita", 0)),
+                int(r.get("population", 0)),
+                float(r.get("desemprego", 0)),
+            ))
         except (KeyError, ValueError) as exc:
             logger.warning(f"Dado regional inválido para {r.get('uf', '?')}: {exc}")
-    logger.info(f"Regional: {len(regional)} estado(s) salvo(s).")
+    written = db.upsert_regional_many(conn, rows)
+    logger.info(f"Regional: {written} estado(s) salvo(s).")
+    return written
+
+
+# tabelas gravadas por cada fonte, na ordem de gravação
+_SOURCE_TABLES = {
+    "bcb": [("macro_indicators", _store_macro), ("indicator_history", _store_history)],
+    "market": [("market_snapshot", _store_market)],
+    "regional": [("regional_indicators", _store_regional)],
+}
 
 
 # ---------------------------------------------------------------------------
@@ -127,20 +171,14 @@ def _store_regional(conn: sqlite3.Connection, regional: list[dict]) -> None:
 # ---------------------------------------------------------------------------
 
 def get_summary_stats(conn: sqlite3.Connection) -> dict:
-    """Retorna estatísticas de registros por tabela para health check."""
-    tables = [
-        "macro_indicators",
-        "indicator_history",
-        "market_snapshot",
-        "regional_indicators",
-        "pipeline_log",
-    ]
-    stats: dict[str, int] = {}
-    for table in tables:
-        try:
-            cursor = conn.execute(f"SELECT COUNT(*) FROM {table}")  # noqa: S608
-            stats[table] = cursor.fetchone()[0]
-        except Exception as exc:
-            logger.warning(f"Erro ao contar registros em {table}: {exc}")
-            stats[table] = -1
-    return stats
+    """Retorna estatísticas de registros por tabela para health check.
+
+    Lê os contadores de ``table_counts`` (mantidos por triggers) em vez de
+    rodar COUNT(*) em cada tabela a cada ciclo.
+    """
+    try:
+        counts = db.table_counts(conn)
+    except Exception as exc:
+        logger.warning(f"Erro ao ler contadores de registros: {exc}")
+        counts = {}
+    return {table: counts.get(table, -1) for table in db.COUNTED_TABLES}
@@ -1,90 +1,212 @@
-"""Pipeline entry point — coleta dados e agenda atualizações periódicas."""
+"""Pipeline entry point — coleta dados e agenda atualizações por fonte.
+
+Cada fonte declara a própria cadência (``Source``): mercado a cada minuto, BCB a
+cada ``COLLECT_INTERVAL_MINUTES`` e dados regionais uma vez por dia. O laço
+principal dorme até a próxima fonte vencer (ou até um SIGTERM) e dispara as
+fontes vencidas em paralelo. Cada fonte grava só as próprias tabelas, numa
+transação própria.
+"""
 
 from __future__ import annotations
 
+import argparse
+import hashlib
+import json
 import os
+import random
 import signal
+import sqlite3
+import threading
 import time
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable
 
 from loguru import logger
 
 from . import db
 from .collector import collect_bcb, collect_market, collect_regional
-from .processor import get_summary_stats, process_and_store
+from .processor import get_summary_stats, store_source
 
 INTERVAL_MINUTES: int = int(os.getenv("COLLECT_INTERVAL_MINUTES", "30"))
+MARKET_INTERVAL_SECONDS: int = int(os.getenv("MARKET_INTERVAL_SECONDS", "60"))
+REGIONAL_INTERVAL_HOURS: int = int(os.getenv("REGIONAL_INTERVAL_HOURS", "24"))
 
 _shutdown = False
+_wake = threading.Event()
 
 
 def _handle_sigterm(signum: int, frame: object) -> None:
     global _shutdown
     logger.info("SIGTERM recebido. Encerrando pipeline graciosamente...")
     _shutdown = True
+    _wake.set()
 
 
-def _run_pipeline() -> None:
-    """Executa um ciclo completo de coleta e armazenamento."""
-    start = time.monotonic()
-    conn = db.get_conn()
-    status = "success"
-    message = ""
+# ---------------------------------------------------------------------------
+# Fontes
+# ---------------------------------------------------------------------------
 
-    try:
-        logger.info("Iniciando coleta BCB...")
-        bcb_data = collect_bcb()
+@dataclass(eq=False)
+class Source:
+    """Uma fonte de dados com cadência própria.
 
-        logger.info("Iniciando coleta de mercado...")
-        market_data = collect_market()
+    Depois de uma execução bem-sucedida, a próxima vem em ``interval_s`` ±
+    ``jitter``. Após falhas consecutivas o intervalo dobra a cada falha, até
+    ``max_backoff_s``. Com ``only_on_change``, os dados só são gravados quando o
+    hash do conteúdo coletado difere do último gravado.
+    """
 
-        logger.info("Carregando dados regionais...")
-        regional_data = collect_regional()
+    name: str
+    collect: Callable[[sqlite3.Connection], dict | list[dict]]
+    interval_s: float
+    jitter: float = 0.1
+    max_backoff_s: float = 0.0  # 0 = 8x o intervalo
+    only_on_change: bool = False
+    next_run: float = 0.0
+    failures: int = 0
+    running: bool = False
+    conn: sqlite3.Connection | None = field(default=None, repr=False)
 
-        logger.info("Processando e armazenando dados...")
-        process_and_store(bcb_data, market_data, regional_data)
+    def delay(self) -> float:
+        """Segundos até a próxima execução, com backoff exponencial e jitter."""
+        delay = self.interval_s
+        if self.failures:
+            delay = min(self.interval_s * 2 ** self.failures, self.max_backoff_s or self.interval_s * 8)
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
 
-        summary = get_summary_stats(conn)
-        message = str(summary)
-        logger.info(f"Pipeline concluído. Resumo: {summary}")
 
-    except Exception as exc:
-        status = "error"
-        message = str(exc)
-        logger.error(f"Erro no pipeline: {exc}")
+def _collect_bcb(conn: sqlite3.Connection) -> dict:
+    return collect_bcb(db.latest_history(conn))
 
-    finally:
-        duration_s = time.monotonic() - start
-        try:
-            db.log_run(conn, status, message, round(duration_s, 3))
-        except Exception as log_exc:
-            logger.error(f"Falha ao registrar log de execução: {log_exc}")
-        conn.close()
-        logger.info(f"Ciclo encerrado em {duration_s:.2f}s com status={status}.")
 
+def _collect_market(conn: sqlite3.Connection) -> dict:
+    # dados sintéticos só enquanto não existe nenhum snapshot real; depois, uma
+    # falha mantém o último snapshot e entra em backoff
+    has_snapshot = db.table_counts(conn).get("market_snapshot", 0) > 0
+    return collect_market(fallback=not has_snapshot)
 
-def main() -> None:
-    signal.signal(signal.SIGTERM, _handle_sigterm)
 
-    logger.info(f"Pipeline iniciado. Intervalo: {INTERVAL_MINUTES}min")
+def _collect_regional(conn: sqlite3.Connection) -> list[dict]:
+    return collect_regional()
+
+
+def default_sources() -> list[Source]:
+    return [
+        Source("market", _collect_market, MARKET_INTERVAL_SECONDS, max_backoff_s=15 * 60),
+        Source("bcb", _collect_bcb, INTERVAL_MINUTES * 60),
+        Source("regional", _collect_regional, REGIONAL_INTERVAL_HOURS * 3600, only_on_change=True),
+    ]
+
+
+def _content_hash(data: object) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
 
-    # Primeira execução imediata
-    _run_pipeline()
+def _describe(source: str, data: object) -> str:
+    if source == "bcb":
+        new_points = sum(len(v) for k, v in data.items() if k.endswith("_history"))
+        return f"{new_points} ponto(s) novo(s)"
+    if source == "market":
+        return f"{len(data.get('stocks', []))} ativo(s)"
+    return f"{len(data)} estado(s)"
 
-    last_run = datetime.now(timezone.utc)
 
-    while not _shutdown:
-        time.sleep(60)
-        if _shutdown:
-            break
-        now = datetime.now(timezone.utc)
-        elapsed_minutes = (now - last_run).total_seconds() / 60
-        if elapsed_minutes >= INTERVAL_MINUTES:
-            logger.info(f"{elapsed_minutes:.1f}min desde última coleta. Executando ciclo...")
-            _run_pipeline()
-            last_run = datetime.now(timezone.utc)
+# ---------------------------------------------------------------------------
+# Execução
+# ---------------------------------------------------------------------------
+
+def run_source(source: Source) -> bool:
+    """Coleta e grava uma fonte; registra o resultado em ``pipeline_log``.
+
+    Retorna ``True`` em caso de sucesso. Agenda a próxima execução da fonte.
+    """
+    start = time.monotonic()
+    ok = False
+    try:
+        if source.conn is None:
+            source.conn = db.get_conn()
+        conn = source.conn
+        data = source.collect(conn)
+        digest = _content_hash(data) if source.only_on_change else None
+        if digest is not None and digest == db.source_hash(conn, source.name):
+            detail = "sem mudança na fonte"
+        else:
+            written = store_source(conn, source.name, data, digest)
+            detail = f"{_describe(source.name, data)}; gravado: {written}"
+        duration_s = time.monotonic() - start
+        logger.info(f"Fonte {source.name}: {detail} em {duration_s:.2f}s")
+        db.log_run(conn, "success", detail, round(duration_s, 3), source=source.name)
+        source.failures = 0
+        ok = True
+    except Exception as exc:
+        source.failures += 1
+        logger.error(f"Erro na fonte {source.name} ({source.failures} falha(s) seguida(s)): {exc}")
+        try:
+            db.log_run(source.conn, "error", str(exc), round(time.monotonic() - start, 3), source=source.name)
+        except Exception as log_exc:
+            logger.error(f"Falha ao registrar log da fonte {source.name}: {log_exc}")
+    finally:
+        source.next_run = time.monotonic() + source.delay()
+        source.running = False
+        _wake.set()
+    return ok
+
+
+def run_once(sources: list[Source]) -> bool:
+    """Roda todas as fontes uma vez, em paralelo. Retorna ``True`` se todas tiveram sucesso."""
+    with ThreadPoolExecutor(max_workers=len(sources)) as pool:
+        results = list(pool.map(run_source, sources))
+    return all(results)
+
+
+def run_forever(sources: list[Source]) -> None:
+    """Laço orientado a eventos: dispara as fontes vencidas e dorme até a próxima.
+
+    O sono é interrompido quando uma fonte termina (para reagendá-la) ou por SIGTERM;
+    no encerramento, as execuções em andamento terminam antes de sair.
+    """
+    with ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="source") as pool:
+        while not _shutdown:
+            now = time.monotonic()
+            for source in sources:
+                if not source.running and source.next_run <= now:
+                    source.running = True
+                    pool.submit(run_source, source)
+            idle = [s.next_run for s in sources if not s.running]
+            timeout = max(0.0, min(idle) - time.monotonic()) if idle else None
+            _wake.wait(timeout)
+            _wake.clear()
+        logger.info("Aguardando fontes em andamento...")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Pipeline de coleta do Panorama BR.")
+    parser.add_argument("--once", action="store_true", help="roda cada fonte uma vez e sai")
+    args = parser.parse_args(argv)
+
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+    sources = default_sources()
+    logger.info(
+        "Pipeline iniciado. Cadências: "
+        + ", ".join(f"{s.name}={s.interval_s:.0f}s" for s in sources)
+    )
+    try:
+        if args.once:
+            ok = run_once(sources)
+        else:
+            run_forever(sources)
+            ok = True
+        if sources[0].conn is not None:
+            logger.info(f"Resumo: {get_summary_stats(sources[0].conn)}")
+    finally:
+        for source in sources:
+            if source.conn is not None:
+                source.conn.close()
 
     logger.info("Pipeline encerrado.")
+    if not ok:
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
@@ -16,7 +16,8 @@ import qrcode
 from babel.numbers import format_currency
 
 from modules import db_data_manager as dm
-from modules.ui_components import _build_pdf_bytes, renderizar_relatorio_compradores
+from modules.ui_components import renderizar_relatorio_compradores
+from modules import reports
 from modules import ui_components as ui
 from logger import get_logger, log_exceptions, add_user_context
 
@@ -208,45 +209,27 @@ def main():
             tz_offset = st.number_input("Fuso horário (offset horas)", value=tz_default, step=1, min_value=-12, max_value=14)
         
         if vendas:
-            vendas_sel = vendas
+            # Início arredondado ao minuto: pedidos repetidos reaproveitam o relatório em cache
+            inicio_pdf = pd.Timestamp(start2).floor("min").isoformat() if start2 else None
+            opcoes_pdf = {"start_iso": inicio_pdf, "end_iso": end2, "tz_offset": int(tz_offset)}
             if numeros_pdf_txt:
                 try:
-                    nums = ui._parse_ranges(numeros_pdf_txt)
-                    vendas_sel = [v for v in vendas_sel if int(v['numero']) in set(nums)]
-                    logger.debug(f"Filtro de números aplicado para PDF", numeros=nums)
+                    opcoes_pdf["numeros"] = ui._parse_ranges(numeros_pdf_txt)
+                    logger.debug(f"Filtro de números aplicado para PDF", numeros=opcoes_pdf["numeros"])
                 except Exception as e:
                     logger.warning(f"Falha ao parsear números para PDF", exception=e)
                     st.error("Formato de números inválido.")
-                    vendas_sel = []
             
+            tipo_pdf = "comprovantes"
             if comprador_pdf and comprador_pdf != "(Todos)":
-                vendas_sel = [v for v in vendas_sel if v['comprador'] == comprador_pdf]
+                tipo_pdf = "comprovante_comprador"
+                opcoes_pdf["comprador"] = comprador_pdf
                 logger.debug(f"Filtro de comprador {comprador_pdf} aplicado para PDF")
             
-            if vendas_sel and st.button("Gerar PDF de comprovantes"):
-                try:
-                    if comprador_pdf and comprador_pdf != "(Todos)":
-                        pdf_bytes = _build_pdf_bytes(
-                            vendas_list=vendas_sel,
-                            cfg_local=cfg,
-                            consolidate_buyer=comprador_pdf,
-                            nome_rifa=nome_rifa,
-                            tz_offset=tz_offset
-                        )
-                        fname = f"{_safe_fname(nome_rifa)}_{_safe_fname(comprador_pdf)}_comprovante.pdf"
-                    else:
-                        pdf_bytes = _build_pdf_bytes(
-                            vendas_list=vendas_sel,
-                            cfg_local=cfg,
-                            nome_rifa=nome_rifa,
-                            tz_offset=tz_offset
-                        )
-                        fname = f"{_safe_fname(nome_rifa)}_comprovantes.pdf"
-                    st.download_button("Baixar PDF", data=pdf_bytes, file_name=fname, mime="application/pdf")
-                    logger.success(f"PDF de comprovantes gerado para rifa {nome_rifa}", comprador=comprador_pdf)
-                except Exception as e:
-                    logger.error(f"Falha ao gerar PDF para rifa {nome_rifa}", exception=e)
-                    st.error(f"Erro ao gerar PDF: {str(e)}")
+            if st.button("Gerar PDF de comprovantes"):
+                st.session_state[f"job_pdf_comprovantes_{nome_rifa}"] = reports.submit_report(tipo_pdf, nome_rifa, cfg, opcoes_pdf)
+                logger.info(f"PDF de comprovantes solicitado para rifa {nome_rifa}", comprador=comprador_pdf)
+            ui.renderizar_progresso_relatorio(f"job_pdf_comprovantes_{nome_rifa}")
         
         # Adiciona o relatório de compradores
         st.markdown("---")
@@ -523,13 +506,15 @@ def main():
 
         st.markdown("---")
         st.subheader("Exportar Backup (JSON)")
+        incremental = st.checkbox("Incremental (apenas alterações desde o último backup)", value=False)
         if st.button("Gerar Backup"):
             try:
-                backup_bytes = dm.export_backup_json_zip()
+                backup_bytes = dm.export_backup_json_zip(incremental=incremental)
+                sufixo = "_incremental" if incremental else ""
                 st.download_button(
                     "Baixar Backup (ZIP)",
                     data=backup_bytes,
-                    file_name=f"backup_rifas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+                    file_name=f"backup_rifas{sufixo}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
                     mime="application/zip",
                 )
                 logger.success(f"Backup JSON ZIP gerado para usuário {user['id']}")
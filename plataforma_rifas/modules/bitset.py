@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+
+# Bitset de números da rifa (1..total): o número n ocupa o bit (n - 1).
+# Ocupa ceil(total / 8) bytes; 100 mil números cabem em 12,5 KB.
+
+
+def nbytes(total: int) -> int:
+    return (max(0, int(total)) + 7) // 8
+
+
+def empty(total: int) -> bytearray:
+    return bytearray(nbytes(total))
+
+
+def from_numbers(total: int, numeros: Iterable[int]) -> bytearray:
+    buf = empty(total)
+    set_bits(buf, numeros, True)
+    return buf
+
+
+def resize(buf: bytes | None, total: int) -> bytearray:
+    """Ajusta o tamanho para `total` números (rifa ampliada ou bitset ausente)."""
+    size = nbytes(total)
+    data = bytearray(buf or b"")
+    if len(data) < size:
+        data.extend(bytes(size - len(data)))
+    return data[:size]
+
+
+def set_bits(buf: bytearray, numeros: Iterable[int], value: bool) -> None:
+    for n in numeros:
+        idx = int(n) - 1
+        byte, bit = divmod(idx, 8)
+        if idx < 0 or byte >= len(buf):
+            continue
+        if value:
+            buf[byte] |= 1 << bit
+        else:
+            buf[byte] &= ~(1 << bit) & 0xFF
+
+
+def test(buf: bytes, n: int) -> bool:
+    idx = int(n) - 1
+    byte, bit = divmod(idx, 8)
+    if idx < 0 or byte >= len(buf):
+        return False
+    return bool(buf[byte] >> bit & 1)
+
+
+def count(buf: bytes) -> int:
+    return int.from_bytes(buf, "little").bit_count()
+
+
+def iter_numbers(buf: bytes, start: int = 1, end: int | None = None) -> Iterator[int]:
+    """Números marcados no intervalo [start, end], pulando bytes zerados."""
+    last = len(buf) * 8 if end is None else min(int(end), len(buf) * 8)
+    n = max(1, int(start))
+    while n <= last:
+        byte = buf[(n - 1) // 8]
+        if not byte:
+            n = ((n - 1) // 8 + 1) * 8 + 1
+            continue
+        if byte >> ((n - 1) % 8) & 1:
+            yield n
+        n += 1
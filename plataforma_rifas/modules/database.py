@@ -1,6 +1,10 @@
 from __future__ import annotations
 
+import os
+import re
 import sqlite3
+import threading
+import time
 from pathlib import Path
 
 from logger import get_logger
@@ -19,18 +23,187 @@ except Exception as e:
 
 DB_PATH = DATA_DIR / "rifas.db"
 
+# Pragmas aplicados uma vez por conexão
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+)
+
+# Consultas mais lentas que isso (ms) geram aviso no log
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = False
+_stats_lock = threading.Lock()
+_query_stats: dict[str, dict[str, float]] = {}
+
+# Listas IN (?, ?, ...) de qualquer tamanho contam como uma única consulta
+_IN_PLACEHOLDERS = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+# Limite de consultas distintas; as demais são somadas em uma entrada só
+MAX_QUERY_STATS = 500
+_OTHER_QUERIES = "(outras consultas)"
+
+
+def _record_query(sql: str, elapsed_ms: float) -> None:
+    key = _IN_PLACEHOLDERS.sub("IN (?…)", " ".join(sql.split()))
+    with _stats_lock:
+        if key not in _query_stats and len(_query_stats) >= MAX_QUERY_STATS:
+            key = _OTHER_QUERIES
+        stats = _query_stats.setdefault(key, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        stats["count"] += 1
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+    if elapsed_ms >= SLOW_QUERY_MS:
+        logger.warning(f"Consulta lenta ({elapsed_ms:.1f} ms): {key[:200]}")
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor que mede o tempo de cada execute/executemany."""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record_query(sql, (time.perf_counter() - start) * 1000)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_query(sql, (time.perf_counter() - start) * 1000)
+
+
+class PooledConnection(sqlite3.Connection):
+    """Conexão reutilizada pela thread.
+
+    close() não fecha a conexão: as funções de acesso chamam close() ao final e podem
+    ser chamadas dentro de um `with conn:` de outra (mesma conexão), cuja transação
+    não pode ser desfeita. Transações continuam delimitadas por `with conn:`.
+
+    Fora de qualquer `with conn:`, close() desfaz a transação pendente (escrita sem
+    commit, p. ex. num caminho de exceção), para que ela não seja efetivada pelo
+    commit do próximo usuário da conexão.
+    """
+
+    _depth = 0  # blocos `with conn:` abertos nesta conexão
+
+    def __enter__(self):
+        self._depth += 1
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        self._depth -= 1
+        return super().__exit__(exc_type, exc, tb)
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def close(self) -> None:
+        if self._depth == 0 and self.in_transaction:
+            logger.warning("Transação sem commit desfeita ao devolver a conexão")
+            self.rollback()
+
+    def dispose(self) -> None:
+        super().close()
+
+
+def _open_connection() -> PooledConnection:
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, factory=PooledConnection)
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def init_db() -> None:
+    """Cria/migra o schema uma única vez por processo."""
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        conn = _open_connection()
+        try:
+            _create_tables(conn)
+        finally:
+            conn.dispose()
+        _schema_ready = True
+
+
 def get_connection() -> sqlite3.Connection:
+    """Retorna a conexão da thread atual (aberta e configurada no primeiro uso).
+
+    Chamar close() na conexão retornada não a fecha (ver PooledConnection).
+    """
     try:
-        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON;")
-        _create_tables(conn)
-        logger.success("Conexão com banco de dados estabelecida com sucesso")
+        init_db()
+        conn = getattr(_local, "conn", None)
+        if conn is None:
+            conn = _local.conn = _open_connection()
+            logger.debug("Conexão com banco de dados aberta para a thread")
         return conn
     except sqlite3.Error as e:
         logger.critical("Erro ao conectar ao banco de dados", exception=e)
         raise RuntimeError(f"Erro de conexão com DB: {e}") from e
 
+
+def close_connection() -> None:
+    """Fecha de fato a conexão da thread atual (se houver)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.dispose()
+        _local.conn = None
+
+
+def get_query_stats() -> dict[str, dict[str, float]]:
+    """Estatísticas de tempo por consulta (count, total_ms, max_ms, avg_ms)."""
+    with _stats_lock:
+        return {
+            sql: {**stats, "avg_ms": stats["total_ms"] / stats["count"]}
+            for sql, stats in _query_stats.items()
+        }
+
+
+def reset_query_stats() -> None:
+    with _stats_lock:
+        _query_stats.clear()
+
+
+# Hora (UTC) de uma venda, chave do rollup vendas_por_hora
+HORA_SQL = "STRFTIME('%Y-%m-%d %H:00:00', {})"
+
+
+def rebuild_vendas_por_hora(cur: sqlite3.Cursor, rifa_id: int | None = None) -> int:
+    """Recalcula vendas_por_hora a partir de vendas (uma rifa ou todas); retorna o nº de horas."""
+    where, params = ("WHERE rifa_id = ?", (rifa_id,)) if rifa_id is not None else ("", ())
+    cur.execute(f"DELETE FROM vendas_por_hora {where}", params)
+    cur.execute(
+        f"""
+        INSERT INTO vendas_por_hora (rifa_id, hora, quantidade)
+        SELECT rifa_id, {HORA_SQL.format('timestamp')} AS hora, COUNT(*)
+        FROM vendas {where}
+        GROUP BY rifa_id, hora
+        HAVING hora IS NOT NULL
+        """,
+        params,
+    )
+    return cur.rowcount
+
+
 def _create_tables(conn: sqlite3.Connection) -> None:
     try:
         cur = conn.cursor()
@@ -109,6 +282,10 @@ def _create_tables(conn: sqlite3.Connection) -> None:
             if "owner_id" not in cols:
                 cur.execute("ALTER TABLE rifas ADD COLUMN owner_id INTEGER")
                 logger.success("Coluna 'owner_id' adicionada à tabela rifas")
+            # Versão dos dados de vendas (chave do cache de relatórios)
+            if "versao_dados" not in cols:
+                cur.execute("ALTER TABLE rifas ADD COLUMN versao_dados INTEGER NOT NULL DEFAULT 0")
+                logger.success("Coluna 'versao_dados' adicionada à tabela rifas")
         except sqlite3.Error as e:
             logger.warning("Falha ao adicionar coluna 'owner_id' à tabela rifas (pode já existir)", exception=e)
         # Reservas
@@ -125,9 +302,40 @@ def _create_tables(conn: sqlite3.Connection) -> None:
             """
         )
         logger.debug("Tabela 'reservas' criada ou verificada")
+        # Disponibilidade: bitsets (vendidos/reservados) mantidos junto das tabelas
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS disponibilidade (
+                rifa_id INTEGER PRIMARY KEY,
+                vendidos BLOB NOT NULL,
+                reservados BLOB NOT NULL,
+                FOREIGN KEY(rifa_id) REFERENCES rifas(id) ON DELETE CASCADE
+            );
+            """
+        )
+        logger.debug("Tabela 'disponibilidade' criada ou verificada")
+        # Rollup de vendas por hora (UTC) para os gráficos de analytics
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS vendas_por_hora (
+                rifa_id INTEGER NOT NULL,
+                hora TEXT NOT NULL,
+                quantidade INTEGER NOT NULL,
+                PRIMARY KEY (rifa_id, hora),
+                FOREIGN KEY(rifa_id) REFERENCES rifas(id) ON DELETE CASCADE
+            ) WITHOUT ROWID;
+            """
+        )
+        if cur.execute("SELECT 1 FROM vendas_por_hora LIMIT 1").fetchone() is None:
+            buckets = rebuild_vendas_por_hora(cur)
+            if buckets:
+                logger.success(f"Rollup 'vendas_por_hora' preenchido com {buckets} horas")
+        logger.debug("Tabela 'vendas_por_hora' criada ou verificada")
         # Índices úteis
         cur.execute("CREATE INDEX IF NOT EXISTS idx_vendas_rifa ON vendas(rifa_id)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_vendas_rifa_ts ON vendas(rifa_id, timestamp)")
         cur.execute("CREATE INDEX IF NOT EXISTS idx_reservas_rifa ON reservas(rifa_id)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_reservas_rifa_ts ON reservas(rifa_id, timestamp)")
         cur.execute("CREATE INDEX IF NOT EXISTS idx_rifas_owner ON rifas(owner_id)")
         logger.debug("Índices criados ou verificados")
         conn.commit()
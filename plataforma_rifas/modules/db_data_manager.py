@@ -2,7 +2,7 @@ from __future__ import annotations
 import json
 import random
 import sqlite3
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, Iterable, List, Tuple, Optional, Any
 from datetime import datetime, timezone, timedelta
 from pathlib import Path  # Adicionando importação do Path
 from logger import logger
@@ -10,10 +10,11 @@ from .database import get_connection  # Importando a função get_connection dir
 
 # Manter a importação do módulo database para outras funções que podem precisar
 from . import database as db
+from . import bitset
+from . import json_journal
 import bcrypt
 import os
-import io
-import zipfile
+from collections import Counter
 from logger import get_logger
 
 logger = get_logger(__name__)
@@ -23,6 +24,25 @@ logger = get_logger(__name__)
 def _utcnow_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
+def _rollup_apply(cur: sqlite3.Cursor, rifa_id: int, timestamps: Iterable[str], sinal: int = 1) -> None:
+    """Soma (sinal=1) ou subtrai (sinal=-1) vendas no rollup vendas_por_hora, na transação corrente."""
+    por_ts = Counter(timestamps)
+    if not por_ts:
+        return
+    cur.executemany(
+        f"""
+        INSERT INTO vendas_por_hora (rifa_id, hora, quantidade) VALUES (?, {db.HORA_SQL.format('?')}, ?)
+        ON CONFLICT(rifa_id, hora) DO UPDATE SET quantidade = quantidade + excluded.quantidade
+        """,
+        [(rifa_id, ts, sinal * qtd) for ts, qtd in por_ts.items()],
+    )
+    if sinal < 0:
+        cur.execute("DELETE FROM vendas_por_hora WHERE rifa_id = ? AND quantidade <= 0", (rifa_id,))
+
+def _bump_versao(cur: sqlite3.Cursor, rifa_id: int) -> None:
+    """Incrementa a versão dos dados de vendas da rifa (invalida relatórios em cache)."""
+    cur.execute("UPDATE rifas SET versao_dados = versao_dados + 1 WHERE id = ?", (rifa_id,))
+
 # ----------------- JSON fallback/mirror -----------------
 
 BASE_DIR = Path(__file__).resolve().parents[1]
@@ -32,14 +52,6 @@ INDEX_FILE = DATA_DIR / "index.json"
 
 JSON_MIRROR = os.getenv("JSON_MIRROR", "true").lower() == "true"
 
-def _json_safe_filename(name: str) -> str:
-    for ch in ['\\', '/', ':', '*', '?', '"', '<', '>', '|']:
-        name = name.replace(ch, '-')
-    return name
-
-def _json_rifa_path(nome_rifa: str) -> Path:
-    return DATA_DIR / f"{_json_safe_filename(nome_rifa)}.json"
-
 def _json_index_load() -> Dict[str, Dict]:
     try:
         if INDEX_FILE.exists():
@@ -61,26 +73,15 @@ def _json_index_save(index: Dict[str, Dict]) -> None:
         logger.warning("Falha ao salvar index.json", exception=e)
 
 def _json_dados_load(nome_rifa: str) -> Dict[str, str]:
-    p = _json_rifa_path(nome_rifa)
-    if not p.exists():
-        logger.debug(f"Arquivo JSON não encontrado para rifa {nome_rifa}")
-        return {}
+    """Estado da rifa no espelho JSON (snapshot + journal)."""
     try:
-        data = json.loads(p.read_text(encoding='utf-8') or '{}')
+        data = json_journal.load_dados(nome_rifa)
         logger.debug(f"Dados JSON carregados para rifa {nome_rifa}")
         return data
     except Exception as e:
         logger.error(f"Falha ao carregar dados JSON para rifa {nome_rifa}", exception=e)
         return {}
 
-def _json_dados_save(nome_rifa: str, dados: Dict[str, str]) -> None:
-    try:
-        p = _json_rifa_path(nome_rifa)
-        p.write_text(json.dumps(dados, ensure_ascii=False, indent=2), encoding='utf-8')
-        logger.debug(f"Dados JSON salvos para rifa {nome_rifa}")
-    except Exception as e:
-        logger.warning(f"Falha ao salvar dados JSON para rifa {nome_rifa}", exception=e)
-
 def migrate_from_json() -> None:
     """Importa dados de JSON para SQLite se o DB estiver vazio para aquela rifa."""
     index = _json_index_load()
@@ -119,6 +120,7 @@ def migrate_from_json() -> None:
                                 "INSERT OR IGNORE INTO vendas (rifa_id, numero, comprador, timestamp) VALUES (?, ?, ?, ?)",
                                 vendas,
                             )
+                            db.rebuild_vendas_por_hora(cur, rifa_id)
                             logger.success(f"Migração de {len(vendas)} vendas concluída para rifa {nome}")
                         except Exception as e:
                             logger.error(f"Falha ao migrar vendas para rifa {nome}", exception=e)
@@ -132,22 +134,15 @@ def migrate_from_json() -> None:
     finally:
         conn.close()
 
-def export_backup_json_zip() -> bytes:
-    """Gera um ZIP com index.json e arquivos de rifas JSON."""
-    mem = io.BytesIO()
+def export_backup_json_zip(incremental: bool = False) -> bytes:
+    """Gera um ZIP com index.json, snapshots e journal das rifas.
+
+    Com `incremental=True`, inclui apenas as alterações do journal desde o último backup.
+    """
     try:
-        with zipfile.ZipFile(mem, mode='w', compression=zipfile.ZIP_DEFLATED) as zf:
-            if INDEX_FILE.exists():
-                zf.writestr('index.json', INDEX_FILE.read_text(encoding='utf-8'))
-                logger.debug("index.json adicionado ao backup ZIP")
-            for jf in DATA_DIR.glob('*.json'):
-                if jf.name == 'index.json':
-                    continue
-                zf.writestr(jf.name, jf.read_text(encoding='utf-8'))
-                logger.debug(f"{jf.name} adicionado ao backup ZIP")
-        mem.seek(0)
-        logger.success("Backup JSON ZIP gerado com sucesso")
-        return mem.getvalue()
+        data = json_journal.export_backup_zip(incremental=incremental)
+        logger.success("Backup JSON ZIP gerado com sucesso", incremental=incremental)
+        return data
     except Exception as e:
         logger.error("Falha ao gerar backup JSON ZIP", exception=e)
         raise RuntimeError("Erro ao criar backup JSON ZIP") from e
@@ -221,9 +216,9 @@ def get_sales_by_weekday(nome_rifa: str, days: int = 30) -> List[Dict]:
         cur = conn.cursor()
         cur.execute(
             """
-            SELECT CAST(STRFTIME('%w', v.timestamp) AS INTEGER) as dow, COUNT(v.id) as quantidade
-            FROM vendas v JOIN rifas r ON v.rifa_id = r.id
-            WHERE r.nome = ? AND v.timestamp >= DATETIME('now', ?)
+            SELECT CAST(STRFTIME('%w', a.hora) AS INTEGER) as dow, SUM(a.quantidade) as quantidade
+            FROM vendas_por_hora a JOIN rifas r ON a.rifa_id = r.id
+            WHERE r.nome = ? AND a.hora >= STRFTIME('%Y-%m-%d %H:00:00', 'now', ?)
             GROUP BY dow
             ORDER BY dow ASC
             """,
@@ -244,24 +239,22 @@ def get_revenue_by_day(nome_rifa: str, start_iso: Optional[str], end_iso: Option
     conn = db.get_connection()
     try:
         cur = conn.cursor()
-        cur.execute("SELECT valor_numero FROM rifas WHERE nome = ?", (nome_rifa,))
+        cur.execute("SELECT id, valor_numero FROM rifas WHERE nome = ?", (nome_rifa,))
         r = cur.fetchone()
         if not r:
             logger.warning(f"Rifa {nome_rifa} não encontrada para cálculo de receita")
             return []
         valor_unit = float(r['valor_numero'])
-        base_sql = (
-            "SELECT DATE(v.timestamp) as dia, COUNT(v.id) as qtd FROM vendas v "
-            "JOIN rifas r ON v.rifa_id = r.id WHERE r.nome = ?"
-        )
-        params: List[Any] = [nome_rifa]
+        base_sql = "SELECT SUBSTR(hora, 1, 10) as dia, SUM(quantidade) as qtd FROM vendas_por_hora WHERE rifa_id = ?"
+        params: List[Any] = [r['id']]
+        # Limites arredondados para a hora, granularidade do rollup
         if start_iso:
-            base_sql += " AND v.timestamp >= ?"
+            base_sql += " AND hora >= STRFTIME('%Y-%m-%d %H:00:00', ?)"
             params.append(start_iso)
         if end_iso:
-            base_sql += " AND v.timestamp <= ?"
+            base_sql += " AND hora <= DATETIME(?)"
             params.append(end_iso)
-        base_sql += " GROUP BY DATE(v.timestamp) ORDER BY DATE(v.timestamp) ASC"
+        base_sql += " GROUP BY dia ORDER BY dia ASC"
         cur.execute(base_sql, params)
         data = [dict(dia=row['dia'], receita=float(row['qtd']) * valor_unit, qtd=int(row['qtd'])) for row in cur.fetchall()]
         logger.debug(f"Receita por dia carregada para rifa {nome_rifa}", period=f"{start_iso} to {end_iso}")
@@ -294,11 +287,11 @@ def get_sales_heatmap(nome_rifa: str, days: int = 30) -> List[Dict]:
         cur = conn.cursor()
         cur.execute(
             """
-            SELECT CAST(STRFTIME('%w', v.timestamp) AS INTEGER) AS dow,
-                   CAST(STRFTIME('%H', v.timestamp) AS INTEGER) AS hour,
-                   COUNT(v.id) AS quantidade
-            FROM vendas v JOIN rifas r ON v.rifa_id = r.id
-            WHERE r.nome = ? AND v.timestamp >= DATETIME('now', ?)
+            SELECT CAST(STRFTIME('%w', a.hora) AS INTEGER) AS dow,
+                   CAST(STRFTIME('%H', a.hora) AS INTEGER) AS hour,
+                   SUM(a.quantidade) AS quantidade
+            FROM vendas_por_hora a JOIN rifas r ON a.rifa_id = r.id
+            WHERE r.nome = ? AND a.hora >= STRFTIME('%Y-%m-%d %H:00:00', 'now', ?)
             GROUP BY dow, hour
             """,
             (nome_rifa, f'-{int(days)} days'),
@@ -320,11 +313,11 @@ def get_sales_by_hour(nome_rifa: str, days: int = 7) -> List[Dict]:
         cur = conn.cursor()
         cur.execute(
             """
-            SELECT CAST(STRFTIME('%H', v.timestamp) AS INTEGER) as hora, COUNT(v.id) as quantidade
-            FROM vendas v JOIN rifas r ON v.rifa_id = r.id
-            WHERE r.nome = ? AND v.timestamp >= DATETIME('now', ?)
-            GROUP BY hora
-            ORDER BY hora ASC
+            SELECT CAST(STRFTIME('%H', a.hora) AS INTEGER) as hora, SUM(a.quantidade) as quantidade
+            FROM vendas_por_hora a JOIN rifas r ON a.rifa_id = r.id
+            WHERE r.nome = ? AND a.hora >= STRFTIME('%Y-%m-%d %H:00:00', 'now', ?)
+            GROUP BY 1
+            ORDER BY 1 ASC
             """,
             (nome_rifa, f'-{int(days)} days'),
         )
@@ -338,6 +331,29 @@ def get_sales_by_hour(nome_rifa: str, days: int = 7) -> List[Dict]:
     finally:
         conn.close()
 
+def rebuild_sales_rollup(nome_rifa: Optional[str] = None) -> int:
+    """Reconstrói o rollup vendas_por_hora de uma rifa (ou de todas). Retorna o nº de horas gravadas."""
+    conn = db.get_connection()
+    try:
+        with conn:
+            cur = conn.cursor()
+            rifa_id = None
+            if nome_rifa is not None:
+                cur.execute("SELECT id FROM rifas WHERE nome = ?", (nome_rifa,))
+                row = cur.fetchone()
+                if not row:
+                    logger.warning(f"Rifa {nome_rifa} não encontrada para reconstrução do rollup")
+                    return 0
+                rifa_id = row["id"]
+            buckets = db.rebuild_vendas_por_hora(cur, rifa_id)
+            logger.success("Rollup de vendas por hora reconstruído", rifa=nome_rifa or "todas", horas=buckets)
+            return buckets
+    except Exception as e:
+        logger.error("Falha ao reconstruir rollup de vendas por hora", exception=e)
+        return 0
+    finally:
+        conn.close()
+
 def get_sales_in_period(nome_rifa: str, start_iso: Optional[str], end_iso: Optional[str]) -> List[Dict]:
     """Retorna vendas no período [start_iso, end_iso]. Se algum limite for None, não aplica esse lado."""
     conn = db.get_connection()
@@ -365,6 +381,111 @@ def get_sales_in_period(nome_rifa: str, start_iso: Optional[str], end_iso: Optio
     finally:
         conn.close()
 
+def get_data_version(nome_rifa: str) -> int:
+    """Versão dos dados de vendas da rifa (muda a cada venda, cancelamento ou transferência)."""
+    conn = db.get_connection()
+    try:
+        row = conn.execute("SELECT versao_dados FROM rifas WHERE nome = ?", (nome_rifa,)).fetchone()
+        return int(row["versao_dados"]) if row else 0
+    finally:
+        conn.close()
+
+def _filtro_vendas(nome_rifa: str, start_iso: Optional[str], end_iso: Optional[str], comprador: Optional[str]) -> Tuple[str, List[Any]]:
+    sql = "FROM vendas v JOIN rifas r ON v.rifa_id = r.id WHERE r.nome = ?"
+    params: List[Any] = [nome_rifa]
+    if start_iso:
+        sql += " AND v.timestamp >= ?"
+        params.append(start_iso)
+    if end_iso:
+        sql += " AND v.timestamp <= ?"
+        params.append(end_iso)
+    if comprador:
+        sql += " AND v.comprador = ?"
+        params.append(comprador)
+    return sql, params
+
+def count_vendas(
+    nome_rifa: str,
+    start_iso: Optional[str] = None,
+    end_iso: Optional[str] = None,
+    comprador: Optional[str] = None,
+    numeros: Optional[Iterable[int]] = None,
+) -> int:
+    """Quantidade de vendas com os mesmos filtros de `iter_vendas`, contada no banco."""
+    conn = db.get_connection()
+    try:
+        where, params = _filtro_vendas(nome_rifa, start_iso, end_iso, comprador)
+        if not numeros:
+            return int(conn.execute(f"SELECT COUNT(*) {where}", params).fetchone()[0])
+        total = 0
+        for chunk in _chunks(sorted({int(n) for n in numeros})):
+            placeholders = ",".join(["?"] * len(chunk))
+            total += int(conn.execute(
+                f"SELECT COUNT(*) {where} AND v.numero IN ({placeholders})", params + chunk
+            ).fetchone()[0])
+        return total
+    finally:
+        conn.close()
+
+def iter_vendas(
+    nome_rifa: str,
+    start_iso: Optional[str] = None,
+    end_iso: Optional[str] = None,
+    comprador: Optional[str] = None,
+    numeros: Optional[Iterable[int]] = None,
+    batch_size: int = 500,
+) -> Iterable[Dict[str, Any]]:
+    """Percorre as vendas em ordem de número, lendo do cursor em lotes (memória constante)."""
+    filtro = set(int(n) for n in numeros) if numeros else None
+    where, params = _filtro_vendas(nome_rifa, start_iso, end_iso, comprador)
+    conn = db.get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            f"SELECT v.numero, v.comprador, IFNULL(v.contato, '') AS contato, v.timestamp {where} ORDER BY v.numero",
+            params,
+        )
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            for r in rows:
+                if filtro is None or int(r['numero']) in filtro:
+                    yield dict(numero=int(r['numero']), comprador=r['comprador'], contato=r['contato'], timestamp=r['timestamp'])
+    finally:
+        conn.close()
+
+def count_compradores(nome_rifa: str) -> int:
+    conn = db.get_connection()
+    try:
+        row = conn.execute(
+            "SELECT COUNT(DISTINCT v.comprador) FROM vendas v JOIN rifas r ON v.rifa_id = r.id WHERE r.nome = ?",
+            (nome_rifa,),
+        ).fetchone()
+        return int(row[0])
+    finally:
+        conn.close()
+
+def iter_resumo_compradores(nome_rifa: str) -> Iterable[Dict[str, Any]]:
+    """Quantidade de números e última compra por comprador (mais recentes primeiro)."""
+    conn = db.get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT v.comprador, COUNT(*) AS quantidade, MAX(v.timestamp) AS ultima_compra
+            FROM vendas v JOIN rifas r ON v.rifa_id = r.id
+            WHERE r.nome = ?
+            GROUP BY v.comprador
+            ORDER BY ultima_compra DESC, v.comprador ASC
+            """,
+            (nome_rifa,),
+        )
+        for r in cur:
+            yield dict(comprador=r['comprador'], quantidade=int(r['quantidade']), ultima_compra=r['ultima_compra'])
+    finally:
+        conn.close()
+
 # ----------------- Minha Conta -----------------
 
 def update_user_name(user_id: int, new_name: str) -> Tuple[bool, str]:
@@ -636,6 +757,75 @@ def claim_rifa(nome_rifa: str, user_id: int) -> Tuple[bool, str]:
     finally:
         conn.close()
 
+# ----------------- Disponibilidade (bitset) -----------------
+
+def _chunks(seq: List[int], size: int = 500):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+def _bitset_save(cur: sqlite3.Cursor, rifa_id: int, vendidos: bytearray, reservados: bytearray) -> None:
+    cur.execute(
+        """
+        INSERT INTO disponibilidade (rifa_id, vendidos, reservados) VALUES (?, ?, ?)
+        ON CONFLICT(rifa_id) DO UPDATE SET vendidos = excluded.vendidos, reservados = excluded.reservados
+        """,
+        (rifa_id, bytes(vendidos), bytes(reservados)),
+    )
+
+def _bitset_rebuild(cur: sqlite3.Cursor, rifa_id: int, total: int) -> Tuple[bytearray, bytearray]:
+    cur.execute("SELECT numero FROM vendas WHERE rifa_id = ?", (rifa_id,))
+    vendidos = bitset.from_numbers(total, (row["numero"] for row in cur.fetchall()))
+    cur.execute("SELECT numero FROM reservas WHERE rifa_id = ?", (rifa_id,))
+    reservados = bitset.from_numbers(total, (row["numero"] for row in cur.fetchall()))
+    _bitset_save(cur, rifa_id, vendidos, reservados)
+    logger.debug("Bitset de disponibilidade reconstruído", rifa_id=rifa_id, total=total)
+    return vendidos, reservados
+
+def _bitset_load(cur: sqlite3.Cursor, rifa_id: int, total: int) -> Tuple[bytearray, bytearray]:
+    cur.execute("SELECT vendidos, reservados FROM disponibilidade WHERE rifa_id = ?", (rifa_id,))
+    row = cur.fetchone()
+    if not row:
+        return _bitset_rebuild(cur, rifa_id, total)
+    return bitset.resize(row["vendidos"], total), bitset.resize(row["reservados"], total)
+
+def _bitset_update(
+    cur: sqlite3.Cursor,
+    rifa_id: int,
+    total: int,
+    vender: Iterable[int] = (),
+    liberar_venda: Iterable[int] = (),
+    reservar: Iterable[int] = (),
+    liberar_reserva: Iterable[int] = (),
+) -> None:
+    """Aplica as mudanças nos bitsets. Chamar depois do DML, na mesma transação
+    (o lock de escrita já está tomado, então a leitura-modificação-escrita é segura)."""
+    vendidos, reservados = _bitset_load(cur, rifa_id, total)
+    bitset.set_bits(vendidos, vender, True)
+    bitset.set_bits(vendidos, liberar_venda, False)
+    bitset.set_bits(reservados, reservar, True)
+    bitset.set_bits(reservados, liberar_reserva, False)
+    _bitset_save(cur, rifa_id, vendidos, reservados)
+
+def carregar_disponibilidade(nome_rifa: str) -> Dict[str, Any]:
+    """Retorna os bitsets da rifa: {'total', 'vendidos', 'reservados'} (ver modules.bitset)."""
+    conn = db.get_connection()
+    try:
+        with conn:
+            cur = conn.cursor()
+            cur.execute("SELECT id, total_numeros FROM rifas WHERE nome = ?", (nome_rifa,))
+            rifa = cur.fetchone()
+            if not rifa:
+                logger.warning(f"Rifa {nome_rifa} não encontrada para carregar disponibilidade")
+                return {"total": 0, "vendidos": b"", "reservados": b""}
+            total = int(rifa["total_numeros"])
+            vendidos, reservados = _bitset_load(cur, rifa["id"], total)
+            return {"total": total, "vendidos": bytes(vendidos), "reservados": bytes(reservados)}
+    except Exception as e:
+        logger.error(f"Falha ao carregar disponibilidade da rifa {nome_rifa}", exception=e)
+        return {"total": 0, "vendidos": b"", "reservados": b""}
+    finally:
+        conn.close()
+
 # ----------------- Vendas -----------------
 
 def carregar_dados_rifa(nome_rifa: str) -> Dict[str, str]:
@@ -717,12 +907,12 @@ def registrar_venda(nome_rifa: str, nome_comprador: str, numeros: List[int], con
                 f"DELETE FROM reservas WHERE rifa_id = ? AND numero IN ({placeholders})",
                 [rifa_id] + nums,
             )
+            _bitset_update(cur, rifa_id, total, vender=nums, liberar_reserva=nums)
+            _rollup_apply(cur, rifa_id, [ts] * len(nums))
+            _bump_versao(cur, rifa_id)
             logger.success(f"Venda registrada para rifa {nome_rifa}", comprador=nome_comprador, numeros=sorted(nums))
             if JSON_MIRROR:
-                dados = _json_dados_load(nome_rifa)
-                for n in nums:
-                    dados[str(int(n))] = nome_comprador
-                _json_dados_save(nome_rifa, dados)
+                json_journal.append(nome_rifa, "venda", nums, nome_comprador)
             return True, sorted(nums), "Venda registrada com sucesso."
     except Exception as e:
         logger.error(f"Falha ao registrar venda para rifa {nome_rifa}", exception=e)
@@ -737,7 +927,7 @@ def cancelar_venda(nome_rifa: str, numeros: List[int]) -> Tuple[bool, List[int],
     try:
         with conn:
             cur = conn.cursor()
-            cur.execute("SELECT id FROM rifas WHERE nome = ?", (nome_rifa,))
+            cur.execute("SELECT id, total_numeros FROM rifas WHERE nome = ?", (nome_rifa,))
             row = cur.fetchone()
             if not row:
                 logger.warning(f"Rifa {nome_rifa} não encontrada para cancelamento de venda")
@@ -746,19 +936,20 @@ def cancelar_venda(nome_rifa: str, numeros: List[int]) -> Tuple[bool, List[int],
             nums = [int(n) for n in numeros]
             placeholders = ",".join(["?"] * len(nums))
             cur.execute(
-                f"DELETE FROM vendas WHERE rifa_id = ? AND numero IN ({placeholders})",
+                f"DELETE FROM vendas WHERE rifa_id = ? AND numero IN ({placeholders}) RETURNING timestamp",
                 [rifa_id] + nums,
             )
-            affected = cur.rowcount
+            removidas = [r["timestamp"] for r in cur.fetchall()]
+            affected = len(removidas)
             if affected <= 0:
                 logger.warning(f"Nenhum número vendido encontrado para cancelamento na rifa {nome_rifa}", numeros=nums)
                 return False, [], "Nenhum dos números informados estava vendido."
+            _bitset_update(cur, rifa_id, int(row["total_numeros"]), liberar_venda=nums)
+            _rollup_apply(cur, rifa_id, removidas, sinal=-1)
+            _bump_versao(cur, rifa_id)
             logger.success(f"Vendas canceladas para rifa {nome_rifa}", numeros=sorted(nums), affected=affected)
             if JSON_MIRROR:
-                dados = _json_dados_load(nome_rifa)
-                for n in nums:
-                    dados.pop(str(int(n)), None)
-                _json_dados_save(nome_rifa, dados)
+                json_journal.append(nome_rifa, "cancelamento", nums)
             return True, nums, f"Vendas canceladas ({affected} números)."
     except Exception as e:
         logger.error(f"Falha ao cancelar vendas para rifa {nome_rifa}", exception=e)
@@ -793,13 +984,10 @@ def transferir_venda(nome_rifa: str, numeros: List[int], novo_comprador: str) ->
             if affected <= 0:
                 logger.warning(f"Nenhum número encontrado para transferência na rifa {nome_rifa}", numeros=nums)
                 return False, [], "Nenhum dos números informados foi encontrado para transferir."
+            _bump_versao(cur, rifa_id)
             logger.success(f"Venda transferida para rifa {nome_rifa}", novo_comprador=novo_comprador, numeros=sorted(nums), affected=affected)
             if JSON_MIRROR:
-                dados = _json_dados_load(nome_rifa)
-                for n in nums:
-                    if str(int(n)) in dados:
-                        dados[str(int(n))] = novo_comprador
-                _json_dados_save(nome_rifa, dados)
+                json_journal.append(nome_rifa, "transferencia", nums, novo_comprador)
             return True, nums, f"Transferência realizada ({affected} números)."
     except Exception as e:
         logger.error(f"Falha ao transferir vendas para rifa {nome_rifa}", exception=e)
@@ -827,10 +1015,8 @@ def deletar_rifa(nome_rifa: str) -> Tuple[bool, str]:
                     idx.pop(nome_rifa, None)
                     _json_index_save(idx)
                 try:
-                    p = _json_rifa_path(nome_rifa)
-                    if p.exists():
-                        p.unlink()
-                        logger.debug(f"Arquivo JSON da rifa {nome_rifa} removido")
+                    json_journal.remove(nome_rifa)
+                    logger.debug(f"Arquivos JSON da rifa {nome_rifa} removidos")
                 except Exception as e:
                     logger.warning(f"Falha ao remover arquivo JSON da rifa {nome_rifa}", exception=e)
             return True, "Rifa deletada com sucesso."
@@ -875,6 +1061,8 @@ def salvar_reservas_detalhe(nome_rifa: str, reservas: Dict[int, str]) -> None:
                 return
             rifa_id = row["id"]
             cur.execute("DELETE FROM reservas WHERE rifa_id = ?", (rifa_id,))
+            # Substituição em massa: o bitset é reconstruído na próxima leitura
+            cur.execute("DELETE FROM disponibilidade WHERE rifa_id = ?", (rifa_id,))
             batch = [(rifa_id, int(num), str(ts)) for num, ts in (reservas or {}).items()]
             if batch:
                 cur.executemany(
@@ -887,38 +1075,112 @@ def salvar_reservas_detalhe(nome_rifa: str, reservas: Dict[int, str]) -> None:
     finally:
         conn.close()
 
-def purge_expired_reservas(nome_rifa: str, ttl_minutes: int) -> Tuple[Dict[int, str], List[int]]:
+def _purge_expired(cur: sqlite3.Cursor, rifa_id: int, ttl_minutes: int) -> List[int]:
     if ttl_minutes <= 0:
-        data = carregar_reservas_detalhe(nome_rifa)
-        logger.debug(f"TTL de reservas desativado para rifa {nome_rifa}, retornando reservas atuais")
-        return data, []
+        return []
+    limit_ts = (datetime.now(timezone.utc) - timedelta(minutes=ttl_minutes)).isoformat()
+    cur.execute(
+        "DELETE FROM reservas WHERE rifa_id = ? AND timestamp < ? RETURNING numero",
+        (rifa_id, limit_ts),
+    )
+    return sorted(int(r["numero"]) for r in cur.fetchall())
+
+def purge_expired_reservas(nome_rifa: str, ttl_minutes: int) -> List[int]:
+    """Libera as reservas mais antigas que `ttl_minutes` e retorna os números liberados."""
+    if ttl_minutes <= 0:
+        return []
     conn = db.get_connection()
     try:
         with conn:
             cur = conn.cursor()
-            cur.execute("SELECT id FROM rifas WHERE nome = ?", (nome_rifa,))
+            cur.execute("SELECT id, total_numeros FROM rifas WHERE nome = ?", (nome_rifa,))
             row = cur.fetchone()
             if not row:
                 logger.warning(f"Rifa {nome_rifa} não encontrada para purga de reservas")
-                return {}, []
+                return []
+            removidos = _purge_expired(cur, row["id"], ttl_minutes)
+            if removidos:
+                _bitset_update(cur, row["id"], int(row["total_numeros"]), liberar_reserva=removidos)
+                logger.success(f"Reservas expiradas removidas para rifa {nome_rifa}", removidos=removidos)
+            return removidos
+    except Exception as e:
+        logger.error(f"Falha ao purgar reservas expiradas para rifa {nome_rifa}", exception=e)
+        return []
+    finally:
+        conn.close()
+
+def reservar_numeros(nome_rifa: str, numeros: List[int], ttl_minutes: int = 0) -> Tuple[bool, List[int], str]:
+    """Reserva os números livres (reservas expiradas são liberadas antes, na mesma transação)."""
+    if not isinstance(numeros, list):
+        numeros = [int(numeros)]
+    conn = db.get_connection()
+    try:
+        with conn:
+            cur = conn.cursor()
+            cur.execute("SELECT id, total_numeros FROM rifas WHERE nome = ?", (nome_rifa,))
+            row = cur.fetchone()
+            if not row:
+                logger.warning(f"Rifa {nome_rifa} não encontrada para reserva")
+                return False, [], "Rifa não encontrada."
             rifa_id = row["id"]
-            limit_ts = (datetime.now(timezone.utc) - timedelta(minutes=ttl_minutes)).isoformat()
-            cur.execute(
-                "SELECT numero FROM reservas WHERE rifa_id = ? AND timestamp < ?",
-                (rifa_id, limit_ts),
+            total = int(row["total_numeros"])
+            nums = sorted({int(n) for n in numeros if 1 <= int(n) <= total})
+            if not nums:
+                return False, [], "Números inválidos."
+            cur.execute("BEGIN IMMEDIATE")
+            expirados = _purge_expired(cur, rifa_id, ttl_minutes)
+            # Com o lock de escrita tomado, o bitset é a fonte da disponibilidade
+            vendidos, reservados_bits = _bitset_load(cur, rifa_id, total)
+            bitset.set_bits(reservados_bits, expirados, False)
+            reservados = [n for n in nums if not bitset.test(vendidos, n) and not bitset.test(reservados_bits, n)]
+            ts = _utcnow_iso()
+            cur.executemany(
+                "INSERT OR IGNORE INTO reservas (rifa_id, numero, timestamp) VALUES (?, ?, ?)",
+                [(rifa_id, n, ts) for n in reservados],
             )
-            removidos = [int(r["numero"]) for r in cur.fetchall()]
-            if removidos:
+            if reservados or expirados:
+                bitset.set_bits(reservados_bits, reservados, True)
+                _bitset_save(cur, rifa_id, vendidos, reservados_bits)
+            if not reservados:
+                return False, [], "Todos os números informados já estão vendidos ou reservados."
+            logger.success(f"Números reservados na rifa {nome_rifa}", count=len(reservados))
+            return True, reservados, "Números reservados."
+    except Exception as e:
+        logger.error(f"Falha ao reservar números na rifa {nome_rifa}", exception=e)
+        return False, [], f"Erro ao reservar números: {str(e)}"
+    finally:
+        conn.close()
+
+def cancelar_reservas(nome_rifa: str, numeros: List[int]) -> Tuple[bool, List[int], str]:
+    if not isinstance(numeros, list):
+        numeros = [int(numeros)]
+    conn = db.get_connection()
+    try:
+        with conn:
+            cur = conn.cursor()
+            cur.execute("SELECT id, total_numeros FROM rifas WHERE nome = ?", (nome_rifa,))
+            row = cur.fetchone()
+            if not row:
+                logger.warning(f"Rifa {nome_rifa} não encontrada para cancelamento de reserva")
+                return False, [], "Rifa não encontrada."
+            rifa_id = row["id"]
+            cancelados = []
+            for chunk in _chunks(sorted({int(n) for n in numeros})):
+                placeholders = ",".join(["?"] * len(chunk))
                 cur.execute(
-                    "DELETE FROM reservas WHERE rifa_id = ? AND timestamp < ?",
-                    (rifa_id, limit_ts),
+                    f"DELETE FROM reservas WHERE rifa_id = ? AND numero IN ({placeholders}) RETURNING numero",
+                    [rifa_id] + chunk,
                 )
-                logger.success(f"Reservas expiradas removidas para rifa {nome_rifa}", removidos=sorted(removidos))
-            ativos = carregar_reservas_detalhe(nome_rifa)
-            return ativos, removidos
+                cancelados.extend(int(r["numero"]) for r in cur.fetchall())
+            if not cancelados:
+                return False, [], "Nenhum dos números informados está atualmente reservado."
+            cancelados.sort()
+            _bitset_update(cur, rifa_id, int(row["total_numeros"]), liberar_reserva=cancelados)
+            logger.success(f"Reservas canceladas na rifa {nome_rifa}", count=len(cancelados))
+            return True, cancelados, "Reservas canceladas."
     except Exception as e:
-        logger.error(f"Falha ao purgar reservas expiradas para rifa {nome_rifa}", exception=e)
-        return {}, []
+        logger.error(f"Falha ao cancelar reservas na rifa {nome_rifa}", exception=e)
+        return False, [], f"Erro ao cancelar reservas: {str(e)}"
     finally:
         conn.close()
 
@@ -1091,4 +1353,16 @@ def carregar_vendas_periodo(nome_rifa: str, periodo: str) -> List[Dict]:
         logger.error(f"Falha ao carregar vendas do período {periodo} para rifa {nome_rifa}", exception=e)
         return []
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manutenção do banco da plataforma de rifas")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_rollup = sub.add_parser("rebuild-rollup", help="Reconstrói o rollup de vendas por hora")
+    p_rollup.add_argument("--rifa", help="Nome da rifa (padrão: todas)")
+    args = parser.parse_args()
+    if args.cmd == "rebuild-rollup":
+        print(f"{rebuild_sales_rollup(args.rifa)} horas gravadas em vendas_por_hora")
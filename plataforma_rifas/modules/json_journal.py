@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from logger import get_logger
+
+from .database import DATA_DIR
+
+logger = get_logger(__name__)
+
+# Espelho JSON das vendas em formato de journal:
+#   data/_journal/<rifa>.jsonl           alterações ainda não compactadas (append-only)
+#   data/_journal/archive/<rifa>/<seq>.jsonl
+#                                        segmentos já rotacionados; <seq> é o último do arquivo
+#   data/<rifa>.json                     snapshot {"seq": N, "dados": {numero: comprador}}
+# Um segmento só é apagado depois de estar no snapshot e em algum backup.
+
+JOURNAL_DIR = DATA_DIR / "_journal"
+ARCHIVE_DIR = JOURNAL_DIR / "archive"
+INDEX_FILE = DATA_DIR / "index.json"
+BACKUP_STATE_FILE = JOURNAL_DIR / "backup_state.json"
+
+# Compacta o journal da rifa a cada N alterações (em segundo plano)
+COMPACT_EVERY = int(os.getenv("JSON_JOURNAL_COMPACT_EVERY", "1000"))
+
+_lock = threading.Lock()
+_rifa_locks: Dict[str, threading.Lock] = {}
+_pending: Dict[str, int] = {}
+_last_seq: Dict[str, int] = {}
+
+
+def safe_filename(name: str) -> str:
+    for ch in ['\\', '/', ':', '*', '?', '"', '<', '>', '|']:
+        name = name.replace(ch, '-')
+    return name
+
+
+def snapshot_path(nome_rifa: str) -> Path:
+    return DATA_DIR / f"{safe_filename(nome_rifa)}.json"
+
+
+def journal_path(nome_rifa: str) -> Path:
+    return JOURNAL_DIR / f"{safe_filename(nome_rifa)}.jsonl"
+
+
+def archive_dir(nome_rifa: str) -> Path:
+    return ARCHIVE_DIR / safe_filename(nome_rifa)
+
+
+def _rifa_lock(nome_rifa: str) -> threading.Lock:
+    with _lock:
+        return _rifa_locks.setdefault(nome_rifa, threading.Lock())
+
+
+def _stored_seq(nome_rifa: str) -> int:
+    """Maior seq já gravado da rifa: snapshot, segmentos arquivados, journal ativo e
+    último backup (uma rifa recriada com o mesmo nome não volta a seqs já exportados)."""
+    seq, _ = load_snapshot(nome_rifa)
+    segments = _segments(nome_rifa)
+    if segments:
+        seq = max(seq, segments[-1][0])
+    for entry in _read_entries(journal_path(nome_rifa)):
+        seq = max(seq, int(entry.get("seq", 0)))
+    return max(seq, int(_backup_state_load().get(nome_rifa, 0)))
+
+
+def _next_seq(nome_rifa: str) -> int:
+    """Próximo seq da rifa. Chamar com o lock da rifa: o contador parte do maior seq
+    gravado (lido uma vez por processo) e só é incrementado, sem depender do relógio."""
+    if nome_rifa not in _last_seq:
+        _last_seq[nome_rifa] = _stored_seq(nome_rifa)
+    _last_seq[nome_rifa] += 1
+    return _last_seq[nome_rifa]
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _read_entries(path: Path) -> Iterator[Dict[str, Any]]:
+    """Lê um arquivo JSONL ignorando linhas incompletas (ex.: queda durante a escrita)."""
+    try:
+        with path.open(encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Linha inválida ignorada no journal {path.name}")
+    except FileNotFoundError:
+        return
+
+
+def _segments(nome_rifa: str) -> List[Tuple[int, Path]]:
+    """Segmentos arquivados da rifa, em ordem, como (último seq, caminho)."""
+    folder = archive_dir(nome_rifa)
+    if not folder.exists():
+        return []
+    return sorted((int(p.stem), p) for p in folder.glob("*.jsonl") if p.stem.isdigit())
+
+
+def _apply(dados: Dict[str, str], entry: Dict[str, Any]) -> None:
+    op = entry.get("op")
+    numeros = [str(int(n)) for n in entry.get("numeros", [])]
+    if op == "venda":
+        for n in numeros:
+            dados[n] = entry.get("comprador", "")
+    elif op == "cancelamento":
+        for n in numeros:
+            dados.pop(n, None)
+    elif op == "transferencia":
+        for n in numeros:
+            if n in dados:
+                dados[n] = entry.get("comprador", "")
+
+
+def load_snapshot(nome_rifa: str) -> Tuple[int, Dict[str, str]]:
+    """Retorna (seq, dados) do snapshot; aceita o formato antigo (dict numero→comprador)."""
+    p = snapshot_path(nome_rifa)
+    if not p.exists():
+        return 0, {}
+    try:
+        data = json.loads(p.read_text(encoding="utf-8") or "{}")
+    except Exception as e:
+        logger.error(f"Falha ao carregar snapshot JSON da rifa {nome_rifa}", exception=e)
+        return 0, {}
+    if isinstance(data.get("dados"), dict):
+        return int(data.get("seq", 0)), data["dados"]
+    return 0, data
+
+
+def load_dados(nome_rifa: str) -> Dict[str, str]:
+    """Estado atual da rifa: snapshot + alterações do journal posteriores a ele."""
+    seq, dados = load_snapshot(nome_rifa)
+    paths = [p for last, p in _segments(nome_rifa) if last > seq] + [journal_path(nome_rifa)]
+    for path in paths:
+        for entry in _read_entries(path):
+            if int(entry.get("seq", 0)) > seq:
+                _apply(dados, entry)
+    return dados
+
+
+def append(nome_rifa: str, op: str, numeros: List[int], comprador: Optional[str] = None) -> None:
+    """Acrescenta uma alteração ao journal (custo independente do tamanho da rifa)."""
+    entry = {"seq": 0, "ts": time.time(), "op": op, "numeros": sorted(int(n) for n in numeros)}
+    if comprador is not None:
+        entry["comprador"] = comprador
+    try:
+        JOURNAL_DIR.mkdir(parents=True, exist_ok=True)
+        with _rifa_lock(nome_rifa):
+            path = journal_path(nome_rifa)
+            if nome_rifa not in _pending:
+                _pending[nome_rifa] = sum(1 for _ in _read_entries(path))
+            # seq atribuído sob o lock: a ordem no arquivo é a ordem do seq
+            entry["seq"] = _next_seq(nome_rifa)
+            with path.open("a", encoding="utf-8") as fh:
+                fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            _pending[nome_rifa] += 1
+            compactar = _pending[nome_rifa] >= COMPACT_EVERY
+        if compactar:
+            threading.Thread(target=compact, args=(nome_rifa,), daemon=True).start()
+    except Exception as e:
+        logger.warning(f"Falha ao registrar alteração no journal da rifa {nome_rifa}", exception=e)
+
+
+def _rotate(nome_rifa: str) -> Optional[Path]:
+    """Move o journal ativo para o arquivo; novas alterações vão para um arquivo novo."""
+    with _rifa_lock(nome_rifa):
+        path = journal_path(nome_rifa)
+        _pending[nome_rifa] = 0
+        last = None
+        for entry in _read_entries(path):
+            last = int(entry.get("seq", 0))
+        if last is None:
+            path.unlink(missing_ok=True)
+            return None
+        folder = archive_dir(nome_rifa)
+        folder.mkdir(parents=True, exist_ok=True)
+        target = folder / f"{last:020d}.jsonl"
+        os.replace(path, target)
+        return target
+
+
+_compact_locks: Dict[str, threading.Lock] = {}
+
+
+def compact(nome_rifa: str) -> int:
+    """Incorpora o journal ao snapshot da rifa. Retorna o seq do novo snapshot."""
+    with _lock:
+        compact_lock = _compact_locks.setdefault(nome_rifa, threading.Lock())
+    if not compact_lock.acquire(blocking=False):
+        return 0  # Compactação já em andamento
+    try:
+        started = time.perf_counter()
+        _rotate(nome_rifa)
+        seq, dados = load_snapshot(nome_rifa)
+        new_seq = seq
+        for last, path in _segments(nome_rifa):
+            if last <= seq:
+                continue
+            for entry in _read_entries(path):
+                entry_seq = int(entry.get("seq", 0))
+                if entry_seq > seq:
+                    _apply(dados, entry)
+                    new_seq = max(new_seq, entry_seq)
+        if new_seq != seq:
+            _write_atomic(snapshot_path(nome_rifa), json.dumps({"seq": new_seq, "dados": dados}, ensure_ascii=False))
+        _prune(nome_rifa)
+        logger.debug(
+            f"Journal da rifa {nome_rifa} compactado",
+            seq=new_seq,
+            numeros=len(dados),
+            ms=round((time.perf_counter() - started) * 1000, 1),
+        )
+        return new_seq
+    except Exception as e:
+        logger.error(f"Falha ao compactar journal da rifa {nome_rifa}", exception=e)
+        return 0
+    finally:
+        compact_lock.release()
+
+
+def remove(nome_rifa: str) -> None:
+    """Remove snapshot, journal e segmentos da rifa."""
+    with _rifa_lock(nome_rifa):
+        _pending.pop(nome_rifa, None)
+        _last_seq.pop(nome_rifa, None)
+        for path in [snapshot_path(nome_rifa), journal_path(nome_rifa)] + [p for _, p in _segments(nome_rifa)]:
+            path.unlink(missing_ok=True)
+    try:
+        archive_dir(nome_rifa).rmdir()
+    except OSError:
+        pass
+
+
+# ----------------- Backups -----------------
+
+
+def _backup_state_load() -> Dict[str, int]:
+    try:
+        return json.loads(BACKUP_STATE_FILE.read_text(encoding="utf-8") or "{}")
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning("Falha ao carregar estado de backups do journal", exception=e)
+        return {}
+
+
+def _prune(nome_rifa: str) -> None:
+    """Apaga segmentos que já estão no snapshot e em algum backup."""
+    with _rifa_lock(nome_rifa):
+        seq, _ = load_snapshot(nome_rifa)
+        limite = min(seq, int(_backup_state_load().get(nome_rifa, 0)))
+        for last, path in _segments(nome_rifa):
+            if last <= limite:
+                path.unlink(missing_ok=True)
+
+
+def _rifas() -> List[str]:
+    try:
+        return list(json.loads(INDEX_FILE.read_text(encoding="utf-8") or "{}").keys())
+    except FileNotFoundError:
+        return []
+
+
+def _snapshot_seq(raw: bytes) -> int:
+    try:
+        data = json.loads(raw.decode("utf-8") or "{}")
+    except Exception:
+        return 0
+    return int(data.get("seq", 0)) if isinstance(data.get("dados"), dict) else 0
+
+
+def export_backup_zip(incremental: bool = False) -> bytes:
+    """ZIP com index.json e, por rifa, snapshot + journal (completo) ou só as alterações
+    posteriores ao último backup (incremental). Os arquivos são copiados, não re-serializados."""
+    state = _backup_state_load()
+    new_state = dict(state)
+    manifest: Dict[str, Dict[str, int]] = {}
+    mem = io.BytesIO()
+    with zipfile.ZipFile(mem, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        if INDEX_FILE.exists():
+            zf.write(INDEX_FILE, "index.json")
+        for nome in _rifas():
+            since = int(state.get(nome, 0)) if incremental else 0
+            last_seq = since
+            lines: List[str] = []
+            # Sob o lock da rifa, rotação e limpeza não mudam os arquivos durante a leitura:
+            # o estado do backup só avança até o que foi de fato copiado
+            with _rifa_lock(nome):
+                if not incremental and snapshot_path(nome).exists():
+                    # compact() troca o snapshot fora deste lock: seq e conteúdo vêm da mesma cópia
+                    raw = snapshot_path(nome).read_bytes()
+                    zf.writestr(snapshot_path(nome).name, raw)
+                    since = _snapshot_seq(raw)
+                    last_seq = since
+                paths = [p for last, p in _segments(nome) if last > since] + [journal_path(nome)]
+                for path in paths:
+                    for entry in _read_entries(path):
+                        if int(entry.get("seq", 0)) > since:
+                            lines.append(json.dumps(entry, ensure_ascii=False))
+                            last_seq = max(last_seq, int(entry["seq"]))
+            if lines:
+                zf.writestr(f"journal/{safe_filename(nome)}.jsonl", "\n".join(lines) + "\n")
+            manifest[nome] = {"desde": since, "ate": last_seq, "alteracoes": len(lines)}
+            new_state[nome] = max(last_seq, int(state.get(nome, 0)))
+        zf.writestr(
+            "manifest.json",
+            json.dumps({"incremental": incremental, "gerado_em": time.time(), "rifas": manifest}, ensure_ascii=False, indent=2),
+        )
+    JOURNAL_DIR.mkdir(parents=True, exist_ok=True)
+    _write_atomic(BACKUP_STATE_FILE, json.dumps(new_state, ensure_ascii=False))
+    for nome in manifest:
+        _prune(nome)
+    logger.debug("Backup do journal gerado", incremental=incremental, rifas=len(manifest))
+    return mem.getvalue()
@@ -0,0 +1,466 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import qrcode
+from babel.numbers import format_currency
+from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+
+from logger import get_logger
+
+from . import db_data_manager as dm
+from .database import DATA_DIR
+
+logger = get_logger(__name__)
+
+# Relatórios PDF gerados em segundo plano, a partir de um cursor sobre as vendas:
+#   - as páginas são escritas em volumes de até REPORT_PAGES_PER_VOLUME páginas, cada um
+#     gravado em disco ao fechar (a memória não cresce com o tamanho da rifa);
+#   - mais de um volume → o relatório é entregue como ZIP;
+#   - o arquivo fica em data/_reports/<chave>.{pdf,zip}, onde a chave é o hash de
+#     (rifa, versão dos dados, tipo, opções, configuração); uma venda, cancelamento ou
+#     transferência muda a versão e invalida os relatórios da rifa.
+
+REPORTS_DIR = DATA_DIR / "_reports"
+PAGES_PER_VOLUME = int(os.getenv("REPORT_PAGES_PER_VOLUME", "2000"))
+CACHE_MAX_FILES = int(os.getenv("REPORT_CACHE_MAX_FILES", "50"))
+MAX_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+# Jobs concluídos ou com erro saem da memória após este tempo (o arquivo segue no cache)
+JOB_TTL_SECONDS = int(os.getenv("REPORT_JOB_TTL_SECONDS", "1800"))
+
+TIPOS = ("comprovantes", "comprovante_comprador", "compradores")
+
+# Campos da configuração da rifa que afetam o conteúdo dos relatórios
+_CFG_KEYS = ("logo_path", "qr_text", "obs_padrao_pdf", "valor_numero")
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="relatorios")
+_jobs: Dict[str, Dict[str, Any]] = {}
+_jobs_lock = threading.Lock()
+
+
+def _brl(valor: float) -> str:
+    return format_currency(valor, 'BRL', locale='pt_BR')
+
+
+def _safe_fname(text: str) -> str:
+    return "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in str(text)).strip("_") or "rifa"
+
+
+def _local_time(timestamp: Optional[str], tz_offset: int) -> str:
+    """Converte o timestamp ISO (UTC) para o fuso informado em horas."""
+    if not timestamp:
+        return ""
+    try:
+        dt = datetime.fromisoformat(str(timestamp).replace('Z', '+00:00'))
+        if dt.tzinfo is not None:
+            dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+        return (dt + timedelta(hours=int(tz_offset))).strftime('%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        return str(timestamp)
+
+
+def _qr_image(texto: str):
+    qr = qrcode.QRCode(version=1, box_size=4, border=2)
+    qr.add_data(texto)
+    qr.make(fit=True)
+    # Imagem PIL em memória (sem arquivo temporário por página)
+    return qr.make_image(fill_color="black", back_color="white").get_image()
+
+
+def _normalizar_opcoes(opcoes: Optional[Dict]) -> Dict[str, Any]:
+    """Remove filtros vazios e ordena os números (pedidos equivalentes → mesma chave)."""
+    opcoes = {k: v for k, v in (opcoes or {}).items() if v not in (None, "", [], ())}
+    if opcoes.get("numeros"):
+        opcoes["numeros"] = sorted({int(n) for n in opcoes["numeros"]})
+    return opcoes
+
+
+def cache_key(tipo: str, nome_rifa: str, cfg: Optional[Dict], opcoes: Optional[Dict] = None) -> str:
+    """Chave do relatório: muda quando os dados da rifa, as opções ou a configuração mudam."""
+    payload = {
+        "tipo": tipo,
+        "rifa": nome_rifa,
+        "versao": dm.get_data_version(nome_rifa),
+        "opcoes": opcoes or {},
+        "cfg": {k: (cfg or {}).get(k) for k in _CFG_KEYS},
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def cached_report(key: str) -> Optional[Path]:
+    for ext in (".pdf", ".zip"):
+        path = REPORTS_DIR / f"{key}{ext}"
+        if path.exists():
+            os.utime(path)  # Marca como usado (remoção pelos menos recentes)
+            return path
+    return None
+
+
+def _evict_cache() -> None:
+    """Mantém apenas os CACHE_MAX_FILES relatórios usados mais recentemente."""
+    try:
+        files = sorted(
+            (p for p in REPORTS_DIR.iterdir() if p.suffix in (".pdf", ".zip")),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True,
+        )
+        for path in files[CACHE_MAX_FILES:]:
+            path.unlink(missing_ok=True)
+    except FileNotFoundError:
+        return
+
+
+# ----------------- Escrita em volumes -----------------
+
+class _VolumeWriter:
+    """Distribui as páginas em PDFs de até `pages_per_volume` páginas, gravados em disco."""
+
+    def __init__(self, base: Path, orientation: str = 'P', pages_per_volume: Optional[int] = None):
+        self.base = base
+        self.orientation = orientation
+        self.pages_per_volume = max(1, int(pages_per_volume or PAGES_PER_VOLUME))
+        self.volumes: List[Path] = []
+        self.pdf: Optional[FPDF] = None
+
+    def _new_pdf(self) -> FPDF:
+        pdf = FPDF(orientation=self.orientation, unit='mm', format='A4')
+        pdf.set_auto_page_break(auto=True, margin=12)
+        return pdf
+
+    def add_page(self) -> FPDF:
+        if self.pdf is not None and self.pdf.page >= self.pages_per_volume:
+            self._flush()
+        if self.pdf is None:
+            self.pdf = self._new_pdf()
+        self.pdf.add_page()
+        return self.pdf
+
+    def _flush(self) -> None:
+        path = self.base.with_name(f"{self.base.name}.parte{len(self.volumes) + 1:03d}.pdf")
+        self.pdf.output(str(path))
+        self.volumes.append(path)
+        self.pdf = None
+
+    def close(self, nome_arquivo: str) -> Path:
+        """Finaliza o relatório: um único PDF ou um ZIP com os volumes."""
+        if self.pdf is not None:
+            self._flush()
+        if len(self.volumes) == 1:
+            target = self.base.with_suffix(".pdf")
+            os.replace(self.volumes[0], target)
+            return target
+        target = self.base.with_suffix(".zip")
+        tmp = target.with_name(target.name + ".tmp")
+        with zipfile.ZipFile(tmp, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for i, path in enumerate(self.volumes, start=1):
+                zf.write(path, f"{nome_arquivo}_parte{i:03d}.pdf")
+                path.unlink(missing_ok=True)
+        os.replace(tmp, target)
+        return target
+
+    def discard(self) -> None:
+        for path in self.volumes:
+            path.unlink(missing_ok=True)
+        self.pdf = None
+
+
+def _cabecalho(pdf: FPDF, titulo: str, logo_path: Optional[str]) -> None:
+    pdf.set_font("Arial", "B", 16)
+    if logo_path and os.path.exists(logo_path):
+        try:
+            pdf.image(logo_path, x=12, y=10, w=28)
+        except Exception as e:
+            logger.warning("Erro ao adicionar logo ao PDF", exception=e)
+    pdf.cell(0, 12, titulo, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+    pdf.set_font("Arial", size=12)
+    pdf.ln(4)
+
+
+def _linha(pdf: FPDF, texto: str) -> None:
+    pdf.cell(0, 8, texto, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+
+def _qr(pdf: FPDF, qr_text: Optional[str], **campos: Any) -> None:
+    if not qr_text:
+        return
+    try:
+        pdf.image(_qr_image(qr_text.format(**campos)), x=pdf.w - 50, y=10, w=35)
+    except Exception as e:
+        logger.warning("Falha ao gerar QR code", exception=e)
+
+
+# ----------------- Tipos de relatório -----------------
+
+def _render_comprovantes(writer: _VolumeWriter, nome_rifa: str, cfg: Dict, opcoes: Dict,
+                         progresso: Callable[[int], None]) -> None:
+    """Um comprovante (página) por número vendido."""
+    valor_unit = float(cfg.get("valor_numero", 0.0))
+    tz_offset = int(opcoes.get("tz_offset", 0))
+    for i, venda in enumerate(dm.iter_vendas(
+        nome_rifa, opcoes.get("start_iso"), opcoes.get("end_iso"),
+        comprador=opcoes.get("comprador"), numeros=opcoes.get("numeros"),
+    ), start=1):
+        pdf = writer.add_page()
+        _cabecalho(pdf, f"Comprovante - {nome_rifa}", cfg.get("logo_path"))
+        _linha(pdf, f"Número: {venda['numero']}")
+        _linha(pdf, f"Comprador: {venda['comprador']}")
+        if venda['contato']:
+            _linha(pdf, f"Contato: {venda['contato']}")
+        _linha(pdf, f"Valor: {_brl(valor_unit)}")
+        if venda['timestamp']:
+            _linha(pdf, f"Data da compra: {_local_time(venda['timestamp'], tz_offset)}")
+        _qr(pdf, cfg.get("qr_text"), rifa=nome_rifa, numero=venda['numero'],
+            comprador=venda['comprador'], contato=venda['contato'], valor=valor_unit)
+        if cfg.get("obs_padrao_pdf"):
+            pdf.ln(4)
+            pdf.multi_cell(0, 7, cfg["obs_padrao_pdf"])
+        progresso(i)
+
+
+def _render_comprovante_comprador(writer: _VolumeWriter, nome_rifa: str, cfg: Dict, opcoes: Dict,
+                                  progresso: Callable[[int], None]) -> None:
+    """Comprovante consolidado de um comprador: todos os números em sequência."""
+    comprador = opcoes["comprador"]
+    valor_unit = float(cfg.get("valor_numero", 0.0))
+    vendas = dm.iter_vendas(
+        nome_rifa, opcoes.get("start_iso"), opcoes.get("end_iso"),
+        comprador=comprador, numeros=opcoes.get("numeros"),
+    )
+    total = int(opcoes.get("_total", 0))
+    primeira = next(vendas, None)
+    contato = primeira['contato'] if primeira else ""
+
+    pdf = writer.add_page()
+    _cabecalho(pdf, f"Comprovante de Compra - {nome_rifa}", cfg.get("logo_path"))
+    _linha(pdf, f"Comprador: {comprador}")
+    if contato:
+        _linha(pdf, f"Contato: {contato}")
+    _linha(pdf, f"Quantidade de números: {total}")
+    _linha(pdf, f"Valor por número: {_brl(valor_unit)}")
+    _linha(pdf, f"Valor total: {_brl(total * valor_unit)}")
+    gerado_em = _local_time(datetime.now(timezone.utc).isoformat(), int(opcoes.get("tz_offset", 0)))
+    _linha(pdf, f"Gerado em (local): {gerado_em}")
+    _qr(pdf, cfg.get("qr_text"), rifa=nome_rifa, comprador=comprador, contato=contato,
+        quantidade=total, valor=total * valor_unit)
+    if cfg.get("obs_padrao_pdf"):
+        pdf.ln(4)
+        pdf.multi_cell(0, 7, cfg["obs_padrao_pdf"])
+
+    # Números escritos em blocos, em fluxo contínuo: a lista nunca é montada inteira em memória
+    pdf.ln(2)
+    pdf.set_font("Arial", size=11)
+    pdf.write(7, "Números: ")
+    bloco: List[str] = []
+    feitos = 0
+    if primeira:
+        bloco.append(str(primeira['numero']))
+    for venda in vendas:
+        bloco.append(str(venda['numero']))
+        if len(bloco) >= 500:
+            feitos += len(bloco)
+            pdf.write(7, ", ".join(bloco) + ", ")
+            bloco = []
+            progresso(feitos)
+    if bloco:
+        feitos += len(bloco)
+        pdf.write(7, ", ".join(bloco))
+        progresso(feitos)
+
+
+def _render_compradores(writer: _VolumeWriter, nome_rifa: str, cfg: Dict, opcoes: Dict,
+                        progresso: Callable[[int], None]) -> None:
+    """Tabela de compradores (quantidade e valor), agregada no banco."""
+    valor_unit = float(cfg.get("valor_numero", 0.0))
+
+    def cabecalho_tabela(pdf: FPDF) -> None:
+        pdf.set_font("Arial", 'B', 10)
+        pdf.set_fill_color(200, 220, 255)
+        pdf.cell(120, 10, "Comprador", border=1, align='C', fill=True)
+        pdf.cell(30, 10, "Quantidade", border=1, align='C', fill=True)
+        pdf.cell(40, 10, "Valor Total", border=1, align='C', fill=True, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        pdf.set_font("Arial", '', 10)
+
+    pdf = writer.add_page()
+    _cabecalho(pdf, f"Relatório de Compradores - {nome_rifa}", cfg.get("logo_path"))
+    pdf.set_font("Arial", '', 10)
+    pdf.cell(0, 8, f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}",
+             align='R', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    cabecalho_tabela(pdf)
+
+    fill = False
+    total_numeros = 0
+    for i, linha in enumerate(dm.iter_resumo_compradores(nome_rifa), start=1):
+        if pdf.will_page_break(8):
+            pdf = writer.add_page()
+            cabecalho_tabela(pdf)
+        total_numeros += linha['quantidade']
+        pdf.set_fill_color(224, 235, 255) if fill else pdf.set_fill_color(255, 255, 255)
+        pdf.cell(120, 8, linha['comprador'], border=1, fill=fill)
+        pdf.cell(30, 8, str(linha['quantidade']), border=1, align='C', fill=fill)
+        pdf.cell(40, 8, _brl(linha['quantidade'] * valor_unit), border=1, align='R', fill=fill,
+                 new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        fill = not fill
+        progresso(i)
+
+    if pdf.will_page_break(10):
+        pdf = writer.add_page()
+    pdf.set_font("Arial", 'B', 10)
+    pdf.set_fill_color(180, 200, 255)
+    pdf.cell(120, 10, "TOTAL GERAL", border=1, align='R', fill=True)
+    pdf.cell(30, 10, str(total_numeros), border=1, align='C', fill=True)
+    pdf.cell(40, 10, _brl(total_numeros * valor_unit), border=1, align='R', fill=True,
+             new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+
+_RENDERERS = {
+    "comprovantes": (_render_comprovantes, 'P'),
+    "comprovante_comprador": (_render_comprovante_comprador, 'P'),
+    "compradores": (_render_compradores, 'L'),
+}
+
+
+def _total_itens(tipo: str, nome_rifa: str, opcoes: Dict) -> int:
+    if tipo == "compradores":
+        return dm.count_compradores(nome_rifa)
+    return dm.count_vendas(nome_rifa, opcoes.get("start_iso"), opcoes.get("end_iso"),
+                           comprador=opcoes.get("comprador"), numeros=opcoes.get("numeros"))
+
+
+def nome_arquivo(tipo: str, nome_rifa: str, opcoes: Optional[Dict] = None) -> str:
+    opcoes = opcoes or {}
+    if tipo == "comprovante_comprador":
+        return f"{_safe_fname(nome_rifa)}_{_safe_fname(opcoes.get('comprador', ''))}_comprovante"
+    if tipo == "compradores":
+        return f"relatorio_compradores_{_safe_fname(nome_rifa)}"
+    return f"{_safe_fname(nome_rifa)}_comprovantes"
+
+
+def gerar_relatorio(
+    tipo: str,
+    nome_rifa: str,
+    cfg: Optional[Dict] = None,
+    opcoes: Optional[Dict] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> Path:
+    """Gera (ou reaproveita do cache) o relatório e retorna o caminho do PDF/ZIP.
+
+    Tipos: "comprovantes" (uma página por número), "comprovante_comprador"
+    (opção `comprador` obrigatória) e "compradores" (tabela resumo).
+    Opções: start_iso, end_iso, comprador, numeros, tz_offset.
+    """
+    if tipo not in _RENDERERS:
+        raise ValueError(f"Tipo de relatório desconhecido: {tipo}")
+    cfg = cfg or {}
+    opcoes = _normalizar_opcoes(opcoes)
+    if tipo == "comprovante_comprador" and not opcoes.get("comprador"):
+        raise ValueError("Informe o comprador para o comprovante consolidado")
+
+    key = cache_key(tipo, nome_rifa, cfg, opcoes)
+    cached = cached_report(key)
+    if cached:
+        logger.debug(f"Relatório {tipo} da rifa {nome_rifa} servido do cache", arquivo=cached.name)
+        return cached
+
+    started = time.perf_counter()
+    total = _total_itens(tipo, nome_rifa, opcoes)
+    if total == 0:
+        raise ValueError("Nenhuma venda encontrada para os filtros informados")
+
+    def progresso(feitos: int) -> None:
+        if on_progress:
+            on_progress(feitos, total)
+
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    render, orientation = _RENDERERS[tipo]
+    writer = _VolumeWriter(REPORTS_DIR / key, orientation=orientation)
+    try:
+        render(writer, nome_rifa, cfg, dict(opcoes, _total=total), progresso)
+        path = writer.close(nome_arquivo(tipo, nome_rifa, opcoes))
+    except Exception:
+        writer.discard()
+        raise
+    _evict_cache()
+    logger.success(
+        f"Relatório {tipo} da rifa {nome_rifa} gerado",
+        itens=total,
+        volumes=len(writer.volumes),
+        ms=round((time.perf_counter() - started) * 1000, 1),
+    )
+    return path
+
+
+# ----------------- Worker em segundo plano -----------------
+
+def _run_job(job: Dict[str, Any]) -> None:
+    def on_progress(feitos: int, total: int) -> None:
+        job["feitos"], job["total"] = feitos, total
+
+    job["status"] = "gerando"
+    try:
+        path = gerar_relatorio(job["tipo"], job["rifa"], job["cfg"], job["opcoes"], on_progress=on_progress)
+        job["path"] = path
+        job["file_name"] = nome_arquivo(job["tipo"], job["rifa"], job["opcoes"]) + path.suffix
+        job["mime"] = "application/zip" if path.suffix == ".zip" else "application/pdf"
+        job["status"] = "pronto"
+    except Exception as e:
+        logger.error(f"Falha ao gerar relatório {job['tipo']} da rifa {job['rifa']}", exception=e)
+        job["erro"] = str(e)
+        job["status"] = "erro"
+    finally:
+        job["finalizado_em"] = time.time()
+
+
+def _prune_jobs() -> None:
+    """Remove jobs finalizados há mais de JOB_TTL_SECONDS. Chamar com _jobs_lock."""
+    limite = time.time() - JOB_TTL_SECONDS
+    expirados = [k for k, job in _jobs.items() if job["finalizado_em"] and job["finalizado_em"] < limite]
+    for key in expirados:
+        del _jobs[key]
+
+
+def submit_report(tipo: str, nome_rifa: str, cfg: Optional[Dict] = None, opcoes: Optional[Dict] = None) -> str:
+    """Agenda a geração do relatório e retorna o id do job.
+
+    Pedidos idênticos (mesma chave de cache) compartilham o mesmo job enquanto ele
+    estiver pendente, em andamento ou concluído.
+    """
+    opcoes = _normalizar_opcoes(opcoes)
+    key = cache_key(tipo, nome_rifa, cfg, opcoes)
+    with _jobs_lock:
+        _prune_jobs()
+        job = _jobs.get(key)
+        if job and (job["status"] != "erro" and (job["status"] != "pronto" or Path(job["path"]).exists())):
+            return key
+        job = {
+            "id": key, "tipo": tipo, "rifa": nome_rifa, "cfg": dict(cfg or {}), "opcoes": opcoes,
+            "status": "pendente", "feitos": 0, "total": 0, "path": None, "file_name": None,
+            "mime": None, "erro": None, "criado_em": time.time(), "finalizado_em": None,
+        }
+        _jobs[key] = job
+    _executor.submit(_run_job, job)
+    return key
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Estado do job: status ("pendente", "gerando", "pronto", "erro"), feitos/total e arquivo.
+
+    Retorna None para jobs desconhecidos ou que já expiraram (JOB_TTL_SECONDS).
+    """
+    with _jobs_lock:
+        _prune_jobs()
+        job = _jobs.get(job_id)
+    if job is None:
+        return None
+    return {k: v for k, v in job.items() if k != "cfg"}
+
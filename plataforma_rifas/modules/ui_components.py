@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Dict, List, Optional, Tuple, Any
 import streamlit as st
-from datetime import datetime, timezone, timedelta
+from datetime import datetime
 import plotly.express as px
 import pandas as pd
 import altair as alt
@@ -12,6 +12,8 @@ import pandas as pd
 import altair as alt
 from fpdf import FPDF
 import qrcode
+from . import bitset
+from . import reports
 from . import db_data_manager as dm  # Usando o módulo db_data_manager que contém as funções necessárias
 from logger import logger
 from babel.numbers import format_currency
@@ -156,260 +158,59 @@ def _parse_ranges(texto: str) -> List[int]:
     return sorted(list(resultado))
 
 
-def _build_pdf_bytes(vendas_list, cfg_local, consolidate_buyer: str = None, nome_rifa: str = None, tz_offset: int = 0):
-    """Gera bytes de um PDF com os comprovantes de venda."""
-    import os
-    import qrcode
-    from fpdf import FPDF
-    from babel.numbers import format_currency
-    import pandas as pd
-    import logging
-    
-    logger = logging.getLogger(__name__)
-    
+def renderizar_progresso_relatorio(state_key: str) -> None:
+    """Acompanha o job de relatório guardado em st.session_state[state_key].
+
+    Só o progresso roda no fragmento que se atualiza a cada segundo. Concluído o job,
+    o arquivo fica registrado na sessão e o botão de download é desenhado fora do
+    fragmento, sem reler o PDF/ZIP a cada segundo.
+    """
+    arquivo_key = f"{state_key}_arquivo"
+    job_id = st.session_state.get(state_key)
+    if job_id:
+        job = reports.get_job(job_id)
+        if job and job["status"] in ("pendente", "gerando"):
+            st.session_state.pop(arquivo_key, None)
+            _progresso_relatorio(state_key)
+            return
+        st.session_state.pop(state_key, None)
+        if job and job["status"] == "erro":
+            st.error(f"Erro ao gerar relatório: {job['erro']}")
+            return
+        if job:
+            st.session_state[arquivo_key] = {k: job[k] for k in ("path", "file_name", "mime")}
+
+    arquivo = st.session_state.get(arquivo_key)
+    if not arquivo:
+        return
     try:
-        if not vendas_list:
-            raise ValueError("Lista de vendas vazia")
-            
-        logo_path = (cfg_local or {}).get("logo_path")
-        qr_text = (cfg_local or {}).get("qr_text")
-        obs = (cfg_local or {}).get("obs_padrao_pdf", "")
-        valor_unit = float((cfg_local or {}).get("valor_numero", 0.0))
-        
-        pdf = FPDF(orientation='P', unit='mm', format='A4')
-        pdf.set_auto_page_break(auto=True, margin=12)
-        
-        try:
-            if consolidate_buyer:
-                # Modo consolidado (todos os números de um comprador em uma página)
-                try:
-                    nums = sorted([int(v['numero']) for v in vendas_list if v.get('comprador') == consolidate_buyer])
-                    contato_buyer = next((v.get('contato') for v in vendas_list 
-                                        if v.get('comprador') == consolidate_buyer and v.get('contato')), "")
-                    total_qtd = len(nums)
-                    total_valor = total_qtd * valor_unit
-                    gerado_em = (pd.Timestamp.utcnow() + pd.Timedelta(hours=int(tz_offset))).strftime('%Y-%m-%d %H:%M:%S')
-                    
-                    pdf.add_page()
-                    pdf.set_font("Arial", "B", 16)
-                    
-                    # Adiciona logo se existir
-                    if logo_path and os.path.exists(logo_path):
-                        try:
-                            pdf.image(logo_path, x=12, y=10, w=28)
-                        except Exception as e:
-                            logger.warning(f"Erro ao adicionar logo: {e}")
-                    
-                    pdf.cell(0, 12, f"Comprovante de Compra - {nome_rifa}", ln=1, align='C')
-                    pdf.set_font("Arial", size=12)
-                    pdf.ln(4)
-                    pdf.cell(0, 8, f"Comprador: {consolidate_buyer}", ln=1)
-                    
-                    if contato_buyer:
-                        pdf.cell(0, 8, f"Contato: {contato_buyer}", ln=1)
-                        
-                    pdf.cell(0, 8, f"Quantidade de números: {total_qtd}", ln=1)
-                    pdf.cell(0, 8, f"Valor por número: {format_currency(valor_unit, 'BRL', locale='pt_BR')}", ln=1)
-                    pdf.cell(0, 8, f"Valor total: {format_currency(total_valor, 'BRL', locale='pt_BR')}", ln=1)
-                    
-                    # Lista de números em colunas
-                    pdf.ln(2)
-                    pdf.set_font("Arial", size=11)
-                    nums_str = ", ".join(map(str, nums))
-                    pdf.multi_cell(0, 7, f"Números: {nums_str}")
-                    
-                    pdf.ln(2)
-                    pdf.cell(0, 8, f"Gerado em (local): {gerado_em}", ln=1)
-                    
-                    # Adiciona observação se existir
-                    if obs:
-                        pdf.ln(4)
-                        pdf.multi_cell(0, 7, obs)
-                        
-                    # Adiciona QR code se configurado
-                    if qr_text:
-                        try:
-                            qr = qrcode.QRCode(version=1, box_size=4, border=2)
-                            qr_data = qr_text.format(
-                                rifa=nome_rifa,
-                                comprador=consolidate_buyer,
-                                contato=contato_buyer,
-                                quantidade=total_qtd,
-                                valor=total_valor
-                            )
-                            qr.add_data(qr_data)
-                            qr.make(fit=True)
-                            qr_img = qr.make_image(fill_color="black", back_color="white")
-                            qr_img_path = "temp_qr.png"
-                            qr_img.save(qr_img_path)
-                            pdf.image(qr_img_path, x=160, y=10, w=35)
-                            if os.path.exists(qr_img_path):
-                                os.remove(qr_img_path)
-                        except Exception as e:
-                            logger.warning(f"Falha ao gerar QR code: {e}")
-                
-                except Exception as e:
-                    logger.error(f"Erro ao gerar PDF consolidado: {e}")
-                    raise
-                    
-            else:
-                # Modo individual (um comprovante por número)
-                for venda in vendas_list:
-                    try:
-                        pdf.add_page()
-                        pdf.set_font("Arial", "B", 16)
-                        
-                        # Adiciona logo se existir
-                        if logo_path and os.path.exists(logo_path):
-                            try:
-                                pdf.image(logo_path, x=12, y=10, w=28)
-                            except Exception as e:
-                                logger.warning(f"Erro ao adicionar logo: {e}")
-                        
-                        # Cabeçalho do comprovante
-                        pdf.cell(0, 12, f"Comprovante - {nome_rifa}", ln=1, align='C')
-                        pdf.set_font("Arial", size=12)
-                        pdf.ln(4)
-                        
-                        # Dados da venda
-                        pdf.cell(0, 8, f"Número: {venda.get('numero', 'N/A')}", ln=1)
-                        pdf.cell(0, 8, f"Comprador: {venda.get('comprador', 'N/A')}", ln=1)
-                        
-                        contato = venda.get('contato')
-                        if contato:
-                            pdf.cell(0, 8, f"Contato: {contato}", ln=1)
-                            
-                        pdf.cell(0, 8, f"Valor: {format_currency(valor_unit, 'BRL', locale='pt_BR')}", ln=1)
-                        
-                        # Formata a data/hora
-                        timestamp = venda.get('timestamp')
-                        if timestamp:
-                            try:
-                                dt = pd.to_datetime(timestamp)
-                                if hasattr(dt, 'tz_localize'):  # Se for um objeto Timestamp do pandas
-                                    dt = dt.tz_localize('UTC').tz_convert(None) + pd.Timedelta(hours=int(tz_offset))
-                                    pdf.cell(0, 8, f"Data da compra: {dt.strftime('%Y-%m-%d %H:%M:%S')}", ln=1)
-                                else:
-                                    pdf.cell(0, 8, f"Data da compra: {timestamp}", ln=1)
-                            except Exception as e:
-                                logger.warning(f"Erro ao formatar data {timestamp}: {e}")
-                                pdf.cell(0, 8, f"Data da compra: {timestamp}", ln=1)
-                        
-                        # Adiciona QR code se configurado
-                        if qr_text:
-                            try:
-                                qr = qrcode.QRCode(version=1, box_size=4, border=2)
-                                qr_data = qr_text.format(
-                                    rifa=nome_rifa,
-                                    numero=venda.get('numero', ''),
-                                    comprador=venda.get('comprador', ''),
-                                    contato=venda.get('contato', ''),
-                                    valor=valor_unit
-                                )
-                                qr.add_data(qr_data)
-                                qr.make(fit=True)
-                                qr_img = qr.make_image(fill_color="black", back_color="white")
-                                qr_img_path = f"temp_qr_{venda.get('numero', '')}.png"
-                                qr_img.save(qr_img_path)
-                                pdf.image(qr_img_path, x=160, y=10, w=35)
-                                if os.path.exists(qr_img_path):
-                                    os.remove(qr_img_path)
-                            except Exception as e:
-                                logger.warning(f"Falha ao gerar QR code: {e}")
-                        
-                        # Adiciona observação se existir
-                        if obs:
-                            pdf.ln(4)
-                            pdf.multi_cell(0, 7, obs)
-                            
-                    except Exception as e:
-                        logger.error(f"Erro ao gerar página para venda {venda.get('numero', 'desconhecido')}: {e}")
-                        continue
-            
-            # Retorna os bytes do PDF, tratando diferentes tipos de retorno do FPDF
-            pdf_output = pdf.output(dest='S')
-            if isinstance(pdf_output, str):
-                return pdf_output.encode('latin1')
-            elif isinstance(pdf_output, bytearray):
-                return bytes(pdf_output)
-            return pdf_output
-            
-        except Exception as e:
-            logger.error(f"Erro ao gerar PDF: {str(e)}", exc_info=True)
-            raise
-            
-    except Exception as e:
-        logger.error(f"Erro inesperado ao gerar PDF: {str(e)}", exc_info=True)
-        raise RuntimeError(f"Erro ao gerar PDF: {str(e)}")
+        data = Path(arquivo["path"]).read_bytes()
+    except FileNotFoundError:
+        st.session_state.pop(arquivo_key, None)
+        return
+    st.download_button(
+        f"Baixar {'ZIP' if arquivo['mime'] == 'application/zip' else 'PDF'}",
+        data=data,
+        file_name=arquivo["file_name"],
+        mime=arquivo["mime"],
+        key=f"download_{state_key}",
+    )
 
 
-def _gerar_relatorio_comprador_pdf(compras_agrupadas: Dict, nome_rifa: str, valor_unit: float, logo_path: str = None) -> bytes:
-    """Gera um PDF com o relatório de compradores."""
-    from fpdf import FPDF
-    from babel.numbers import format_currency
-    
-    pdf = FPDF(orientation='L', unit='mm', format='A4')
-    pdf.set_auto_page_break(auto=True, margin=15)
-    
-    # Adiciona logo se existir
-    if logo_path and os.path.exists(logo_path):
-        try:
-            pdf.image(logo_path, x=12, y=10, w=28)
-        except Exception:
-            pass
-    
-    # Cabeçalho
-    pdf.add_page()
-    pdf.set_font("Arial", 'B', 16)
-    pdf.cell(0, 15, f"Relatório de Compradores - {nome_rifa}", 0, 1, 'C')
-    
-    # Data de geração
-    pdf.set_font("Arial", '', 10)
-    pdf.cell(0, 8, f"Gerado em: {pd.Timestamp.now().strftime('%d/%m/%Y %H:%M:%S')}", 0, 1, 'R')
-    
-    # Cabeçalho da tabela
-    pdf.set_font("Arial", 'B', 10)
-    pdf.set_fill_color(200, 220, 255)
-    pdf.cell(120, 10, "Comprador", 1, 0, 'C', 1)
-    pdf.cell(30, 10, "Quantidade", 1, 0, 'C', 1)
-    pdf.cell(40, 10, "Valor Total", 1, 1, 'C', 1)
-    
-    # Dados
-    pdf.set_font("Arial", '', 10)
-    fill = False
-    total_geral = 0
-    total_numeros = 0
-    
-    for comprador, info in compras_agrupadas.items():
-        total = info['quantidade'] * valor_unit
-        total_geral += total
-        total_numeros += info['quantidade']
-        
-        pdf.set_fill_color(224, 235, 255) if fill else pdf.set_fill_color(255, 255, 255)
-        pdf.cell(120, 8, comprador, 1, 0, 'L', fill)
-        pdf.cell(30, 8, str(info['quantidade']), 1, 0, 'C', fill)
-        pdf.cell(40, 8, format_currency(total, 'BRL', locale='pt_BR'), 1, 1, 'R', fill)
-        fill = not fill
-    
-    # Totalizador
-    pdf.set_font("Arial", 'B', 10)
-    pdf.set_fill_color(180, 200, 255)
-    pdf.cell(120, 10, "TOTAL GERAL", 1, 0, 'R', 1)
-    pdf.cell(30, 10, str(total_numeros), 1, 0, 'C', 1)
-    pdf.cell(40, 10, format_currency(total_geral, 'BRL', locale='pt_BR'), 1, 1, 'R', 1)
-    
-    # Gera o PDF em memória
-    pdf_output = pdf.output(dest='S')
-    if isinstance(pdf_output, bytearray):
-        return bytes(pdf_output)
-    elif isinstance(pdf_output, str):
-        return pdf_output.encode('latin-1')
-    return pdf_output
+@st.fragment(run_every=1)
+def _progresso_relatorio(state_key: str) -> None:
+    """Barra de progresso do job; ao terminar, reexecuta a página para mostrar o resultado."""
+    job_id = st.session_state.get(state_key)
+    job = reports.get_job(job_id) if job_id else None
+    if not job or job["status"] not in ("pendente", "gerando"):
+        st.rerun()
+    feitos, total = job["feitos"], job["total"]
+    st.progress(feitos / total if total else 0.0, text=f"Gerando relatório... {feitos}/{total}")
+
 
 def renderizar_relatorio_compradores(nome_rifa: str, vendas: List[Dict], valor_unit: float, cfg: Dict) -> None:
     """Renderiza o relatório de compradores com paginação e opção de exportar para PDF."""
     import pandas as pd
-    from datetime import datetime
     
     # Agrupa as vendas por comprador
     compras_agrupadas = {}
@@ -504,25 +305,12 @@ def renderizar_relatorio_compradores(nome_rifa: str, vendas: List[Dict], valor_u
     with col2:
         st.metric("Total de Números", total_numeros)
     
-    # Botão para exportar para PDF
+    # Exporta para PDF em segundo plano (agregado no banco, sem montar o relatório em memória)
+    state_key = f"relatorio_compradores_{nome_rifa}"
     if st.button("Exportar Relatório para PDF", type="primary"):
-        try:
-            pdf_bytes = _gerar_relatorio_comprador_pdf(
-                {row['Comprador']: {'quantidade': row['Quantidade']} for _, row in df.iterrows()},
-                nome_rifa,
-                valor_unit,
-                cfg.get('logo_path')
-            )
-            
-            st.download_button(
-                label="Baixar Relatório em PDF",
-                data=pdf_bytes,
-                file_name=f"relatorio_compradores_{nome_rifa}.pdf",
-                mime="application/pdf"
-            )
-        except Exception as e:
-            logger.error(f"Erro ao gerar relatório PDF: {str(e)}")
-            st.error(f"Erro ao gerar relatório: {str(e)}")
+        st.session_state[state_key] = reports.submit_report("compradores", nome_rifa, cfg)
+        logger.info(f"Relatório de compradores solicitado para rifa {nome_rifa}")
+    renderizar_progresso_relatorio(state_key)
 
 
 def renderizar_analytics_tab(nome_rifa: str) -> None:
@@ -887,15 +675,17 @@ def renderizar_analytics_tab(nome_rifa: str) -> None:
             st.info("Sem vendas neste dia.")
 
 def renderizar_grid_vendas(nome_rifa: str, dados: Dict[str, str], cfg: Dict):
-    total = int(cfg.get("total_numeros", 0))
-    vendidos = set(map(int, dados.keys()))
-    
-    ttl_min = int(cfg.get("ttl_reserva_minutos", 15))
-    ativos_det, expirados = dm.purge_expired_reservas(nome_rifa, ttl_min)
+    # TTL configurado em Gerenciamento ("reserva_ttl_minutos"); chave antiga como fallback
+    ttl_min = int(cfg.get("reserva_ttl_minutos", cfg.get("ttl_reserva_minutos", 15)))
+    expirados = dm.purge_expired_reservas(nome_rifa, ttl_min)
     if expirados:
-        st.toast(f"Reservas expiradas liberadas: {sorted(expirados)}", icon="⏱️")
-    
-    reservados = set(ativos_det.keys())
+        st.toast(f"Reservas expiradas liberadas: {expirados}", icon="⏱️")
+
+    # Bitsets de disponibilidade (1 bit por número)
+    disp = dm.carregar_disponibilidade(nome_rifa)
+    total = disp["total"] or int(cfg.get("total_numeros", 0))
+    vendidos = disp["vendidos"]
+    reservados = disp["reservados"]
 
     st.subheader("Venda e Reserva de Números")
 
@@ -938,28 +728,19 @@ def renderizar_grid_vendas(nome_rifa: str, dados: Dict[str, str], cfg: Dict):
                 st.error(f"{msg} | Detalhes: {detalhes}")
 
         elif tipo == "Reserva":
-            novos = [n for n in nums if n not in vendidos and n not in reservados]
-            if not novos:
-                st.info("Todos os números informados já estão vendidos ou reservados.")
+            ok, novos, msg = dm.reservar_numeros(nome_rifa, nums, ttl_min)
+            if not ok:
+                st.info(msg)
                 return
-            
-            now_ts = datetime.now(timezone.utc).isoformat()
-            for n in novos:
-                ativos_det[n] = now_ts
-            dm.salvar_reservas_detalhe(nome_rifa, ativos_det)
-            st.success(f"Números reservados: {sorted(novos)}")
+            st.success(f"Números reservados: {novos}")
             st.rerun()
-            
+
         elif tipo == "Cancelar reserva":
-            cancelar = [n for n in nums if n in reservados]
-            if not cancelar:
-                st.info("Nenhum dos números informados está atualmente reservado.")
+            ok, cancelados, msg = dm.cancelar_reservas(nome_rifa, nums)
+            if not ok:
+                st.info(msg)
                 return
-                
-            for n in cancelar:
-                ativos_det.pop(n, None)
-            dm.salvar_reservas_detalhe(nome_rifa, ativos_det)
-            st.success(f"Reservas canceladas: {sorted(cancelar)}")
+            st.success(f"Reservas canceladas: {cancelados}")
             st.rerun()
 
     # Grade de números com paginação
@@ -994,10 +775,10 @@ def renderizar_grid_vendas(nome_rifa: str, dados: Dict[str, str], cfg: Dict):
     cols = st.columns(cfg.get("grid_columns", 12))
     for n in range(start, end + 1):
         col = cols[(n - 1) % len(cols)]
-        if n in vendidos:
+        if bitset.test(vendidos, n):
             klass = "sold"
             title = dados.get(str(n), "Vendido")
-        elif n in reservados:
+        elif bitset.test(reservados, n):
             klass = "reserved"
             title = "Reservado"
         else:
@@ -7,13 +7,14 @@ Agora a chave da API é definida manualmente pelo usuário em tempo de execuçã
 qualquer função que dependa da IA.
 """
 
-import streamlit as st
 from google import genai
 from google.genai import types
 import os
 from core.logger import get_logger, log_api_call, log_performance
+from core.llm_cache import LLMCache
 from typing import List, Dict, Any, Optional
 import json
+import random
 import time
 import numpy as np
 from datetime import datetime
@@ -26,6 +27,14 @@ class AIServiceError(Exception):
     pass
 
 
+class CachedResponse:
+    """Resposta servida pelo cache (mesma interface usada da resposta do Gemini)"""
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = None
+
+
 class GeminiService:
     """Serviço principal para integração com Google Gemini"""
     
@@ -34,6 +43,7 @@ class GeminiService:
         self.model_name = "gemini-2.5-flash"
         self.chat_history = {}
         self.api_key = None
+        self.cache = LLMCache()
     
     def _initialize_model(self):
         """Inicializa o cliente Gemini (google-genai) com a chave já configurada."""
@@ -55,8 +65,27 @@ class GeminiService:
         self.api_key = key.strip()
         self._initialize_model()
     
-    def _make_api_call(self, prompt: str, stream: bool = False, use_chat: bool = False, chat_id: str = None) -> Any:
-        """Faz chamada para API Gemini (google-genai) com retry logic"""
+    def _make_api_call(self, prompt: str, stream: bool = False, use_chat: bool = False,
+                       chat_id: str = None, cache_ttl: Optional[int] = None) -> Any:
+        """
+        Faz chamada para API Gemini (google-genai) com retry logic.
+        Com `cache_ttl`, a resposta é servida/gravada no cache persistente (LLMCache),
+        compartilhado entre sessões e reinícios; chamadas idênticas simultâneas
+        resultam em uma única requisição à API.
+        """
+        if cache_ttl is None or use_chat:
+            return self._call_gemini(prompt)
+        
+        text = self.cache.get_or_compute(
+            self.model_name,
+            prompt,
+            lambda: self._call_gemini(prompt).text,
+            ttl=cache_ttl
+        )
+        return CachedResponse(text)
+    
+    def _call_gemini(self, prompt: str) -> Any:
+        """Executa a requisição ao Gemini com backoff exponencial"""
         max_retries = 3
         base_delay = 1
         start_time = time.time()
@@ -89,25 +118,31 @@ class GeminiService:
                 
             except Exception as e:
                 logger.warning(f"Tentativa {attempt + 1} falhou: {str(e)}")
+                msg = str(e)
+                invalid_key = "API key not valid" in msg or "API_KEY_INVALID" in msg
                 
-                if attempt < max_retries - 1:
-                    delay = base_delay * (2 ** attempt)  # Exponential backoff
-                    time.sleep(delay)
+                if attempt < max_retries - 1 and not invalid_key:
+                    # Backoff exponencial com jitter (chave inválida não é retentada)
+                    delay = base_delay * (2 ** attempt)
+                    time.sleep(delay * random.uniform(0.5, 1.0))
                 else:
                     duration = time.time() - start_time
                     log_api_call(logger, "gemini_api_call", success=False)
                     log_performance(logger, "gemini_api_call", duration, success=False)
                     # Dica de causa comum
-                    msg = str(e)
-                    if "API key not valid" in msg or "API_KEY_INVALID" in msg:
+                    if invalid_key:
                         logger.error("Valide sua GEMINI_API_KEY. Em ambiente local, o env var GEMINI_API_KEY tem prioridade sobre st.secrets.")
-                    raise AIServiceError(f"Falha após {max_retries} tentativas: {msg}")
+                    raise AIServiceError(f"Falha após {attempt + 1} tentativas: {msg}")
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Estatísticas do cache persistente de respostas"""
+        return self.cache.stats()
     
-    @st.cache_data(ttl=1800)  # Cache por 30 minutos
-    def search_products_with_gemini(_self, product_name: str) -> List[Dict[str, Any]]:
+    def search_products_with_gemini(self, product_name: str, use_cache: bool = True) -> List[Dict[str, Any]]:
         """
         Simula busca de produtos em e-commerces usando IA
         Retorna ofertas estruturadas com scores de relevância
+        Com `use_cache=False` a resposta não é lida nem gravada no cache (preço atual)
         """
         start_time = time.time()
         
@@ -139,7 +174,7 @@ class GeminiService:
             Seja realista com preços brasileiros e disponibilidade.
             """
             
-            response = _self._make_api_call(prompt)
+            response = self._make_api_call(prompt, cache_ttl=1800 if use_cache else None)  # Cache por 30 minutos
             result_text = response.text.strip()
             
             # Tentar extrair JSON da resposta
@@ -180,8 +215,7 @@ class GeminiService:
             log_performance(logger, "search_products", duration, success=False)
             raise AIServiceError(f"Falha na busca de produtos: {str(e)}")
     
-    @st.cache_data(ttl=3600)  # Cache por 1 hora
-    def generate_tags_for_product(_self, product_name: str) -> str:
+    def generate_tags_for_product(self, product_name: str) -> str:
         """
         Gera tags relevantes para o produto usando IA
         Retorna até 7 tags únicas separadas por vírgula
@@ -205,7 +239,7 @@ class GeminiService:
             Exemplo de resposta: eletrônicos, smartphone, android, 128gb, dual-sim
             """
             
-            response = _self._make_api_call(prompt)
+            response = self._make_api_call(prompt, cache_ttl=3600)  # Cache por 1 hora
             tags = response.text.strip()
             
             # Limpar e validar tags
@@ -227,8 +261,7 @@ class GeminiService:
             log_performance(logger, "generate_tags", duration, success=False)
             return "produto, geral"
     
-    @st.cache_data(ttl=1800)
-    def generate_product_summary(_self, product_name: str) -> str:
+    def generate_product_summary(self, product_name: str) -> str:
         """
         Gera resumo inteligente do produto
         Usa temperatura baixa para consistência
@@ -250,7 +283,7 @@ class GeminiService:
             Máximo 200 palavras.
             """
             
-            response = _self._make_api_call(prompt)
+            response = self._make_api_call(prompt, cache_ttl=1800)  # Cache por 30 minutos
             summary = response.text.strip()
             
             duration = time.time() - start_time
@@ -265,8 +298,7 @@ class GeminiService:
             log_performance(logger, "generate_summary", duration, success=False)
             return f"Resumo não disponível para {product_name}."
     
-    @st.cache_data(ttl=1800)
-    def summarize_reviews(_self, product_name: str) -> Dict[str, Any]:
+    def summarize_reviews(self, product_name: str) -> Dict[str, Any]:
         """
         Simula análise de reviews com score de sentimento
         Retorna resumo e score numérico (-1 a 1)
@@ -298,7 +330,7 @@ class GeminiService:
             Seja realista baseado no tipo de produto e mercado brasileiro.
             """
             
-            response = _self._make_api_call(prompt)
+            response = self._make_api_call(prompt, cache_ttl=1800)  # Cache por 30 minutos
             result_text = response.text.strip()
             
             try:
@@ -442,8 +474,7 @@ class GeminiService:
                 "confianca": 0.0
             }
     
-    @st.cache_data(ttl=1800)
-    def compare_products(_self, product_names: List[str], user_focus: str = "") -> str:
+    def compare_products(self, product_names: List[str], user_focus: str = "") -> str:
         """
         Compara produtos lado a lado com recomendações personalizadas
         Suporte dinâmico para 2-5 produtos
@@ -489,7 +520,7 @@ class GeminiService:
             Seja objetivo, imparcial e focado em valor real para o consumidor brasileiro.
             """
             
-            response = _self._make_api_call(prompt)
+            response = self._make_api_call(prompt, cache_ttl=1800)  # Cache por 30 minutos
             comparison = response.text.strip()
             
             duration = time.time() - start_time
@@ -538,8 +569,7 @@ class GeminiService:
             log_performance(logger, "answer_question", duration, success=False)
             return f"Desculpe, não consegui processar sua pergunta sobre {product_name}. Tente novamente."
     
-    @st.cache_data(ttl=3600)
-    def suggest_alert_threshold(_self, product_name: str, budget: float = None) -> float:
+    def suggest_alert_threshold(self, product_name: str, budget: float = None) -> float:
         """
         Sugere threshold de alerta baseado no produto e orçamento
         """
@@ -562,7 +592,7 @@ class GeminiService:
             Retorne APENAS o valor numérico do preço sugerido (ex: 299.90), sem formatação adicional.
             """
             
-            response = _self._make_api_call(prompt)
+            response = self._make_api_call(prompt, cache_ttl=3600)  # Cache por 1 hora
             threshold_text = response.text.strip()
             
             # Extrair número da resposta
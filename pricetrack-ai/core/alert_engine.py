@@ -0,0 +1,163 @@
+"""
+Motor de Avaliação de Alertas para PriceTrack AI
+Avalia todos os alertas ativos em uma única consulta e dispara apenas em transições de estado
+"""
+
+from sqlalchemy import select, update, func, case, literal
+from sqlalchemy.orm import Session, aliased
+from core.models import Alert, Product, PriceObservation
+from core.logger import get_logger, log_performance
+from typing import Dict, Any, Optional
+from datetime import datetime
+import time
+
+logger = get_logger(__name__)
+
+
+class AlertEngine:
+    """
+    Avaliação set-based de alertas.
+
+    Uma única consulta junta alerts e products e obtém, por subconsultas correlacionadas
+    que usam o índice (product_id, observed_at), o preço mais recente e o preço de
+    referência de cada tipo de alerta. Apenas mudanças de estado são gravadas.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _evaluation_query(self, now: datetime):
+        """Monta a consulta de avaliação de todos os alertas ativos"""
+        obs = PriceObservation
+        same_product = obs.product_id == Alert.product_id
+        window_start = func.datetime(
+            literal(now.strftime('%Y-%m-%d %H:%M:%S')),
+            func.printf('-%d days', Alert.window_days)
+        )
+
+        latest_obs = aliased(PriceObservation)
+        latest_at = (
+            select(func.max(latest_obs.observed_at))
+            .where(latest_obs.product_id == Alert.product_id)
+            .scalar_subquery()
+        )
+        latest_price = (
+            select(obs.price).where(same_product)
+            .order_by(obs.observed_at.desc()).limit(1)
+            .scalar_subquery()
+        )
+        window_max = select(func.max(obs.price)).where(same_product, obs.observed_at >= window_start).scalar_subquery()
+        window_avg = select(func.avg(obs.price)).where(same_product, obs.observed_at >= window_start).scalar_subquery()
+        prior_min = select(func.min(obs.price)).where(same_product, obs.observed_at < latest_at).scalar_subquery()
+
+        # CASE garante que o SQLite só calcule a referência do tipo de cada alerta
+        reference_price = case(
+            (Alert.alert_type == 'percent_drop', window_max),
+            (Alert.alert_type == 'all_time_low', prior_min),
+            (Alert.alert_type == 'ma_crossover', window_avg),
+            else_=None
+        )
+
+        return (
+            select(
+                Alert.id,
+                Alert.product_id,
+                Product.product_name,
+                Alert.alert_type,
+                Alert.threshold_price,
+                Alert.threshold_percent,
+                Alert.is_triggered,
+                latest_price.label("current_price"),
+                reference_price.label("reference_price"),
+            )
+            .join(Product, Product.id == Alert.product_id)
+            .where(Alert.is_active == 1)
+        )
+
+    @staticmethod
+    def _condition_met(row) -> bool:
+        """Verifica se a condição do alerta é verdadeira para os preços atuais"""
+        price, reference = row.current_price, row.reference_price
+        if price is None:
+            return False
+        if row.alert_type == 'below_price':
+            return price <= row.threshold_price
+        if reference is None:
+            return False
+        if row.alert_type == 'percent_drop':
+            return price <= reference * (1 - (row.threshold_percent or 0) / 100)
+        # all_time_low e ma_crossover: preço abaixo da referência
+        return price < reference
+
+    @staticmethod
+    def _to_dict(row) -> Dict[str, Any]:
+        """Converte linha avaliada no formato exibido pelas páginas"""
+        target: Optional[float] = row.threshold_price if row.alert_type == 'below_price' else row.reference_price
+        return {
+            "alert_id": row.id,
+            "product_id": row.product_id,
+            "product_name": row.product_name,
+            "alert_type": row.alert_type,
+            "current_price": row.current_price,
+            "threshold_price": row.threshold_price,
+            "reference_price": row.reference_price,
+            "savings": (target - row.current_price) if target is not None else 0.0
+        }
+
+    def evaluate(self) -> Dict[str, Any]:
+        """
+        Avalia todos os alertas ativos.
+
+        Returns:
+            Dict com `fired` (alertas que passaram a disparar nesta execução),
+            `triggered` (todos os alertas cuja condição está verdadeira),
+            contadores e custo da execução em milissegundos
+        """
+        start_time = time.time()
+
+        try:
+            rows = self.db.execute(self._evaluation_query(datetime.now())).all()
+
+            fired, triggered, resets = [], [], []
+            for row in rows:
+                met = self._condition_met(row)
+                if met:
+                    triggered.append(self._to_dict(row))
+                    if not row.is_triggered:
+                        fired.append(triggered[-1])
+                elif row.is_triggered:
+                    resets.append({"id": row.id, "is_triggered": 0})
+
+            if fired or resets:
+                # UPDATE em lote pela chave primária (executemany)
+                triggered_at = datetime.utcnow()
+                if fired:
+                    self.db.execute(update(Alert), [
+                        {"id": alert["alert_id"], "is_triggered": 1, "triggered_at": triggered_at}
+                        for alert in fired
+                    ])
+                if resets:
+                    self.db.execute(update(Alert), resets)
+                self.db.commit()
+
+            duration = time.time() - start_time
+            result = {
+                "fired": fired,
+                "triggered": triggered,
+                "evaluated": len(rows),
+                "reset": len(resets),
+                "duration_ms": duration * 1000
+            }
+
+            if fired:
+                logger.info(f"{len(fired)} alertas disparados")
+            log_performance(
+                logger, "evaluate_alerts", duration,
+                evaluated=result["evaluated"], fired=len(fired), reset=result["reset"]
+            )
+            return result
+
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Erro ao avaliar alertas: {str(e)}")
+            raise
@@ -4,12 +4,17 @@ CRUD completo com SQLAlchemy e logging robusto
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, asc
-from core.models import Product, Alert, ProductCreate, ProductUpdate, AlertCreate, AppSetting
+from sqlalchemy import and_, desc, asc, func, text, insert, update
+from core.models import (
+    Product, PriceObservation, Tag, ProductTag, Alert, AppSetting,
+    ProductCreate, ProductUpdate, AlertCreate, normalize_tag,
+)
+from core.alert_engine import AlertEngine
 from core.logger import get_logger, log_database_operation
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 import json
+import re
 
 logger = get_logger(__name__)
 
@@ -29,11 +34,12 @@ class DatabaseManager:
                 product_name=product_data.product_name,
                 tags=product_data.tags,
                 alert_threshold=product_data.alert_threshold,
-                user_rating=product_data.user_rating,
-                price_history=[]
+                user_rating=product_data.user_rating
             )
             
             self.db.add(db_product)
+            self.db.flush()
+            self._sync_product_tags(db_product, product_data.tags)
             self.db.commit()
             self.db.refresh(db_product)
             
@@ -83,16 +89,27 @@ class DatabaseManager:
             logger.error(f"Erro ao listar produtos: {str(e)}")
             raise
     
-    def search_products(self, query: str) -> List[Product]:
-        """Busca produtos por nome ou tags"""
+    def search_products(self, query: str, limit: int = 50) -> List[Product]:
+        """
+        Busca produtos por nome, tags ou resumo da IA (FTS5, ordenado por relevância).
+        Termos casam com palavras inteiras, sem diferenciar acentos ("tv" não casa "tvbox").
+        """
         try:
-            products = self.db.query(Product).filter(
-                or_(
-                    Product.product_name.ilike(f"%{query}%"),
-                    Product.tags.ilike(f"%{query}%")
-                )
-            ).all()
+            terms = re.findall(r"\w+", query)
+            if not terms:
+                return []
             
+            match_expr = " ".join(f'"{term}"' for term in terms)
+            # bm25 com pesos por coluna: nome > tags > resumo
+            product_ids = [row[0] for row in self.db.execute(
+                text(
+                    "SELECT rowid FROM products_fts WHERE products_fts MATCH :match "
+                    "ORDER BY bm25(products_fts, 10.0, 5.0, 1.0) LIMIT :limit"
+                ),
+                {"match": match_expr, "limit": limit}
+            )]
+            
+            products = self._products_in_order(product_ids)
             logger.info(f"Busca por '{query}' retornou {len(products)} produtos")
             return products
         except Exception as e:
@@ -100,23 +117,56 @@ class DatabaseManager:
             raise
     
     def get_products_by_tags(self, tags_filter: List[str]) -> List[Product]:
-        """Busca produtos por tags específicas"""
+        """Busca produtos que tenham qualquer uma das tags (comparação exata, normalizada)"""
         try:
-            if not tags_filter:
+            names = {normalize_tag(tag) for tag in tags_filter} - {""}
+            if not names:
                 return []
             
-            # Construir filtros OR para cada tag
-            filters = []
-            for tag in tags_filter:
-                filters.append(Product.tags.ilike(f"%{tag.strip()}%"))
+            products = self.db.query(Product).join(
+                ProductTag, ProductTag.product_id == Product.id
+            ).join(
+                Tag, Tag.id == ProductTag.tag_id
+            ).filter(Tag.name.in_(names)).distinct().all()
             
-            products = self.db.query(Product).filter(or_(*filters)).all()
             logger.info(f"Busca por tags {tags_filter} retornou {len(products)} produtos")
             return products
         except Exception as e:
             logger.error(f"Erro na busca por tags {tags_filter}: {str(e)}")
             raise
     
+    def _products_in_order(self, product_ids: List[int]) -> List[Product]:
+        """Carrega produtos por ID preservando a ordem informada"""
+        if not product_ids:
+            return []
+        by_id = {p.id: p for p in self.db.query(Product).filter(Product.id.in_(product_ids)).all()}
+        return [by_id[pid] for pid in product_ids if pid in by_id]
+    
+    def _sync_product_tags(self, product: Product, tags: Optional[str]) -> None:
+        """Sincroniza a associação product_tags com o texto de tags do produto (sem commit)"""
+        labels: Dict[str, str] = {}
+        for label in (t.strip() for t in (tags or "").split(',')):
+            name = normalize_tag(label)
+            if name and name not in labels:
+                labels[name] = label
+        
+        existing = {tag.name: tag for tag in self.db.query(Tag).filter(Tag.name.in_(labels)).all()} if labels else {}
+        new_tags = [Tag(name=name, label=label) for name, label in labels.items() if name not in existing]
+        if new_tags:
+            self.db.add_all(new_tags)
+            self.db.flush()
+            existing.update((tag.name, tag) for tag in new_tags)
+        
+        # Reaproveita vínculos existentes; os que sobrarem são removidos (delete-orphan)
+        current = {
+            link.tag_id: link
+            for link in self.db.query(ProductTag).filter(ProductTag.product_id == product.id).all()
+        }
+        product.tag_links = [
+            current.get(existing[name].id) or ProductTag(product_id=product.id, tag_id=existing[name].id)
+            for name in labels
+        ]
+    
     def update_product(self, product_id: int, product_data: ProductUpdate) -> Optional[Product]:
         """Atualiza produto existente"""
         try:
@@ -129,6 +179,7 @@ class DatabaseManager:
                 product.product_name = product_data.product_name
             if product_data.tags is not None:
                 product.tags = product_data.tags
+                self._sync_product_tags(product, product_data.tags)
             if product_data.alert_threshold is not None:
                 product.alert_threshold = product_data.alert_threshold
             if product_data.user_rating is not None:
@@ -147,6 +198,22 @@ class DatabaseManager:
             logger.error(f"Erro ao atualizar produto ID {product_id}: {str(e)}")
             raise
     
+    def update_product_summary(self, product_id: int, summary: str) -> bool:
+        """Salva o resumo da IA do produto (indexado na busca); não grava se não mudou"""
+        try:
+            product = self.get_product(product_id)
+            if not product:
+                return False
+            if product.ai_summary != summary:
+                product.ai_summary = summary
+                self.db.commit()
+                logger.info(f"Resumo da IA salvo para produto ID {product_id}")
+            return True
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Erro ao salvar resumo do produto ID {product_id}: {str(e)}")
+            raise
+    
     def delete_product(self, product_id: int) -> bool:
         """Remove produto"""
         try:
@@ -167,84 +234,149 @@ class DatabaseManager:
     
     # ========== OPERAÇÕES DE HISTÓRICO DE PREÇOS ==========
     
-    def update_price_history(self, product_id: int, new_price: float) -> bool:
-        """Atualiza histórico de preços do produto"""
+    def update_price_history(self, product_id: int, new_price: float,
+                             observed_at: Optional[datetime] = None) -> bool:
+        """Registra nova observação de preço (append-only, custo constante por atualização)"""
         try:
-            product = self.get_product(product_id)
-            if not product:
+            # UPDATE pela chave primária também serve como verificação de existência
+            updated = self.db.query(Product).filter(Product.id == product_id).update(
+                {Product.updated_at: datetime.utcnow()}, synchronize_session=False
+            )
+            if not updated:
+                logger.warning(f"Produto não encontrado: ID {product_id}")
                 return False
             
-            # Obter histórico atual
-            price_history = product.price_history or []
-            
-            # Adicionar nova entrada
-            today = datetime.now().strftime('%Y-%m-%d')
-            new_entry = {
-                "date": today,
-                "price": float(new_price)
-            }
-            
-            # Verificar se já existe entrada para hoje
-            existing_entry = None
-            for entry in price_history:
-                if entry.get("date") == today:
-                    existing_entry = entry
-                    break
-            
-            if existing_entry:
-                # Atualizar entrada existente
-                existing_entry["price"] = float(new_price)
-                logger.info(f"Preço atualizado para hoje: R$ {new_price}")
-            else:
-                # Adicionar nova entrada
-                price_history.append(new_entry)
-                logger.info(f"Novo preço adicionado: R$ {new_price}")
-            
-            # Limpar histórico antigo (manter apenas últimos 30 dias)
-            cutoff_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-            price_history = [
-                entry for entry in price_history 
-                if entry.get("date", "") >= cutoff_date
-            ]
-            
-            # Ordenar por data
-            price_history.sort(key=lambda x: x.get("date", ""))
-            
-            # Atualizar produto
-            product.price_history = price_history
-            product.updated_at = datetime.utcnow()
-            
+            self.db.add(PriceObservation(
+                product_id=product_id,
+                price=float(new_price),
+                observed_at=observed_at or datetime.now()
+            ))
             self.db.commit()
-            self.db.refresh(product)
             
-            logger.info(f"Histórico de preços atualizado para produto ID {product_id}")
+            logger.info(f"Novo preço registrado para produto ID {product_id}: R$ {new_price}")
+            log_database_operation(logger, "INSERT", "price_observations", True, product_id)
             return True
             
         except Exception as e:
             self.db.rollback()
             logger.error(f"Erro ao atualizar histórico de preços produto ID {product_id}: {str(e)}")
+            log_database_operation(logger, "INSERT", "price_observations", False, product_id)
+            raise
+    
+    def add_price_observations(self, observations: List[Dict[str, Any]]) -> int:
+        """
+        Registra observações em lote numa única transação.
+        Cada item: {"product_id": int, "price": float, "observed_at": datetime}
+        """
+        if not observations:
+            return 0
+        try:
+            self.db.execute(insert(PriceObservation), observations)
+            product_ids = {obs["product_id"] for obs in observations}
+            self.db.execute(
+                update(Product).where(Product.id.in_(product_ids)).values(updated_at=datetime.utcnow())
+            )
+            self.db.commit()
+            
+            logger.info(f"{len(observations)} observações de preço registradas em lote")
+            log_database_operation(logger, "BULK_INSERT", "price_observations", True)
+            return len(observations)
+            
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Erro ao registrar observações em lote: {str(e)}")
+            log_database_operation(logger, "BULK_INSERT", "price_observations", False)
+            raise
+    
+    def _observations_since(self, product_id: int, days: Optional[int] = None):
+        """Query das observações de um produto, opcionalmente limitada aos últimos N dias"""
+        query = self.db.query(PriceObservation).filter(PriceObservation.product_id == product_id)
+        if days is not None:
+            cutoff = (datetime.now() - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+            query = query.filter(PriceObservation.observed_at >= cutoff)
+        return query
+    
+    def get_price_history(self, product_id: int, days: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Lista observações de preço em ordem cronológica (histórico completo se days=None)"""
+        try:
+            observations = self._observations_since(product_id, days).order_by(
+                asc(PriceObservation.observed_at)
+            ).all()
+            return [{"observed_at": obs.observed_at, "price": obs.price} for obs in observations]
+        except Exception as e:
+            logger.error(f"Erro ao buscar histórico de preços produto ID {product_id}: {str(e)}")
+            raise
+    
+    def get_latest_price(self, product_id: int) -> Optional[float]:
+        """Retorna o preço mais recente do produto (busca pelo índice product_id/observed_at)"""
+        try:
+            latest = self._observations_since(product_id).order_by(
+                desc(PriceObservation.observed_at)
+            ).first()
+            return latest.price if latest else None
+        except Exception as e:
+            logger.error(f"Erro ao buscar preço atual produto ID {product_id}: {str(e)}")
+            raise
+    
+    def get_price_stats(self, product_id: int, days: Optional[int] = None) -> Dict[str, Any]:
+        """Calcula mínimo, máximo e média de preços em SQL"""
+        try:
+            min_price, max_price, avg_price, count, first_seen, last_seen = self._observations_since(
+                product_id, days
+            ).with_entities(
+                func.min(PriceObservation.price),
+                func.max(PriceObservation.price),
+                func.avg(PriceObservation.price),
+                func.count(PriceObservation.id),
+                func.min(PriceObservation.observed_at),
+                func.max(PriceObservation.observed_at),
+            ).one()
+            
+            return {
+                "min_price": min_price,
+                "max_price": max_price,
+                "avg_price": avg_price,
+                "observations": count,
+                "first_observed": first_seen,
+                "last_observed": last_seen
+            }
+        except Exception as e:
+            logger.error(f"Erro ao calcular estatísticas de preço produto ID {product_id}: {str(e)}")
+            raise
+    
+    def get_moving_average(self, product_id: int, window: int = 7, days: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Média móvel das últimas `window` observações, calculada com window function"""
+        try:
+            moving_avg = func.avg(PriceObservation.price).over(
+                order_by=PriceObservation.observed_at,
+                rows=(-(window - 1), 0)
+            )
+            rows = self._observations_since(product_id, days).with_entities(
+                PriceObservation.observed_at, PriceObservation.price, moving_avg
+            ).order_by(asc(PriceObservation.observed_at)).all()
+            
+            return [
+                {"observed_at": observed_at, "price": price, "moving_average": avg}
+                for observed_at, price, avg in rows
+            ]
+        except Exception as e:
+            logger.error(f"Erro ao calcular média móvel produto ID {product_id}: {str(e)}")
             raise
     
     def get_price_trend(self, product_id: int, days: int = 7) -> Dict[str, Any]:
         """Calcula tendência de preços dos últimos dias"""
         try:
-            product = self.get_product(product_id)
-            if not product or not product.price_history:
-                return {"trend": 0, "percentage": 0, "days_analyzed": 0}
-            
-            # Filtrar últimos N dias
-            cutoff_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-            recent_prices = [
-                entry for entry in product.price_history 
-                if entry.get("date", "") >= cutoff_date
-            ]
+            window = self._observations_since(product_id, days)
+            days_analyzed = window.with_entities(
+                func.count(func.distinct(func.date(PriceObservation.observed_at)))
+            ).scalar() or 0
             
-            if len(recent_prices) < 2:
-                return {"trend": 0, "percentage": 0, "days_analyzed": len(recent_prices)}
+            if days_analyzed < 2:
+                return {"trend": 0, "percentage": 0, "days_analyzed": days_analyzed}
             
-            # Calcular tendência
-            first_price = recent_prices[0]["price"]
-            last_price = recent_prices[-1]["price"]
+            # Primeiro e último preço da janela
+            first_price = window.order_by(asc(PriceObservation.observed_at)).first().price
+            last_price = window.order_by(desc(PriceObservation.observed_at)).first().price
             
             trend = last_price - first_price
             percentage = (trend / first_price) * 100 if first_price > 0 else 0
@@ -252,7 +384,7 @@ class DatabaseManager:
             result = {
                 "trend": trend,
                 "percentage": percentage,
-                "days_analyzed": len(recent_prices),
+                "days_analyzed": days_analyzed,
                 "first_price": first_price,
                 "last_price": last_price
             }
@@ -274,17 +406,21 @@ class DatabaseManager:
             if not product:
                 raise ValueError(f"Produto ID {alert_data.product_id} não encontrado")
             
-            # Verificar se já existe alerta ativo para este produto
+            # Verificar se já existe alerta ativo deste tipo para este produto
             existing_alert = self.db.query(Alert).filter(
                 and_(
                     Alert.product_id == alert_data.product_id,
+                    Alert.alert_type == alert_data.alert_type,
                     Alert.is_active == 1
                 )
             ).first()
             
             if existing_alert:
-                # Atualizar alerta existente
-                existing_alert.threshold_price = alert_data.threshold_price
+                # Atualizar alerta existente (reavaliado do zero na próxima execução)
+                existing_alert.threshold_price = alert_data.threshold_price or 0.0
+                existing_alert.threshold_percent = alert_data.threshold_percent
+                existing_alert.window_days = alert_data.window_days
+                existing_alert.is_triggered = 0
                 self.db.commit()
                 self.db.refresh(existing_alert)
                 
@@ -294,8 +430,12 @@ class DatabaseManager:
                 # Criar novo alerta
                 db_alert = Alert(
                     product_id=alert_data.product_id,
-                    threshold_price=alert_data.threshold_price,
-                    is_active=1
+                    alert_type=alert_data.alert_type,
+                    threshold_price=alert_data.threshold_price or 0.0,
+                    threshold_percent=alert_data.threshold_percent,
+                    window_days=alert_data.window_days,
+                    is_active=1,
+                    is_triggered=0
                 )
                 
                 self.db.add(db_alert)
@@ -338,47 +478,19 @@ class DatabaseManager:
             logger.error(f"Erro ao desativar alerta ID {alert_id}: {str(e)}")
             raise
     
+    def evaluate_alerts(self) -> Dict[str, Any]:
+        """Avalia todos os alertas ativos em uma consulta e persiste as transições de estado"""
+        return AlertEngine(self.db).evaluate()
+    
     def check_price_alerts(self) -> List[Dict[str, Any]]:
-        """Verifica alertas de preço que devem ser disparados"""
-        try:
-            triggered_alerts = []
-            active_alerts = self.get_active_alerts()
-            
-            for alert in active_alerts:
-                product = self.get_product(alert.product_id)
-                if not product or not product.price_history:
-                    continue
-                
-                # Obter preço mais recente
-                latest_price_entry = max(
-                    product.price_history, 
-                    key=lambda x: x.get("date", "")
-                )
-                current_price = latest_price_entry["price"]
-                
-                # Verificar se preço está abaixo do threshold
-                if current_price <= alert.threshold_price:
-                    triggered_alerts.append({
-                        "alert_id": alert.id,
-                        "product_id": product.id,
-                        "product_name": product.product_name,
-                        "current_price": current_price,
-                        "threshold_price": alert.threshold_price,
-                        "savings": alert.threshold_price - current_price
-                    })
-                    
-                    # Marcar alerta como disparado
-                    alert.triggered_at = datetime.utcnow()
-            
-            if triggered_alerts:
-                self.db.commit()
-                logger.info(f"{len(triggered_alerts)} alertas disparados")
-            
-            return triggered_alerts
-            
-        except Exception as e:
-            logger.error(f"Erro ao verificar alertas: {str(e)}")
-            raise
+        """
+        Verifica alertas de preço e retorna todos cuja condição está verdadeira
+
+        Mantém o contrato anterior: um alerta continua na lista enquanto o preço atender
+        à condição, não só na avaliação em que disparou. Para obter apenas os novos
+        disparos, use `evaluate_alerts()["fired"]`.
+        """
+        return self.evaluate_alerts()["triggered"]
     
     # ========== ESTATÍSTICAS ==========
     
@@ -389,9 +501,9 @@ class DatabaseManager:
             active_alerts = self.db.query(Alert).filter(Alert.is_active == 1).count()
             
             # Produtos com histórico de preços
-            products_with_history = self.db.query(Product).filter(
-                Product.price_history.isnot(None)
-            ).count()
+            products_with_history = self.db.query(
+                func.count(func.distinct(PriceObservation.product_id))
+            ).scalar() or 0
             
             # Produtos com tags
             products_with_tags = self.db.query(Product).filter(
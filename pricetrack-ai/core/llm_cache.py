@@ -0,0 +1,193 @@
+"""
+Cache Persistente de Respostas de LLM para PriceTrack AI
+SQLite compartilhado entre sessões e reinícios, com TTL, limite de tamanho e coalescência
+
+Chave: hash de (modelo, prompt normalizado). O arquivo é configurável pela variável
+de ambiente PTAI_LLM_CACHE_PATH e o limite de entradas por PTAI_LLM_CACHE_MAX_ENTRIES.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_CACHE_PATH = os.getenv("PTAI_LLM_CACHE_PATH", "./pricetrack_llm_cache.db")
+DEFAULT_MAX_ENTRIES = int(os.getenv("PTAI_LLM_CACHE_MAX_ENTRIES", "5000"))
+
+# Tempo máximo que uma requisição idêntica aguarda a chamada em andamento
+COALESCE_TIMEOUT_SECONDS = 120
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normaliza espaços em branco do prompt (indentação e quebras de linha não mudam a chave)"""
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+def make_cache_key(model: str, prompt: str) -> str:
+    """Gera a chave do cache a partir do modelo e do prompt normalizado"""
+    return hashlib.sha256(f"{model}\x00{normalize_prompt(prompt)}".encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Cache de respostas de LLM em SQLite.
+
+    - TTL por entrada (expires_at)
+    - Eviction LRU quando o número de entradas excede `max_entries`
+    - Estatísticas de hit/miss/coalescência
+    - Requisições idênticas concorrentes (outras sessões do mesmo servidor) aguardam
+      a chamada em andamento em vez de chamar a API novamente
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._inflight: Dict[str, threading.Event] = {}
+        self._inflight_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "expired": 0, "evictions": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        """Conexão por thread, criada (com o schema) no primeiro uso"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_last_access ON llm_cache(last_access)")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, stat: str) -> None:
+        with self._stats_lock:
+            self._stats[stat] += 1
+
+    def _lookup(self, key: str) -> Optional[str]:
+        """Busca entrada válida; entradas expiradas são removidas"""
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT response, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        response, expires_at = row
+        if expires_at is not None and expires_at <= now:
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._count("expired")
+            return None
+        conn.execute("UPDATE llm_cache SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        return response
+
+    def _store(self, key: str, model: str, response: str, ttl: Optional[float]) -> None:
+        """Grava entrada e aplica o limite de tamanho (remove as menos acessadas)"""
+        conn = self._connect()
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, model, response, created_at, expires_at, last_access, hits) "
+            "VALUES (?, ?, ?, ?, ?, ?, 0)",
+            (key, model, response, now, expires_at, now),
+        )
+        excess = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access LIMIT ?)",
+                (excess,),
+            )
+            with self._stats_lock:
+                self._stats["evictions"] += excess
+
+    def get(self, model: str, prompt: str) -> Optional[str]:
+        """Retorna resposta em cache ou None"""
+        response = self._lookup(make_cache_key(model, prompt))
+        self._count("hits" if response is not None else "misses")
+        return response
+
+    def set(self, model: str, prompt: str, response: str, ttl: Optional[float] = None) -> None:
+        """Armazena resposta (ttl em segundos; None = sem expiração)"""
+        self._store(make_cache_key(model, prompt), model, response, ttl)
+
+    def get_or_compute(self, model: str, prompt: str, compute: Callable[[], str],
+                       ttl: Optional[float] = None) -> str:
+        """
+        Retorna a resposta do cache ou executa `compute` uma única vez por chave.
+
+        Chamadas concorrentes com a mesma chave aguardam a primeira (single flight).
+        Se a chamada líder falhar, quem aguardava executa `compute` por conta própria.
+        """
+        key = make_cache_key(model, prompt)
+        cached = self._lookup(key)
+        if cached is not None:
+            self._count("hits")
+            return cached
+
+        with self._inflight_lock:
+            event = self._inflight.get(key)
+            is_leader = event is None
+            if is_leader:
+                event = self._inflight[key] = threading.Event()
+
+        if not is_leader:
+            event.wait(COALESCE_TIMEOUT_SECONDS)
+            cached = self._lookup(key)
+            if cached is not None:
+                self._count("coalesced")
+                return cached
+
+        try:
+            if is_leader:
+                # Outro líder pode ter gravado a resposta entre a consulta acima e o lock
+                cached = self._lookup(key)
+                if cached is not None:
+                    self._count("coalesced")
+                    return cached
+            self._count("misses")
+            response = compute()
+            self._store(key, model, response, ttl)
+            return response
+        finally:
+            if is_leader:
+                with self._inflight_lock:
+                    self._inflight.pop(key, None)
+                event.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Estatísticas de uso do cache (contadores do processo + entradas em disco)"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        entries = self._connect().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        requests = stats["hits"] + stats["coalesced"] + stats["misses"]
+        stats["entries"] = entries
+        stats["hit_rate"] = (stats["hits"] + stats["coalesced"]) / requests if requests else 0.0
+        return stats
+
+    def purge_expired(self) -> int:
+        """Remove entradas expiradas e retorna quantas foram removidas"""
+        cursor = self._connect().execute(
+            "DELETE FROM llm_cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        )
+        return cursor.rowcount
+
+    def clear(self) -> None:
+        """Remove todas as entradas"""
+        self._connect().execute("DELETE FROM llm_cache")
+        logger.info("Cache de LLM limpo")
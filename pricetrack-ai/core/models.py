@@ -3,18 +3,25 @@ Modelos de Dados para PriceTrack AI
 Usando SQLAlchemy ORM com validação Pydantic
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, create_engine
+from sqlalchemy import (
+    Column, Integer, String, Float, DateTime, Text, ForeignKey, Index,
+    create_engine, inspect, text,
+)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from pydantic import BaseModel, Field, field_validator
+from sqlalchemy.orm import sessionmaker, relationship
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import List, Dict, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
+import unicodedata
 
 
 # Base SQLAlchemy
 Base = declarative_base()
 
+# Janela padrão de Product.price_history; histórico mais antigo via price_history_page()
+PRICE_HISTORY_DAYS = 365
+
 
 class Product(Base):
     """Modelo de Produto no banco de dados"""
@@ -22,30 +29,120 @@ class Product(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     product_name = Column(String(255), unique=True, nullable=False, index=True)
-    tags = Column(String(500), nullable=True)  # Tags separadas por vírgula
-    price_history = Column(JSON, nullable=True)  # Lista de dicts {date: str, price: float}
+    tags = Column(String(500), nullable=True)  # Tags separadas por vírgula (normalizadas em product_tags)
+    ai_summary = Column(Text, nullable=True)  # Último resumo gerado pela IA (indexado na busca)
     alert_threshold = Column(Float, nullable=True, default=0.0)
     user_rating = Column(Integer, nullable=True)  # Rating manual 1-5
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    observations = relationship(
+        "PriceObservation",
+        order_by="PriceObservation.observed_at",
+        cascade="all, delete-orphan",
+        lazy="dynamic",  # consultado por janela, nunca carregado inteiro
+    )
+    tag_links = relationship("ProductTag", cascade="all, delete-orphan")
+
+    @property
+    def price_history(self) -> List[Dict]:
+        """Histórico diário [{date, price}] dos últimos PRICE_HISTORY_DAYS dias (último preço do dia)"""
+        return self.price_history_page()
+
+    def price_history_page(self, before: Optional[datetime] = None, days: int = PRICE_HISTORY_DAYS) -> List[Dict]:
+        """
+        Página do histórico diário: observações dos `days` dias anteriores a `before`
+
+        Sem `before`, a página termina agora. Para páginas mais antigas, passe a data
+        do primeiro item da página anterior (ex.: datetime.fromisoformat(page[0]["date"])).
+        """
+        query = self.observations
+        if before is not None:
+            query = query.filter(PriceObservation.observed_at < before)
+        cutoff = ((before or datetime.now()) - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+        daily: Dict[str, float] = {}
+        for obs in query.filter(PriceObservation.observed_at >= cutoff):
+            daily[obs.observed_at.strftime('%Y-%m-%d')] = obs.price
+        return [{"date": day, "price": price} for day, price in daily.items()]
     
     def __repr__(self):
         return f"<Product(id={self.id}, name='{self.product_name}')>"
 
 
+class PriceObservation(Base):
+    """Observação de preço (append-only), indexada por (product_id, observed_at)"""
+    __tablename__ = 'price_observations'
+    __table_args__ = (
+        Index('ix_price_observations_product_observed', 'product_id', 'observed_at'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey('products.id', ondelete='CASCADE'), nullable=False)
+    price = Column(Float, nullable=False)
+    observed_at = Column(DateTime, nullable=False, default=datetime.now)  # Horário local, como o histórico legado
+
+    def __repr__(self):
+        return f"<PriceObservation(product_id={self.product_id}, price={self.price}, observed_at={self.observed_at})>"
+
+
+class Tag(Base):
+    """Tag normalizada (minúsculas, sem acentos) compartilhada entre produtos"""
+    __tablename__ = 'tags'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), unique=True, nullable=False)  # Chave normalizada
+    label = Column(String(100), nullable=False)  # Forma exibida
+
+    def __repr__(self):
+        return f"<Tag(id={self.id}, name='{self.name}')>"
+
+
+class ProductTag(Base):
+    """Associação produto ↔ tag"""
+    __tablename__ = 'product_tags'
+    __table_args__ = (
+        Index('ix_product_tags_tag_product', 'tag_id', 'product_id'),
+    )
+
+    product_id = Column(Integer, ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    tag_id = Column(Integer, ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True)
+
+
+def normalize_tag(tag: str) -> str:
+    """Normaliza tag para comparação: minúsculas, sem acentos e espaços extras"""
+    folded = unicodedata.normalize('NFKD', tag.strip().lower())
+    return ' '.join(''.join(ch for ch in folded if not unicodedata.combining(ch)).split())
+
+
+# Tipos de alerta suportados pelo motor de avaliação (core/alert_engine.py)
+ALERT_TYPES = {
+    "below_price": "Preço abaixo do threshold",
+    "percent_drop": "Queda percentual em relação ao máximo da janela",
+    "all_time_low": "Menor preço de todo o histórico",
+    "ma_crossover": "Preço cruza abaixo da média móvel",
+}
+
+# Janela padrão (dias) para tipos que dependem de janela
+DEFAULT_ALERT_WINDOWS = {"percent_drop": 30, "ma_crossover": 7}
+
+
 class Alert(Base):
     """Modelo de Alerta para notificações"""
     __tablename__ = 'alerts'
     
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, nullable=False, index=True)
-    threshold_price = Column(Float, nullable=False)
+    alert_type = Column(String(32), nullable=False, default='below_price')
+    threshold_price = Column(Float, nullable=False, default=0.0)  # Usado por below_price
+    threshold_percent = Column(Float, nullable=True)  # Usado por percent_drop
+    window_days = Column(Integer, nullable=True)  # Usado por percent_drop e ma_crossover
     is_active = Column(Integer, default=1)  # 1 = ativo, 0 = inativo
+    is_triggered = Column(Integer, nullable=False, default=0)  # Estado da condição na última avaliação
     created_at = Column(DateTime, default=datetime.utcnow)
     triggered_at = Column(DateTime, nullable=True)
     
     def __repr__(self):
-        return f"<Alert(id={self.id}, product_id={self.product_id}, threshold={self.threshold_price})>"
+        return f"<Alert(id={self.id}, product_id={self.product_id}, type={self.alert_type}, threshold={self.threshold_price})>"
 
 
 class AppSetting(Base):
@@ -134,22 +231,46 @@ class ProductResponse(BaseModel):
 class AlertCreate(BaseModel):
     """Modelo para criação de alerta"""
     product_id: int = Field(..., gt=0)
-    threshold_price: float = Field(..., gt=0)
+    alert_type: str = Field('below_price')
+    threshold_price: Optional[float] = Field(None, gt=0)
+    threshold_percent: Optional[float] = Field(None, gt=0, lt=100)
+    window_days: Optional[int] = Field(None, ge=1, le=365)
+    
+    @field_validator('alert_type')
+    @classmethod
+    def validate_alert_type(cls, v):
+        if v not in ALERT_TYPES:
+            raise ValueError(f"Tipo de alerta inválido: {v}")
+        return v
     
     @field_validator('threshold_price')
     @classmethod
     def validate_threshold(cls, v):
-        if v <= 0:
+        if v is not None and v <= 0:
             raise ValueError('Preço de alerta deve ser maior que zero')
         return v
+    
+    @model_validator(mode='after')
+    def validate_parameters(self):
+        if self.alert_type == 'below_price' and self.threshold_price is None:
+            raise ValueError('Alerta below_price exige threshold_price')
+        if self.alert_type == 'percent_drop' and self.threshold_percent is None:
+            raise ValueError('Alerta percent_drop exige threshold_percent')
+        if self.window_days is None and self.alert_type in DEFAULT_ALERT_WINDOWS:
+            self.window_days = DEFAULT_ALERT_WINDOWS[self.alert_type]
+        return self
 
 
 class AlertResponse(BaseModel):
     """Modelo para resposta de alerta"""
     id: int
     product_id: int
+    alert_type: str
     threshold_price: float
+    threshold_percent: Optional[float]
+    window_days: Optional[int]
     is_active: int
+    is_triggered: int
     created_at: datetime
     triggered_at: Optional[datetime]
     
@@ -169,9 +290,133 @@ engine = create_engine(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
-def create_tables():
-    """Cria todas as tabelas no banco de dados"""
-    Base.metadata.create_all(bind=engine)
+def create_tables(bind=None):
+    """Cria todas as tabelas no banco de dados e aplica as migrações pendentes"""
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    migrate_price_history(bind)
+    migrate_alert_columns(bind)
+    migrate_search_index(bind)
+
+
+def migrate_price_history(bind=None) -> int:
+    """
+    Migra o histórico legado (coluna JSON products.price_history) para price_observations.
+    Idempotente: após copiar as entradas, a coluna legada é zerada.
+    Retorna o número de observações inseridas.
+    """
+    bind = bind or engine
+    columns = {col["name"] for col in inspect(bind).get_columns("products")}
+    if "price_history" not in columns:
+        return 0
+
+    inserted = 0
+    with bind.begin() as conn:
+        rows = conn.execute(
+            text("SELECT id, price_history FROM products WHERE price_history IS NOT NULL")
+        ).all()
+        for product_id, raw_history in rows:
+            entries = json.loads(raw_history) if isinstance(raw_history, str) else (raw_history or [])
+            observations = []
+            for entry in entries:
+                try:
+                    observed_at = datetime.strptime(entry["date"], '%Y-%m-%d')
+                    price = float(entry["price"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                observations.append({"product_id": product_id, "price": price, "observed_at": observed_at})
+            if observations:
+                conn.execute(PriceObservation.__table__.insert(), observations)
+                inserted += len(observations)
+        conn.execute(text("UPDATE products SET price_history = NULL WHERE price_history IS NOT NULL"))
+    return inserted
+
+
+def _add_missing_columns(bind, table: str, columns: Dict[str, str]) -> None:
+    """Adiciona colunas (nome -> DDL) ausentes em tabelas criadas por versões anteriores"""
+    existing = {col["name"] for col in inspect(bind).get_columns(table)}
+    with bind.begin() as conn:
+        for name, ddl in columns.items():
+            if name not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+
+def migrate_alert_columns(bind=None) -> None:
+    """Adiciona à tabela alerts as colunas de tipo/estado em bancos criados antes delas"""
+    _add_missing_columns(bind or engine, "alerts", {
+        "alert_type": "VARCHAR(32) NOT NULL DEFAULT 'below_price'",
+        "threshold_percent": "FLOAT",
+        "window_days": "INTEGER",
+        "is_triggered": "INTEGER NOT NULL DEFAULT 0",
+    })
+
+
+# Índice FTS5 (external content sobre products) mantido por triggers.
+# remove_diacritics 2 torna a busca insensível a acentos ("eletronico" encontra "eletrônico").
+SEARCH_INDEX_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        product_name, tags, ai_summary,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, product_name, tags, ai_summary)
+        VALUES (new.id, new.product_name, new.tags, new.ai_summary);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, product_name, tags, ai_summary)
+        VALUES ('delete', old.id, old.product_name, old.tags, old.ai_summary);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF product_name, tags, ai_summary ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, product_name, tags, ai_summary)
+        VALUES ('delete', old.id, old.product_name, old.tags, old.ai_summary);
+        INSERT INTO products_fts(rowid, product_name, tags, ai_summary)
+        VALUES (new.id, new.product_name, new.tags, new.ai_summary);
+    END
+    """,
+]
+
+
+def migrate_search_index(bind=None) -> None:
+    """
+    Cria o índice de busca (FTS5 + product_tags) e o popula a partir dos dados existentes.
+    Executado apenas quando o índice ainda não existe.
+    """
+    bind = bind or engine
+    _add_missing_columns(bind, "products", {"ai_summary": "TEXT"})
+    if "products_fts" in inspect(bind).get_table_names():
+        return
+
+    with bind.begin() as conn:
+        for ddl in SEARCH_INDEX_DDL:
+            conn.execute(text(ddl))
+        conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+
+        # Backfill da associação produto <-> tag a partir da coluna texto
+        tag_ids: Dict[str, int] = {}
+        links = set()
+        for product_id, tags in conn.execute(text("SELECT id, tags FROM products WHERE tags IS NOT NULL")).all():
+            for label in (t.strip() for t in tags.split(',')):
+                name = normalize_tag(label)
+                if not name:
+                    continue
+                if name not in tag_ids:
+                    tag_ids[name] = conn.execute(
+                        Tag.__table__.insert().values(name=name, label=label)
+                    ).inserted_primary_key[0]
+                links.add((product_id, tag_ids[name]))
+        if links:
+            conn.execute(
+                ProductTag.__table__.insert(),
+                [{"product_id": product_id, "tag_id": tag_id} for product_id, tag_id in links]
+            )
 
 
 def get_db():
@@ -0,0 +1,230 @@
+"""
+Worker de Atualização de Preços em Lote para PriceTrack AI
+Atualiza todo o catálogo em segundo plano, sem depender de interação nas páginas
+
+Uso:
+    python -m core.price_refresh --source stub --once
+    python -m core.price_refresh --source gemini --interval 60 --workers 4 --rate 1
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from core.database import DatabaseManager
+from core.logger import get_logger, log_performance
+from core.models import Product, SessionLocal, create_tables
+
+logger = get_logger(__name__)
+
+
+class RateLimiter:
+    """Limitador de taxa thread-safe (requisições por segundo, sem rajadas)"""
+
+    def __init__(self, rate_per_second: Optional[float]):
+        self.interval = 1.0 / rate_per_second if rate_per_second else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Bloqueia até o próximo horário livre"""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class PriceSource(ABC):
+    """Fonte de preços: subclasses implementam `fetch_price`"""
+
+    name = "base"
+    rate_limit: Optional[float] = None  # Requisições por segundo (None = sem limite)
+
+    @abstractmethod
+    def fetch_price(self, product_name: str) -> Optional[float]:
+        """Preço atual do produto, ou None se não encontrado"""
+
+
+class StubPriceSource(PriceSource):
+    """
+    Fonte offline para testes e desenvolvimento.
+    Preço base determinístico por produto, com variação aleatória de até `volatility`.
+    """
+
+    name = "stub"
+
+    def __init__(self, volatility: float = 0.05, latency: float = 0.0,
+                 rate_limit: Optional[float] = None, seed: Optional[int] = None):
+        self.volatility = volatility
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def fetch_price(self, product_name: str) -> Optional[float]:
+        if self.latency:
+            time.sleep(self.latency)
+        digest = int(hashlib.md5(product_name.encode("utf-8")).hexdigest()[:8], 16)
+        base_price = 50 + digest % 5000
+        with self._lock:
+            variation = self._random.uniform(-self.volatility, self.volatility)
+        return round(base_price * (1 + variation), 2)
+
+
+class GeminiPriceSource(PriceSource):
+    """Fonte baseada na busca simulada do Gemini (oferta de maior score)"""
+
+    name = "gemini"
+
+    def __init__(self, rate_limit: Optional[float] = 1.0):
+        from core.ai_services import gemini_service
+        self.service = gemini_service
+        self.rate_limit = rate_limit
+
+    def fetch_price(self, product_name: str) -> Optional[float]:
+        # Sem cache de respostas: um preço de até 30 min atrás seria gravado como observação nova
+        offers = self.service.search_products_with_gemini(product_name, use_cache=False)
+        priced = [offer for offer in offers if isinstance(offer.get("price"), (int, float)) and offer["price"] > 0]
+        if not priced:
+            return None
+        return float(max(priced, key=lambda offer: offer.get("score", 0))["price"])
+
+
+PRICE_SOURCES: Dict[str, Callable[[], PriceSource]] = {
+    "stub": StubPriceSource,
+    "gemini": GeminiPriceSource,
+}
+
+
+class PriceRefreshWorker:
+    """
+    Atualiza o preço de todos os produtos monitorados.
+
+    Os preços são buscados com concorrência limitada (`max_workers`) e respeitando o
+    rate limit da fonte; cada lote é gravado em uma única transação e, em seguida,
+    os alertas são avaliados uma vez.
+    """
+
+    def __init__(self, source: PriceSource, session_factory: Callable[[], Session] = SessionLocal,
+                 max_workers: int = 4, batch_size: int = 200):
+        self.source = source
+        self.session_factory = session_factory
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.rate_limiter = RateLimiter(source.rate_limit)
+
+    def _fetch(self, product: Tuple[int, str]) -> Tuple[int, Optional[float]]:
+        """Busca o preço de um produto (executado nas threads do pool)"""
+        product_id, product_name = product
+        self.rate_limiter.acquire()
+        try:
+            return product_id, self.source.fetch_price(product_name)
+        except Exception as e:
+            logger.warning(f"Falha ao buscar preço de '{product_name}' ({self.source.name}): {str(e)}")
+            return product_id, None
+
+    def run_once(self) -> Dict[str, Any]:
+        """Executa um ciclo completo de atualização e retorna o relatório"""
+        start_time = time.time()
+        report = {"source": self.source.name, "products": 0, "refreshed": 0, "failed": 0,
+                  "batches": 0, "alerts_fired": 0}
+
+        db = self.session_factory()
+        try:
+            db_manager = DatabaseManager(db)
+            products = db.query(Product.id, Product.product_name).order_by(Product.id).all()
+            report["products"] = len(products)
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for offset in range(0, len(products), self.batch_size):
+                    batch = products[offset:offset + self.batch_size]
+                    observed_at = datetime.now()
+                    observations = [
+                        {"product_id": product_id, "price": price, "observed_at": observed_at}
+                        for product_id, price in executor.map(self._fetch, batch)
+                        if price is not None
+                    ]
+
+                    db_manager.add_price_observations(observations)
+                    report["refreshed"] += len(observations)
+                    report["failed"] += len(batch) - len(observations)
+                    report["batches"] += 1
+                    report["alerts_fired"] += len(db_manager.evaluate_alerts()["fired"])
+        finally:
+            db.close()
+
+        duration = time.time() - start_time
+        report["duration_s"] = duration
+        report["products_per_second"] = report["products"] / duration if duration > 0 else 0.0
+
+        log_performance(
+            logger, "price_refresh", duration,
+            source=self.source.name, products=report["products"], refreshed=report["refreshed"],
+            failed=report["failed"], products_per_second=f"{report['products_per_second']:.1f}"
+        )
+        return report
+
+    def run_forever(self, interval_minutes: float) -> None:
+        """Agenda ciclos a cada `interval_minutes` (intervalo contado do início do ciclo)"""
+        logger.info(f"Worker de preços iniciado | fonte={self.source.name} | intervalo={interval_minutes} min")
+        while True:
+            started = time.monotonic()
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Erro no ciclo de atualização de preços: {str(e)}")
+            time.sleep(max(0.0, interval_minutes * 60 - (time.monotonic() - started)))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Atualiza em lote os preços de todos os produtos monitorados.")
+    parser.add_argument("--source", choices=sorted(PRICE_SOURCES), default="stub", help="Fonte de preços")
+    parser.add_argument("--workers", type=int, default=4, help="Buscas simultâneas")
+    parser.add_argument("--rate", type=float, default=None, help="Limite de requisições/s da fonte")
+    parser.add_argument("--batch-size", type=int, default=200, help="Produtos gravados por transação")
+    parser.add_argument("--interval", type=float, default=60, help="Intervalo entre ciclos em minutos")
+    parser.add_argument("--once", action="store_true", help="Executa um único ciclo e sai")
+    args = parser.parse_args(argv)
+
+    source = PRICE_SOURCES[args.source]()
+    if args.rate is not None:
+        source.rate_limit = args.rate
+    if args.source == "gemini":
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            parser.error("Defina GEMINI_API_KEY para usar a fonte gemini.")
+        source.service.configure_api_key(api_key)
+
+    create_tables()
+    worker = PriceRefreshWorker(source, max_workers=args.workers, batch_size=args.batch_size)
+
+    if args.once:
+        report = worker.run_once()
+        print(
+            f"{report['refreshed']}/{report['products']} produtos atualizados em {report['duration_s']:.2f}s "
+            f"({report['products_per_second']:.1f} produtos/s), {report['alerts_fired']} alertas disparados"
+        )
+        return 0
+
+    try:
+        worker.run_forever(args.interval)
+    except KeyboardInterrupt:
+        logger.info("Worker de preços encerrado")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -206,6 +206,8 @@ def display_ai_analysis_tabs(product_id: int):
                         st.error("Produto não encontrado.")
                         return
                     summary = generate_summary(product.product_name)
+                    # Persistir resumo para a busca full-text
+                    db_manager.update_product_summary(product.id, summary)
                 st.markdown(summary)
                 
                 log_user_action(logger, f"Resumo gerado para: {product.product_name}")
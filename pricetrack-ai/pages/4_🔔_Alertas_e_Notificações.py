@@ -8,7 +8,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 from core.logger import get_logger, log_user_action
-from core.models import create_tables, SessionLocal, AlertCreate, ProductUpdate
+from core.models import create_tables, SessionLocal, AlertCreate, ProductUpdate, ALERT_TYPES
 from core.database import DatabaseManager, DatabaseTransaction
 from core.ai_services import suggest_threshold
 from core.utils import (
@@ -47,9 +47,14 @@ def display_alerts_overview():
                 st.metric("Produtos Monitorados", stats['total_products'])
             
             with col3:
-                # Verificar alertas disparados
-                triggered_alerts = db_manager.check_price_alerts()
-                st.metric("Alertas Disparados", len(triggered_alerts))
+                # Avaliar alertas (novos disparos são persistidos apenas na transição)
+                evaluation = db_manager.evaluate_alerts()
+                triggered_alerts = evaluation["triggered"]
+                st.metric(
+                    "Alertas Disparados",
+                    len(triggered_alerts),
+                    delta=f"+{len(evaluation['fired'])} novos" if evaluation["fired"] else None
+                )
             
             with col4:
                 # Calcular taxa de sucesso (simulada)
@@ -82,19 +87,22 @@ def display_active_alerts(active_alerts):
                     continue
                 
                 # Obter preço atual
-                current_price = "N/A"
-                if product.price_history:
-                    latest_price = max(product.price_history, key=lambda x: x.get("date", ""))
-                    current_price = latest_price["price"]
+                latest_price = db_manager.get_latest_price(product.id)
+                current_price = latest_price if latest_price is not None else "N/A"
+                is_price_alert = alert.alert_type == 'below_price'
                 
                 with st.container():
                     col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
                     
                     with col1:
+                        if is_price_alert:
+                            condition = f"🎯 Threshold: {format_currency(alert.threshold_price)}"
+                        else:
+                            condition = f"🎯 {ALERT_TYPES[alert.alert_type]}"
                         st.markdown(f"""
                         **{product.product_name}**
                         
-                        🎯 Threshold: {format_currency(alert.threshold_price)}
+                        {condition}
                         """)
                     
                     with col2:
@@ -104,32 +112,35 @@ def display_active_alerts(active_alerts):
                             st.metric("Preço Atual", "N/A")
                     
                     with col3:
-                        if current_price != "N/A" and current_price <= alert.threshold_price:
+                        if is_price_alert and current_price != "N/A" and current_price <= alert.threshold_price:
                             savings = alert.threshold_price - current_price
                             st.metric("Economia", format_currency(savings))
                         else:
                             st.metric("Economia", "N/A")
                     
                     with col4:
-                        # Slider para ajustar threshold
-                        new_threshold = st.slider(
-                            "Ajustar Threshold",
-                            min_value=0.0,
-                            max_value=float(current_price * 2) if current_price != "N/A" else 1000.0,
-                            value=float(alert.threshold_price),
-                            step=10.0,
-                            key=f"threshold_{alert.id}"
-                        )
+                        if not is_price_alert:
+                            st.caption(f"Janela: {alert.window_days or '-'} dias")
+                        else:
+                            # Slider para ajustar threshold
+                            new_threshold = st.slider(
+                                "Ajustar Threshold",
+                                min_value=0.0,
+                                max_value=float(current_price * 2) if current_price != "N/A" else 1000.0,
+                                value=float(alert.threshold_price),
+                                step=10.0,
+                                key=f"threshold_{alert.id}"
+                            )
                         
-                        if new_threshold != alert.threshold_price:
-                            if st.button("💾 Salvar", key=f"save_{alert.id}"):
-                                try:
-                                    update_data = ProductUpdate(alert_threshold=new_threshold)
-                                    db_manager.update_product(product.id, update_data)
-                                    st.success("Threshold atualizado!")
-                                    st.rerun()
-                                except Exception as e:
-                                    st.error(f"Erro ao atualizar: {e}")
+                            if new_threshold != alert.threshold_price:
+                                if st.button("💾 Salvar", key=f"save_{alert.id}"):
+                                    try:
+                                        update_data = ProductUpdate(alert_threshold=new_threshold)
+                                        db_manager.update_product(product.id, update_data)
+                                        st.success("Threshold atualizado!")
+                                        st.rerun()
+                                    except Exception as e:
+                                        st.error(f"Erro ao atualizar: {e}")
                     
                     # Botão para desativar
                     if st.button("❌ Desativar Alerta", key=f"deactivate_{alert.id}"):
@@ -153,18 +164,22 @@ def display_triggered_alerts(triggered_alerts):
         return
     
     st.subheader("🚨 Alertas Disparados")
-    st.markdown("Estes alertas foram ativados porque o preço caiu abaixo do threshold!")
+    st.markdown("Estes alertas foram ativados porque a condição de preço foi atingida!")
     
     for alert in triggered_alerts:
         with st.container():
             col1, col2, col3 = st.columns([2, 1, 1])
             
             with col1:
+                if alert['alert_type'] == 'below_price':
+                    target_line = f"🎯 Threshold: {format_currency(alert['threshold_price'])}"
+                else:
+                    target_line = f"🎯 {ALERT_TYPES[alert['alert_type']]}: {format_currency(alert['reference_price'])}"
                 st.markdown(f"""
                 **🎯 {alert['product_name']}**
                 
                 💰 Preço atual: {format_currency(alert['current_price'])}
-                🎯 Threshold: {format_currency(alert['threshold_price'])}
+                {target_line}
                 """)
             
             with col2:
@@ -220,60 +235,87 @@ def display_alert_configuration():
             
             selected_product = product_options[selected_name]
             
-            # Verificar se já tem alerta ativo
+            # Tipo de alerta
+            alert_type = st.selectbox(
+                "Tipo de alerta:",
+                options=list(ALERT_TYPES.keys()),
+                format_func=lambda key: ALERT_TYPES[key]
+            )
+            
+            # Verificar se já tem alerta ativo deste tipo
             existing_alerts = db_manager.get_active_alerts()
-            has_active_alert = any(alert.product_id == selected_product.id for alert in existing_alerts)
+            has_active_alert = any(
+                alert.product_id == selected_product.id and alert.alert_type == alert_type
+                for alert in existing_alerts
+            )
             
             if has_active_alert:
-                st.info("Este produto já possui um alerta ativo. Use a seção acima para ajustá-lo.")
+                st.info("Este produto já possui um alerta ativo deste tipo. Use a seção acima para ajustá-lo.")
                 return
             
-            # Configuração do threshold
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.markdown("**Configuração Manual:**")
-                manual_threshold = st.number_input(
-                    "Threshold (R$):",
-                    min_value=0.0,
-                    max_value=10000.0,
-                    step=10.0,
-                    value=0.0
-                )
+            manual_threshold, threshold_percent, window_days = 0.0, None, None
             
-            with col2:
-                st.markdown("**Sugestão da IA:**")
-                if st.button("🤖 Sugerir Threshold"):
-                    with st.spinner("Artemis está calculando..."):
-                        try:
-                            suggested = suggest_threshold(selected_product.product_name)
-                            st.success(f"Threshold sugerido: {format_currency(suggested)}")
-                            
-                            # Atualizar o input manual
-                            st.session_state[f"threshold_{selected_product.id}"] = suggested
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"Erro ao sugerir threshold: {e}")
+            if alert_type == 'below_price':
+                # Configuração do threshold
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    st.markdown("**Configuração Manual:**")
+                    manual_threshold = st.number_input(
+                        "Threshold (R$):",
+                        min_value=0.0,
+                        max_value=10000.0,
+                        step=10.0,
+                        value=0.0
+                    )
+                
+                with col2:
+                    st.markdown("**Sugestão da IA:**")
+                    if st.button("🤖 Sugerir Threshold"):
+                        with st.spinner("Artemis está calculando..."):
+                            try:
+                                suggested = suggest_threshold(selected_product.product_name)
+                                st.success(f"Threshold sugerido: {format_currency(suggested)}")
+                                
+                                # Atualizar o input manual
+                                st.session_state[f"threshold_{selected_product.id}"] = suggested
+                                st.rerun()
+                            except Exception as e:
+                                st.error(f"Erro ao sugerir threshold: {e}")
+            elif alert_type == 'percent_drop':
+                col1, col2 = st.columns(2)
+                with col1:
+                    threshold_percent = st.number_input("Queda mínima (%):", min_value=1.0, max_value=99.0, value=10.0, step=1.0)
+                with col2:
+                    window_days = st.number_input("Janela (dias):", min_value=1, max_value=365, value=30)
+            elif alert_type == 'ma_crossover':
+                window_days = st.number_input("Janela da média móvel (dias):", min_value=1, max_value=365, value=7)
             
             # Botão para criar alerta
             if st.button("🔔 Criar Alerta", use_container_width=True):
                 try:
                     threshold = manual_threshold
                     
-                    if threshold <= 0:
+                    if alert_type == 'below_price' and threshold <= 0:
                         st.error("Threshold deve ser maior que zero!")
                         return
                     
                     # Criar alerta
                     alert_data = AlertCreate(
                         product_id=selected_product.id,
-                        threshold_price=threshold
+                        alert_type=alert_type,
+                        threshold_price=threshold if alert_type == 'below_price' else None,
+                        threshold_percent=threshold_percent,
+                        window_days=window_days
                     )
                     
                     new_alert = db_manager.create_alert(alert_data)
                     
                     st.success(f"✅ Alerta criado para {selected_product.product_name}!")
-                    st.info(f"🎯 Threshold: {format_currency(threshold)}")
+                    if alert_type == 'below_price':
+                        st.info(f"🎯 Threshold: {format_currency(threshold)}")
+                    else:
+                        st.info(f"🎯 {ALERT_TYPES[alert_type]}")
                     
                     log_user_action(logger, f"Alerta criado para: {selected_product.product_name}")
                     st.rerun()
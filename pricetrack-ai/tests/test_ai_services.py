@@ -288,6 +288,7 @@ class TestDatabaseManager:
         db_manager.db.add = Mock()
         db_manager.db.commit = Mock()
         db_manager.db.refresh = Mock()
+        db_manager.db.query.return_value.filter.return_value.all.return_value = []  # Nenhuma tag existente
         
         with patch('core.database.Product', return_value=mock_product):
             result = db_manager.create_product(product_data)
@@ -0,0 +1,270 @@
+"""
+Testes de integração do DatabaseManager com SQLite em memória
+Foco em histórico de preços, consultas SQL, avaliação de alertas e busca
+"""
+
+import itertools
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from core.models import (
+    Product, PriceObservation, Alert, ALERT_TYPES,
+    ProductCreate, ProductUpdate, AlertCreate, create_tables, migrate_price_history,
+)
+from core.database import DatabaseManager
+
+
+@pytest.fixture
+def engine():
+    """Engine SQLite em memória compartilhada entre conexões"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    create_tables(engine)
+    return engine
+
+
+@pytest.fixture
+def db_manager(engine):
+    """DatabaseManager com sessão real"""
+    session = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        yield DatabaseManager(session)
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def product(db_manager):
+    """Produto de exemplo"""
+    return db_manager.create_product(ProductCreate(product_name="iPhone 15", tags="smartphone, apple"))
+
+
+class TestPriceObservations:
+    """Testes para histórico de preços normalizado"""
+
+    def test_update_price_history_appends(self, db_manager, product):
+        now = datetime.now()
+        assert db_manager.update_price_history(product.id, 100.0, observed_at=now - timedelta(days=400))
+        assert db_manager.update_price_history(product.id, 90.0, observed_at=now)
+
+        history = db_manager.get_price_history(product.id)
+        assert [entry["price"] for entry in history] == [100.0, 90.0]
+        assert db_manager.get_latest_price(product.id) == 90.0
+
+    def test_update_price_history_unknown_product(self, db_manager):
+        assert db_manager.update_price_history(999, 10.0) is False
+
+    def test_price_history_property_keeps_last_price_per_day(self, db_manager, product):
+        today = datetime.now().replace(hour=8)
+        db_manager.update_price_history(product.id, 120.0, observed_at=today - timedelta(days=1))
+        db_manager.update_price_history(product.id, 110.0, observed_at=today)
+        db_manager.update_price_history(product.id, 105.0, observed_at=today + timedelta(hours=2))
+
+        db_manager.db.expire_all()
+        history = db_manager.get_product(product.id).price_history
+        assert [entry["price"] for entry in history] == [120.0, 105.0]
+        assert history[-1]["date"] == today.strftime('%Y-%m-%d')
+
+    def test_price_history_property_is_bounded_and_pages_back(self, db_manager, product):
+        now = datetime.now().replace(hour=8)
+        for days_ago in (1000, 700, 370, 10, 0):
+            db_manager.update_price_history(product.id, float(days_ago), observed_at=now - timedelta(days=days_ago))
+
+        db_manager.db.expire_all()
+        loaded = db_manager.get_product(product.id)
+        recent = loaded.price_history
+        assert [entry["price"] for entry in recent] == [10.0, 0.0]
+
+        older = loaded.price_history_page(before=datetime.fromisoformat(recent[0]["date"]))
+        assert [entry["price"] for entry in older] == [370.0]
+        oldest = loaded.price_history_page(before=datetime.fromisoformat(older[0]["date"]), days=3650)
+        assert [entry["price"] for entry in oldest] == [1000.0, 700.0]
+
+    def test_price_stats_and_trend(self, db_manager, product):
+        now = datetime.now()
+        for days_ago, price in [(3, 100.0), (2, 80.0), (1, 120.0), (0, 90.0)]:
+            db_manager.update_price_history(product.id, price, observed_at=now - timedelta(days=days_ago))
+
+        stats = db_manager.get_price_stats(product.id)
+        assert stats["min_price"] == 80.0
+        assert stats["max_price"] == 120.0
+        assert stats["avg_price"] == pytest.approx(97.5)
+        assert stats["observations"] == 4
+
+        trend = db_manager.get_price_trend(product.id, days=7)
+        assert trend["days_analyzed"] == 4
+        assert trend["first_price"] == 100.0
+        assert trend["last_price"] == 90.0
+        assert trend["percentage"] == pytest.approx(-10.0)
+
+    def test_moving_average(self, db_manager, product):
+        now = datetime.now()
+        for days_ago, price in [(2, 10.0), (1, 20.0), (0, 30.0)]:
+            db_manager.update_price_history(product.id, price, observed_at=now - timedelta(days=days_ago))
+
+        averages = [row["moving_average"] for row in db_manager.get_moving_average(product.id, window=2)]
+        assert averages == pytest.approx([10.0, 15.0, 25.0])
+
+    def test_migrate_legacy_json_history(self, engine, db_manager, product):
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE products ADD COLUMN price_history JSON"))
+            conn.execute(
+                text("UPDATE products SET price_history = :history WHERE id = :id"),
+                {"history": '[{"date": "2024-01-01", "price": 50.0}, {"date": "2024-01-02", "price": 45.0}]',
+                 "id": product.id},
+            )
+
+        assert migrate_price_history(engine) == 2
+        assert migrate_price_history(engine) == 0
+        assert [entry["price"] for entry in db_manager.get_price_history(product.id)] == [50.0, 45.0]
+
+
+class TestAlertEngine:
+    """Testes para avaliação set-based de alertas"""
+
+    def _add_prices(self, db_manager, product_id, prices):
+        now = datetime.now()
+        for days_ago, price in zip(range(len(prices) - 1, -1, -1), prices):
+            db_manager.update_price_history(product_id, price, observed_at=now - timedelta(days=days_ago))
+
+    def test_below_price_fires_only_on_transition(self, db_manager, product):
+        self._add_prices(db_manager, product.id, [120.0, 95.0])
+        db_manager.create_alert(AlertCreate(product_id=product.id, threshold_price=100.0))
+
+        first = db_manager.evaluate_alerts()
+        assert [alert["product_id"] for alert in first["fired"]] == [product.id]
+        assert first["fired"][0]["savings"] == pytest.approx(5.0)
+        assert first["evaluated"] == 1
+
+        # Condição continua verdadeira: não dispara de novo
+        second = db_manager.evaluate_alerts()
+        assert second["fired"] == []
+        assert len(second["triggered"]) == 1
+
+        # Preço volta a subir: estado é resetado e um novo cruzamento dispara novamente
+        db_manager.update_price_history(product.id, 130.0)
+        assert db_manager.evaluate_alerts()["reset"] == 1
+        db_manager.update_price_history(product.id, 90.0, observed_at=datetime.now() + timedelta(minutes=1))
+        assert len(db_manager.check_price_alerts()) == 1
+
+    def test_check_price_alerts_returns_all_triggered(self, db_manager, product):
+        self._add_prices(db_manager, product.id, [120.0, 95.0])
+        db_manager.create_alert(AlertCreate(product_id=product.id, threshold_price=100.0))
+
+        assert len(db_manager.check_price_alerts()) == 1
+        # Continua na lista enquanto a condição for verdadeira (contrato anterior)
+        alerts = db_manager.check_price_alerts()
+        assert [alert["product_id"] for alert in alerts] == [product.id]
+        assert alerts[0]["current_price"] == 95.0
+        assert alerts[0]["savings"] == pytest.approx(5.0)
+
+    def test_percent_drop(self, db_manager, product):
+        self._add_prices(db_manager, product.id, [200.0, 190.0, 170.0])
+        db_manager.create_alert(AlertCreate(product_id=product.id, alert_type="percent_drop", threshold_percent=10))
+
+        fired = db_manager.check_price_alerts()
+        assert len(fired) == 1
+        assert fired[0]["reference_price"] == 200.0
+
+    def test_all_time_low_and_ma_crossover(self, db_manager, product):
+        self._add_prices(db_manager, product.id, [100.0, 110.0, 105.0, 99.0])
+        db_manager.create_alert(AlertCreate(product_id=product.id, alert_type="all_time_low"))
+        db_manager.create_alert(AlertCreate(product_id=product.id, alert_type="ma_crossover", window_days=7))
+
+        fired = {alert["alert_type"]: alert for alert in db_manager.check_price_alerts()}
+        assert fired["all_time_low"]["reference_price"] == 100.0
+        assert fired["ma_crossover"]["reference_price"] == pytest.approx(103.5)
+
+    def test_all_time_low_requires_history(self, db_manager, product):
+        self._add_prices(db_manager, product.id, [100.0])
+        db_manager.create_alert(AlertCreate(product_id=product.id, alert_type="all_time_low"))
+
+        assert db_manager.check_price_alerts() == []
+
+    def test_evaluates_10k_alerts_in_constant_queries(self, engine, db_manager):
+        now = datetime.now()
+        with engine.begin() as conn:
+            conn.execute(Product.__table__.insert(), [
+                {"id": i, "product_name": f"Produto {i}"} for i in range(1, 10_001)
+            ])
+            conn.execute(PriceObservation.__table__.insert(), [
+                {"product_id": i, "price": 100.0 + day, "observed_at": now - timedelta(days=day)}
+                for i in range(1, 10_001) for day in range(5)
+            ])
+            conn.execute(Alert.__table__.insert(), [
+                {"product_id": i, "alert_type": alert_type, "threshold_price": 101.0,
+                 "threshold_percent": 3.0, "window_days": 7, "is_active": 1, "is_triggered": 0}
+                for i, alert_type in zip(range(1, 10_001), itertools.cycle(ALERT_TYPES))
+            ])
+
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.split()[0].upper())
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            result = db_manager.evaluate_alerts()
+            assert result["evaluated"] == 10_000
+            assert len(result["fired"]) == 10_000
+            # Uma consulta de avaliação e um UPDATE em lote, independente do número de alertas
+            assert statements == ["SELECT", "UPDATE"]
+
+            statements.clear()
+            assert db_manager.evaluate_alerts()["fired"] == []
+            assert statements == ["SELECT"]
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+
+class TestProductSearch:
+    """Testes para busca full-text e índice de tags"""
+
+    @pytest.fixture
+    def catalog(self, db_manager):
+        products = [
+            ProductCreate(product_name="Smart TV Samsung 55", tags="tv, eletrônicos, 4k"),
+            ProductCreate(product_name="TV Box Android", tags="tvbox, streaming"),
+            ProductCreate(product_name="Fone Bluetooth JBL", tags="áudio, fone"),
+        ]
+        return [db_manager.create_product(product) for product in products]
+
+    def test_search_matches_whole_words(self, db_manager, catalog):
+        results = db_manager.search_products("tv")
+        assert {p.product_name for p in results} == {"Smart TV Samsung 55", "TV Box Android"}
+        assert [p.product_name for p in db_manager.search_products("tvbox")] == ["TV Box Android"]
+
+    def test_search_is_accent_insensitive(self, db_manager, catalog):
+        assert [p.product_name for p in db_manager.search_products("eletronicos")] == ["Smart TV Samsung 55"]
+        assert [p.product_name for p in db_manager.search_products("AUDIO")] == ["Fone Bluetooth JBL"]
+
+    def test_search_ranks_name_above_tags(self, db_manager, catalog):
+        db_manager.update_product(catalog[2].id, ProductUpdate(tags="áudio, fone, samsung"))
+        assert [p.product_name for p in db_manager.search_products("samsung")][0] == "Smart TV Samsung 55"
+
+    def test_search_includes_ai_summary(self, db_manager, catalog):
+        db_manager.update_product_summary(catalog[2].id, "Fone com cancelamento de ruído")
+        assert [p.product_name for p in db_manager.search_products("ruido")] == ["Fone Bluetooth JBL"]
+
+    def test_search_ignores_fts_syntax(self, db_manager, catalog):
+        assert db_manager.search_products('"') == []
+        assert len(db_manager.search_products("tv* (")) == 2
+
+    def test_get_products_by_tags_exact(self, db_manager, catalog):
+        assert [p.product_name for p in db_manager.get_products_by_tags(["TV"])] == ["Smart TV Samsung 55"]
+        assert [p.product_name for p in db_manager.get_products_by_tags(["audio"])] == ["Fone Bluetooth JBL"]
+
+    def test_update_and_delete_keep_indexes_in_sync(self, db_manager, catalog):
+        db_manager.update_product(catalog[0].id, ProductUpdate(tags="televisão, 4k"))
+        assert db_manager.get_products_by_tags(["tv"]) == []
+        assert [p.id for p in db_manager.get_products_by_tags(["4k"])] == [catalog[0].id]
+
+        db_manager.delete_product(catalog[0].id)
+        assert db_manager.search_products("samsung") == []
+        assert db_manager.get_products_by_tags(["4k"]) == []
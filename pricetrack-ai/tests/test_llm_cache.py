@@ -0,0 +1,111 @@
+"""
+Testes Unitários para o cache persistente de respostas de LLM
+"""
+
+import threading
+import time
+import pytest
+
+from core.llm_cache import LLMCache, make_cache_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Cache em arquivo temporário"""
+    return LLMCache(path=str(tmp_path / "llm_cache.db"), max_entries=3)
+
+
+class TestLLMCache:
+    """Testes para LLMCache"""
+
+    def test_key_ignores_prompt_whitespace(self):
+        assert make_cache_key("m", "  Busque\n   iPhone 15 ") == make_cache_key("m", "Busque iPhone 15")
+        assert make_cache_key("m", "Busque iPhone 15") != make_cache_key("outro", "Busque iPhone 15")
+
+    def test_get_or_compute_hits_after_first_call(self, cache):
+        calls = []
+        compute = lambda: calls.append(1) or "resposta"
+
+        assert cache.get_or_compute("m", "prompt", compute, ttl=60) == "resposta"
+        assert cache.get_or_compute("m", "  prompt\n", compute, ttl=60) == "resposta"
+
+        assert len(calls) == 1
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_persists_across_instances(self, cache):
+        cache.set("m", "prompt", "resposta", ttl=60)
+
+        assert LLMCache(path=cache.path).get("m", "prompt") == "resposta"
+
+    def test_expired_entries_are_misses(self, cache):
+        cache.set("m", "prompt", "resposta", ttl=0.01)
+        time.sleep(0.02)
+
+        assert cache.get("m", "prompt") is None
+        assert cache.stats()["expired"] == 1
+
+    def test_evicts_least_recently_used(self, cache):
+        for i in range(3):
+            cache.set("m", f"prompt {i}", f"resposta {i}")
+            time.sleep(0.001)
+        cache.get("m", "prompt 0")
+        cache.set("m", "prompt 3", "resposta 3")
+
+        assert cache.get("m", "prompt 1") is None
+        assert cache.get("m", "prompt 0") == "resposta 0"
+        assert cache.stats()["entries"] == 3
+
+    def test_concurrent_identical_requests_coalesce(self, cache):
+        calls = []
+        release = threading.Event()
+
+        def compute():
+            calls.append(1)
+            release.wait(1)
+            return "resposta"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_compute("m", "prompt", compute, ttl=60)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert results == ["resposta"] * 5
+        assert len(calls) == 1
+        assert cache.stats()["coalesced"] == 4
+
+    def test_leader_rechecks_cache_before_compute(self, cache):
+        # Simula a corrida: a consulta inicial erra, mas o líder anterior grava antes do lock
+        cache.set("m", "prompt", "resposta", ttl=60)
+        lookup, lookups = cache._lookup, []
+
+        def racing_lookup(key):
+            lookups.append(key)
+            return None if len(lookups) == 1 else lookup(key)
+
+        cache._lookup = racing_lookup
+        calls = []
+
+        result = cache.get_or_compute("m", "prompt", lambda: calls.append(1) or "outra", ttl=60)
+
+        assert result == "resposta"
+        assert calls == []
+        assert cache.stats()["coalesced"] == 1
+        assert cache.stats()["misses"] == 0
+
+    def test_failed_compute_is_not_cached(self, cache):
+        def failing():
+            raise RuntimeError("API indisponível")
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_compute("m", "prompt", failing, ttl=60)
+
+        assert cache.get_or_compute("m", "prompt", lambda: "resposta", ttl=60) == "resposta"
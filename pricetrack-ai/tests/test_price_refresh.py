@@ -0,0 +1,123 @@
+"""
+Testes do worker de atualização de preços em lote (fonte stub, sem rede)
+"""
+
+import time
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from core.database import DatabaseManager
+from core.models import AlertCreate, PriceObservation, ProductCreate, create_tables
+from core.price_refresh import GeminiPriceSource, PriceRefreshWorker, PriceSource, RateLimiter, StubPriceSource
+
+
+@pytest.fixture
+def session_factory():
+    """Fábrica de sessões sobre SQLite em memória"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    create_tables(engine)
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+@pytest.fixture
+def catalog(session_factory):
+    """Catálogo com 25 produtos"""
+    db = session_factory()
+    db_manager = DatabaseManager(db)
+    ids = [db_manager.create_product(ProductCreate(product_name=f"Produto {i}")).id for i in range(25)]
+    db.close()
+    return ids
+
+
+class FlakySource(PriceSource):
+    """Fonte que falha para um produto específico"""
+
+    name = "flaky"
+
+    def fetch_price(self, product_name):
+        if product_name == "Produto 3":
+            raise RuntimeError("timeout")
+        return 10.0
+
+
+class TestPriceRefreshWorker:
+    """Testes para PriceRefreshWorker"""
+
+    def test_refreshes_all_products_in_batches(self, session_factory, catalog):
+        worker = PriceRefreshWorker(StubPriceSource(seed=1), session_factory, max_workers=4, batch_size=10)
+
+        report = worker.run_once()
+
+        assert report["products"] == 25
+        assert report["refreshed"] == 25
+        assert report["batches"] == 3
+        assert report["products_per_second"] > 0
+        db = session_factory()
+        assert db.query(PriceObservation).count() == 25
+        db.close()
+
+    def test_failures_are_counted_not_raised(self, session_factory, catalog):
+        report = PriceRefreshWorker(FlakySource(), session_factory).run_once()
+
+        assert report["refreshed"] == 24
+        assert report["failed"] == 1
+
+    def test_evaluates_alerts_after_batch(self, session_factory, catalog):
+        db = session_factory()
+        DatabaseManager(db).create_alert(AlertCreate(product_id=catalog[0], threshold_price=20.0))
+        db.close()
+
+        report = PriceRefreshWorker(FlakySource(), session_factory).run_once()
+
+        assert report["alerts_fired"] == 1
+
+
+class TestPriceSources:
+    """Testes para as fontes de preço"""
+
+    def test_price_source_is_abstract(self):
+        with pytest.raises(TypeError):
+            PriceSource()
+
+    def test_gemini_source_bypasses_response_cache(self):
+        source = GeminiPriceSource.__new__(GeminiPriceSource)
+        source.service = Mock()
+        source.service.search_products_with_gemini.return_value = [
+            {"price": 100.0, "score": 0.5},
+            {"price": 120.0, "score": 0.9},
+            {"price": None, "score": 1.0},
+        ]
+        assert source.fetch_price("Produto") == 120.0
+        source.service.search_products_with_gemini.assert_called_once_with("Produto", use_cache=False)
+
+    def test_search_without_cache_skips_cache_ttl(self):
+        from core.ai_services import GeminiService
+
+        service = GeminiService.__new__(GeminiService)
+        service._make_api_call = Mock(return_value=Mock(text='[{"price": 10.0}]'))
+        service.search_products_with_gemini("Produto", use_cache=False)
+        assert service._make_api_call.call_args.kwargs["cache_ttl"] is None
+        service.search_products_with_gemini("Produto")
+        assert service._make_api_call.call_args.kwargs["cache_ttl"] == 1800
+
+
+class TestRateLimiter:
+    """Testes para RateLimiter"""
+
+    def test_spaces_requests(self):
+        limiter = RateLimiter(rate_per_second=50)
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.acquire()
+        assert time.monotonic() - start >= 0.09
+
+    def test_unlimited(self):
+        limiter = RateLimiter(rate_per_second=None)
+        start = time.monotonic()
+        for _ in range(1000):
+            limiter.acquire()
+        assert time.monotonic() - start < 0.1
@@ -42,13 +42,21 @@ def get_sentiment(ticker: str):
         log.error(f"Sentiment error for {ticker}: {e}")
         raise HTTPException(status_code=500, detail="Error fetching sentiment")
 
+@router.get("/ws/stats")
+def get_ticker_hub_stats():
+    return websocket_service.hub.snapshot()
+
 @router.websocket("/ws/ticker")
 async def websocket_ticker(websocket: WebSocket):
-    await websocket_service.manager.connect(websocket)
-    log.info("WebSocket connected to /ws/ticker")
+    hub = websocket_service.hub
+    sub = await hub.connect(websocket)
+    log.debug("WebSocket connected to /ws/ticker")
     try:
         while True:
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        websocket_service.manager.disconnect(websocket)
-        log.info("WebSocket disconnected from /ws/ticker")
+            hub.handle_message(sub, await websocket.receive_text())
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the hub already closed this socket (slow consumer)
+        pass
+    finally:
+        hub.disconnect(sub)
+        log.debug("WebSocket disconnected from /ws/ticker")
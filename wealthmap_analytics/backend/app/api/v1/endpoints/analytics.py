@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.models import models
-from app.services import ml_service
+from app.services import frontier_service, ml_service, price_store
 
 router = APIRouter()
 
@@ -12,6 +12,18 @@ def get_risk_analytics(db: Session = Depends(get_db)):
     tickers = [a.ticker for a in assets]
     return ml_service.calculate_risk_metrics(tickers)
 
+@router.get("/frontier")
+def get_efficient_frontier(
+    points: int = Query(frontier_service.FRONTIER_POINTS, ge=5, le=100),
+    simulations: int = Query(frontier_service.SIMULATIONS, ge=1_000, le=200_000),
+    db: Session = Depends(get_db),
+):
+    tickers = list(dict.fromkeys(a.ticker for a in db.query(models.Asset).all()))
+    if len(tickers) < 2:
+        return {"tickers": tickers, "frontier": [], "cloud": [], "min_volatility": None, "max_sharpe": None}
+    returns = price_store.returns_matrix(tickers, days=ml_service.PERIOD_DAYS["1y"])
+    return frontier_service.efficient_frontier(returns, points, simulations)
+
 @router.get("/forecast/{ticker}")
 def get_forecast(ticker: str, days: int = 15):
     return ml_service.forecast_price(ticker, days)
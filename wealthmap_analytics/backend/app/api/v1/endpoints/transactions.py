@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.models import models
 from app.schemas import schemas
+from app.services import ledger_service
 from app.core.logger import log
 
 router = APIRouter()
@@ -16,7 +17,7 @@ def create_transaction(transaction: schemas.TransactionCreate, db: Session = Dep
         raise HTTPException(status_code=404, detail="Asset not found")
     
     new_tx = models.Transaction(**transaction.dict())
-    db.add(new_tx)
+    ledger_service.record_transaction(db, new_tx)
     db.commit()
     db.refresh(new_tx)
     log.info(f"Transaction created successfully: {new_tx.id}")
@@ -3,10 +3,10 @@ from fastapi.middleware.cors import CORSMiddleware
 import asyncio
 from contextlib import asynccontextmanager
 
-from app.db.session import engine
+from app.db.session import engine, SessionLocal
 from app.models import models
 from app.api.v1.endpoints import assets, transactions, portfolio, analytics, ai
-from app.services import websocket_service
+from app.services import websocket_service, ledger_service
 from app.core.exceptions import global_exception_handler, http_exception_handler
 from app.core.logger import setup_logging
 from fastapi import HTTPException
@@ -19,8 +19,12 @@ models.Base.metadata.create_all(bind=engine)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Backfill the position ledger for transactions recorded before it existed
+    with SessionLocal() as db:
+        ledger_service.rebuild_positions(db)
+
     # Start background tasks
-    ticker_task = asyncio.create_task(websocket_service.market_ticker_generator())
+    ticker_task = asyncio.create_task(websocket_service.hub.run())
     yield
     # Cleanup
     ticker_task.cancel()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Enum, ForeignKey
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 import enum
@@ -24,6 +24,7 @@ class Asset(Base):
     currency = Column(String, default="BRL")
     
     transactions = relationship("Transaction", back_populates="asset", cascade="all, delete-orphan")
+    position = relationship("Position", back_populates="asset", uselist=False, cascade="all, delete-orphan")
 
 class Transaction(Base):
     __tablename__ = "transactions"
@@ -37,3 +38,26 @@ class Transaction(Base):
     date = Column(DateTime, default=datetime.utcnow)
     
     asset = relationship("Asset", back_populates="transactions")
+
+class Position(Base):
+    """Running position per asset, updated on every transaction insert (average-price ledger)."""
+    __tablename__ = "positions"
+
+    asset_id = Column(Integer, ForeignKey("assets.id"), primary_key=True)
+    quantity = Column(Float, default=0.0, nullable=False)
+    total_invested = Column(Float, default=0.0, nullable=False)
+    last_transaction_id = Column(Integer, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    asset = relationship("Asset", back_populates="position")
+
+class PriceBar(Base):
+    """Daily OHLC bar for a ticker; completed sessions only, appended by price_store."""
+    __tablename__ = "price_bars"
+
+    ticker = Column(String, primary_key=True)
+    date = Column(Date, primary_key=True)
+    open = Column(Float)
+    high = Column(Float)
+    low = Column(Float)
+    close = Column(Float)
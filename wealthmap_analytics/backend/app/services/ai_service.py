@@ -134,6 +134,16 @@ def _build_portfolio_context(portfolio_data: list, risk_metrics: dict):
         for ticker, weight in optimal_weights.items():
             lines.append(f"- {ticker}: {float(weight) * 100:.1f}%")
 
+    frontier = risk_metrics.get("efficient_frontier") or {}
+    if frontier.get("min_volatility") and frontier.get("max_sharpe"):
+        low, best = frontier["min_volatility"], frontier["max_sharpe"]
+        lines.append("Fronteira eficiente (Markowitz, 1 ano):")
+        lines.append(f"- Minima volatilidade: vol {low['volatility'] * 100:.1f}%, retorno {low['return'] * 100:.1f}%")
+        lines.append(
+            f"- Maximo Sharpe ({best['sharpe']:.2f}): vol {best['volatility'] * 100:.1f}%, "
+            f"retorno {best['return'] * 100:.1f}%"
+        )
+
     return "\n".join(lines)
 
 
@@ -0,0 +1,165 @@
+"""Efficient frontier engine (Markowitz, long-only, fully invested).
+
+For a daily return matrix it computes a vectorized Monte Carlo cloud (random
+portfolios scored with matrix ops over the covariance), the minimum-volatility
+and maximum-Sharpe portfolios and ``points`` frontier portfolios between them
+and the highest-return asset. Results are cached per return-matrix
+fingerprint. Every SLSQP run is warm-started from the closest known solution:
+the previous frontier point in the sweep, or the result last computed for the
+same ticker set (e.g. yesterday's data).
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+
+from app.core.logger import log
+
+TRADING_DAYS = 252
+RISK_FREE_RATE = 0.10
+FRONTIER_POINTS = 30
+SIMULATIONS = 100_000
+CLOUD_SAMPLE = 1_500  # simulated portfolios returned to the client
+CACHE_SIZE = 32
+
+_lock = threading.Lock()
+_cache: "OrderedDict[str, dict]" = OrderedDict()
+_warm: dict[tuple, dict] = {}  # tickers -> last solutions {"min_vol", "max_sharpe", "frontier"}
+
+
+def fingerprint(returns: pd.DataFrame, *params) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((tuple(returns.columns), returns.shape, params)).encode())
+    digest.update(np.ascontiguousarray(returns.to_numpy(np.float64)).tobytes())
+    return digest.hexdigest()
+
+
+def monte_carlo(mu: np.ndarray, cov: np.ndarray, simulations: int = SIMULATIONS, seed: int = 42):
+    """Random long-only portfolios (Dirichlet weights) -> ``(weights, returns, volatilities, sharpes)``."""
+    rng = np.random.default_rng(seed)
+    weights = rng.dirichlet(np.ones(len(mu)), size=simulations)
+    rets = weights @ mu
+    vols = np.sqrt(np.maximum(((weights @ cov) * weights).sum(axis=1), 0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpes = np.where(vols > 0, (rets - RISK_FREE_RATE) / vols, 0.0)
+    return weights, rets, vols, sharpes
+
+
+def _constraints(mu: np.ndarray, target: float | None):
+    cons = [{"type": "eq", "fun": lambda w: w.sum() - 1, "jac": lambda w: np.ones_like(w)}]
+    if target is not None:
+        cons.append({"type": "eq", "fun": lambda w: w @ mu - target, "jac": lambda w: mu})
+    return cons
+
+
+def _min_variance(mu, cov, x0, target=None):
+    result = minimize(
+        lambda w: w @ cov @ w, x0, jac=lambda w: 2 * cov @ w, method="SLSQP",
+        bounds=[(0, 1)] * len(mu), constraints=_constraints(mu, target),
+    )
+    return result.x if result.success else None
+
+
+def _max_sharpe(mu, cov, x0):
+    def neg_sharpe(w):
+        vol = np.sqrt(w @ cov @ w)
+        return -(w @ mu - RISK_FREE_RATE) / vol
+
+    def grad(w):
+        var = w @ cov @ w
+        vol = np.sqrt(var)
+        excess = w @ mu - RISK_FREE_RATE
+        return -(mu * vol - excess * (cov @ w) / vol) / var
+
+    result = minimize(neg_sharpe, x0, jac=grad, method="SLSQP",
+                      bounds=[(0, 1)] * len(mu), constraints=_constraints(mu, None))
+    return result.x if result.success else None
+
+
+def _portfolio(w: np.ndarray, mu: np.ndarray, cov: np.ndarray, tickers: tuple, weights=True) -> dict:
+    w = np.clip(w, 0, 1)
+    w = w / w.sum()
+    ret = float(w @ mu)
+    vol = float(np.sqrt(max(w @ cov @ w, 0)))
+    out = {
+        "return": ret,
+        "volatility": vol,
+        "sharpe": (ret - RISK_FREE_RATE) / vol if vol > 0 else 0.0,
+    }
+    if weights:
+        out["weights"] = {t: round(float(x), 4) for t, x in zip(tickers, w)}
+    return out
+
+
+def efficient_frontier(returns: pd.DataFrame, points: int = FRONTIER_POINTS,
+                       simulations: int = SIMULATIONS) -> dict:
+    """Frontier, optimal portfolios and Monte Carlo cloud for daily *returns*; cached per fingerprint.
+
+    The result is shared between callers and must not be modified.
+    """
+    key = fingerprint(returns, points, simulations)
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    started = time.perf_counter()
+    tickers = tuple(returns.columns)
+    mu = returns.mean().to_numpy() * TRADING_DAYS
+    cov = returns.cov().to_numpy() * TRADING_DAYS
+    n = len(tickers)
+    warm = _warm.get(tickers, {})
+
+    weights, rets, vols, sharpes = monte_carlo(mu, cov, simulations)
+    best = int(np.argmax(sharpes))
+    equal = np.full(n, 1.0 / n)
+
+    min_vol = _min_variance(mu, cov, warm.get("min_vol", equal))
+    if min_vol is None:
+        min_vol = weights[int(np.argmin(vols))]
+    max_sharpe = _max_sharpe(mu, cov, warm.get("max_sharpe", weights[best]))
+
+    # targets from the minimum-volatility return up to the best single asset
+    targets = np.linspace(float(min_vol @ mu), float(mu.max()), points)
+    previous = warm.get("frontier") if len(warm.get("frontier", [])) == points else None
+    frontier, solutions, x = [], [], min_vol
+    for i, target in enumerate(targets):
+        solved = _min_variance(mu, cov, previous[i] if previous is not None else x, target)
+        if solved is None:
+            continue
+        x = solved
+        solutions.append(x)
+        frontier.append(_portfolio(x, mu, cov, tickers))
+
+    sample = np.random.default_rng(0).choice(simulations, size=min(CLOUD_SAMPLE, simulations), replace=False)
+    result = {
+        "tickers": list(tickers),
+        "frontier": frontier,
+        "min_volatility": _portfolio(min_vol, mu, cov, tickers),
+        "max_sharpe": _portfolio(max_sharpe, mu, cov, tickers) if max_sharpe is not None else None,
+        "best_simulated": _portfolio(weights[best], mu, cov, tickers),
+        "cloud": [
+            {"return": float(rets[i]), "volatility": float(vols[i]), "sharpe": float(sharpes[i])}
+            for i in sample
+        ],
+        "simulations": simulations,
+        "risk_free_rate": RISK_FREE_RATE,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+    with _lock:
+        _warm[tickers] = {
+            "min_vol": min_vol,
+            "max_sharpe": max_sharpe if max_sharpe is not None else warm.get("max_sharpe", weights[best]),
+            "frontier": solutions if len(solutions) == points else warm.get("frontier", []),
+        }
+        _cache[key] = result
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    log.info(f"Efficient frontier for {len(tickers)} assets: {len(frontier)} points, "
+             f"{simulations:,} simulations in {result['elapsed_ms']} ms")
+    return result
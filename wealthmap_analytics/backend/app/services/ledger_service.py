@@ -0,0 +1,64 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models import models
+from app.core.logger import log
+
+
+def apply_transaction(position: models.Position, tx: models.Transaction) -> None:
+    """Average-price rule: buys add cost (with fees), sells remove cost at the current average."""
+    if tx.transaction_type == models.TransactionType.BUY:
+        position.quantity += tx.quantity
+        position.total_invested += (tx.quantity * tx.price_per_unit) + (tx.fees or 0.0)
+    elif tx.transaction_type == models.TransactionType.SELL:
+        if position.quantity > 0:
+            average_price_before_sell = position.total_invested / position.quantity
+            position.quantity -= tx.quantity
+            position.total_invested -= (tx.quantity * average_price_before_sell)
+    position.last_transaction_id = tx.id
+
+
+def record_transaction(db: Session, tx: models.Transaction) -> models.Position:
+    """Adds the transaction and updates its asset's position in the same unit of work."""
+    db.add(tx)
+    db.flush()  # assigns tx.id
+    position = db.get(models.Position, tx.asset_id)
+    if position is None:
+        position = models.Position(asset_id=tx.asset_id, quantity=0.0, total_invested=0.0)
+        db.add(position)
+    apply_transaction(position, tx)
+    return position
+
+
+def rebuild_positions(db: Session) -> int:
+    """Replays transactions for assets whose position is missing or stale. Returns assets rebuilt."""
+    latest = dict(
+        db.query(models.Transaction.asset_id, func.max(models.Transaction.id))
+        .group_by(models.Transaction.asset_id)
+        .all()
+    )
+    positions = {p.asset_id: p for p in db.query(models.Position).all()}
+    stale = [
+        asset_id for asset_id, last_id in latest.items()
+        if asset_id not in positions or positions[asset_id].last_transaction_id != last_id
+    ]
+    if not stale:
+        return 0
+
+    transactions = (
+        db.query(models.Transaction)
+        .filter(models.Transaction.asset_id.in_(stale))
+        .order_by(models.Transaction.asset_id, models.Transaction.id)
+        .all()
+    )
+    for asset_id in stale:
+        position = positions.get(asset_id)
+        if position is None:
+            position = models.Position(asset_id=asset_id)
+            db.add(position)
+        position.quantity, position.total_invested = 0.0, 0.0
+        positions[asset_id] = position
+    for tx in transactions:
+        apply_transaction(positions[tx.asset_id], tx)
+    db.commit()
+    log.info(f"Position ledger rebuilt for {len(stale)} assets")
+    return len(stale)
@@ -1,44 +1,94 @@
 import yfinance as yf
 import httpx
 import asyncio
+import os
+import time
 from typing import Optional
 from app.services.ml_service import fallback_history
+from app.core.logger import log
 
-async def get_market_price(ticker: str, asset_type: str) -> float:
-    try:
-        if asset_type == "CRYPTO":
-            mapping = {
-                "BTC": "bitcoin",
-                "ETH": "ethereum",
-                "SOL": "solana"
-            }
-            coin_id = mapping.get(ticker.upper())
-            if coin_id:
-                url = f"https://api.coingecko.com/api/v3/simple/price?ids={coin_id}&vs_currencies=brl"
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(url)
-                    data = response.json()
-                    price = float(data.get(coin_id, {}).get("brl", 0.0))
-                    return price if price > 0 else fallback_price(ticker)
-            return fallback_price(ticker)
+COINGECKO_IDS = {
+    "BTC": "bitcoin",
+    "ETH": "ethereum",
+    "SOL": "solana"
+}
+QUOTE_TTL_SECONDS = float(os.getenv("QUOTE_TTL_SECONDS", "60"))
+QUOTE_TIMEOUT_SECONDS = 10
+
+# ticker -> (price, fetched_at)
+_quote_cache: dict[str, tuple[float, float]] = {}
+
+
+async def get_market_prices(assets: list[tuple[str, str]]) -> dict[str, float]:
+    """Prices for many ``(ticker, asset_type)`` pairs: one batched call per provider, run concurrently.
+
+    Quotes are cached for ``QUOTE_TTL_SECONDS``; tickers without a quote get ``fallback_price``.
+    """
+    now = time.monotonic()
+    prices = {}
+    stocks, cryptos = set(), set()
+    for ticker, asset_type in assets:
+        cached = _quote_cache.get(ticker)
+        if cached and now - cached[1] < QUOTE_TTL_SECONDS:
+            prices[ticker] = cached[0]
+        elif asset_type == "CRYPTO":
+            cryptos.add(ticker)
         else:
-            # yfinance doesn't have a native async API, so we run it in a thread
-            loop = asyncio.get_event_loop()
-            price = await loop.run_in_executor(None, _fetch_yfinance_price, ticker)
-            return price if price > 0 else fallback_price(ticker)
-    except Exception as e:
-        print(f"Error fetching price for {ticker}: {e}")
-        return fallback_price(ticker)
+            stocks.add(ticker)
 
-def _fetch_yfinance_price(ticker: str) -> float:
-    try:
-        stock = yf.Ticker(ticker)
-        hist = stock.history(period="1d")
-        if not hist.empty:
-            return float(hist["Close"].iloc[-1])
-        return 0.0
-    except:
-        return fallback_price(ticker)
+    if stocks or cryptos:
+        log.debug(f"Fetching quotes: {len(stocks)} stocks, {len(cryptos)} crypto")
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            loop.run_in_executor(None, _fetch_yfinance_prices, sorted(stocks)),
+            _fetch_coingecko_prices(sorted(cryptos)),
+            return_exceptions=True,
+        )
+        fetched = {}
+        for result in results:
+            if isinstance(result, Exception):
+                log.warning(f"Quote batch failed: {result}")
+            else:
+                fetched.update(result)
+        fetched_at = time.monotonic()
+        for ticker in stocks | cryptos:
+            price = fetched.get(ticker, 0.0)
+            # fallbacks are cached too, so an unreachable provider is retried once per TTL
+            prices[ticker] = price if price > 0 else fallback_price(ticker)
+            _quote_cache[ticker] = (prices[ticker], fetched_at)
+    return prices
+
+
+def _fetch_yfinance_prices(tickers: list[str]) -> dict[str, float]:
+    if not tickers:
+        return {}
+    data = yf.download(
+        tickers, period="5d", progress=False, auto_adjust=False,
+        threads=True, timeout=QUOTE_TIMEOUT_SECONDS,
+    )
+    if data.empty:
+        return {}
+    close = data["Close"]
+    if not hasattr(close, "columns"):  # single ticker without a ticker level
+        close = close.to_frame(tickers[0])
+    last = close.ffill().iloc[-1].dropna()
+    return {ticker: float(price) for ticker, price in last.items()}
+
+
+async def _fetch_coingecko_prices(tickers: list[str]) -> dict[str, float]:
+    ids = {COINGECKO_IDS[t.upper()]: t for t in tickers if t.upper() in COINGECKO_IDS}
+    if not ids:
+        return {}
+    url = f"https://api.coingecko.com/api/v3/simple/price?ids={','.join(ids)}&vs_currencies=brl"
+    async with httpx.AsyncClient(timeout=QUOTE_TIMEOUT_SECONDS) as client:
+        response = await client.get(url)
+        data = response.json()
+    return {ticker: float(data.get(coin_id, {}).get("brl", 0.0)) for coin_id, ticker in ids.items()}
+
+
+async def get_market_price(ticker: str, asset_type: str) -> float:
+    prices = await get_market_prices([(ticker, asset_type)])
+    return prices[ticker]
 
 def fallback_price(ticker: str) -> float:
     try:
@@ -1,59 +1,35 @@
-import yfinance as yf
+from functools import lru_cache
+
 import numpy as np
 import pandas as pd
 from sklearn.linear_model import Ridge
 from sklearn.preprocessing import PolynomialFeatures
 from sklearn.pipeline import make_pipeline
-from datetime import datetime, timedelta
-
-def get_historical_data(ticker: str, period="1y", return_ohlc=False):
-    try:
-        yf_ticker = ticker
-        if ticker in ["BTC", "ETH"]:
-            yf_ticker = f"{ticker}-USD"
+from datetime import date, timedelta
+from app.services import frontier_service, price_store
+from app.services.price_store import fallback_history  # noqa: F401  (re-exported)
 
-        stock = yf.Ticker(yf_ticker)
-        hist = stock.history(period=period)
-        if hist.empty:
-            hist = fallback_history(ticker)
-    except Exception as exc:
-        print(f"Historical data fallback for {ticker}: {exc}")
-        hist = fallback_history(ticker)
+PERIOD_DAYS = {"1y": 365, "2y": 730}
 
+def get_historical_data(ticker: str, period="1y", return_ohlc=False):
+    hist = price_store.get_ohlc(ticker, days=PERIOD_DAYS[period])
     return hist if return_ohlc else hist['Close']
 
-def fallback_history(ticker: str, points=252):
-    seed = sum(ord(c) for c in ticker.upper())
-    rng = np.random.default_rng(seed)
-    dates = pd.bdate_range(end=datetime.utcnow().date(), periods=points)
-    points = len(dates)
-    base = 20 + (seed % 180)
-    drift = np.linspace(0, (seed % 17) - 6, points)
-    noise = rng.normal(0, max(base * 0.012, 0.3), points).cumsum()
-    close = np.maximum(base + drift + noise, 1)
-    open_ = close * (1 + rng.normal(0, 0.004, points))
-    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0.006, 0.004, points)))
-    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0.006, 0.004, points)))
-    return pd.DataFrame(
-        {"Open": open_, "High": high, "Low": low, "Close": close},
-        index=pd.DatetimeIndex(dates, name="Date"),
-    )
-
 def calculate_risk_metrics(tickers: list):
     if not tickers:
         return {"volatility": 0, "sharpe_ratio": 0, "correlation": {}}
-    
-    df = pd.DataFrame()
-    unique_tickers = list(dict.fromkeys(tickers))
-    for t in unique_tickers:
-        series = get_historical_data(t, period="1y")
-        if not series.empty:
-            df[t] = series
-            
-    if df.empty:
+
+    unique_tickers = tuple(dict.fromkeys(tickers))
+    price_store.refresh(unique_tickers)
+    return _risk_metrics(unique_tickers, price_store.as_of(unique_tickers))
+
+@lru_cache(maxsize=64)
+def _risk_metrics(tickers: tuple, as_of: date):
+    """Risk metrics for a ticker set as of a session; memoized, so callers must not mutate the result."""
+    returns = price_store.returns_matrix(tickers, days=PERIOD_DAYS["1y"])
+    if returns.empty:
         return {"volatility": 0, "sharpe_ratio": 0, "correlation": {}}
-        
-    returns = df.pct_change().fillna(0)
+
     volatilities = (returns.std() * np.sqrt(252)).replace([np.inf, -np.inf], 0).fillna(0).to_dict()
     
     risk_free_rate = 0.10
@@ -66,25 +42,17 @@ def calculate_risk_metrics(tickers: list):
     avg_sharpe = float(np.mean(list(sharpes.values()))) if sharpes else 0
     
     optimal_weights = {}
-    if len(tickers) > 1 and not df.empty:
-        mean_returns = returns.mean() * 252
-        cov_matrix = returns.cov() * 252
-        num_assets = len(df.columns)
-        
-        def neg_sharpe_ratio(weights, mean_returns, cov_matrix, risk_free_rate):
-            p_ret = np.sum(mean_returns * weights)
-            p_vol = np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights)))
-            return -(p_ret - risk_free_rate) / p_vol
-            
-        constraints = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1})
-        bounds = tuple((0, 1) for _ in range(num_assets))
-        initial_guess = num_assets * [1. / num_assets,]
-        
+    efficient_frontier = None
+    if len(tickers) > 1:
         try:
-            from scipy.optimize import minimize
-            result = minimize(neg_sharpe_ratio, initial_guess, args=(mean_returns, cov_matrix, risk_free_rate), method='SLSQP', bounds=bounds, constraints=constraints)
-            if result.success:
-                optimal_weights = {df.columns[i]: round(float(result.x[i]), 4) for i in range(num_assets)}
+            frontier = frontier_service.efficient_frontier(returns)
+            if frontier["max_sharpe"]:
+                optimal_weights = frontier["max_sharpe"]["weights"]
+            efficient_frontier = {
+                "min_volatility": frontier["min_volatility"],
+                "max_sharpe": frontier["max_sharpe"],
+                "points": [{k: p[k] for k in ("return", "volatility", "sharpe")} for p in frontier["frontier"]],
+            }
         except Exception as e:
             print("Optimization Error:", e)
 
@@ -94,22 +62,27 @@ def calculate_risk_metrics(tickers: list):
         "asset_volatility": volatilities,
         "asset_sharpe": sharpes,
         "correlation": correlation_matrix,
-        "optimal_weights": optimal_weights
+        "optimal_weights": optimal_weights,
+        "efficient_frontier": efficient_frontier
     }
 
 def forecast_price(ticker: str, days=15):
+    price_store.refresh([ticker])
+    return _forecast(ticker, days, price_store.as_of([ticker]))
+
+@lru_cache(maxsize=128)
+def _forecast(ticker: str, days: int, as_of: date):
     df_hist = get_historical_data(ticker, period="2y", return_ohlc=True)
     if df_hist.empty:
         return {"dates": [], "historical": [], "forecast": []}
-        
+
     df = df_hist.reset_index()
-    df['Date'] = df['Date'].dt.tz_localize(None)
     
     df['SMA_50'] = df['Close'].rolling(window=50).mean().bfill()
     df['SMA_200'] = df['Close'].rolling(window=200).mean().bfill()
     
     min_ordinal = df['Date'].iloc[0].toordinal()
-    df['ordinal'] = df['Date'].apply(lambda x: x.toordinal() - min_ordinal)
+    df['ordinal'] = (df['Date'] - df['Date'].iloc[0]).dt.days
     
     X = df[['ordinal']].values
     y = df['Close'].values
@@ -123,17 +96,15 @@ def forecast_price(ticker: str, days=15):
     
     predictions = model.predict(future_ordinals)
     
-    historical_data = []
-    for _, row in df.iterrows():
-        historical_data.append({
-            "date": row['Date'].strftime("%Y-%m-%d"),
-            "open": float(row['Open']),
-            "high": float(row['High']),
-            "low": float(row['Low']),
-            "close": float(row['Close']),
-            "sma50": float(row['SMA_50']),
-            "sma200": float(row['SMA_200'])
-        })
+    historical_data = pd.DataFrame({
+        "date": df['Date'].dt.strftime("%Y-%m-%d"),
+        "open": df['Open'].astype(float),
+        "high": df['High'].astype(float),
+        "low": df['Low'].astype(float),
+        "close": df['Close'].astype(float),
+        "sma50": df['SMA_50'].astype(float),
+        "sma200": df['SMA_200'].astype(float),
+    }).to_dict("records")
     
     forecast_data = [{"date": historical_data[-1]["date"], "value": historical_data[-1]["close"]}]
     forecast_data += [{"date": d.strftime("%Y-%m-%d"), "value": float(v)} for d, v in zip(future_dates, predictions)]
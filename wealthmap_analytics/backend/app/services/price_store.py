@@ -0,0 +1,199 @@
+"""Local daily OHLC store shared by risk, forecast and optimization.
+
+Bars live in the ``price_bars`` table, one row per (ticker, session). Only
+completed sessions are stored, so rows are append-only: ``refresh`` downloads
+just the sessions after the last stored bar, with one batched ``yf.download``
+per distinct start date, and at most once per ``PRICE_REFRESH_SECONDS`` per
+ticker. Tickers that cannot be fetched (offline, unknown symbol) are served
+from ``fallback_history`` without being persisted.
+"""
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert
+
+from app.db.session import engine
+from app.models import models
+from app.core.logger import log
+
+HISTORY_DAYS = 730  # longest window served (forecast uses 2y)
+PRICE_REFRESH_SECONDS = float(os.getenv("PRICE_REFRESH_SECONDS", "3600"))
+DOWNLOAD_TIMEOUT_SECONDS = 20
+
+_lock = threading.Lock()
+_checked: dict[str, float] = {}      # ticker -> monotonic time of the last refresh
+_last_bar: dict[str, date] = {}      # ticker -> last stored session (absent = fallback)
+
+
+def yf_symbol(ticker: str) -> str:
+    return f"{ticker}-USD" if ticker in ["BTC", "ETH"] else ticker
+
+
+def fallback_history(ticker: str, points=252):
+    seed = sum(ord(c) for c in ticker.upper())
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=datetime.utcnow().date(), periods=points)
+    points = len(dates)
+    base = 20 + (seed % 180)
+    drift = np.linspace(0, (seed % 17) - 6, points)
+    noise = rng.normal(0, max(base * 0.012, 0.3), points).cumsum()
+    close = np.maximum(base + drift + noise, 1)
+    open_ = close * (1 + rng.normal(0, 0.004, points))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0.006, 0.004, points)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0.006, 0.004, points)))
+    return pd.DataFrame(
+        {"Open": open_, "High": high, "Low": low, "Close": close},
+        index=pd.DatetimeIndex(dates, name="Date"),
+    )
+
+
+# ── updates ──────────────────────────────────────────────────────────────────
+
+def _stored_last_dates(tickers: list[str]) -> dict[str, date]:
+    stmt = (
+        select(models.PriceBar.ticker, func.max(models.PriceBar.date))
+        .where(models.PriceBar.ticker.in_(tickers))
+        .group_by(models.PriceBar.ticker)
+    )
+    with engine.connect() as conn:
+        return {ticker: last for ticker, last in conn.execute(stmt)}
+
+
+def _download(tickers: list[str], start: date, end: date) -> dict[str, pd.DataFrame]:
+    """OHLC per ticker for sessions in [start, end) — one batched request."""
+    symbols = {yf_symbol(t): t for t in tickers}
+    data = yf.download(
+        list(symbols), start=start, end=end, group_by="ticker", auto_adjust=True,
+        progress=False, threads=True, timeout=DOWNLOAD_TIMEOUT_SECONDS,
+    )
+    frames = {}
+    if data.empty:
+        return frames
+    for symbol, ticker in symbols.items():
+        if isinstance(data.columns, pd.MultiIndex):
+            if symbol not in data.columns.get_level_values(0):
+                continue
+            bars = data[symbol]
+        else:
+            bars = data
+        bars = bars[["Open", "High", "Low", "Close"]].dropna(subset=["Close"])
+        if not bars.empty:
+            frames[ticker] = bars
+    return frames
+
+
+def _append(ticker: str, bars: pd.DataFrame, after: date | None) -> date | None:
+    """Inserts the bars newer than *after*; returns the new last session."""
+    days = pd.DatetimeIndex(bars.index).tz_localize(None).date
+    rows = [
+        {"ticker": ticker, "date": d, "open": float(o), "high": float(h), "low": float(l), "close": float(c)}
+        for d, o, h, l, c in zip(days, bars["Open"], bars["High"], bars["Low"], bars["Close"])
+        if after is None or d > after
+    ]
+    if not rows:
+        return after
+    with engine.begin() as conn:
+        conn.execute(insert(models.PriceBar).on_conflict_do_nothing(), rows)
+    return rows[-1]["date"]
+
+
+def refresh(tickers) -> None:
+    """Brings the stored history of *tickers* up to the last completed session."""
+    now = time.monotonic()
+    with _lock:
+        pending = [t for t in dict.fromkeys(tickers) if now - _checked.get(t, -PRICE_REFRESH_SECONDS) >= PRICE_REFRESH_SECONDS]
+        if not pending:
+            return
+        today = date.today()
+        last_session = (pd.Timestamp(today) - pd.offsets.BDay(1)).date()
+        last = _stored_last_dates(pending)
+        by_start = defaultdict(list)
+        for t in pending:
+            if last.get(t) is None:
+                by_start[today - timedelta(days=HISTORY_DAYS)].append(t)
+            elif last[t] < last_session:
+                by_start[last[t] + timedelta(days=1)].append(t)
+
+        for start, group in by_start.items():
+            try:
+                frames = _download(group, start, today)
+            except Exception as exc:
+                log.warning(f"History download failed for {group}: {exc}")
+                continue
+            for t, bars in frames.items():
+                last[t] = _append(t, bars, last.get(t))
+            log.info(f"Price store: {len(frames)}/{len(group)} tickers updated from {start}")
+
+        for t in pending:
+            _checked[t] = now
+            if last.get(t) is not None:
+                _last_bar[t] = last[t]
+
+
+def as_of(tickers) -> date:
+    """Last session behind the data served for *tickers* (today when any uses the fallback)."""
+    dates = [_last_bar.get(t) for t in tickers]
+    if not dates or None in dates:
+        return datetime.utcnow().date()
+    return max(dates)
+
+
+# ── reads ────────────────────────────────────────────────────────────────────
+
+def get_ohlc(ticker: str, days: int = 365) -> pd.DataFrame:
+    """Open/High/Low/Close indexed by ``Date`` for the last *days* calendar days."""
+    refresh([ticker])
+    start = date.today() - timedelta(days=days)
+    stmt = (
+        select(models.PriceBar.date, models.PriceBar.open, models.PriceBar.high,
+               models.PriceBar.low, models.PriceBar.close)
+        .where(models.PriceBar.ticker == ticker, models.PriceBar.date >= start)
+        .order_by(models.PriceBar.date)
+    )
+    with engine.connect() as conn:
+        df = pd.DataFrame(conn.execute(stmt).all(), columns=["Date", "Open", "High", "Low", "Close"])
+    if df.empty:
+        return fallback_history(ticker, points=max(int(days * 252 / 365), 2))
+    return df.set_index(pd.DatetimeIndex(df.pop("Date"), name="Date"))
+
+
+def get_closes(tickers, days: int = 365) -> pd.DataFrame:
+    """Close prices, one column per ticker, aligned on the union of sessions (forward-filled)."""
+    tickers = list(dict.fromkeys(tickers))
+    refresh(tickers)
+    start = date.today() - timedelta(days=days)
+    stmt = (
+        select(models.PriceBar.date, models.PriceBar.ticker, models.PriceBar.close)
+        .where(models.PriceBar.ticker.in_(tickers), models.PriceBar.date >= start)
+    )
+    with engine.connect() as conn:
+        long = pd.DataFrame(conn.execute(stmt).all(), columns=["Date", "ticker", "close"])
+    closes = long.pivot(index="Date", columns="ticker", values="close")
+    closes.index = pd.DatetimeIndex(closes.index, name="Date")
+    for t in tickers:
+        if t not in closes.columns:
+            closes = closes.join(fallback_history(t, points=max(int(days * 252 / 365), 2))["Close"].rename(t), how="outer")
+    return closes[tickers].sort_index().ffill()
+
+
+def returns_matrix(tickers, days: int = 365) -> pd.DataFrame:
+    """Daily returns aligned across *tickers*, memoized per (tickers, days, as-of session).
+
+    The frame is shared between callers and must not be modified.
+    """
+    key = tuple(dict.fromkeys(tickers))
+    refresh(key)
+    return _returns(key, days, as_of(key))
+
+
+@lru_cache(maxsize=64)
+def _returns(tickers: tuple, days: int, as_of_date: date) -> pd.DataFrame:
+    return get_closes(tickers, days).pct_change().fillna(0)
@@ -1,50 +1,230 @@
-from fastapi import WebSocket
+"""Real-time ticker hub: per-symbol subscriptions over one WebSocket per client.
+
+Clients send ``{"action": "subscribe", "symbols": [...]}`` or
+``{"action": "unsubscribe", "symbols": [...]}``; new connections start on
+``DEFAULT_SYMBOLS`` (the ticker tape). Each symbol with at least one subscriber
+has exactly one upstream poller, so upstream calls scale with distinct symbols,
+not with connected clients.
+
+Updates are coalesced per client (latest price per symbol) and flushed every
+``FLUSH_SECONDS`` as a single ``ticker_update`` message. Sends run
+concurrently; a client whose previous send is still pending after
+``MAX_LAGGED_FLUSHES`` flushes, or that takes longer than
+``SEND_TIMEOUT_SECONDS``, is dropped.
+"""
 import asyncio
+import json
+import os
 import random
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+from fastapi import WebSocket
 from app.core.logger import log
 
-class ConnectionManager:
+DEFAULT_SYMBOLS = ["IBOV", "S&P500", "BTC/USD", "USD/BRL", "PETR4", "AAPL"]
+BASE_PRICES = {"IBOV": 130000, "S&P500": 5100, "BTC/USD": 64000, "USD/BRL": 5.05, "PETR4": 38.50, "AAPL": 172.00}
+POLL_SECONDS = float(os.getenv("TICKER_POLL_SECONDS", "2"))
+FLUSH_SECONDS = float(os.getenv("TICKER_FLUSH_SECONDS", "0.5"))
+SEND_TIMEOUT_SECONDS = 5
+MAX_LAGGED_FLUSHES = 10
+MAX_SYMBOLS_PER_CLIENT = 50
+# "simulated" (random walk, the default) or "market" (market_service quotes, TTL-cached)
+TICKER_SOURCE = os.getenv("TICKER_SOURCE", "simulated")
+
+
+class SimulatedQuotes:
+    """Random walk per symbol, starting from ``BASE_PRICES`` or the offline fallback price."""
+
     def __init__(self):
-        self.active_connections: list[WebSocket] = []
+        self.prices: dict[str, float] = {}
+
+    async def __call__(self, symbol: str) -> float:
+        if symbol not in self.prices:
+            from app.services.market_service import fallback_price
+            self.prices[symbol] = BASE_PRICES.get(symbol) or fallback_price(symbol)
+        self.prices[symbol] *= 1 + random.uniform(-0.002, 0.002)
+        return self.prices[symbol]
+
+
+async def market_quote(symbol: str) -> float:
+    from app.services import market_service
+    asset_type = "CRYPTO" if symbol.upper() in market_service.COINGECKO_IDS else "STOCK"
+    return await market_service.get_market_price(symbol, asset_type)
+
+
+@dataclass(eq=False)
+class Subscriber:
+    websocket: WebSocket
+    symbols: set[str] = field(default_factory=set)
+    pending: set[str] = field(default_factory=set)  # symbols updated since the last send
+    sending: bool = False
+    lagged: int = 0
+
+
+class TickerHub:
+    def __init__(self, quote_source=None, poll_seconds: float = POLL_SECONDS, flush_seconds: float = FLUSH_SECONDS):
+        self.quote_source = quote_source or (market_quote if TICKER_SOURCE == "market" else SimulatedQuotes())
+        self.poll_seconds = poll_seconds
+        self.flush_seconds = flush_seconds
+        self.subscribers: set[Subscriber] = set()
+        self.by_symbol: dict[str, set[Subscriber]] = defaultdict(set)
+        self.feeds: dict[str, asyncio.Task] = {}
+        self.last: dict[str, dict] = {}  # latest update per symbol
+        self.stats = Counter()
+        self._sends: set[asyncio.Task] = set()
+
+    # ── clients ──────────────────────────────────────────────────────────────
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, symbols=DEFAULT_SYMBOLS) -> Subscriber:
         await websocket.accept()
-        self.active_connections.append(websocket)
-        log.debug(f"WS Client connected. Total: {len(self.active_connections)}")
+        sub = Subscriber(websocket)
+        self.subscribers.add(sub)
+        self.subscribe(sub, symbols)
+        log.debug(f"WS Client connected. Total: {len(self.subscribers)}")
+        return sub
 
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            log.debug(f"WS Client disconnected. Total: {len(self.active_connections)}")
+    def disconnect(self, sub: Subscriber):
+        if sub not in self.subscribers:
+            return
+        self.subscribers.discard(sub)
+        self.unsubscribe(sub, list(sub.symbols))
+        log.debug(f"WS Client disconnected. Total: {len(self.subscribers)}")
 
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
+    def subscribe(self, sub: Subscriber, symbols):
+        for symbol in symbols:
+            if len(sub.symbols) >= MAX_SYMBOLS_PER_CLIENT:
+                break
+            sub.symbols.add(symbol)
+            self.by_symbol[symbol].add(sub)
+            if symbol in self.last:
+                sub.pending.add(symbol)  # snapshot on the next flush
+            if symbol not in self.feeds:
+                self.feeds[symbol] = asyncio.create_task(self._poll(symbol))
+
+    def unsubscribe(self, sub: Subscriber, symbols):
+        for symbol in symbols:
+            sub.symbols.discard(symbol)
+            sub.pending.discard(symbol)
+            subscribers = self.by_symbol.get(symbol)
+            if subscribers is None:
+                continue
+            subscribers.discard(sub)
+            if not subscribers:
+                del self.by_symbol[symbol]
+                feed = self.feeds.pop(symbol, None)
+                if feed:
+                    feed.cancel()
+                self.last.pop(symbol, None)
+
+    def handle_message(self, sub: Subscriber, text: str):
+        """Applies a client command; anything that is not a known command is ignored (keep-alives)."""
+        try:
+            message = json.loads(text)
+            action, symbols = message.get("action"), message.get("symbols") or []
+        except (ValueError, AttributeError):
+            return
+        symbols = [str(s).strip().upper() for s in symbols if str(s).strip()]
+        if action == "subscribe":
+            self.subscribe(sub, symbols)
+        elif action == "unsubscribe":
+            self.unsubscribe(sub, symbols)
+
+    # ── upstream ─────────────────────────────────────────────────────────────
+
+    def publish(self, symbol: str, update: dict):
+        self.last[symbol] = update
+        for sub in self.by_symbol.get(symbol, ()):
+            sub.pending.add(symbol)
+
+    async def _poll(self, symbol: str):
+        previous = None
+        while True:
             try:
-                await connection.send_json(message)
+                price = await self.quote_source(symbol)
+                self.stats["upstream_polls"] += 1
+                change = (price / previous - 1) if previous else 0.0
+                previous = price
+                self.publish(symbol, {"symbol": symbol, "price": price, "change_pct": change * 100, "ts": time.time()})
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                log.debug(f"Error broadcasting to client: {e}")
-                pass
+                log.error(f"Error polling {symbol}: {e}")
+            await asyncio.sleep(self.poll_seconds)
 
-manager = ConnectionManager()
+    # ── fan-out ──────────────────────────────────────────────────────────────
 
-async def market_ticker_generator():
-    log.info("Starting market ticker background task...")
-    symbols = ["IBOV", "S&P500", "BTC/USD", "USD/BRL", "PETR4", "AAPL"]
-    base_prices = {"IBOV": 130000, "S&P500": 5100, "BTC/USD": 64000, "USD/BRL": 5.05, "PETR4": 38.50, "AAPL": 172.00}
-    
-    while True:
+    def flush(self):
+        """Starts one concurrent send per client with pending updates; identical payloads are encoded once."""
+        encoded: dict[frozenset, str] = {}
+        for sub in list(self.subscribers):
+            if not sub.pending:
+                continue
+            if sub.sending:
+                sub.lagged += 1
+                if sub.lagged > MAX_LAGGED_FLUSHES:
+                    self._drop(sub, "slow consumer")
+                continue
+            key = frozenset(sub.pending)
+            if key not in encoded:
+                data = [self.last[s] for s in sorted(key) if s in self.last]
+                encoded[key] = json.dumps({"type": "ticker_update", "data": data})
+            sub.pending = set()
+            sub.sending = True
+            task = asyncio.create_task(self._send(sub, encoded[key]))
+            self._sends.add(task)
+            task.add_done_callback(self._sends.discard)
+
+    async def _send(self, sub: Subscriber, text: str):
         try:
-            await asyncio.sleep(2)
-            updates = []
-            for sym in symbols:
-                change = random.uniform(-0.002, 0.002) 
-                base_prices[sym] = base_prices[sym] * (1 + change)
-                updates.append({
-                    "symbol": sym,
-                    "price": base_prices[sym],
-                    "change_pct": change * 100
-                })
-            await manager.broadcast({"type": "ticker_update", "data": updates})
+            await asyncio.wait_for(sub.websocket.send_text(text), SEND_TIMEOUT_SECONDS)
+            self.stats["messages_sent"] += 1
+            sub.lagged = 0
         except Exception as e:
-            log.error(f"Error in market ticker generator: {e}")
-            await asyncio.sleep(5)
+            self._drop(sub, f"send failed: {e!r}")
+        finally:
+            sub.sending = False
+
+    def _drop(self, sub: Subscriber, reason: str):
+        if sub not in self.subscribers:
+            return
+        self.stats["dropped"] += 1
+        log.debug(f"Dropping WS client ({reason})")
+        self.disconnect(sub)
+        task = asyncio.create_task(self._close(sub.websocket))
+        self._sends.add(task)
+        task.add_done_callback(self._sends.discard)
+
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        try:
+            await asyncio.wait_for(websocket.close(code=1013), SEND_TIMEOUT_SECONDS)
+        except Exception:
+            pass
+
+    async def run(self):
+        log.info("Starting market ticker hub...")
+        try:
+            while True:
+                await asyncio.sleep(self.flush_seconds)
+                try:
+                    self.flush()
+                except Exception as e:
+                    log.error(f"Error in ticker hub flush: {e}")
+        finally:
+            for feed in self.feeds.values():
+                feed.cancel()
+            self.feeds.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            "clients": len(self.subscribers),
+            "symbols": len(self.feeds),
+            "upstream_polls": self.stats["upstream_polls"],
+            "messages_sent": self.stats["messages_sent"],
+            "dropped": self.stats["dropped"],
+        }
+
+
+hub = TickerHub()
@@ -0,0 +1,80 @@
+"""Load test for the ticker WebSocket hub.
+
+Opens N simulated clients against a running API, each subscribing to a random
+subset of symbols, and reports delivery latency plus the hub counters, so the
+upstream polls can be compared with the number of clients.
+
+    python ws_load_test.py --clients 5000 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import Counter
+
+import httpx
+import websockets
+
+
+async def client(url: str, symbols: list[str], duration: float, results: dict):
+    try:
+        async with websockets.connect(url, open_timeout=30, ping_interval=None) as ws:
+            await ws.send(json.dumps({"action": "subscribe", "symbols": symbols}))
+            results["connected"] += 1
+            deadline = time.monotonic() + duration
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                message = json.loads(raw)
+                now = time.time()
+                results["messages"] += 1
+                results["updates"] += len(message["data"])
+                results["latencies"].extend(now - u["ts"] for u in message["data"] if "ts" in u)
+    except Exception as e:
+        results["failed"] += 1
+        results["errors"][type(e).__name__] += 1
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="ws://localhost:8000/ai/ws/ticker")
+    parser.add_argument("--api", default="http://localhost:8000", help="for /ai/ws/stats")
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--symbols", type=int, default=40, help="size of the symbol pool")
+    parser.add_argument("--per-client", type=int, default=5, help="symbols subscribed per client")
+    parser.add_argument("--duration", type=float, default=30, help="seconds each client stays connected")
+    parser.add_argument("--ramp", type=float, default=10, help="seconds to open all connections")
+    args = parser.parse_args()
+
+    pool = [f"SIM{i:03d}.SA" for i in range(args.symbols)]
+    results = {"connected": 0, "failed": 0, "messages": 0, "updates": 0, "latencies": [],
+               "errors": Counter()}
+    async with httpx.AsyncClient(base_url=args.api) as api:
+        before = (await api.get("/ai/ws/stats")).json()
+        tasks = []
+        for i in range(args.clients):
+            symbols = random.sample(pool, min(args.per_client, len(pool)))
+            tasks.append(asyncio.create_task(client(args.url, symbols, args.duration, results)))
+            await asyncio.sleep(args.ramp / args.clients)
+        await asyncio.sleep(min(args.duration, 2))
+        during = (await api.get("/ai/ws/stats")).json()
+        await asyncio.gather(*tasks)
+        after = (await api.get("/ai/ws/stats")).json()
+
+    lat = sorted(results["latencies"]) or [0.0]
+    print(f"clients: {results['connected']} connected, {results['failed']} failed {dict(results['errors'])}")
+    print(f"received: {results['messages']:,} messages, {results['updates']:,} updates")
+    print(f"latency: p50 {statistics.median(lat) * 1000:.0f} ms, p95 {lat[int(len(lat) * 0.95) - 1] * 1000:.0f} ms, "
+          f"max {lat[-1] * 1000:.0f} ms")
+    print(f"hub while connected: {during['clients']} clients, {during['symbols']} upstream feeds")
+    print(f"upstream polls: {after['upstream_polls'] - before['upstream_polls']:,}, "
+          f"messages sent: {after['messages_sent'] - before['messages_sent']:,}, "
+          f"dropped: {after['dropped'] - before['dropped']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
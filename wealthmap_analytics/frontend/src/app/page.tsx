@@ -7,6 +7,7 @@ import ExecutiveBrief from "@/components/dashboard/ExecutiveBrief";
 import DashboardStats from "@/components/dashboard/DashboardStats";
 import AssetTable from "@/components/dashboard/AssetTable";
 import AllocationChart from "@/components/dashboard/AllocationChart";
+import EfficientFrontier from "@/components/dashboard/EfficientFrontier";
 import MarketRadar from "@/components/radar/MarketRadar";
 import WalletBuilder from "@/components/wallet/WalletBuilder";
 import ChatBot from "@/components/ai/ChatBot";
@@ -110,6 +111,7 @@ export default function Home() {
                   <AllocationChart />
                 </div>
               </div>
+              <EfficientFrontier />
             </div>
           )}
 
@@ -0,0 +1,97 @@
+"use client";
+
+import React, { useEffect, useState } from "react";
+import { usePortfolio } from "@/context/PortfolioContext";
+import { analyticsService } from "@/services/api";
+import {
+  ScatterChart, Scatter, XAxis, YAxis, ZAxis, CartesianGrid,
+  ResponsiveContainer, Tooltip as RechartsTooltip, Legend
+} from "recharts";
+import { Target } from "lucide-react";
+
+const pct = (value: number) => `${(value * 100).toFixed(1)}%`;
+
+const FrontierTooltip = ({ active, payload }: any) => {
+  if (!active || !payload?.length) return null;
+
+  const point = payload[0].payload;
+
+  return (
+    <div className="chart-tooltip">
+      <span className="chart-tooltip-label">{payload[0].name}</span>
+      <div className="chart-tooltip-row">
+        <span>Retorno</span>
+        <strong>{pct(point.return)}</strong>
+      </div>
+      <div className="chart-tooltip-row">
+        <span>Volatilidade</span>
+        <strong>{pct(point.volatility)}</strong>
+      </div>
+      <div className="chart-tooltip-row">
+        <span>Sharpe</span>
+        <strong>{Number(point.sharpe || 0).toFixed(2)}</strong>
+      </div>
+    </div>
+  );
+};
+
+const EfficientFrontier = () => {
+  const { riskData } = usePortfolio();
+  const [data, setData] = useState<any>(null);
+
+  // refetch when the risk snapshot changes (new assets or a new trading session)
+  useEffect(() => {
+    if (!riskData) return;
+    analyticsService.getFrontier()
+      .then((res) => setData(res.data))
+      .catch((error) => console.error("Error fetching efficient frontier:", error));
+  }, [riskData]);
+
+  const hasFrontier = data?.frontier?.length > 0;
+  const maxSharpe = data?.max_sharpe;
+  const minVol = data?.min_volatility;
+
+  return (
+    <div className="glass rounded-2xl p-6 flex flex-col">
+      <div className="mb-6 flex flex-col md:flex-row md:items-end md:justify-between gap-2">
+        <div>
+          <h3 className="text-xl font-bold flex items-center gap-2">
+            <Target className="text-purple-400" size={20} /> Efficient frontier
+          </h3>
+          <p className="text-xs text-neutral-500 mt-1">
+            Markowitz com {data?.simulations?.toLocaleString("pt-BR") || 0} carteiras simuladas e {data?.frontier?.length || 0} pontos otimizados.
+          </p>
+        </div>
+        {maxSharpe && (
+          <div className="text-[11px] text-neutral-400">
+            Max Sharpe <strong className="text-white">{maxSharpe.sharpe.toFixed(2)}</strong> · retorno {pct(maxSharpe.return)} · vol {pct(maxSharpe.volatility)}
+          </div>
+        )}
+      </div>
+      <div className="min-h-[320px] w-full">
+        {hasFrontier ? (
+          <ResponsiveContainer width="100%" height={320}>
+            <ScatterChart margin={{ top: 10, right: 20, bottom: 10, left: 0 }}>
+              <CartesianGrid stroke="#262626" strokeDasharray="3 3" />
+              <XAxis type="number" dataKey="volatility" name="Volatilidade" tickFormatter={pct} stroke="#737373" fontSize={11} />
+              <YAxis type="number" dataKey="return" name="Retorno" tickFormatter={pct} stroke="#737373" fontSize={11} />
+              <ZAxis range={[12, 12]} />
+              <RechartsTooltip content={<FrontierTooltip />} />
+              <Legend wrapperStyle={{ fontSize: 11 }} />
+              <Scatter name="Carteiras simuladas" data={data.cloud} fill="#3b82f6" fillOpacity={0.25} isAnimationActive={false} />
+              <Scatter name="Fronteira eficiente" data={data.frontier} fill="#8b5cf6" line={{ stroke: "#8b5cf6", strokeWidth: 2 }} isAnimationActive={false} />
+              {minVol && <Scatter name="Minima volatilidade" data={[minVol]} fill="#10b981" />}
+              {maxSharpe && <Scatter name="Maximo Sharpe" data={[maxSharpe]} fill="#f59e0b" />}
+            </ScatterChart>
+          </ResponsiveContainer>
+        ) : (
+          <div className="h-[320px] flex items-center justify-center text-neutral-500 text-sm">
+            {data && data.tickers?.length < 2 ? "Adicione ao menos dois ativos para calcular a fronteira." : "Calculando fronteira..."}
+          </div>
+        )}
+      </div>
+    </div>
+  );
+};
+
+export default EfficientFrontier;
@@ -28,7 +28,13 @@ const TickerTape = () => {
     ws.onmessage = (event) => {
       const message = JSON.parse(event.data);
       if (message.type === "ticker_update") {
-        setUpdates(message.data);
+        // batches carry only the symbols that changed since the last one
+        setUpdates((prev) => {
+          const changed = new Map<string, TickerUpdate>(message.data.map((u: TickerUpdate) => [u.symbol, u]));
+          const merged = prev.map((u) => changed.get(u.symbol) || u);
+          const known = new Set(prev.map((u) => u.symbol));
+          return [...merged, ...message.data.filter((u: TickerUpdate) => !known.has(u.symbol))];
+        });
       }
     };
 
@@ -31,6 +31,7 @@ export const portfolioService = {
 
 export const analyticsService = {
   getRisk: () => api.get("/analytics/risk"),
+  getFrontier: (points = 30) => api.get(`/analytics/frontier?points=${points}`),
   getForecast: (ticker: string, days = 15) => api.get(`/analytics/forecast/${encodeURIComponent(ticker)}?days=${days}`),
   getSentiment: (ticker: string) => api.get(`/ai/sentiment/${encodeURIComponent(ticker)}`),
   getMacro: () => api.get("/analytics/macro"),